@@ -1,5 +1,7 @@
 # api/appointment/admin.py
 from django.contrib import admin
+
+from api.utils.admin_changelist import ChangelistEficienteMixin
 from .models import Cita, HorarioAtencion, RecordatorioCita
 
 
@@ -17,6 +19,7 @@ class HorarioAtencionAdmin(admin.ModelAdmin):
         'activo',
         'fecha_creacion'
     ]
+    list_select_related = ['odontologo']
     
     list_filter = [
         'dia_semana',
@@ -58,7 +61,7 @@ class HorarioAtencionAdmin(admin.ModelAdmin):
 
 
 @admin.register(Cita)
-class CitaAdmin(admin.ModelAdmin):
+class CitaAdmin(ChangelistEficienteMixin, admin.ModelAdmin):
     """Admin para citas"""
     
     list_display = [
@@ -150,7 +153,7 @@ class CitaAdmin(admin.ModelAdmin):
 
 
 @admin.register(RecordatorioCita)
-class RecordatorioCitaAdmin(admin.ModelAdmin):
+class RecordatorioCitaAdmin(ChangelistEficienteMixin, admin.ModelAdmin):
     """Admin para recordatorios"""
     
     list_display = [
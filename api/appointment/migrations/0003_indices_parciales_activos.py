@@ -0,0 +1,44 @@
+# Generated by Django 5.1.6 on 2026-10-18 22:57
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Índices parciales (WHERE activo) creados CONCURRENTLY antes de borrar los
+    # completos que reemplazan: las consultas calientes no quedan sin índice y
+    # la migración no bloquea escrituras. Si un CREATE INDEX CONCURRENTLY se
+    # interrumpe queda un índice INVALID: borrarlo y volver a migrar. Revertir
+    # recrea los índices anteriores.
+    atomic = False
+
+    dependencies = [
+        ('appointment', '0002_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='cita',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['odontologo', 'fecha', 'hora_inicio'], name='idx_cita_odontologo_act'),
+        ),
+        AddIndexConcurrently(
+            model_name='cita',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['paciente', '-fecha'], name='idx_cita_paciente_act'),
+        ),
+        AddIndexConcurrently(
+            model_name='cita',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['estado', 'fecha'], name='idx_cita_estado_act'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='cita',
+            name='appointment_fecha_bc4a70_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='cita',
+            name='appointment_pacient_0cbbff_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='cita',
+            name='appointment_estado_5cdb50_idx',
+        ),
+    ]
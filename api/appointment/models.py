@@ -1,8 +1,11 @@
 # api/appointment/models.py
 from django.db import models
+from django.db.models import Q
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from django_currentuser.db.models import CurrentUserField
+from api.patients.models.base import ActivosManager, SoftDeleteManager
+from common.services.particiones_service import HistorialParticionadoQuerySet
 from datetime import datetime, timedelta
 import uuid
 
@@ -158,15 +161,21 @@ class Cita(models.Model):
     actualizado_por = CurrentUserField(on_update=True, related_name='citas_actualizadas', null=True, blank=True, editable=False)
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_modificacion = models.DateTimeField(auto_now=True)
+
+    objects = SoftDeleteManager()
+    activos = ActivosManager()
     
     class Meta:
         verbose_name = "Cita"
         verbose_name_plural = "Citas"
         ordering = ['-fecha', '-hora_inicio']
         indexes = [
-            models.Index(fields=['fecha', 'odontologo']),
-            models.Index(fields=['paciente', 'fecha']),
-            models.Index(fields=['estado', 'fecha']),
+            models.Index(
+                fields=['odontologo', 'fecha', 'hora_inicio'], name='idx_cita_odontologo_act',
+                condition=Q(activo=True),
+            ),
+            models.Index(fields=['paciente', '-fecha'], name='idx_cita_paciente_act', condition=Q(activo=True)),
+            models.Index(fields=['estado', 'fecha'], name='idx_cita_estado_act', condition=Q(activo=True)),
         ]
     
     def __str__(self):
@@ -272,6 +281,9 @@ class RecordatorioCita(models.Model):
     enviado_exitosamente = models.BooleanField(default=False)
     mensaje = models.TextField(blank=True)
     error = models.TextField(blank=True)
+
+    # Tabla particionada por mes (common/services/particiones_service.py)
+    objects = HistorialParticionadoQuerySet.as_manager()
     
     class Meta:
         verbose_name = "Recordatorio"
@@ -333,6 +345,9 @@ class HistorialCita(models.Model):
         blank=True,
         verbose_name='Descripción del cambio'
     )
+
+    # Tabla particionada por mes (common/services/particiones_service.py)
+    objects = HistorialParticionadoQuerySet.as_manager()
     
     class Meta:
         db_table = 'historial_citas'
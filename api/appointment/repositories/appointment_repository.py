@@ -11,9 +11,9 @@ class CitaRepository:
     @staticmethod
     def obtener_todas(filtros=None):
         """Obtiene todas las citas con filtros opcionales"""
-        queryset = Cita.objects.select_related(
+        queryset = Cita.activos.select_related(
             'paciente', 'odontologo', 'creado_por', 'cancelada_por'
-        ).filter(activo=True)
+        )
         
         if filtros:
             if 'odontologo' in filtros:
@@ -42,20 +42,19 @@ class CitaRepository:
     def obtener_por_id(cita_id):
         """Obtiene una cita por ID"""
         try:
-            return Cita.objects.select_related(
+            return Cita.activos.select_related(
                 'paciente', 'odontologo', 'creado_por',
                 'cancelada_por', 'cita_original'
-            ).get(id=cita_id, activo=True)
+            ).get(id=cita_id)
         except Cita.DoesNotExist:
             return None
     
     @staticmethod
     def obtener_por_fecha_y_odontologo(fecha, odontologo_id):
         """Obtiene citas de un odontólogo en una fecha específica"""
-        return Cita.objects.select_related('paciente', 'odontologo').filter(
+        return Cita.activos.select_related('paciente', 'odontologo').filter(
             fecha=fecha,
             odontologo_id=odontologo_id,
-            activo=True
         ).exclude(
             estado__in=[EstadoCita.CANCELADA, EstadoCita.REPROGRAMADA]
         ).order_by('hora_inicio')
@@ -64,9 +63,8 @@ class CitaRepository:
     def obtener_por_semana(fecha_inicio, odontologo_id=None):
         """Obtiene citas de una semana"""
         fecha_fin = fecha_inicio + timedelta(days=6)
-        queryset = Cita.objects.select_related('paciente', 'odontologo').filter(
+        queryset = Cita.activos.select_related('paciente', 'odontologo').filter(
             fecha__range=[fecha_inicio, fecha_fin],
-            activo=True
         ).exclude(
             estado__in=[EstadoCita.CANCELADA, EstadoCita.REPROGRAMADA]
         )
@@ -79,9 +77,8 @@ class CitaRepository:
     @staticmethod
     def obtener_por_paciente(paciente_id):
         """Obtiene todas las citas de un paciente"""
-        return Cita.objects.select_related('odontologo').filter(
+        return Cita.activos.select_related('odontologo').filter(
             paciente_id=paciente_id,
-            activo=True
         ).order_by('-fecha', '-hora_inicio')
     
     @staticmethod
@@ -107,10 +104,9 @@ class CitaRepository:
     @staticmethod
     def verificar_disponibilidad(odontologo_id, fecha, hora_inicio, hora_fin, excluir_cita_id=None):
         """Verifica si un odontólogo está disponible en un horario"""
-        queryset = Cita.objects.filter(
+        queryset = Cita.activos.filter(
             odontologo_id=odontologo_id,
             fecha=fecha,
-            activo=True
         ).exclude(
             estado__in=[EstadoCita.CANCELADA, EstadoCita.REPROGRAMADA]
         )
@@ -134,8 +130,7 @@ class CitaRepository:
         ahora = timezone.now()
         limite_inferior = ahora + timedelta(hours=23)
         limite_superior = ahora + timedelta(hours=25)
-        return Cita.objects.filter(
-            activo=True,
+        return Cita.activos.filter(
             recordatorio_enviado=False, #
             estado__in=[EstadoCita.PROGRAMADA, EstadoCita.CONFIRMADA]
         ).filter(
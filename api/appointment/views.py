@@ -348,7 +348,8 @@ class CitaViewSet(viewsets.ModelViewSet):
         instance = self.get_object()
         from .models import HistorialCita
         from .serializers import HistorialCitaSerializer
-        historial = HistorialCita.objects.filter(
+        # periodo(): trae del archivo los meses ya archivados del historial de la cita
+        historial = HistorialCita.objects.periodo(instance.fecha_creacion).filter(
             cita=instance
         ).select_related('usuario').order_by('-fecha_cambio')
         serializer = HistorialCitaSerializer(historial, many=True)
@@ -574,7 +575,7 @@ class CitaViewSet(viewsets.ModelViewSet):
         GET /api/appointment/citas/{cita_id}/recordatorios/
         """
         cita = self.get_object()
-        recordatorios = RecordatorioCita.objects.filter(
+        recordatorios = RecordatorioCita.objects.periodo(cita.fecha_creacion).filter(
             cita=cita
         ).order_by('-fecha_envio')
         
@@ -1,15 +1,33 @@
 # api/clinical_files/admin.py
 from django.contrib import admin
-from .models import ClinicalFile
+
+from api.utils.admin_changelist import ChangelistEficienteMixin
+from .models import ArchivoBlob, ClinicalFile, EliminacionStorage
 
 
 @admin.register(ClinicalFile)
-class ClinicalFileAdmin(admin.ModelAdmin):
+class ClinicalFileAdmin(ChangelistEficienteMixin, admin.ModelAdmin):
     list_display = ['original_filename', 'paciente', 'category', 'file_size_mb', 'uploaded_by', 'created_at']
-    list_filter = ['category', 'created_at', 'mime_type']
+    list_select_related = ['paciente', 'uploaded_by']
+    list_filter = ['category', 'created_at', 'mime_type', 'derivados_estado']
     search_fields = ['original_filename', 'paciente__nombres', 'paciente__apellidos']
-    readonly_fields = ['id', 'bucket_name', 's3_key', 'created_at', 'is_dicom']
+    readonly_fields = ['id', 'bucket_name', 's3_key', 'sha256', 'blob', 'created_at', 'is_dicom', 'derivados', 'derivados_estado', 'derivados_intentos']
     
     def file_size_mb(self, obj):
         return f"{obj.file_size_bytes / 1024 / 1024:.2f} MB"
     file_size_mb.short_description = 'Tamaño'
+
+
+@admin.register(ArchivoBlob)
+class ArchivoBlobAdmin(ChangelistEficienteMixin, admin.ModelAdmin):
+    list_display = ['sha256', 'paciente', 'file_size_bytes', 'referencias', 'created_at']
+    list_select_related = ['paciente']
+    search_fields = ['sha256', 's3_key']
+    readonly_fields = ['id', 'paciente', 'sha256', 'bucket_name', 's3_key', 'file_size_bytes', 'referencias', 'created_at']
+
+
+@admin.register(EliminacionStorage)
+class EliminacionStorageAdmin(admin.ModelAdmin):
+    list_display = ['s3_key', 'intentos', 'proximo_intento', 'created_at']
+    search_fields = ['s3_key', 'origen']
+    readonly_fields = ['s3_key', 'origen', 'intentos', 'ultimo_error', 'proximo_intento', 'created_at']
@@ -15,4 +15,10 @@ class ClinicalFilesConfig(AppConfig):
         Registra signals cuando la aplicación está lista.
         Implementa patrón Observer para eventos del modelo.
         """
-        import api.clinical_files.signals  # noqa
\ No newline at end of file
+        import api.clinical_files.signals  # noqa
+
+        from django.conf import settings
+        if getattr(settings, 'STORAGE_VERIFICAR_AL_INICIAR', False):
+            # Cliente y bucket listos antes del primer request, sin bloquear el arranque
+            from common.services.storage_service import StorageService
+            StorageService.verificar_en_segundo_plano()
\ No newline at end of file
@@ -0,0 +1,39 @@
+# api/clinical_files/management/commands/generar_derivados.py
+# python manage.py generar_derivados [--limite N] [--sin-reintentos]
+# Genera miniaturas y vistas previas pendientes (archivos previos a los derivados
+# o cuyo hilo de fondo no terminó) y reintenta los fallidos hasta MAX_INTENTOS
+
+from django.core.management.base import BaseCommand
+
+from api.clinical_files.models import ClinicalFile
+from api.clinical_files.services.derivados_service import MAX_INTENTOS, DerivadosService
+
+
+class Command(BaseCommand):
+    help = 'Genera los derivados (miniatura y vista previa) pendientes de los archivos clínicos'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limite', type=int, default=None, help='Máximo de archivos a procesar')
+        parser.add_argument(
+            '--sin-reintentos',
+            action='store_true',
+            help='No reintenta los archivos con estado ERROR',
+        )
+
+    def handle(self, *args, **options):
+        resumen = DerivadosService.procesar_pendientes(
+            limite=options['limite'],
+            reintentar=not options['sin_reintentos'],
+        )
+        if not resumen:
+            self.stdout.write(self.style.SUCCESS('No hay derivados pendientes'))
+            return
+
+        detalle = ', '.join(f"{estado}: {cantidad}" for estado, cantidad in sorted(resumen.items()))
+        errores = resumen.get(ClinicalFile.EstadoDerivados.ERROR, 0)
+        if errores:
+            self.stdout.write(self.style.WARNING(
+                f"{detalle} (los errores se reintentan hasta {MAX_INTENTOS} veces)"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(detalle))
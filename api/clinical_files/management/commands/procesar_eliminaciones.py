@@ -0,0 +1,37 @@
+# api/clinical_files/management/commands/procesar_eliminaciones.py
+# python manage.py procesar_eliminaciones [--lote 1000] [--max-lotes N]
+# Vacía la cola de eliminación del storage (DeleteObjects en lote); pensado para cron
+
+from django.core.management.base import BaseCommand
+
+from api.clinical_files.models import EliminacionStorage
+from api.clinical_files.services.eliminacion_service import ColaEliminacionService
+from common.services.storage_backend import MAX_CLAVES_DELETE_OBJECTS
+
+
+class Command(BaseCommand):
+    help = 'Elimina del storage los objetos encolados, en lotes de hasta 1000 claves'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=MAX_CLAVES_DELETE_OBJECTS,
+            help='Claves por llamada a DeleteObjects (máximo 1000)',
+        )
+        parser.add_argument('--max-lotes', type=int, default=None, help='Máximo de lotes a procesar')
+
+    def handle(self, *args, **options):
+        resumen = ColaEliminacionService.procesar(
+            tamano_lote=max(1, min(options['lote'], MAX_CLAVES_DELETE_OBJECTS)),
+            max_lotes=options['max_lotes'],
+        )
+        pendientes = EliminacionStorage.objects.count()
+        mensaje = (
+            f"{resumen['eliminados']} eliminado(s), {resumen['descartados']} descartado(s) "
+            f"(vueltos a referenciar), {resumen['fallidos']} fallido(s); {pendientes} en cola"
+        )
+        if resumen['fallidos']:
+            self.stdout.write(self.style.WARNING(mensaje))
+        else:
+            self.stdout.write(self.style.SUCCESS(mensaje))
@@ -0,0 +1,50 @@
+# api/clinical_files/management/commands/reconciliar_storage.py
+# python manage.py reconciliar_storage [--prefijo pacientes/] [--horas 24] [--eliminar]
+# Sin --eliminar solo informa los objetos huérfanos del bucket
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from api.clinical_files.services.reconciliacion_service import (
+    PREFIJO_PACIENTES,
+    ReconciliacionStorageService,
+)
+
+
+class Command(BaseCommand):
+    help = 'Busca objetos del bucket sin registro en BD (subidas nunca confirmadas) y opcionalmente los elimina'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--prefijo', default=PREFIJO_PACIENTES, help='Prefijo a recorrer')
+        parser.add_argument(
+            '--horas',
+            type=int,
+            default=24,
+            help='Antigüedad mínima del objeto (las subidas en curso son más recientes)',
+        )
+        parser.add_argument(
+            '--eliminar',
+            action='store_true',
+            help='Encola los huérfanos en la cola de eliminación',
+        )
+
+    def handle(self, *args, **options):
+        huerfanos = list(ReconciliacionStorageService.huerfanos(
+            prefijo=options['prefijo'],
+            antiguedad_minima=timedelta(hours=options['horas']),
+        ))
+        tamano = sum(objeto['size'] for objeto in huerfanos)
+        for objeto in huerfanos[:20]:
+            self.stdout.write(f"  {objeto['key']} ({objeto['size']} bytes, {objeto['last_modified']:%Y-%m-%d %H:%M})")
+        if len(huerfanos) > 20:
+            self.stdout.write(f"  … y {len(huerfanos) - 20} más")
+
+        resumen = f"{len(huerfanos)} huérfano(s), {tamano / 1024 / 1024:.2f} MB"
+        if not huerfanos:
+            self.stdout.write(self.style.SUCCESS('No hay objetos huérfanos'))
+        elif options['eliminar']:
+            ReconciliacionStorageService.encolar_huerfanos(huerfanos)
+            self.stdout.write(self.style.SUCCESS(f"{resumen} encolado(s) para eliminación"))
+        else:
+            self.stdout.write(self.style.WARNING(f"{resumen}; use --eliminar para eliminarlos"))
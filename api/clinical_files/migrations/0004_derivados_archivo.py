@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-18 21:35
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical_files', '0003_initial'),
+        ('patients', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clinicalfile',
+            name='derivados',
+            field=models.JSONField(blank=True, default=dict, help_text='{nombre: {key, width, height, content_type, size}}'),
+        ),
+        migrations.AddField(
+            model_name='clinicalfile',
+            name='derivados_estado',
+            field=models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('LISTO', 'Generados'), ('ERROR', 'Error'), ('NO_APLICA', 'No aplica')], default='PENDIENTE', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='clinicalfile',
+            name='derivados_intentos',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='clinicalfile',
+            index=models.Index(fields=['derivados_estado'], name='clinical_fi_derivad_69d3e2_idx'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 5.1.6 on 2026-10-18 21:42
+
+import django.db.models.deletion
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical_files', '0004_derivados_archivo'),
+        ('patients', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='clinicalfile',
+            name='sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.CreateModel(
+            name='ArchivoBlob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('sha256', models.CharField(max_length=64)),
+                ('bucket_name', models.CharField(max_length=255)),
+                ('s3_key', models.CharField(max_length=1024, unique=True)),
+                ('file_size_bytes', models.BigIntegerField()),
+                ('referencias', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('paciente', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='blobs_clinicos', to='patients.paciente')),
+            ],
+            options={
+                'db_table': 'clinical_file_blobs',
+            },
+        ),
+        migrations.AddField(
+            model_name='clinicalfile',
+            name='blob',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='archivos', to='clinical_files.archivoblob'),
+        ),
+        migrations.AddConstraint(
+            model_name='archivoblob',
+            constraint=models.UniqueConstraint(fields=('paciente', 'sha256'), name='blob_unico_por_paciente'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.1.6 on 2026-10-18 21:48
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical_files', '0005_blobs_contenido'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EliminacionStorage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('s3_key', models.CharField(max_length=1024)),
+                ('origen', models.CharField(max_length=1024)),
+                ('intentos', models.PositiveSmallIntegerField(default=0)),
+                ('ultimo_error', models.TextField(blank=True, default='')),
+                ('proximo_intento', models.DateTimeField(default=django.utils.timezone.now)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'clinical_file_deletions',
+                'indexes': [models.Index(fields=['proximo_intento', 'id'], name='clinical_fi_proximo_afe0a4_idx')],
+            },
+        ),
+    ]
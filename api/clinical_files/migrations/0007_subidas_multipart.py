@@ -0,0 +1,31 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:22
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical_files', '0006_cola_eliminacion'),
+        ('patients', '0003_indices_parciales_activos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SubidaMultipart',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('upload_id', models.CharField(max_length=1024)),
+                ('s3_key', models.CharField(max_length=1024, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('paciente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='subidas_multipart', to='patients.paciente')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'clinical_file_multipart_uploads',
+            },
+        ),
+    ]
@@ -1,8 +1,35 @@
 import uuid
 from django.db import models
 from django.conf import settings
+from django.utils import timezone
 from api.odontogram.models import Paciente, HistorialOdontograma
 
+
+class ArchivoBlob(models.Model):
+    """
+    Objeto del storage direccionado por contenido (SHA-256), compartido por
+    los ClinicalFile del mismo paciente que suben el mismo archivo.
+    El objeto se elimina del storage cuando `referencias` llega a 0.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    paciente = models.ForeignKey(Paciente, on_delete=models.PROTECT, related_name='blobs_clinicos')
+    sha256 = models.CharField(max_length=64)
+    bucket_name = models.CharField(max_length=255)
+    s3_key = models.CharField(max_length=1024, unique=True)
+    file_size_bytes = models.BigIntegerField()
+    referencias = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'clinical_file_blobs'
+        constraints = [
+            models.UniqueConstraint(fields=['paciente', 'sha256'], name='blob_unico_por_paciente'),
+        ]
+
+    def __str__(self):
+        return f"{self.sha256[:12]}… ({self.referencias} ref.)"
+
+
 class ClinicalFile(models.Model):
     class FileType(models.TextChoices):
         XRAY = 'XRAY', 'Radiografía (IMG/DICOM)'
@@ -11,6 +38,12 @@ class ClinicalFile(models.Model):
         MODEL_3D = '3D', 'Modelo 3D (STL/OBJ)'
         OTHER = 'OTHER', 'Otro'
 
+    class EstadoDerivados(models.TextChoices):
+        PENDIENTE = 'PENDIENTE', 'Pendiente'
+        LISTO = 'LISTO', 'Generados'
+        ERROR = 'ERROR', 'Error'
+        NO_APLICA = 'NO_APLICA', 'No aplica'
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     
     # Propiedad y Contexto Clínico
@@ -33,6 +66,29 @@ class ClinicalFile(models.Model):
     file_size_bytes = models.BigIntegerField()
     category = models.CharField(max_length=20, choices=FileType.choices, default=FileType.OTHER)
 
+    # Integridad / deduplicación (None en archivos previos y subidas multipart)
+    sha256 = models.CharField(max_length=64, null=True, blank=True, db_index=True)
+    blob = models.ForeignKey(
+        ArchivoBlob,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name='archivos',
+    )
+
+    # Derivados (miniatura y vista previa) generados en segundo plano
+    derivados = models.JSONField(
+        default=dict,
+        blank=True,
+        help_text="{nombre: {key, width, height, content_type, size}}"
+    )
+    derivados_estado = models.CharField(
+        max_length=10,
+        choices=EstadoDerivados.choices,
+        default=EstadoDerivados.PENDIENTE,
+    )
+    derivados_intentos = models.PositiveSmallIntegerField(default=0)
+
     # Auditoría
     uploaded_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.PROTECT)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -42,8 +98,55 @@ class ClinicalFile(models.Model):
         indexes = [
             models.Index(fields=['paciente', 'created_at']),
             models.Index(fields=['snapshot_version']),
+            models.Index(fields=['derivados_estado']),
         ]
 
     @property
     def is_dicom(self):
         return 'dicom' in self.mime_type or self.original_filename.lower().endswith('.dcm')
+
+    def derivado_key(self, nombre):
+        """Clave en storage del derivado ('thumb', 'preview') o None si no existe"""
+        return (self.derivados or {}).get(nombre, {}).get('key')
+
+
+class EliminacionStorage(models.Model):
+    """
+    Cola de objetos a eliminar del storage. Se encola en la misma transacción
+    que borra el registro; un worker la vacía con DeleteObjects en lote.
+    """
+    s3_key = models.CharField(max_length=1024)
+    # Clave del archivo original: si vuelve a estar referenciada, no se elimina
+    origen = models.CharField(max_length=1024)
+    intentos = models.PositiveSmallIntegerField(default=0)
+    ultimo_error = models.TextField(blank=True, default='')
+    proximo_intento = models.DateTimeField(default=timezone.now)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'clinical_file_deletions'
+        indexes = [
+            models.Index(fields=['proximo_intento', 'id']),
+        ]
+
+    def __str__(self):
+        return f"{self.s3_key} ({self.intentos} intento(s))"
+
+
+class SubidaMultipart(models.Model):
+    """
+    Subida multipart en curso: liga el upload_id y la clave al paciente y al
+    usuario que la inició. Solo ese usuario puede pedir URLs de partes,
+    completarla o cancelarla; el registro se borra al completar o cancelar.
+    """
+    upload_id = models.CharField(max_length=1024)
+    s3_key = models.CharField(max_length=1024, unique=True)
+    paciente = models.ForeignKey(Paciente, on_delete=models.CASCADE, related_name='subidas_multipart')
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'clinical_file_multipart_uploads'
+
+    def __str__(self):
+        return f"{self.s3_key} ({self.usuario_id})"
@@ -8,8 +8,19 @@ from rest_framework import serializers
 from common.services.storage_service import StorageService
 from .models import ClinicalFile
 from api.odontogram.models import Paciente
+import re
 import uuid
 
+SHA256_REGEX = re.compile(r'^[0-9a-f]{64}$')
+
+
+def validar_sha256(value):
+    """SHA-256 del contenido en hexadecimal (se normaliza a minúsculas)"""
+    value = value.strip().lower()
+    if not SHA256_REGEX.match(value):
+        raise serializers.ValidationError("sha256 debe tener 64 caracteres hexadecimales")
+    return value
+
 
 class FileUploadInitSerializer(serializers.Serializer):
     """Validador para iniciar la carga de archivo"""
@@ -17,11 +28,15 @@ class FileUploadInitSerializer(serializers.Serializer):
     filename = serializers.CharField(max_length=255, required=True)
     content_type = serializers.CharField(max_length=100, required=True)
     snapshot_id = serializers.UUIDField(required=False, allow_null=True)
+    sha256 = serializers.CharField(required=False)
     category = serializers.ChoiceField(
         choices=ClinicalFile.FileType.choices,
         default=ClinicalFile.FileType.OTHER
     )
     
+    def validate_sha256(self, value):
+        return validar_sha256(value)
+    
     def validate_paciente_id(self, value):
         """Verifica que el paciente exista"""
         if not Paciente.objects.filter(id=value).exists():
@@ -42,11 +57,111 @@ class FileUploadConfirmSerializer(serializers.Serializer):
     filename = serializers.CharField(max_length=255, required=True)
     content_type = serializers.CharField(max_length=100, required=True)
     size = serializers.IntegerField(min_value=1, required=True)
+    etag = serializers.CharField(max_length=100, required=False, allow_blank=True)
+    sha256 = serializers.CharField(required=False)
     snapshot_id = serializers.UUIDField(required=False, allow_null=True)
     category = serializers.ChoiceField(
         choices=ClinicalFile.FileType.choices,
         default=ClinicalFile.FileType.OTHER
     )
+    
+    def validate_sha256(self, value):
+        return validar_sha256(value)
+
+
+class MultipartInitSerializer(FileUploadInitSerializer):
+    """Validador para iniciar una subida multipart (DICOM, modelos 3D)"""
+    size = serializers.IntegerField(min_value=1, required=True)
+
+
+class MultipartUploadSerializer(serializers.Serializer):
+    """Identifica una subida multipart en curso"""
+    s3_key = serializers.CharField(max_length=1024, required=True)
+    upload_id = serializers.CharField(max_length=1024, required=True)
+    
+    def validate_s3_key(self, value):
+        """Solo claves generadas por init (evita operar sobre objetos ajenos)"""
+        if not value.startswith('pacientes/') or '..' in value:
+            raise serializers.ValidationError("s3_key inválido")
+        return value
+
+
+class MultipartPartsSerializer(MultipartUploadSerializer):
+    """Solicita URLs para partes pendientes (reanudación o URLs vencidas)"""
+    part_numbers = serializers.ListField(
+        child=serializers.IntegerField(min_value=1, max_value=10000),
+        required=False,
+        allow_empty=False,
+        max_length=1000,
+    )
+
+
+class MultipartPartSerializer(serializers.Serializer):
+    part_number = serializers.IntegerField(min_value=1, max_value=10000)
+    etag = serializers.CharField(max_length=100)
+
+
+class MultipartCompleteSerializer(MultipartUploadSerializer):
+    """Partes subidas por el cliente, con el ETag devuelto por cada PUT"""
+    parts = MultipartPartSerializer(many=True, allow_empty=False)
+    
+    def validate_parts(self, value):
+        numeros = [p['part_number'] for p in value]
+        if len(numeros) != len(set(numeros)):
+            raise serializers.ValidationError("Números de parte duplicados")
+        return value
+
+
+URL_EXPIRATION = 3600
+PRESIGN_MAX_ARCHIVOS = 1000
+
+
+def solicitudes_url(archivos, derivados=('thumb', 'preview')):
+    """Pares (s3_key, download_name) de visualización, descarga y derivados de cada archivo"""
+    solicitudes = []
+    for archivo in archivos:
+        solicitudes.append((archivo.s3_key, None))
+        solicitudes.append((archivo.s3_key, archivo.original_filename))
+        solicitudes.extend(solicitudes_derivados([archivo], derivados))
+    return solicitudes
+
+
+def solicitudes_derivados(archivos, derivados=('thumb', 'preview')):
+    """Pares (s3_key, None) de los derivados ya generados"""
+    return [
+        (clave, None)
+        for archivo in archivos
+        for clave in map(archivo.derivado_key, derivados)
+        if clave
+    ]
+
+
+def url_derivado(archivo, nombre):
+    """URL de visualización del derivado (cache de StorageService) o None"""
+    clave = archivo.derivado_key(nombre)
+    if not clave:
+        return None
+    return StorageService().generate_view_url(clave, expiration=URL_EXPIRATION)
+
+
+class PresignBatchSerializer(serializers.Serializer):
+    """Validador para firmar URLs de varios archivos en una sola llamada"""
+    file_ids = serializers.ListField(
+        child=serializers.UUIDField(),
+        allow_empty=False,
+        max_length=PRESIGN_MAX_ARCHIVOS,
+    )
+
+
+class ClinicalFileListURLSerializer(serializers.ListSerializer):
+    """Firma en lote las URLs de todos los archivos antes de serializar cada fila"""
+
+    def to_representation(self, data):
+        archivos = list(data.all() if hasattr(data, 'all') else data)
+        solicitudes = self.child.solicitudes_url(archivos)
+        if solicitudes:
+            StorageService().generate_view_urls(solicitudes, expiration=URL_EXPIRATION)
+        return super().to_representation(archivos)
 
 
 class ClinicalFileSerializer(serializers.ModelSerializer):
@@ -55,6 +170,8 @@ class ClinicalFileSerializer(serializers.ModelSerializer):
     paciente_nombre = serializers.SerializerMethodField()
     file_url = serializers.SerializerMethodField()
     download_url = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
+    preview_url = serializers.SerializerMethodField()
     
     class Meta:
         model = ClinicalFile
@@ -62,11 +179,18 @@ class ClinicalFileSerializer(serializers.ModelSerializer):
             'id', 'paciente', 'paciente_nombre', 'snapshot_version',
             'original_filename', 'mime_type', 'file_size_bytes',
             'category', 'uploaded_by', 'uploaded_by_name',
-            'created_at', 'file_url', 'download_url', 'is_dicom'
+            'created_at', 'file_url', 'download_url', 'is_dicom',
+            'thumbnail_url', 'preview_url', 'derivados_estado'
         ]
         read_only_fields = [
-            'id', 'bucket_name', 's3_key', 'uploaded_by', 'created_at'
+            'id', 'bucket_name', 's3_key', 'uploaded_by', 'created_at',
+            'derivados_estado'
         ]
+        list_serializer_class = ClinicalFileListURLSerializer
+    
+    @staticmethod
+    def solicitudes_url(archivos):
+        return solicitudes_url(archivos)
     
     def get_uploaded_by_name(self, obj):
         """Nombre completo del usuario que subió el archivo"""
@@ -79,31 +203,48 @@ class ClinicalFileSerializer(serializers.ModelSerializer):
         return f"{obj.paciente.nombres} {obj.paciente.apellidos}"
     
     def get_file_url(self, obj):
-        """URL para visualizar (expira en 1 hora)"""
+        """URL para visualizar (expira en 1 hora; se reutiliza desde la cache)"""
         storage = StorageService()
-        return storage.generate_view_url(obj.s3_key, expiration=3600)
+        return storage.generate_view_url(obj.s3_key, expiration=URL_EXPIRATION)
     
     def get_download_url(self, obj):
         """URL para descargar con nombre original"""
         storage = StorageService()
         return storage.generate_view_url(
             obj.s3_key, 
-            expiration=3600, 
+            expiration=URL_EXPIRATION, 
             download_name=obj.original_filename
         )
+    
+    def get_thumbnail_url(self, obj):
+        """Miniatura (256 px) o None si aún no se genera"""
+        return url_derivado(obj, 'thumb')
+    
+    def get_preview_url(self, obj):
+        """Vista previa (1024 px) o None si aún no se genera"""
+        return url_derivado(obj, 'preview')
 
 
 class ClinicalFileListSerializer(serializers.ModelSerializer):
-    """Serializer ligero para listados (sin URLs)"""
+    """Serializer ligero para listados (solo la URL de la miniatura)"""
     uploaded_by_name = serializers.SerializerMethodField()
+    thumbnail_url = serializers.SerializerMethodField()
     
     class Meta:
         model = ClinicalFile
         fields = [
             'id', 'original_filename', 'mime_type', 
             'file_size_bytes', 'category', 'created_at',
-            'uploaded_by_name', 'is_dicom'
+            'uploaded_by_name', 'is_dicom', 'thumbnail_url'
         ]
+        list_serializer_class = ClinicalFileListURLSerializer
+    
+    @staticmethod
+    def solicitudes_url(archivos):
+        return solicitudes_derivados(archivos, ('thumb',))
+    
+    def get_thumbnail_url(self, obj):
+        return url_derivado(obj, 'thumb')
     
     def get_uploaded_by_name(self, obj):
         if hasattr(obj.uploaded_by, 'get_full_name'):
@@ -0,0 +1,14 @@
+"""
+Servicios del módulo de archivos clínicos
+"""
+from .blobs_service import BlobService
+from .derivados_service import DerivadosService
+from .eliminacion_service import ColaEliminacionService
+from .reconciliacion_service import ReconciliacionStorageService
+
+__all__ = [
+    'BlobService',
+    'ColaEliminacionService',
+    'DerivadosService',
+    'ReconciliacionStorageService',
+]
@@ -0,0 +1,81 @@
+# api/clinical_files/services/blobs_service.py
+"""
+Almacenamiento direccionado por contenido de archivos clínicos.
+
+- El cliente envía el SHA-256 en init-upload. Si el paciente ya tiene ese
+  contenido, no se genera URL de subida: confirm-upload reutiliza el objeto.
+- Los objetos nuevos se guardan en 'pacientes/{id}/blobs/{sha256}' y la URL
+  de subida firma el checksum, así el storage rechaza un contenido distinto.
+- La deduplicación es por paciente: un hash conocido no da acceso a
+  archivos de otros pacientes.
+- ArchivoBlob.referencias cuenta los ClinicalFile que apuntan al objeto;
+  el objeto (y sus derivados) se encola para eliminación al liberar la
+  última referencia.
+"""
+import logging
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import F
+
+from api.clinical_files.models import ArchivoBlob, ClinicalFile
+
+from .eliminacion_service import ColaEliminacionService, claves_archivo
+
+logger = logging.getLogger(__name__)
+
+SEGMENTO_BLOBS = '/blobs/'
+
+
+class BlobService:
+    """Referencias a objetos compartidos por contenido."""
+
+    @staticmethod
+    def clave_blob(paciente_id, sha256: str) -> str:
+        return f"pacientes/{paciente_id}{SEGMENTO_BLOBS}{sha256}"
+
+    @staticmethod
+    def es_clave_blob(s3_key: str) -> bool:
+        return SEGMENTO_BLOBS in s3_key
+
+    @staticmethod
+    def buscar(paciente_id, sha256: str) -> Optional[ArchivoBlob]:
+        return ArchivoBlob.objects.filter(paciente_id=paciente_id, sha256=sha256).first()
+
+    @staticmethod
+    def registrar_referencia(paciente_id, sha256: str, bucket_name: str, file_size_bytes: int) -> ArchivoBlob:
+        """Obtiene o crea el blob y suma una referencia (dentro de la transacción actual)."""
+        with transaction.atomic():
+            blob, creado = ArchivoBlob.objects.select_for_update().get_or_create(
+                paciente_id=paciente_id,
+                sha256=sha256,
+                defaults={
+                    'bucket_name': bucket_name,
+                    's3_key': BlobService.clave_blob(paciente_id, sha256),
+                    'file_size_bytes': file_size_bytes,
+                },
+            )
+            ArchivoBlob.objects.filter(pk=blob.pk).update(referencias=F('referencias') + 1)
+            blob.refresh_from_db(fields=['referencias'])
+        if not creado:
+            logger.info(f"[Blobs] {blob.s3_key} reutilizado ({blob.referencias} referencias)")
+        return blob
+
+    @staticmethod
+    def liberar_referencia(archivo: ClinicalFile) -> bool:
+        """
+        Resta la referencia del archivo eliminado. Si era la última, borra el
+        blob y encola la eliminación del objeto y sus derivados.
+        Retorna True si el objeto se elimina.
+        """
+        with transaction.atomic():
+            blob = ArchivoBlob.objects.select_for_update().filter(pk=archivo.blob_id).first()
+            if blob is None:
+                return False
+            if blob.referencias > 1:
+                ArchivoBlob.objects.filter(pk=blob.pk).update(referencias=F('referencias') - 1)
+                return False
+            blob.delete()
+            # Si el mismo contenido se vuelve a subir antes del worker, la cola lo descarta
+            ColaEliminacionService.encolar(claves_archivo(archivo), origen=blob.s3_key)
+        return True
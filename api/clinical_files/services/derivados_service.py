@@ -0,0 +1,235 @@
+# api/clinical_files/services/derivados_service.py
+"""
+Generación de derivados de archivos clínicos: miniatura y vista previa.
+
+- PHOTO / XRAY en formato imagen: reducción con Pillow.
+- DICOM: se renderiza el corte central (pydicom, dependencia opcional).
+- Otros tipos (PDF, STL/OBJ): NO_APLICA.
+
+Los derivados se guardan junto al original ('{uuid}__thumb.webp') y se
+registran en ClinicalFile.derivados. Se generan en segundo plano tras
+confirm-upload; el comando `generar_derivados` procesa pendientes y
+reintenta los fallidos.
+"""
+import io
+import logging
+import tempfile
+import threading
+from typing import Dict, Optional
+
+import numpy as np
+from django.db import close_old_connections, transaction
+from PIL import Image, ImageOps, features
+
+from api.clinical_files.models import ClinicalFile
+from common.services.storage_service import StorageService
+
+logger = logging.getLogger(__name__)
+
+# nombre → lado mayor en píxeles
+TAMANOS_DERIVADOS = {
+    'thumb': 256,
+    'preview': 1024,
+}
+MAX_INTENTOS = 3
+CATEGORIAS_IMAGEN = {ClinicalFile.FileType.PHOTO, ClinicalFile.FileType.XRAY}
+
+if features.check('webp'):
+    FORMATO_DERIVADO, EXTENSION_DERIVADO, CONTENT_TYPE_DERIVADO = 'WEBP', 'webp', 'image/webp'
+else:
+    FORMATO_DERIVADO, EXTENSION_DERIVADO, CONTENT_TYPE_DERIVADO = 'JPEG', 'jpg', 'image/jpeg'
+
+
+class DerivadoNoSoportado(Exception):
+    """El archivo no admite derivados (o falta la librería para leerlo)."""
+
+
+def clave_derivado(s3_key: str, nombre: str) -> str:
+    """Clave hermana del original: .../archivos/{uuid}__{nombre}.webp"""
+    base = s3_key.rsplit('.', 1)[0] if '.' in s3_key.rsplit('/', 1)[-1] else s3_key
+    return f"{base}__{nombre}.{EXTENSION_DERIVADO}"
+
+
+def imagen_desde_pixeles(pixeles: np.ndarray, invertir: bool = False, muestras: int = 1) -> Image.Image:
+    """
+    Convierte un arreglo de píxeles DICOM a imagen de 8 bits.
+    Volúmenes / multiframe: se usa el corte central. `muestras` es
+    SamplesPerPixel (3 = color, con el canal en el último eje).
+    """
+    dimensiones_corte = 3 if muestras > 1 else 2
+    if pixeles.ndim > dimensiones_corte:
+        pixeles = pixeles[pixeles.shape[0] // 2]
+
+    if muestras > 1:
+        return Image.fromarray(pixeles[..., :3].astype(np.uint8), 'RGB')
+
+    valores = pixeles.astype(np.float32)
+    minimo, maximo = float(valores.min()), float(valores.max())
+    escala = 255.0 / (maximo - minimo) if maximo > minimo else 0.0
+    normalizado = ((valores - minimo) * escala).astype(np.uint8)
+    if invertir:
+        normalizado = 255 - normalizado
+    return Image.fromarray(normalizado, 'L')
+
+
+class DerivadosService:
+    """Genera y registra los derivados de un ClinicalFile."""
+
+    @staticmethod
+    def aplica(archivo: ClinicalFile) -> bool:
+        return archivo.is_dicom or (
+            archivo.category in CATEGORIAS_IMAGEN and archivo.mime_type.startswith('image/')
+        )
+
+    @classmethod
+    def programar(cls, archivo_id) -> None:
+        """Genera los derivados en un hilo de fondo cuando la transacción confirma."""
+        def _iniciar():
+            threading.Thread(
+                target=cls._procesar_en_hilo,
+                args=(archivo_id,),
+                name=f"derivados-{archivo_id}",
+                daemon=True,
+            ).start()
+        transaction.on_commit(_iniciar)
+
+    @classmethod
+    def reutilizar(cls, archivo: ClinicalFile) -> bool:
+        """Copia los derivados de otro archivo con el mismo blob (mismo contenido)."""
+        if archivo.blob_id is None:
+            return False
+        previo = (
+            ClinicalFile.objects
+            .filter(blob_id=archivo.blob_id, derivados_estado=ClinicalFile.EstadoDerivados.LISTO)
+            .exclude(id=archivo.id)
+            .only('derivados')
+            .first()
+        )
+        if previo is None:
+            return False
+        cls._guardar(archivo, ClinicalFile.EstadoDerivados.LISTO, previo.derivados)
+        return True
+
+    @classmethod
+    def _procesar_en_hilo(cls, archivo_id) -> None:
+        try:
+            cls.procesar(archivo_id)
+        finally:
+            close_old_connections()
+
+    @classmethod
+    def procesar(cls, archivo_id) -> Optional[str]:
+        """Genera los derivados del archivo y retorna el estado final."""
+        archivo = ClinicalFile.objects.filter(id=archivo_id).first()
+        if archivo is None:
+            return None
+
+        if not cls.aplica(archivo):
+            cls._guardar(archivo, ClinicalFile.EstadoDerivados.NO_APLICA, {})
+            return archivo.derivados_estado
+
+        storage = StorageService()
+        try:
+            with tempfile.SpooledTemporaryFile(max_size=32 * 1024 * 1024) as original:
+                if not storage.download_file(archivo.s3_key, original):
+                    raise IOError(f"No se pudo descargar {archivo.s3_key}")
+                original.seek(0)
+                imagen = cls._abrir(archivo, original)
+
+            derivados = {}
+            for nombre, lado in TAMANOS_DERIVADOS.items():
+                derivado = cls._reducir(imagen, lado)
+                contenido = cls._codificar(derivado)
+                clave = clave_derivado(archivo.s3_key, nombre)
+                if not storage.upload_file(clave, contenido, CONTENT_TYPE_DERIVADO):
+                    raise IOError(f"No se pudo subir el derivado {clave}")
+                derivados[nombre] = {
+                    'key': clave,
+                    'width': derivado.width,
+                    'height': derivado.height,
+                    'content_type': CONTENT_TYPE_DERIVADO,
+                    'size': len(contenido),
+                }
+        except DerivadoNoSoportado as e:
+            logger.info(f"[Derivados] {archivo.id} sin derivados: {e}")
+            cls._guardar(archivo, ClinicalFile.EstadoDerivados.NO_APLICA, {})
+            return archivo.derivados_estado
+        except Exception as e:
+            logger.error(f"[Derivados] Error generando derivados de {archivo.id}: {e}", exc_info=True)
+            cls._guardar(archivo, ClinicalFile.EstadoDerivados.ERROR, {'error': str(e)}, intento=True)
+            return archivo.derivados_estado
+
+        cls._guardar(archivo, ClinicalFile.EstadoDerivados.LISTO, derivados, intento=True)
+        logger.info(f"[Derivados] {archivo.id}: {', '.join(derivados)} generados")
+        return archivo.derivados_estado
+
+    @classmethod
+    def procesar_pendientes(cls, limite: Optional[int] = None, reintentar: bool = True) -> Dict[str, int]:
+        """Procesa los pendientes (y los fallidos con intentos restantes)."""
+        estados = [ClinicalFile.EstadoDerivados.PENDIENTE]
+        if reintentar:
+            estados.append(ClinicalFile.EstadoDerivados.ERROR)
+        ids = (
+            ClinicalFile.objects
+            .filter(derivados_estado__in=estados, derivados_intentos__lt=MAX_INTENTOS)
+            .order_by('created_at')
+            .values_list('id', flat=True)
+        )
+        if limite:
+            ids = ids[:limite]
+
+        resumen: Dict[str, int] = {}
+        for archivo_id in list(ids):
+            estado = cls.procesar(archivo_id)
+            resumen[estado] = resumen.get(estado, 0) + 1
+        return resumen
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Helpers privados
+    # ─────────────────────────────────────────────────────────────────────────
+    @staticmethod
+    def _abrir(archivo: ClinicalFile, contenido) -> Image.Image:
+        if archivo.is_dicom:
+            try:
+                import pydicom
+            except ImportError:
+                raise DerivadoNoSoportado("pydicom no está instalado") from None
+            dataset = pydicom.dcmread(contenido)
+            invertir = getattr(dataset, 'PhotometricInterpretation', '') == 'MONOCHROME1'
+            return imagen_desde_pixeles(
+                dataset.pixel_array, invertir, int(getattr(dataset, 'SamplesPerPixel', 1))
+            )
+
+        imagen = Image.open(contenido)
+        # JPEG: decodifica directamente a escala reducida (mucho más rápido)
+        imagen.draft('RGB', (max(TAMANOS_DERIVADOS.values()),) * 2)
+        imagen = ImageOps.exif_transpose(imagen)
+        imagen.load()
+        if imagen.mode in ('I', 'I;16', 'F'):
+            # Radiografías de 16 bits: normalizar el rango real a 8 bits
+            return imagen_desde_pixeles(np.asarray(imagen))
+        return imagen
+
+    @staticmethod
+    def _reducir(imagen: Image.Image, lado: int) -> Image.Image:
+        derivado = imagen.copy()
+        derivado.thumbnail((lado, lado), Image.Resampling.LANCZOS)
+        if derivado.mode not in ('RGB', 'L'):
+            derivado = derivado.convert('RGB')
+        return derivado
+
+    @staticmethod
+    def _codificar(imagen: Image.Image) -> bytes:
+        buffer = io.BytesIO()
+        imagen.save(buffer, FORMATO_DERIVADO, quality=80)
+        return buffer.getvalue()
+
+    @staticmethod
+    def _guardar(archivo: ClinicalFile, estado: str, derivados: dict, intento: bool = False) -> None:
+        archivo.derivados_estado = estado
+        archivo.derivados = derivados
+        campos = ['derivados_estado', 'derivados']
+        if intento:
+            archivo.derivados_intentos += 1
+            campos.append('derivados_intentos')
+        archivo.save(update_fields=campos)
@@ -0,0 +1,146 @@
+# api/clinical_files/services/eliminacion_service.py
+"""
+Eliminación diferida y en lote de objetos del storage.
+
+- Al borrar un ClinicalFile (o liberar la última referencia de un blob) las
+  claves se encolan en EliminacionStorage dentro de la misma transacción:
+  si el borrado se revierte, la cola también.
+- Tras el commit un hilo de fondo vacía la cola con DeleteObjects
+  (hasta 1000 claves por llamada). Las claves que fallan se reintentan con
+  espera exponencial; `manage.py procesar_eliminaciones` vacía la cola de
+  forma periódica (cron) y recoge lo que el hilo no alcanzó.
+- Antes de eliminar se descartan las claves cuyo archivo de origen volvió a
+  estar referenciado (p. ej. el mismo contenido se subió otra vez).
+"""
+import logging
+import threading
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional
+
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from api.clinical_files.models import ArchivoBlob, ClinicalFile, EliminacionStorage
+from common.services.storage_backend import MAX_CLAVES_DELETE_OBJECTS
+from common.services.storage_service import StorageService
+
+logger = logging.getLogger(__name__)
+
+RETRASO_BASE = timedelta(minutes=1)
+RETRASO_MAXIMO = timedelta(hours=1)
+
+
+def claves_archivo(archivo: ClinicalFile) -> List[str]:
+    """Clave del original y de sus derivados"""
+    return [archivo.s3_key] + [
+        derivado['key'] for derivado in (archivo.derivados or {}).values()
+        if isinstance(derivado, dict) and derivado.get('key')
+    ]
+
+
+class ColaEliminacionService:
+    """Encola y procesa eliminaciones de objetos del storage."""
+
+    _drenando = threading.Lock()
+
+    @classmethod
+    def encolar(cls, claves: Iterable[str], origen: Optional[str] = None) -> None:
+        """
+        Encola las claves en la transacción actual y agenda el worker tras el commit.
+        Sin `origen`, cada clave es su propio origen (objetos huérfanos).
+        """
+        EliminacionStorage.objects.bulk_create([
+            EliminacionStorage(s3_key=clave, origen=origen or clave) for clave in dict.fromkeys(claves)
+        ])
+        transaction.on_commit(cls.programar)
+
+    @classmethod
+    def programar(cls) -> None:
+        if cls._drenando.locked():
+            return
+        threading.Thread(target=cls._drenar_en_hilo, name='eliminacion-storage', daemon=True).start()
+
+    @classmethod
+    def _drenar_en_hilo(cls) -> None:
+        # Un solo worker por proceso; el siguiente commit o el cron recogen el resto
+        if not cls._drenando.acquire(blocking=False):
+            return
+        try:
+            cls.procesar()
+        except Exception as e:
+            logger.error(f"[Eliminacion] Error vaciando la cola: {e}", exc_info=True)
+        finally:
+            cls._drenando.release()
+            close_old_connections()
+
+    @classmethod
+    def procesar(cls, tamano_lote: int = MAX_CLAVES_DELETE_OBJECTS, max_lotes: Optional[int] = None) -> Dict[str, int]:
+        """
+        Procesa los elementos vencidos de la cola por lotes.
+
+        Returns:
+            {'eliminados': n, 'fallidos': n, 'descartados': n}
+        """
+        resumen = {'eliminados': 0, 'fallidos': 0, 'descartados': 0}
+        lotes = 0
+        while max_lotes is None or lotes < max_lotes:
+            resultado = cls._procesar_lote(tamano_lote)
+            if resultado is None:
+                break
+            for clave, cantidad in resultado.items():
+                resumen[clave] += cantidad
+            lotes += 1
+            if resultado['eliminados'] + resultado['descartados'] == 0:
+                # Todo el lote falló: se reintenta más tarde
+                break
+        return resumen
+
+    @classmethod
+    def _procesar_lote(cls, tamano_lote: int) -> Optional[Dict[str, int]]:
+        with transaction.atomic():
+            filas = list(
+                EliminacionStorage.objects
+                .select_for_update(skip_locked=True)
+                .filter(proximo_intento__lte=timezone.now())
+                .order_by('proximo_intento', 'id')[:tamano_lote]
+            )
+            if not filas:
+                return None
+
+            referenciados = cls._referenciados({fila.origen for fila in filas})
+            descartadas = [fila.id for fila in filas if fila.origen in referenciados]
+            pendientes = [fila for fila in filas if fila.origen not in referenciados]
+
+            errores = {}
+            if pendientes:
+                errores = StorageService().delete_files(list(dict.fromkeys(f.s3_key for f in pendientes)))
+
+            fallidas = [fila for fila in pendientes if fila.s3_key in errores]
+            completas = [fila.id for fila in pendientes if fila.s3_key not in errores]
+            EliminacionStorage.objects.filter(id__in=completas + descartadas).delete()
+            ahora = timezone.now()
+            for fila in fallidas:
+                fila.proximo_intento = ahora + cls._retraso(fila.intentos)
+                fila.intentos += 1
+                fila.ultimo_error = errores[fila.s3_key][:1000]
+            if fallidas:
+                EliminacionStorage.objects.bulk_update(fallidas, ['intentos', 'ultimo_error', 'proximo_intento'])
+
+        if fallidas:
+            logger.warning(f"[Eliminacion] {len(fallidas)} objeto(s) no eliminados; se reintentarán")
+        logger.info(
+            f"[Eliminacion] Lote: {len(completas)} eliminado(s), {len(descartadas)} descartado(s), "
+            f"{len(fallidas)} fallido(s)"
+        )
+        return {'eliminados': len(completas), 'fallidos': len(fallidas), 'descartados': len(descartadas)}
+
+    @staticmethod
+    def _retraso(intentos: int) -> timedelta:
+        """Espera exponencial: 1, 2, 4 … minutos, hasta una hora"""
+        return min(RETRASO_BASE * 2 ** min(intentos, 10), RETRASO_MAXIMO)
+
+    @staticmethod
+    def _referenciados(origenes: set) -> set:
+        referenciados = set(ClinicalFile.objects.filter(s3_key__in=origenes).values_list('s3_key', flat=True))
+        referenciados.update(ArchivoBlob.objects.filter(s3_key__in=origenes).values_list('s3_key', flat=True))
+        return referenciados
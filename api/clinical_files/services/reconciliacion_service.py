@@ -0,0 +1,84 @@
+# api/clinical_files/services/reconciliacion_service.py
+"""
+Reconciliación del bucket contra la base de datos.
+
+Busca objetos huérfanos bajo 'pacientes/': subidas que nunca llegaron a
+confirm-upload, multipart completados sin confirmar, derivados de archivos
+ya eliminados, etc. El listado viene ordenado por clave, así que se
+procesa paciente por paciente ('pacientes/{uuid}/...') y solo se consultan
+las claves registradas de ese paciente.
+
+Los objetos más recientes que `antiguedad_minima` se ignoran: pueden ser
+subidas en curso entre init-upload y confirm-upload.
+"""
+import logging
+import uuid
+from datetime import timedelta
+from itertools import groupby
+from typing import Iterator, List, Optional, Set
+
+from django.utils import timezone
+
+from api.clinical_files.models import ArchivoBlob, ClinicalFile, EliminacionStorage
+from common.services.storage_service import StorageService
+
+from .eliminacion_service import ColaEliminacionService
+
+logger = logging.getLogger(__name__)
+
+PREFIJO_PACIENTES = 'pacientes/'
+ANTIGUEDAD_MINIMA = timedelta(hours=24)
+
+
+def _paciente_de_clave(clave: str) -> Optional[str]:
+    """UUID del paciente en 'pacientes/{uuid}/...' (None si la clave no sigue el formato)"""
+    partes = clave.split('/', 2)
+    if len(partes) < 3 or partes[0] != PREFIJO_PACIENTES.rstrip('/'):
+        return None
+    try:
+        return str(uuid.UUID(partes[1]))
+    except ValueError:
+        return None
+
+
+class ReconciliacionStorageService:
+    """Detecta (y opcionalmente encola) objetos del bucket sin registro."""
+
+    @classmethod
+    def huerfanos(cls, prefijo: str = PREFIJO_PACIENTES, antiguedad_minima: timedelta = ANTIGUEDAD_MINIMA) -> Iterator[dict]:
+        """Objetos bajo `prefijo` sin ClinicalFile, ArchivoBlob, derivado ni eliminación pendiente."""
+        limite = timezone.now() - antiguedad_minima
+        objetos = StorageService().list_objects(prefijo)
+        for paciente_id, grupo in groupby(objetos, key=lambda o: _paciente_de_clave(o['key'])):
+            if paciente_id is None:
+                # Fuera del formato esperado: no se toca
+                continue
+            grupo = list(grupo)
+            registradas = cls._claves_registradas(paciente_id, [o['key'] for o in grupo])
+            for objeto in grupo:
+                if objeto['key'] not in registradas and objeto['last_modified'] < limite:
+                    yield objeto
+
+    @classmethod
+    def encolar_huerfanos(cls, objetos: List[dict]) -> int:
+        """Encola la eliminación de los huérfanos detectados."""
+        ColaEliminacionService.encolar([objeto['key'] for objeto in objetos])
+        logger.info(f"[Reconciliacion] {len(objetos)} huérfano(s) encolado(s) para eliminación")
+        return len(objetos)
+
+    @staticmethod
+    def _claves_registradas(paciente_id: str, claves: List[str]) -> Set[str]:
+        registradas = set(
+            ArchivoBlob.objects.filter(paciente_id=paciente_id).values_list('s3_key', flat=True)
+        )
+        for s3_key, derivados in (
+            ClinicalFile.objects.filter(paciente_id=paciente_id).values_list('s3_key', 'derivados')
+        ):
+            registradas.add(s3_key)
+            registradas.update(
+                d['key'] for d in (derivados or {}).values() if isinstance(d, dict) and d.get('key')
+            )
+        registradas.update(
+            EliminacionStorage.objects.filter(s3_key__in=claves).values_list('s3_key', flat=True)
+        )
+        return registradas
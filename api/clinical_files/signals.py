@@ -9,7 +9,8 @@ import logging
 from django.db.models.signals import post_delete, pre_save
 from django.dispatch import receiver
 from .models import ClinicalFile
-from common.services.storage_service import StorageService
+from .services.blobs_service import BlobService
+from .services.eliminacion_service import ColaEliminacionService, claves_archivo
 
 logger = logging.getLogger(__name__)
 
@@ -20,7 +21,8 @@ def delete_file_from_storage(sender, instance, **kwargs):
     Signal: Elimina archivo de S3/MinIO cuando se borra el registro en BD.
     
     Garantiza consistencia entre base de datos y almacenamiento físico.
-    Se ejecuta DESPUÉS de eliminar el registro (post_delete).
+    Se ejecuta DESPUÉS de eliminar el registro (post_delete): las claves se
+    encolan en la misma transacción y se eliminan en lote tras el commit.
     
     Args:
         sender: Modelo que envió la señal (ClinicalFile)
@@ -31,27 +33,17 @@ def delete_file_from_storage(sender, instance, **kwargs):
         logger.warning(f"Archivo {instance.id} no tiene s3_key definido. Skip eliminación.")
         return
     
-    try:
-        storage = StorageService()
-        deleted = storage.delete_file(instance.s3_key)
-        
-        if deleted:
-            logger.info(
-                f"✓ Archivo eliminado del storage: {instance.s3_key} "
-                f"(Paciente: {instance.paciente_id}, Size: {instance.file_size_bytes} bytes)"
-            )
-        else:
-            logger.warning(
-                f"⚠ No se pudo eliminar archivo del storage: {instance.s3_key} "
-                f"(puede que ya no exista)"
-            )
+    # Contenido compartido: solo se elimina al liberar la última referencia
+    if instance.blob_id:
+        BlobService.liberar_referencia(instance)
+        return
     
-    except Exception as e:
-        logger.error(
-            f"✗ Error eliminando archivo {instance.s3_key} del storage: {e}",
-            exc_info=True
-        )
-        # No propagamos la excepción para no bloquear la eliminación en BD
+    # Se encola en la transacción del borrado; el worker elimina en lote tras el commit
+    ColaEliminacionService.encolar(claves_archivo(instance), origen=instance.s3_key)
+    logger.info(
+        f"Archivo encolado para eliminación del storage: {instance.s3_key} "
+        f"(Paciente: {instance.paciente_id}, Size: {instance.file_size_bytes} bytes)"
+    )
 
 
 @receiver(pre_save, sender=ClinicalFile)
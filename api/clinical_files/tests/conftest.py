@@ -7,6 +7,7 @@ import pytest
 from django.contrib.auth import get_user_model
 from api.odontogram.models import Paciente, HistorialOdontograma
 from api.clinical_files.models import ClinicalFile
+from common.services.storage_backend import LocalBackend
 from common.services.storage_service import StorageService
 import uuid
 from datetime import date, datetime
@@ -66,6 +67,15 @@ def storage_service():
     return StorageService()
 
 
+@pytest.fixture
+def storage_local(tmp_path):
+    """StorageService sobre LocalBackend en un directorio temporal (semántica S3, sin red)"""
+    backend = LocalBackend({'bucket_name': 'plexident-test', 'root': tmp_path, 'secret_key': 'test-secret'})
+    backend.verificar()
+    with StorageService.usar_backend(backend) as servicio:
+        yield servicio
+
+
 @pytest.fixture
 def sample_file_data():
     """Datos de ejemplo para un archivo"""
@@ -0,0 +1,129 @@
+# api/clinical_files/tests/test_deduplicacion.py
+"""
+Tests del almacenamiento direccionado por contenido (SHA-256) con
+conteo de referencias. Las respuestas de S3 se simulan con botocore Stubber.
+"""
+import base64
+import hashlib
+
+import pytest
+from botocore.stub import ANY, Stubber
+from django.urls import reverse
+from rest_framework import status
+
+from api.clinical_files.models import ArchivoBlob, ClinicalFile, EliminacionStorage
+from api.clinical_files.services import BlobService, ColaEliminacionService
+from common.services.storage_service import StorageService
+
+CONTENIDO = b'radiografia panoramica'
+SHA256 = hashlib.sha256(CONTENIDO).hexdigest()
+
+
+@pytest.fixture
+def s3_stub():
+    with Stubber(StorageService()._backend.s3_client) as stub:
+        yield stub
+        stub.assert_no_pending_responses()
+
+
+def _init(client, paciente, sha256=SHA256):
+    return client.post(reverse('clinical_files:clinical-file-init-upload'), {
+        'paciente_id': str(paciente.id),
+        'filename': 'panoramica.jpg',
+        'content_type': 'image/jpeg',
+        'category': 'OTHER',
+        'sha256': sha256.upper(),
+    }, format='json')
+
+
+def _confirm(client, paciente, s3_key, sha256=SHA256, size=len(CONTENIDO)):
+    return client.post(reverse('clinical_files:clinical-file-confirm-upload'), {
+        's3_key': s3_key,
+        'paciente_id': str(paciente.id),
+        'filename': 'panoramica.jpg',
+        'content_type': 'image/jpeg',
+        'category': 'OTHER',
+        'size': size,
+        'sha256': sha256,
+    }, format='json')
+
+
+def _head(stub, s3_key, sha256=SHA256):
+    stub.add_response(
+        'head_object',
+        {'ContentLength': len(CONTENIDO), 'ETag': '"e"',
+         'ChecksumSHA256': base64.b64encode(bytes.fromhex(sha256)).decode()},
+        {'Bucket': ANY, 'Key': s3_key, 'ChecksumMode': 'ENABLED'},
+    )
+
+
+@pytest.mark.django_db
+class TestDeduplicacion:
+
+    def test_segunda_subida_reutiliza_el_objeto(self, authenticated_client, paciente_test, s3_stub):
+        respuesta = _init(authenticated_client, paciente_test)
+        assert respuesta.status_code == status.HTTP_200_OK
+        s3_key = respuesta.data['s3_key']
+        assert s3_key == f"pacientes/{paciente_test.id}/blobs/{SHA256}"
+        assert respuesta.data['duplicate'] is False
+        assert 'x-amz-checksum-sha256' in respuesta.data['upload_url']
+        assert respuesta.data['headers']['x-amz-checksum-sha256'] == base64.b64encode(
+            bytes.fromhex(SHA256)).decode()
+
+        _head(s3_stub, s3_key)
+        assert _confirm(authenticated_client, paciente_test, s3_key).status_code == status.HTTP_201_CREATED
+
+        # Misma radiografía adjuntada a otro snapshot: sin URL de subida ni consulta al storage
+        respuesta = _init(authenticated_client, paciente_test)
+        assert (respuesta.data['duplicate'], respuesta.data['upload_url']) == (True, None)
+        assert _confirm(authenticated_client, paciente_test, respuesta.data['s3_key']).status_code == 201
+
+        blob = ArchivoBlob.objects.get()
+        assert blob.referencias == 2
+        assert set(ClinicalFile.objects.values_list('blob_id', 's3_key', 'sha256')) == {(blob.id, s3_key, SHA256)}
+
+    def test_rechaza_checksum_o_clave_distintos(self, authenticated_client, paciente_test, s3_stub):
+        s3_key = BlobService.clave_blob(paciente_test.id, SHA256)
+        _head(s3_stub, s3_key, sha256='0' * 64)
+        assert _confirm(authenticated_client, paciente_test, s3_key).status_code == status.HTTP_400_BAD_REQUEST
+
+        otra_clave = BlobService.clave_blob(paciente_test.id, 'f' * 64)
+        assert _confirm(authenticated_client, paciente_test, otra_clave).status_code == 400
+
+        # Una clave de blob no puede confirmarse sin hash (evita referencias sin contar)
+        respuesta = authenticated_client.post(reverse('clinical_files:clinical-file-confirm-upload'), {
+            's3_key': s3_key, 'paciente_id': str(paciente_test.id), 'filename': 'x.jpg',
+            'content_type': 'image/jpeg', 'size': len(CONTENIDO),
+        }, format='json')
+        assert respuesta.status_code == 400
+        assert not ClinicalFile.objects.exists()
+
+    def test_objeto_se_encola_con_la_ultima_referencia(
+        self, paciente_test, odontologo_user, s3_stub, django_capture_on_commit_callbacks
+    ):
+        archivos = []
+        for _ in range(2):
+            blob = BlobService.registrar_referencia(paciente_test.id, SHA256, 'bucket', len(CONTENIDO))
+            archivos.append(ClinicalFile.objects.create(
+                paciente=paciente_test, bucket_name='bucket', s3_key=blob.s3_key,
+                original_filename='panoramica.jpg', mime_type='image/jpeg',
+                file_size_bytes=len(CONTENIDO), uploaded_by=odontologo_user, sha256=SHA256, blob=blob,
+                derivados={'thumb': {'key': f'{blob.s3_key}__thumb.webp'}},
+            ))
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            archivos[0].delete()
+        assert callbacks == []
+        assert ArchivoBlob.objects.get().referencias == 1
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            archivos[1].delete()
+        assert len(callbacks) == 1
+        assert not ArchivoBlob.objects.exists()
+        assert set(EliminacionStorage.objects.values_list('s3_key', flat=True)) == {
+            blob.s3_key, f'{blob.s3_key}__thumb.webp'
+        }
+
+        # El mismo contenido se vuelve a subir antes de que corra el worker: no se elimina
+        BlobService.registrar_referencia(paciente_test.id, SHA256, 'bucket', len(CONTENIDO))
+        assert ColaEliminacionService.procesar()['descartados'] == 2
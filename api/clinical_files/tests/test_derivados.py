@@ -0,0 +1,164 @@
+# api/clinical_files/tests/test_derivados.py
+"""
+Tests de la generación de derivados (miniatura y vista previa).
+Las respuestas de S3 se simulan con botocore Stubber.
+"""
+import io
+import uuid
+
+import numpy as np
+import pytest
+from botocore.response import StreamingBody
+from botocore.stub import ANY, Stubber
+from django.core.management import call_command
+from django.urls import reverse
+from PIL import Image
+
+from api.clinical_files.models import ClinicalFile
+from api.clinical_files.serializers import ClinicalFileListSerializer, ClinicalFileSerializer
+from api.clinical_files.services.derivados_service import (
+    CONTENT_TYPE_DERIVADO,
+    DerivadosService,
+    clave_derivado,
+    imagen_desde_pixeles,
+)
+from common.services.storage_service import StorageService
+
+
+@pytest.fixture(autouse=True)
+def cache_limpia():
+    StorageService.url_cache.limpiar()
+    yield
+    StorageService.url_cache.limpiar()
+
+
+@pytest.fixture
+def s3_stub():
+    with Stubber(StorageService()._backend.s3_client) as stub:
+        yield stub
+        stub.assert_no_pending_responses()
+
+
+def _jpeg(ancho, alto):
+    buffer = io.BytesIO()
+    Image.new('RGB', (ancho, alto), (200, 120, 40)).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+
+def _archivo(paciente, usuario, filename='foto.jpg', mime_type='image/jpeg', category='PHOTO'):
+    extension = filename.rsplit('.', 1)[-1]
+    return ClinicalFile.objects.create(
+        paciente=paciente,
+        bucket_name=StorageService().bucket_name,
+        s3_key=f"pacientes/{paciente.id}/snapshots/general/archivos/{uuid.uuid4()}.{extension}",
+        original_filename=filename,
+        mime_type=mime_type,
+        file_size_bytes=1024,
+        category=category,
+        uploaded_by=usuario,
+    )
+
+
+def test_clave_derivado_hermana_del_original():
+    assert clave_derivado('pacientes/p/archivos/abc.dcm', 'thumb').startswith('pacientes/p/archivos/abc__thumb.')
+    assert clave_derivado('pacientes/p.x/archivos/abc', 'preview').startswith('pacientes/p.x/archivos/abc__preview.')
+
+
+def test_volumen_dicom_usa_corte_central():
+    volumen = np.zeros((5, 4, 4), dtype=np.int16)
+    volumen[2] = np.arange(16, dtype=np.int16).reshape(4, 4) * 100
+
+    imagen = imagen_desde_pixeles(volumen)
+    assert (imagen.mode, imagen.size) == ('L', (4, 4))
+    assert imagen.getpixel((0, 0)) == 0 and imagen.getpixel((3, 3)) == 255
+
+    invertida = imagen_desde_pixeles(volumen, invertir=True)
+    assert invertida.getpixel((0, 0)) == 255
+
+    color = imagen_desde_pixeles(np.zeros((3, 4, 5, 3), dtype=np.uint8), muestras=3)
+    assert (color.mode, color.size) == ('RGB', (5, 4))
+
+
+@pytest.mark.django_db
+class TestDerivados:
+
+    def test_genera_y_expone_derivados(self, paciente_test, odontologo_user, s3_stub):
+        archivo = _archivo(paciente_test, odontologo_user)
+        original = _jpeg(2000, 1000)
+        s3_stub.add_response(
+            'get_object',
+            {'Body': StreamingBody(io.BytesIO(original), len(original))},
+            {'Bucket': ANY, 'Key': archivo.s3_key},
+        )
+        for nombre in ('thumb', 'preview'):
+            s3_stub.add_response(
+                'put_object', {},
+                {'Bucket': ANY, 'Key': clave_derivado(archivo.s3_key, nombre), 'Body': ANY,
+                 'ContentType': CONTENT_TYPE_DERIVADO, 'ChecksumSHA256': ANY},
+            )
+
+        assert DerivadosService.procesar(archivo.id) == ClinicalFile.EstadoDerivados.LISTO
+
+        archivo.refresh_from_db()
+        assert (archivo.derivados['thumb']['width'], archivo.derivados['thumb']['height']) == (256, 128)
+        assert archivo.derivados['preview']['width'] == 1024
+        assert archivo.derivados_intentos == 1
+
+        datos = ClinicalFileSerializer([archivo], many=True).data[0]
+        assert archivo.derivado_key('thumb').split('/')[-1] in datos['thumbnail_url']
+        assert archivo.derivado_key('preview').split('/')[-1] in datos['preview_url']
+        ligero = ClinicalFileListSerializer([archivo], many=True).data[0]
+        assert ligero['thumbnail_url'] == datos['thumbnail_url']
+
+    def test_error_se_reintenta_con_el_comando(self, paciente_test, odontologo_user, s3_stub, capsys):
+        archivo = _archivo(paciente_test, odontologo_user, filename='rx.png', mime_type='image/png',
+                           category='XRAY')
+        s3_stub.add_client_error('get_object', 'NoSuchKey', http_status_code=404)
+
+        assert DerivadosService.procesar(archivo.id) == ClinicalFile.EstadoDerivados.ERROR
+        archivo.refresh_from_db()
+        assert ClinicalFileSerializer(archivo).data['thumbnail_url'] is None
+
+        # Radiografía de 16 bits: se normaliza a 8 bits
+        buffer = io.BytesIO()
+        Image.fromarray(np.linspace(0, 4000, 64 * 64, dtype=np.uint16).reshape(64, 64)).save(buffer, 'PNG')
+        original = buffer.getvalue()
+        s3_stub.add_response('get_object', {'Body': StreamingBody(io.BytesIO(original), len(original))})
+        s3_stub.add_response('put_object', {})
+        s3_stub.add_response('put_object', {})
+
+        call_command('generar_derivados')
+
+        assert 'LISTO: 1' in capsys.readouterr().out
+        archivo.refresh_from_db()
+        assert archivo.derivados_estado == ClinicalFile.EstadoDerivados.LISTO
+        assert archivo.derivados_intentos == 2
+
+    def test_confirm_upload_programa_derivados(
+        self, authenticated_client, paciente_test, s3_stub, django_capture_on_commit_callbacks, monkeypatch
+    ):
+        procesados = []
+
+        class HiloSincrono:
+            def __init__(self, target, args, **kwargs):
+                self.args = args
+
+            def start(self):
+                procesados.append(self.args[0])
+
+        monkeypatch.setattr('api.clinical_files.services.derivados_service.threading.Thread', HiloSincrono)
+
+        for filename, content_type, category in (('foto.jpg', 'image/jpeg', 'PHOTO'),
+                                                 ('plan.pdf', 'application/pdf', 'LAB')):
+            s3_key = f"pacientes/{paciente_test.id}/snapshots/general/archivos/{uuid.uuid4()}.jpg"
+            s3_stub.add_response('head_object', {'ContentLength': 10, 'ETag': '"e"'}, {'Bucket': ANY, 'Key': s3_key})
+            with django_capture_on_commit_callbacks(execute=True):
+                response = authenticated_client.post(reverse('clinical_files:clinical-file-confirm-upload'), {
+                    's3_key': s3_key, 'paciente_id': str(paciente_test.id), 'filename': filename,
+                    'content_type': content_type, 'size': 10, 'category': category,
+                }, format='json')
+            assert response.status_code == 201
+
+        foto, plan = ClinicalFile.objects.order_by('created_at')
+        assert procesados == [foto.id]
+        assert plan.derivados_estado == ClinicalFile.EstadoDerivados.NO_APLICA
@@ -0,0 +1,111 @@
+# api/clinical_files/tests/test_eliminacion_storage.py
+"""
+Tests de la cola de eliminación en lote y de la reconciliación del bucket.
+Las respuestas de S3 se simulan con botocore Stubber.
+"""
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import pytest
+from botocore.stub import ANY, Stubber
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from api.clinical_files.models import ClinicalFile, EliminacionStorage
+from api.clinical_files.services import ColaEliminacionService, ReconciliacionStorageService
+from common.services.storage_service import StorageService
+
+
+@pytest.fixture
+def s3_stub():
+    with Stubber(StorageService()._backend.s3_client) as stub:
+        yield stub
+        stub.assert_no_pending_responses()
+
+
+@pytest.mark.django_db
+class TestColaEliminacion:
+
+    def test_destroy_encola_sin_llamar_al_storage(
+        self, authenticated_client, uploaded_clinical_file, s3_stub, django_capture_on_commit_callbacks
+    ):
+        archivo = uploaded_clinical_file
+        archivo.derivados = {'thumb': {'key': f'{archivo.s3_key}__thumb.webp'}}
+        archivo.save(update_fields=['derivados'])
+        url = reverse('clinical_files:clinical-file-detail', kwargs={'pk': str(archivo.id)})
+
+        with django_capture_on_commit_callbacks() as callbacks:
+            assert authenticated_client.delete(url).status_code == 204
+
+        assert len(callbacks) == 1
+        assert set(EliminacionStorage.objects.values_list('s3_key', 'origen')) == {
+            (archivo.s3_key, archivo.s3_key),
+            (f'{archivo.s3_key}__thumb.webp', archivo.s3_key),
+        }
+
+        # Worker: un DeleteObjects con ambas claves; una falla y se reintenta más tarde
+        s3_stub.add_response(
+            'delete_objects',
+            {'Errors': [{'Key': archivo.s3_key, 'Code': 'SlowDown', 'Message': 'Reduce your request rate'}]},
+            {'Bucket': ANY, 'Delete': {
+                'Objects': [{'Key': archivo.s3_key}, {'Key': f'{archivo.s3_key}__thumb.webp'}],
+                'Quiet': True,
+            }},
+        )
+        assert ColaEliminacionService.procesar() == {'eliminados': 1, 'fallidos': 1, 'descartados': 0}
+
+        pendiente = EliminacionStorage.objects.get()
+        assert (pendiente.s3_key, pendiente.intentos) == (archivo.s3_key, 1)
+        assert 'SlowDown' in pendiente.ultimo_error
+        assert pendiente.proximo_intento > timezone.now()
+        # Aún no vence: no hay llamada al storage
+        assert ColaEliminacionService.procesar() == {'eliminados': 0, 'fallidos': 0, 'descartados': 0}
+
+    def test_lotes_de_mil_y_descarte_de_referenciados(self, uploaded_clinical_file, s3_stub):
+        EliminacionStorage.objects.bulk_create(
+            [EliminacionStorage(s3_key=f'pacientes/x/{n}', origen=f'pacientes/x/{n}') for n in range(2100)]
+            + [EliminacionStorage(s3_key=uploaded_clinical_file.s3_key, origen=uploaded_clinical_file.s3_key)]
+        )
+        for _ in range(3):
+            s3_stub.add_response('delete_objects', {}, {'Bucket': ANY, 'Delete': {'Objects': ANY, 'Quiet': True}})
+
+        resumen = ColaEliminacionService.procesar()
+
+        assert resumen == {'eliminados': 2100, 'fallidos': 0, 'descartados': 1}
+        assert not EliminacionStorage.objects.exists()
+
+
+@pytest.mark.django_db
+def test_reconciliacion_detecta_huerfanos(uploaded_clinical_file, s3_stub, capsys):
+    archivo = uploaded_clinical_file
+    archivo.derivados = {'thumb': {'key': f'{archivo.s3_key}__thumb.webp'}}
+    archivo.save(update_fields=['derivados'])
+    base = f'pacientes/{archivo.paciente_id}/snapshots/general/archivos'
+    antiguo = datetime.now(dt_timezone.utc) - timedelta(days=3)
+    reciente = datetime.now(dt_timezone.utc) - timedelta(minutes=5)
+    huerfano = f'{base}/{uuid.uuid4()}.jpg'
+
+    def objeto(clave, fecha=antiguo):
+        return {'Key': clave, 'Size': 1024, 'LastModified': fecha, 'ETag': '"e"'}
+
+    contenidos = sorted([
+        objeto(archivo.s3_key),
+        objeto(f'{archivo.s3_key}__thumb.webp'),
+        objeto(huerfano),
+        objeto(f'{base}/{uuid.uuid4()}.jpg', reciente),  # subida en curso
+        objeto('pacientes/sin-uuid/archivo.jpg'),          # fuera de formato
+    ], key=lambda o: o['Key'])
+    for _ in range(2):
+        s3_stub.add_response(
+            'list_objects_v2',
+            {'Contents': contenidos, 'IsTruncated': False, 'KeyCount': len(contenidos)},
+            {'Bucket': ANY, 'Prefix': 'pacientes/'},
+        )
+
+    assert [o['key'] for o in ReconciliacionStorageService.huerfanos()] == [huerfano]
+
+    call_command('reconciliar_storage', '--eliminar')
+    assert '1 huérfano(s)' in capsys.readouterr().out
+    assert list(EliminacionStorage.objects.values_list('s3_key', flat=True)) == [huerfano]
+    assert ClinicalFile.objects.filter(id=archivo.id).exists()
@@ -0,0 +1,197 @@
+# api/clinical_files/tests/test_multipart_upload.py
+"""
+Tests del flujo de subida multipart (archivos DICOM / modelos 3D grandes).
+Las respuestas de S3 se simulan con botocore Stubber.
+"""
+import pytest
+from botocore.stub import ANY, Stubber
+from django.contrib.auth import get_user_model
+from django.urls import reverse
+from rest_framework import status
+from rest_framework.test import APIClient
+
+from api.clinical_files.models import ClinicalFile, SubidaMultipart
+from common.services.storage_service import StorageService
+
+MIB = 1024 * 1024
+
+User = get_user_model()
+
+
+@pytest.fixture
+def s3_stub():
+    with Stubber(StorageService()._backend.s3_client) as stub:
+        yield stub
+        stub.assert_no_pending_responses()
+
+
+def _head(stub, key, size, etag):
+    stub.add_response(
+        'head_object',
+        {'ContentLength': size, 'ETag': f'"{etag}"'},
+        {'Bucket': ANY, 'Key': key},
+    )
+
+
+@pytest.mark.django_db
+class TestMultipartUpload:
+
+    def test_flujo_completo_con_reanudacion(self, authenticated_client, paciente_test, s3_stub):
+        s3_stub.add_response(
+            'create_multipart_upload',
+            {'UploadId': 'upload-1'},
+            {'Bucket': ANY, 'Key': ANY, 'ContentType': 'application/dicom'},
+        )
+        response = authenticated_client.post(reverse('clinical_files:clinical-file-multipart-init'), {
+            'paciente_id': str(paciente_test.id),
+            'filename': 'cbct.dcm',
+            'content_type': 'application/dicom',
+            'category': 'XRAY',
+            'size': 40 * MIB,
+        }, format='json')
+
+        assert response.status_code == status.HTTP_200_OK
+        s3_key = response.data['s3_key']
+        assert (response.data['part_size'], response.data['part_count']) == (16 * MIB, 3)
+        assert [p['part_number'] for p in response.data['parts']] == [1, 2, 3]
+        assert 'uploadId=upload-1' in response.data['parts'][2]['url']
+        assert 'partNumber=3' in response.data['parts'][2]['url']
+
+        # Reanudación: el storage ya tiene la parte 1
+        s3_stub.add_response(
+            'list_parts',
+            {'Parts': [{'PartNumber': 1, 'ETag': '"e1"', 'Size': 16 * MIB}], 'IsTruncated': False},
+            {'Bucket': ANY, 'Key': s3_key, 'UploadId': 'upload-1'},
+        )
+        response = authenticated_client.post(reverse('clinical_files:clinical-file-multipart-parts'), {
+            's3_key': s3_key, 'upload_id': 'upload-1', 'part_numbers': [2, 3],
+        }, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['uploaded_parts'] == [{'part_number': 1, 'etag': 'e1', 'size': 16 * MIB}]
+        assert [p['part_number'] for p in response.data['parts']] == [2, 3]
+
+        # Completar: las partes llegan desordenadas (subida en paralelo)
+        s3_stub.add_response(
+            'complete_multipart_upload',
+            {'ETag': '"abc-3"'},
+            {
+                'Bucket': ANY, 'Key': s3_key, 'UploadId': 'upload-1',
+                'MultipartUpload': {'Parts': [
+                    {'PartNumber': 1, 'ETag': '"e1"'},
+                    {'PartNumber': 2, 'ETag': '"e2"'},
+                    {'PartNumber': 3, 'ETag': '"e3"'},
+                ]},
+            },
+        )
+        _head(s3_stub, s3_key, 40 * MIB, 'abc-3')
+        response = authenticated_client.post(reverse('clinical_files:clinical-file-multipart-complete'), {
+            's3_key': s3_key, 'upload_id': 'upload-1',
+            'parts': [
+                {'part_number': 3, 'etag': 'e3'},
+                {'part_number': 1, 'etag': '"e1"'},
+                {'part_number': 2, 'etag': 'e2'},
+            ],
+        }, format='json')
+        assert response.status_code == status.HTTP_200_OK
+        assert (response.data['etag'], response.data['size']) == ('abc-3', 40 * MIB)
+
+        _head(s3_stub, s3_key, 40 * MIB, 'abc-3')
+        response = authenticated_client.post(reverse('clinical_files:clinical-file-confirm-upload'), {
+            's3_key': s3_key,
+            'paciente_id': str(paciente_test.id),
+            'filename': 'cbct.dcm',
+            'content_type': 'application/dicom',
+            'size': 40 * MIB,
+            'etag': 'abc-3',
+            'category': 'XRAY',
+        }, format='json')
+        assert response.status_code == status.HTTP_201_CREATED
+        assert ClinicalFile.objects.get(s3_key=s3_key).file_size_bytes == 40 * MIB
+
+    def test_confirmacion_rechaza_objeto_distinto(self, authenticated_client, paciente_test, s3_stub):
+        s3_key = f"pacientes/{paciente_test.id}/snapshots/general/archivos/modelo.stl"
+        datos = {
+            's3_key': s3_key,
+            'paciente_id': str(paciente_test.id),
+            'filename': 'modelo.stl',
+            'content_type': 'model/stl',
+            'size': 20 * MIB,
+            'category': '3D',
+        }
+        url = reverse('clinical_files:clinical-file-confirm-upload')
+
+        _head(s3_stub, s3_key, 19 * MIB, 'abc-2')
+        assert authenticated_client.post(url, datos, format='json').status_code == status.HTTP_400_BAD_REQUEST
+
+        _head(s3_stub, s3_key, 20 * MIB, 'abc-2')
+        response = authenticated_client.post(url, {**datos, 'etag': 'otro-2'}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert not ClinicalFile.objects.filter(s3_key=s3_key).exists()
+
+    def test_rechaza_claves_ajenas_y_cancela(self, authenticated_client, paciente_test, s3_stub):
+        url = reverse('clinical_files:clinical-file-multipart-abort')
+        response = authenticated_client.post(url, {'s3_key': 'otro/../x', 'upload_id': 'u'}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+        # Clave válida pero sin subida registrada: no llega al storage
+        response = authenticated_client.post(
+            url, {'s3_key': 'pacientes/p/archivos/x.dcm', 'upload_id': 'u'}, format='json'
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+        s3_key = _iniciar(authenticated_client, paciente_test, s3_stub, 'u')
+        s3_stub.add_response('abort_multipart_upload', {}, {'Bucket': ANY, 'Key': s3_key, 'UploadId': 'u'})
+        response = authenticated_client.post(url, {'s3_key': s3_key, 'upload_id': 'u'}, format='json')
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert not SubidaMultipart.objects.filter(s3_key=s3_key).exists()
+
+    def test_otro_usuario_no_opera_la_subida(self, authenticated_client, api_client, paciente_test, s3_stub):
+        s3_key = _iniciar(authenticated_client, paciente_test, s3_stub, 'upload-ajeno')
+        otro = User.objects.create_user(
+            username='multipart_ajeno', correo='multipart_ajeno@test.com', password='x',
+            nombres='Otro', apellidos='Usuario', rol='Odontologo', telefono='0999999999',
+        )
+        cliente = APIClient()
+        cliente.force_authenticate(otro)
+        datos = {'s3_key': s3_key, 'upload_id': 'upload-ajeno'}
+
+        for ruta, extra in [
+            ('multipart-parts', {'part_numbers': [1]}),
+            ('multipart-complete', {'parts': [{'part_number': 1, 'etag': 'e1'}]}),
+            ('multipart-abort', {}),
+        ]:
+            response = cliente.post(reverse(f'clinical_files:clinical-file-{ruta}'), {**datos, **extra}, format='json')
+            assert response.status_code == status.HTTP_404_NOT_FOUND
+        assert SubidaMultipart.objects.get(s3_key=s3_key).usuario.username == 'test_odontologo'
+
+    def test_confirmacion_rechaza_clave_de_otro_paciente(self, authenticated_client, paciente_test):
+        response = authenticated_client.post(reverse('clinical_files:clinical-file-confirm-upload'), {
+            's3_key': 'pacientes/00000000-0000-0000-0000-000000000000/snapshots/general/archivos/x.dcm',
+            'paciente_id': str(paciente_test.id),
+            'filename': 'x.dcm',
+            'content_type': 'application/dicom',
+            'size': MIB,
+        }, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+def _iniciar(client, paciente, stub, upload_id):
+    stub.add_response(
+        'create_multipart_upload',
+        {'UploadId': upload_id},
+        {'Bucket': ANY, 'Key': ANY, 'ContentType': 'application/dicom'},
+    )
+    response = client.post(reverse('clinical_files:clinical-file-multipart-init'), {
+        'paciente_id': str(paciente.id),
+        'filename': 'cbct.dcm',
+        'content_type': 'application/dicom',
+        'size': 6 * MIB,
+    }, format='json')
+    assert response.status_code == status.HTTP_200_OK
+    return response.data['s3_key']
+
+
+def test_calculo_de_partes_respeta_limites_s3():
+    assert StorageService.calcular_partes(1) == (16 * MIB, 1)
+    tamano, partes = StorageService.calcular_partes(200 * 1024 * MIB)
+    assert partes <= 10000 and tamano % (5 * MIB) == 0 and tamano * partes >= 200 * 1024 * MIB
@@ -0,0 +1,127 @@
+# api/clinical_files/tests/test_presigned_urls.py
+"""
+Tests de la cache de URLs prefirmadas y del endpoint de firma en lote.
+"""
+import time
+import uuid
+from unittest import mock
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from api.clinical_files.models import ClinicalFile
+from common.services.storage_backend import S3Backend
+from common.services.storage_service import PresignedURLCache, StorageService
+
+
+@pytest.fixture(autouse=True)
+def cache_limpia():
+    StorageService.url_cache.limpiar()
+    yield
+    StorageService.url_cache.limpiar()
+
+
+def _crear_archivos(paciente, usuario, cantidad):
+    return ClinicalFile.objects.bulk_create([
+        ClinicalFile(
+            paciente=paciente,
+            bucket_name=StorageService().bucket_name,
+            s3_key=f"pacientes/{paciente.id}/snapshots/general/archivos/{uuid.uuid4()}.dcm",
+            original_filename=f"rx {n}.dcm",
+            mime_type='application/dicom',
+            file_size_bytes=1024,
+            category='XRAY',
+            uploaded_by=usuario,
+        )
+        for n in range(cantidad)
+    ])
+
+
+class TestFirmaURLs:
+
+    def test_credenciales_temporales_incluyen_token(self):
+        backend = S3Backend({
+            'bucket_name': 'bucket-test', 'access_key': 'ASIATEST', 'secret_key': 'secreto',
+            'session_token': 'token-sts', 'region': 'us-east-1',
+        })
+        urls = backend.generate_view_urls([('pacientes/x/a b+ñ.jpg', 'radiografía 1.jpg'), ('pacientes/x/b.dcm', None)])
+
+        assert len(urls) == 2
+        assert all('X-Amz-Security-Token=token-sts' in url for url in urls.values())
+        assert 'response-content-disposition' in urls[('pacientes/x/a b+ñ.jpg', 'radiografía 1.jpg')]
+
+
+class TestPresignedURLCache:
+
+    def test_reutiliza_hasta_acercarse_al_vencimiento(self):
+        cache = PresignedURLCache(margen_fraccion=0.25)
+        cache.guardar('k', None, 3600, 'url-1', generado=1000.0)
+
+        with mock.patch('common.services.storage_service.time.time', return_value=1000.0 + 2600):
+            assert cache.obtener('k', None, 3600) == 'url-1'
+            assert cache.obtener('k', 'nombre.jpg', 3600) is None
+        with mock.patch('common.services.storage_service.time.time', return_value=1000.0 + 2800):
+            assert cache.obtener('k', None, 3600) is None
+
+    def test_lru_acotado_e_invalidacion(self):
+        cache = PresignedURLCache(max_entries=2)
+        cache.guardar('a', None, 3600, 'url-a')
+        cache.guardar('b', None, 3600, 'url-b')
+        cache.guardar('c', None, 3600, 'url-c')
+        assert cache.obtener('a', None, 3600) is None
+
+        cache.guardar('b', 'rx.jpg', 600, 'url-b-descarga')
+        cache.invalidar('b')
+        assert cache.obtener('b', None, 3600) is None
+        assert cache.obtener('b', 'rx.jpg', 600) is None
+        assert cache.obtener('c', None, 3600) == 'url-c'
+
+    def test_servicio_reutiliza_url(self, storage_service):
+        primera = storage_service.generate_view_url('test/cache.jpg', expiration=3600)
+        time.sleep(1)
+        assert storage_service.generate_view_url('test/cache.jpg', expiration=3600) == primera
+
+
+@pytest.mark.django_db
+class TestPresignEndpoint:
+
+    def test_firma_en_lote(self, authenticated_client, paciente_test, odontologo_user):
+        archivos = _crear_archivos(paciente_test, odontologo_user, 3)
+        url = reverse('clinical_files:clinical-file-presign')
+
+        response = authenticated_client.post(
+            url, {'file_ids': [str(a.id) for a in archivos] + [str(uuid.uuid4())]}, format='json'
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.data['expires_in'] == 3600
+        assert set(response.data['urls']) == {str(a.id) for a in archivos}
+        primero = response.data['urls'][str(archivos[0].id)]
+        assert primero['file_url'] == StorageService().generate_view_url(archivos[0].s3_key)
+        assert 'response-content-disposition' in primero['download_url']
+
+    def test_rechaza_lista_vacia(self, authenticated_client):
+        url = reverse('clinical_files:clinical-file-presign')
+        response = authenticated_client.post(url, {'file_ids': []}, format='json')
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.django_db
+@pytest.mark.performance
+def test_rendimiento_listado_300_radiografias(authenticated_client, paciente_test, odontologo_user):
+    _crear_archivos(paciente_test, odontologo_user, 300)
+    url = reverse('clinical_files:clinical-file-by-patient', kwargs={'paciente_id': str(paciente_test.id)})
+
+    inicio = time.perf_counter()
+    response = authenticated_client.get(url)
+    primera = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    authenticated_client.get(url)
+    segunda = time.perf_counter() - inicio
+
+    assert response.status_code == status.HTTP_200_OK
+    assert len(response.data['archivos']) == 300
+    assert all(a['file_url'] and a['download_url'] for a in response.data['archivos'])
+    print(f"\nListado 300 archivos: primera {primera * 1000:.0f} ms | con cache {segunda * 1000:.0f} ms")
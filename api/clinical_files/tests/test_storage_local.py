@@ -0,0 +1,121 @@
+# api/clinical_files/tests/test_storage_local.py
+"""
+Tests de la creación diferida del backend y del flujo completo de subida
+contra LocalBackend (objetos en disco con semántica S3, sin red).
+"""
+import base64
+import hashlib
+
+from urllib.parse import unquote, urlsplit
+
+import pytest
+from django.test import RequestFactory
+from django.urls import reverse
+from rest_framework import status
+
+from api.clinical_files.models import ClinicalFile
+from api.clinical_files.services import ColaEliminacionService
+from common.services.storage_service import StorageService
+from common.views import storage_local as vista_storage_local
+
+CONTENIDO = b'%PDF-1.4 consentimiento informado'
+SHA256 = hashlib.sha256(CONTENIDO).hexdigest()
+
+
+def _checksum(contenido):
+    return base64.b64encode(hashlib.sha256(contenido).digest()).decode()
+
+
+def test_backend_se_crea_en_el_primer_uso(monkeypatch, storage_local):
+    creados = []
+    backend = storage_local._backend
+    monkeypatch.setattr(StorageService, '_instance', None)
+    monkeypatch.setattr(StorageService, '_create_backend', staticmethod(lambda: creados.append(1) or backend))
+
+    servicio = StorageService()
+    assert creados == []
+    assert servicio.bucket_name == 'plexident-test'
+    assert StorageService().backend_type == 'LocalBackend'
+    assert creados == [1]
+
+
+@pytest.mark.django_db
+def test_health_check(authenticated_client, monkeypatch, storage_local):
+    monkeypatch.setattr(StorageService, 'estado_salud', dict(StorageService.estado_salud))
+    estado = storage_local.verificar()
+    assert (estado['ok'], estado['backend'], estado['error']) == (True, 'LocalBackend', None)
+
+    respuesta = authenticated_client.get(reverse('clinical_files:clinical-file-storage-status'))
+    assert respuesta.status_code == status.HTTP_200_OK
+    assert respuesta.data['ok'] is True
+
+
+@pytest.mark.django_db
+def test_flujo_completo_con_storage_local(authenticated_client, paciente_test, storage_local,
+                                          django_capture_on_commit_callbacks):
+    backend = storage_local._backend
+    respuesta = authenticated_client.post(reverse('clinical_files:clinical-file-init-upload'), {
+        'paciente_id': str(paciente_test.id),
+        'filename': 'consentimiento.pdf',
+        'content_type': 'application/pdf',
+        'category': 'OTHER',
+        'sha256': SHA256,
+    }, format='json')
+    assert respuesta.status_code == status.HTTP_200_OK
+    s3_key, upload_url = respuesta.data['s3_key'], respuesta.data['upload_url']
+
+    # El storage rechaza contenido alterado, Content-Type distinto o URL manipulada
+    headers = {'Content-Type': 'application/pdf', **respuesta.data['headers']}
+    assert backend.atender('PUT', upload_url, b'otro contenido', headers)[0] == 400
+    assert backend.atender('PUT', upload_url, CONTENIDO, {**headers, 'Content-Type': 'image/png'})[0] == 403
+    assert backend.atender('PUT', upload_url.replace('X-Amz-Expires=300', 'X-Amz-Expires=9999'), CONTENIDO, headers)[0] == 403
+    assert backend.atender('PUT', upload_url, CONTENIDO, headers)[0] == 200
+    assert headers['x-amz-checksum-sha256'] == _checksum(CONTENIDO)
+
+    respuesta = authenticated_client.post(reverse('clinical_files:clinical-file-confirm-upload'), {
+        's3_key': s3_key,
+        'paciente_id': str(paciente_test.id),
+        'filename': 'consentimiento.pdf',
+        'content_type': 'application/pdf',
+        'category': 'OTHER',
+        'size': len(CONTENIDO),
+        'sha256': SHA256,
+    }, format='json')
+    assert respuesta.status_code == status.HTTP_201_CREATED
+
+    codigo, cuerpo, cabeceras = backend.atender('GET', respuesta.data['download_url'])
+    assert (codigo, cuerpo) == (200, CONTENIDO)
+    assert cabeceras['Content-Disposition'] == 'attachment; filename="consentimiento.pdf"'
+
+    with django_capture_on_commit_callbacks():
+        ClinicalFile.objects.get(id=respuesta.data['id']).delete()
+    assert storage_local.check_file_exists(s3_key)
+    assert ColaEliminacionService.procesar()['eliminados'] == 1
+    assert not storage_local.check_file_exists(s3_key)
+    assert backend.atender('GET', respuesta.data['file_url'])[0] == 404
+
+
+def test_vista_http_resuelve_urls_prefirmadas(storage_local):
+    """La ruta de desarrollo (STORAGE_LOCAL_URL) sirve las URLs firmadas"""
+    fabrica = RequestFactory()
+
+    def llamar(metodo, url, **extra):
+        partes = urlsplit(url)
+        request = getattr(fabrica, metodo)(f"{partes.path}?{partes.query}", **extra)
+        # Django entrega la ruta ya decodificada
+        return vista_storage_local(request, unquote(partes.path).lstrip('/'))
+
+    clave = 'pacientes/p/archivos/consentimiento firmado+1.pdf'
+    subida = storage_local.generate_upload_url(clave, 'application/pdf', sha256=SHA256)
+    respuesta = llamar(
+        'put', subida, data=CONTENIDO, content_type='application/pdf',
+        headers={'x-amz-checksum-sha256': _checksum(CONTENIDO)},
+    )
+    assert respuesta.status_code == 200
+
+    respuesta = llamar('get', storage_local.generate_view_url(clave, download_name='consentimiento.pdf'))
+    assert (respuesta.status_code, respuesta.content) == (200, CONTENIDO)
+    assert respuesta['Content-Type'] == 'application/pdf'
+    assert respuesta['Content-Disposition'] == 'attachment; filename="consentimiento.pdf"'
+
+    assert llamar('get', storage_local.generate_view_url(clave) + '0').status_code == 403
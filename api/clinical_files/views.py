@@ -10,17 +10,27 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import get_object_or_404
+from django.db import transaction
 from django.db.models import Q
+import base64
 import uuid
 import logging
 
 from common.services.storage_service import StorageService
-from .models import ClinicalFile
+from .models import ClinicalFile, SubidaMultipart
+from .services import BlobService, DerivadosService
 from .serializers import (
     ClinicalFileSerializer,
     ClinicalFileListSerializer,
     FileUploadInitSerializer,
-    FileUploadConfirmSerializer
+    FileUploadConfirmSerializer,
+    MultipartCompleteSerializer,
+    MultipartInitSerializer,
+    MultipartPartsSerializer,
+    MultipartUploadSerializer,
+    PresignBatchSerializer,
+    URL_EXPIRATION,
+    solicitudes_url,
 )
 
 from api.odontogram.models import HistorialOdontograma, Paciente
@@ -28,6 +38,18 @@ from api.users.permissions import UserBasedPermission
 
 logger = logging.getLogger(__name__)
 
+# URLs de partes: una hora por parte y como máximo 1000 URLs por respuesta
+MULTIPART_URL_EXPIRATION = 3600
+MULTIPART_URLS_POR_RESPUESTA = 1000
+
+
+def generar_s3_key(paciente_id, snapshot_id, filename):
+    """pacientes/{uuid}/snapshots/{uuid}/archivos/{uuid}.ext"""
+    file_uuid = uuid.uuid4()
+    extension = filename.rsplit('.', 1)[-1] if '.' in filename else 'bin'
+    s3_key = f"pacientes/{paciente_id}/snapshots/{snapshot_id}/archivos/{file_uuid}.{extension}"
+    return file_uuid, s3_key
+
 
 class ClinicalFileViewSet(viewsets.ModelViewSet):
     """
@@ -38,7 +60,9 @@ class ClinicalFileViewSet(viewsets.ModelViewSet):
     - GET /clinical-files/{id}/ - Detalle de archivo
     - POST /clinical-files/init-upload/ - Solicitar URL de subida
     - POST /clinical-files/confirm-upload/ - Confirmar subida
+    - POST /clinical-files/multipart/{init,parts,complete,abort}/ - Subida multipart
     - DELETE /clinical-files/{id}/ - Eliminar archivo
+    - POST /clinical-files/presign/ - URLs de varios archivos en una llamada
     - GET /clinical-files/by-patient/{paciente_id}/ - Archivos de un paciente
     """
     
@@ -95,6 +119,7 @@ class ClinicalFileViewSet(viewsets.ModelViewSet):
             "filename": "radiografia.jpg",
             "content_type": "image/jpeg",
             "snapshot_id": "uuid" (opcional),
+            "sha256": "hex" (opcional, habilita deduplicación),
             "category": "XRAY"
         }
         
@@ -104,6 +129,12 @@ class ClinicalFileViewSet(viewsets.ModelViewSet):
             "s3_key": "pacientes/{uuid}/snapshots/{uuid}/archivos/{uuid}.jpg",
             "file_uuid": "uuid-temporal"
         }
+        
+        Con sha256:
+        - Contenido ya almacenado para el paciente: {"duplicate": true,
+          "upload_url": null, "s3_key": "..."}; confirmar directamente.
+        - Contenido nuevo: s3_key 'pacientes/{uuid}/blobs/{sha256}' y
+          "headers" que el PUT debe enviar (incluye x-amz-checksum-sha256).
         """
         serializer = FileUploadInitSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -112,17 +143,26 @@ class ClinicalFileViewSet(viewsets.ModelViewSet):
         filename = serializer.validated_data['filename']
         content_type = serializer.validated_data['content_type']
         snapshot_id = serializer.validated_data.get('snapshot_id', 'general')
+        sha256 = serializer.validated_data.get('sha256')
         
-        # Generar UUID único para el archivo
-        file_uuid = uuid.uuid4()
-        extension = filename.rsplit('.', 1)[-1] if '.' in filename else 'bin'
-        
-        # Estructura de carpetas: pacientes/{uuid}/snapshots/{uuid}/archivos/{uuid}.ext
-        s3_key = f"pacientes/{paciente_id}/snapshots/{snapshot_id}/archivos/{file_uuid}.{extension}"
+        if sha256:
+            blob = BlobService.buscar(paciente_id, sha256)
+            if blob is not None:
+                logger.info(f"Contenido ya almacenado para paciente {paciente_id}: {blob.s3_key}")
+                return Response({
+                    "duplicate": True,
+                    "upload_url": None,
+                    "s3_key": blob.s3_key,
+                    "sha256": sha256,
+                }, status=status.HTTP_200_OK)
+            file_uuid, s3_key = None, BlobService.clave_blob(paciente_id, sha256)
+        else:
+            # Estructura de carpetas: pacientes/{uuid}/snapshots/{uuid}/archivos/{uuid}.ext
+            file_uuid, s3_key = generar_s3_key(paciente_id, snapshot_id, filename)
         
         # Generar URL prefirmada (válida 5 minutos)
         storage = StorageService()
-        upload_url = storage.generate_upload_url(s3_key, content_type, expiration=300)
+        upload_url = storage.generate_upload_url(s3_key, content_type, expiration=300, sha256=sha256)
         
         if not upload_url:
             logger.error(f"No se pudo generar URL de subida para {s3_key}")
@@ -133,11 +173,21 @@ class ClinicalFileViewSet(viewsets.ModelViewSet):
         
         logger.info(f"URL de subida generada para paciente {paciente_id}: {s3_key}")
         
-        return Response({
+        respuesta = {
             "upload_url": upload_url,
             "s3_key": s3_key,
-            "file_uuid": str(file_uuid)
-        }, status=status.HTTP_200_OK)
+            "file_uuid": str(file_uuid) if file_uuid else None,
+        }
+        if sha256:
+            respuesta.update({
+                "duplicate": False,
+                "sha256": sha256,
+                "headers": {
+                    "Content-Type": content_type,
+                    "x-amz-checksum-sha256": base64.b64encode(bytes.fromhex(sha256)).decode('ascii'),
+                },
+            })
+        return Response(respuesta, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=['post'], url_path='confirm-upload')
     def confirm_upload(self, request):
@@ -152,6 +202,7 @@ class ClinicalFileViewSet(viewsets.ModelViewSet):
             "content_type": "image/jpeg",
             "size": 1024000,
             "snapshot_id": "uuid" (opcional),
+            "sha256": "hex" (si se envió en init-upload),
             "category": "XRAY"
         }
         """
@@ -170,14 +221,46 @@ class ClinicalFileViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        # VALIDACIÓN CRÍTICA: Verificar que el archivo existe en S3
+        paciente_id = serializer.validated_data['paciente_id']
+        size = serializer.validated_data['size']
+        sha256 = serializer.validated_data.get('sha256')
         storage = StorageService()
-        if not storage.check_file_exists(s3_key):
-            logger.error(f" Archivo no encontrado en storage: {s3_key}")
-            return Response(
-                {"error": "El archivo no se encuentra en el storage. Intente subir nuevamente."},
-                status=status.HTTP_400_BAD_REQUEST
+        
+        if sha256:
+            # Contenido direccionado por hash: la clave la define el servidor
+            if s3_key != BlobService.clave_blob(paciente_id, sha256):
+                return Response(
+                    {"error": "s3_key no corresponde al sha256 informado."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            blob = BlobService.buscar(paciente_id, sha256)
+            if blob is not None:
+                # Ya verificado al subirse por primera vez: sin consulta al storage
+                if blob.file_size_bytes != size:
+                    return Response(
+                        {"error": "El tamaño no coincide con el archivo almacenado."},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+            else:
+                error = self._verificar_objeto(storage, s3_key, size, sha256=sha256)
+                if error:
+                    return error
+        else:
+            if BlobService.es_clave_blob(s3_key):
+                return Response(
+                    {"error": "Falta sha256 para confirmar un archivo deduplicado."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            if not s3_key.startswith(f"pacientes/{paciente_id}/") or '..' in s3_key:
+                return Response(
+                    {"error": "s3_key no corresponde al paciente."},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            error = self._verificar_objeto(
+                storage, s3_key, size, etag=serializer.validated_data.get('etag', '').strip('"')
             )
+            if error:
+                return error
         
         if snapshot_version_id:
             historial_exists = HistorialOdontograma.objects.filter(
@@ -190,19 +273,34 @@ class ClinicalFileViewSet(viewsets.ModelViewSet):
         
         # Crear registro en base de datos
         try:
-            clinical_file = ClinicalFile.objects.create(
-                paciente_id=serializer.validated_data['paciente_id'],
-                snapshot_version=snapshot_version_id,  
-                bucket_name=storage._backend.bucket,
-                s3_key=s3_key,
-                original_filename=serializer.validated_data['filename'],
-                mime_type=serializer.validated_data['content_type'],
-                file_size_bytes=serializer.validated_data['size'],
-                category=serializer.validated_data.get('category', ClinicalFile.FileType.OTHER),
-                uploaded_by=request.user
-            )
-            
-            logger.info(f" Archivo clínico creado: {clinical_file.id} - {clinical_file.original_filename}")
+            with transaction.atomic():
+                blob = None
+                if sha256:
+                    blob = BlobService.registrar_referencia(
+                        paciente_id, sha256, storage._backend.bucket, size
+                    )
+                clinical_file = ClinicalFile.objects.create(
+                    paciente_id=paciente_id,
+                    snapshot_version=snapshot_version_id,  
+                    bucket_name=storage._backend.bucket,
+                    s3_key=s3_key,
+                    original_filename=serializer.validated_data['filename'],
+                    mime_type=serializer.validated_data['content_type'],
+                    file_size_bytes=size,
+                    category=serializer.validated_data.get('category', ClinicalFile.FileType.OTHER),
+                    sha256=sha256,
+                    blob=blob,
+                    uploaded_by=request.user
+                )
+                
+                logger.info(f" Archivo clínico creado: {clinical_file.id} - {clinical_file.original_filename}")
+                
+                # Miniatura y vista previa en segundo plano (fotos, radiografías, DICOM)
+                if not DerivadosService.aplica(clinical_file):
+                    clinical_file.derivados_estado = ClinicalFile.EstadoDerivados.NO_APLICA
+                    clinical_file.save(update_fields=['derivados_estado'])
+                elif not DerivadosService.reutilizar(clinical_file):
+                    DerivadosService.programar(clinical_file.id)
             
             return Response(
                 ClinicalFileSerializer(clinical_file).data,
@@ -216,19 +314,269 @@ class ClinicalFileViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @staticmethod
+    def _verificar_objeto(storage, s3_key, size, etag=None, sha256=None):
+        """Comprueba que el objeto subido exista y coincida; retorna la respuesta de error o None"""
+        # VALIDACIÓN CRÍTICA: Verificar que el archivo existe en S3
+        metadata = storage.get_file_metadata(s3_key, checksum=bool(sha256))
+        if metadata is None:
+            logger.error(f" Archivo no encontrado en storage: {s3_key}")
+            return Response(
+                {"error": "El archivo no se encuentra en el storage. Intente subir nuevamente."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # El objeto ensamblado debe coincidir con lo que el cliente subió
+        if metadata['size'] != size or (etag and metadata['etag'] != etag):
+            logger.error(
+                f"Archivo en storage no coincide: {s3_key} "
+                f"(size {metadata['size']} != {size} o etag {metadata['etag']} != {etag})"
+            )
+            return Response(
+                {"error": "El archivo almacenado no coincide con el tamaño o ETag informados."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if sha256 and metadata.get('sha256') != sha256:
+            logger.error(f"Checksum no coincide para {s3_key}: {metadata.get('sha256')} != {sha256}")
+            return Response(
+                {"error": "El SHA-256 del archivo almacenado no coincide con el informado."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return None
+
+    @action(detail=False, methods=['post'], url_path='multipart/init')
+    def multipart_init(self, request):
+        """
+        Subida multipart, PASO 1: iniciar la subida de un archivo grande
+        
+        Body JSON: igual que init-upload más "size" (bytes)
+        
+        Returns:
+        {
+            "upload_id": "...",
+            "s3_key": "pacientes/...",
+            "file_uuid": "uuid",
+            "part_size": 16777216,
+            "part_count": 32,
+            "parts": [{"part_number": 1, "url": "https://..."}, ...]
+        }
+        
+        Cada parte se sube con PUT a su URL (en paralelo); el cliente guarda el
+        ETag de cada respuesta para el paso de completar.
+        """
+        serializer = MultipartInitSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+        
+        file_uuid, s3_key = generar_s3_key(
+            datos['paciente_id'], datos.get('snapshot_id', 'general'), datos['filename']
+        )
+        storage = StorageService()
+        upload_id = storage.create_multipart_upload(s3_key, datos['content_type'])
+        if not upload_id:
+            return Response(
+                {"error": "No se pudo iniciar la subida multipart. Verifique configuración de storage."},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+        SubidaMultipart.objects.create(
+            upload_id=upload_id, s3_key=s3_key, paciente_id=datos['paciente_id'], usuario=request.user
+        )
+        
+        part_size, part_count = storage.calcular_partes(datos['size'])
+        urls = storage.generate_part_upload_urls(
+            s3_key, upload_id,
+            range(1, min(part_count, MULTIPART_URLS_POR_RESPUESTA) + 1),
+            expiration=MULTIPART_URL_EXPIRATION,
+        )
+        
+        logger.info(
+            f"Subida multipart iniciada para paciente {datos['paciente_id']}: "
+            f"{s3_key} ({part_count} partes de {part_size} bytes)"
+        )
+        return Response({
+            "upload_id": upload_id,
+            "s3_key": s3_key,
+            "file_uuid": str(file_uuid),
+            "part_size": part_size,
+            "part_count": part_count,
+            "parts": [{"part_number": n, "url": url} for n, url in urls.items()],
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='multipart/parts')
+    def multipart_parts(self, request):
+        """
+        Subida multipart: reanudar tras una caída de red o con URLs vencidas
+        
+        Body JSON:
+        {
+            "s3_key": "...",
+            "upload_id": "...",
+            "part_numbers": [3, 4, 5]   (opcional)
+        }
+        
+        Returns las partes ya recibidas por el storage y URLs nuevas para
+        las partes solicitadas.
+        """
+        serializer = MultipartPartsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        s3_key = serializer.validated_data['s3_key']
+        upload_id = serializer.validated_data['upload_id']
+        if self._subida_multipart(request, serializer.validated_data) is None:
+            return self._subida_no_encontrada()
+        
+        storage = StorageService()
+        subidas = storage.list_uploaded_parts(s3_key, upload_id)
+        if subidas is None:
+            return Response(
+                {"error": "La subida multipart no existe o ya fue completada/cancelada."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        
+        part_numbers = serializer.validated_data.get('part_numbers', [])
+        urls = storage.generate_part_upload_urls(
+            s3_key, upload_id, part_numbers, expiration=MULTIPART_URL_EXPIRATION
+        )
+        return Response({
+            "uploaded_parts": subidas,
+            "parts": [{"part_number": n, "url": url} for n, url in urls.items()],
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='multipart/complete')
+    def multipart_complete(self, request):
+        """
+        Subida multipart, PASO 2: ensamblar el objeto
+        
+        Body JSON:
+        {
+            "s3_key": "...",
+            "upload_id": "...",
+            "parts": [{"part_number": 1, "etag": "..."}, ...]
+        }
+        
+        Returns {"s3_key", "etag", "size"}; luego se llama a confirm-upload
+        con ese size y etag.
+        """
+        serializer = MultipartCompleteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        s3_key = serializer.validated_data['s3_key']
+        subida = self._subida_multipart(request, serializer.validated_data)
+        if subida is None:
+            return self._subida_no_encontrada()
+        
+        storage = StorageService()
+        etag = storage.complete_multipart_upload(
+            s3_key,
+            serializer.validated_data['upload_id'],
+            serializer.validated_data['parts'],
+        )
+        if etag is None:
+            return Response(
+                {"error": "No se pudo completar la subida. Verifique las partes y sus ETag."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        subida.delete()
+        metadata = storage.get_file_metadata(s3_key) or {}
+        return Response({
+            "s3_key": s3_key,
+            "etag": etag,
+            "size": metadata.get('size'),
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='multipart/abort')
+    def multipart_abort(self, request):
+        """Subida multipart: cancelar y liberar las partes almacenadas"""
+        serializer = MultipartUploadSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        subida = self._subida_multipart(request, serializer.validated_data)
+        if subida is None:
+            return self._subida_no_encontrada()
+        
+        if not StorageService().abort_multipart_upload(
+            serializer.validated_data['s3_key'],
+            serializer.validated_data['upload_id'],
+        ):
+            return Response(
+                {"error": "No se pudo cancelar la subida multipart."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        subida.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @staticmethod
+    def _subida_multipart(request, datos):
+        """Subida registrada en multipart/init por el mismo usuario, o None"""
+        return SubidaMultipart.objects.filter(
+            upload_id=datos['upload_id'], s3_key=datos['s3_key'], usuario=request.user
+        ).first()
+
+    @staticmethod
+    def _subida_no_encontrada():
+        return Response(
+            {"error": "La subida multipart no existe o no fue iniciada por este usuario."},
+            status=status.HTTP_404_NOT_FOUND
+        )
+
+    @action(detail=False, methods=['post'], url_path='presign')
+    def presign(self, request):
+        """
+        Firma en lote las URLs de visualización y descarga de varios archivos
+        
+        Body JSON:
+        {
+            "file_ids": ["uuid", ...]   (máximo 1000)
+        }
+        
+        Returns:
+        {
+            "expires_in": 3600,
+            "urls": {"<file_id>": {"file_url": "...", "download_url": "...",
+                                   "thumbnail_url": "..." | null, "preview_url": "..." | null}}
+        }
+        """
+        serializer = PresignBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        
+        archivos = list(
+            self.get_queryset()
+            .filter(id__in=serializer.validated_data['file_ids'])
+            .select_related(None)
+            .only('id', 's3_key', 'original_filename', 'derivados')
+        )
+        urls = StorageService().generate_view_urls(solicitudes_url(archivos), expiration=URL_EXPIRATION)
+        
+        return Response({
+            "expires_in": URL_EXPIRATION,
+            "urls": {
+                str(archivo.id): {
+                    "file_url": urls.get((archivo.s3_key, None)),
+                    "download_url": urls.get((archivo.s3_key, archivo.original_filename)),
+                    "thumbnail_url": urls.get((archivo.derivado_key('thumb'), None)),
+                    "preview_url": urls.get((archivo.derivado_key('preview'), None)),
+                }
+                for archivo in archivos
+            }
+        }, status=status.HTTP_200_OK)
+
+    @action(detail=False, methods=['get'], url_path='storage-status')
+    def storage_status(self, request):
+        """
+        Estado del storage según el último health check (no bloquea el request)
+
+        Returns:
+        {"ok": true | false | null, "backend": "...", "error": "..." | null, "verificado_en": "..." | null}
+
+        Si el estado tiene más de un minuto, se agenda otra verificación en segundo plano.
+        """
+        return Response(StorageService.estado(), status=status.HTTP_200_OK)
+
     def destroy(self, request, *args, **kwargs):
         """Eliminar archivo (BD + Storage)"""
         instance = self.get_object()
-        s3_key = instance.s3_key
-        
-        # Eliminar de storage
-        storage = StorageService()
-        if storage.delete_file(s3_key):
-            logger.info(f"Archivo eliminado del storage: {s3_key}")
-        else:
-            logger.warning(f"No se pudo eliminar del storage: {s3_key}")
         
-        # Eliminar de BD
+        # Eliminar de BD; el signal post_delete libera el objeto del storage
+        # (los blobs compartidos solo se borran con su última referencia)
         instance.delete()
         logger.info(f"Registro de archivo eliminado: {instance.id}")
         
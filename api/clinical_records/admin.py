@@ -1,10 +1,12 @@
 from django.contrib import admin
 from api.clinical_records.models import ClinicalRecord
+from api.utils.admin_changelist import ChangelistEficienteMixin
 
 
 @admin.register(ClinicalRecord)
-class ClinicalRecordAdmin(admin.ModelAdmin):
+class ClinicalRecordAdmin(ChangelistEficienteMixin, admin.ModelAdmin):
     list_display = ('id', 'paciente', 'odontologo_responsable', 'fecha_atencion', 'estado', 'activo')
+    list_select_related = ('paciente', 'odontologo_responsable')
     list_filter = ('estado', 'activo', 'fecha_atencion')
     search_fields = ('paciente__nombres', 'paciente__apellidos', 'paciente__cedula_pasaporte', 'motivo_consulta')
     readonly_fields = ('id', 'fecha_atencion', 'fecha_creacion', 'fecha_modificacion', 'fecha_cierre', 'creado_por', 'actualizado_por')
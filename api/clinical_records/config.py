@@ -9,4 +9,27 @@ INSTITUCION_CONFIG = {
     'UNICODIGO_DEFAULT': '1213141516001-150',  
     'INSTITUCION_SISTEMA': 'SISTEMA NACIONAL DE SALUD',
     'ESTABLECIMIENTO_SALUD': 'FamySALUD',
-}
\ No newline at end of file
+}
+
+# RELACIONES PRECARGADAS DEL HISTORIAL
+# Compartidas por ClinicalRecordViewSet.get_queryset y la exportación masiva de PDF
+HISTORIAL_SELECT_RELATED = (
+    'paciente',
+    'odontologo_responsable',
+    'antecedentes_personales',
+    'antecedentes_familiares',
+    'constantes_vitales',
+    'examen_estomatognatico',
+    'indicadores_salud_bucal',
+    'indices_caries',
+    'creado_por',
+    'plan_tratamiento',
+    'plan_tratamiento__paciente',
+    'plan_tratamiento__creado_por',
+    'examenes_complementarios',
+)
+
+HISTORIAL_PREFETCH_DETALLE = (
+    'plan_tratamiento__sesiones',
+    'plan_tratamiento__sesiones__odontologo',
+)
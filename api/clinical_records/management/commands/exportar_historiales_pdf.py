@@ -0,0 +1,121 @@
+# api/clinical_records/management/commands/exportar_historiales_pdf.py
+# python manage.py exportar_historiales_pdf --salida exports/auditoria.zip [--desde 2025-01-01] [--hasta 2025-03-31]
+#     [--odontologo <uuid>] [--paciente <uuid>] [--seccion <clave>] [--workers N] [--storage <nombre>] [--reiniciar]
+# Si se interrumpe, volver a ejecutar con la misma --salida reanuda la exportación
+# python manage.py exportar_historiales_pdf --pendientes [--workers N]
+#     Procesa las exportaciones encoladas desde el endpoint (pensado para cron)
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from api.clinical_records.services.pdf.exportacion_lote_service import (
+    ExportacionLoteError,
+    ExportacionPDFLoteService,
+)
+
+
+class Command(BaseCommand):
+    help = 'Exporta los historiales clínicos del filtro a un ZIP de PDFs (reanudable)'
+
+    def add_arguments(self, parser):
+        destino = parser.add_mutually_exclusive_group(required=True)
+        destino.add_argument('--salida', help='Ruta local del ZIP')
+        destino.add_argument(
+            '--pendientes',
+            action='store_true',
+            help='Procesa las exportaciones encoladas por el endpoint en EXPORTACION_PDF_DIR',
+        )
+        parser.add_argument('--desde', help='Fecha de atención inicial (AAAA-MM-DD)')
+        parser.add_argument('--hasta', help='Fecha de atención final (AAAA-MM-DD)')
+        parser.add_argument('--odontologo', help='ID del odontólogo responsable')
+        parser.add_argument(
+            '--paciente',
+            action='append',
+            dest='pacientes',
+            help='ID del paciente (repetible)',
+        )
+        parser.add_argument(
+            '--seccion',
+            action='append',
+            dest='secciones',
+            help='Sección del PDF a incluir (repetible; por defecto todas)',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=None,
+            help='Procesos de render (por defecto y como máximo EXPORTACION_PDF_MAX_WORKERS; 0 = sin procesos)',
+        )
+        parser.add_argument(
+            '--storage',
+            help='Nombre con el que se sube el ZIP terminado al almacenamiento de archivos',
+        )
+        parser.add_argument(
+            '--reiniciar',
+            action='store_true',
+            help='Descarta el ZIP y el progreso existentes',
+        )
+
+    def handle(self, *args, **options):
+        if options['pendientes']:
+            estados = ExportacionPDFLoteService.procesar_pendientes(
+                settings.EXPORTACION_PDF_DIR, workers=options['workers'], progreso=self._reportar,
+            )
+            for estado in estados:
+                self._resumen(estado)
+            self.stdout.write(f"{len(estados)} exportación(es) pendiente(s) procesada(s)")
+            return
+
+        desde = self._fecha(options.get('desde'), '--desde')
+        hasta = self._fecha(options.get('hasta'), '--hasta')
+
+        try:
+            estado = ExportacionPDFLoteService.exportar(
+                options['salida'],
+                desde=desde,
+                hasta=hasta,
+                odontologo_id=options.get('odontologo'),
+                paciente_ids=options.get('pacientes'),
+                secciones=options.get('secciones'),
+                workers=options['workers'],
+                destino_storage=options.get('storage'),
+                reiniciar=options['reiniciar'],
+                progreso=self._reportar,
+            )
+        except ExportacionLoteError as e:
+            raise CommandError(str(e))
+        self._resumen(estado)
+
+    def _reportar(self, estado):
+        self.stdout.write(
+            f"{estado['procesados']}/{estado['total']} procesados "
+            f"({estado['exportados']} exportados, {estado['omitidos']} omitidos, "
+            f"{len(estado['errores'])} errores)"
+        )
+
+    def _resumen(self, estado):
+        for error in estado['errores']:
+            self.stdout.write(self.style.WARNING(f"Historial {error['historial_id']}: {error['error']}"))
+
+        resumen = (
+            f"{estado['exportados']} PDF(s) exportado(s), {estado['omitidos']} ya existente(s) "
+            f"en {estado['archivo']}"
+        )
+        if estado['storage']:
+            resumen += f" (subido como {estado['storage']})"
+        if estado['errores']:
+            self.stdout.write(self.style.WARNING(
+                f"{resumen}; {len(estado['errores'])} con error, vuelva a ejecutar para reintentarlos"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(resumen))
+
+    @staticmethod
+    def _fecha(valor, opcion):
+        if not valor:
+            return None
+        fecha = parse_date(valor)
+        if fecha is None:
+            raise CommandError(f'{opcion} debe tener formato AAAA-MM-DD')
+        return fecha
@@ -0,0 +1,51 @@
+# Generated by Django 5.1.6 on 2026-10-18 22:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SECUENCIA = 'clinical_records_historia_clinica_seq'
+
+
+def inicializar_contadores(apps, schema_editor):
+    """Continúa la numeración de hojas desde la mayor hoja existente de cada paciente"""
+    ClinicalRecord = apps.get_model('clinical_records', 'ClinicalRecord')
+    ContadorHojaPaciente = apps.get_model('clinical_records', 'ContadorHojaPaciente')
+    ContadorHojaPaciente.objects.bulk_create(
+        [
+            ContadorHojaPaciente(paciente_id=fila['paciente_id'], ultima_hoja=fila['ultima_hoja'])
+            for fila in (
+                ClinicalRecord.objects.order_by()
+                .values('paciente_id')
+                .annotate(ultima_hoja=models.Max('numero_hoja'))
+            )
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clinical_records', '0005_diagnosticociehistorial_codigo_cie_personalizado'),
+        ('patients', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorHojaPaciente',
+            fields=[
+                ('paciente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='contador_hojas', serialize=False, to='patients.paciente', verbose_name='Paciente')),
+                ('ultima_hoja', models.PositiveIntegerField(default=0, verbose_name='Última hoja asignada')),
+            ],
+            options={
+                'verbose_name': 'Contador de hojas',
+                'verbose_name_plural': 'Contadores de hojas',
+                'db_table': 'clinical_records_contador_hoja',
+            },
+        ),
+        migrations.RunSQL(
+            f'CREATE SEQUENCE IF NOT EXISTS {SECUENCIA}',
+            f'DROP SEQUENCE IF EXISTS {SECUENCIA}',
+        ),
+        migrations.RunPython(inicializar_contadores, migrations.RunPython.noop),
+    ]
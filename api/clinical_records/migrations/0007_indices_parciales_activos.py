@@ -0,0 +1,40 @@
+# Generated by Django 5.1.6 on 2026-10-18 22:57
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Índices parciales (WHERE activo) creados CONCURRENTLY antes de borrar los
+    # completos que reemplazan: las consultas calientes no quedan sin índice y
+    # la migración no bloquea escrituras. Si un CREATE INDEX CONCURRENTLY se
+    # interrumpe queda un índice INVALID: borrarlo y volver a migrar. Revertir
+    # recrea los índices anteriores.
+    atomic = False
+
+    dependencies = [
+        ('clinical_records', '0006_numeracion_historiales'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='clinicalrecord',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['paciente', '-fecha_atencion'], name='idx_hc_paciente_act'),
+        ),
+        AddIndexConcurrently(
+            model_name='clinicalrecord',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['estado', '-fecha_atencion'], name='idx_hc_estado_act'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='clinicalrecord',
+            name='clinical_re_pacient_b6bf64_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='clinicalrecord',
+            name='clinical_re_estado_1107d5_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='diagnosticociehistorial',
+            name='clinical_di_activo_72d062_idx',
+        ),
+    ]
@@ -1,4 +1,5 @@
 from .clinical_record import ClinicalRecord
 from .form033_snapshot import Form033Snapshot  
 from .diagnostico_cie import DiagnosticoCIEHistorial
-__all__ = ['ClinicalRecord', 'Form033Snapshot','DiagnosticoCIEHistorial']
+from .numeracion import ContadorHojaPaciente
+__all__ = ['ClinicalRecord', 'Form033Snapshot','DiagnosticoCIEHistorial', 'ContadorHojaPaciente']
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import Q
 from django.core.exceptions import ValidationError
 from api.patients.models.base import BaseModel
 from api.patients.models.paciente import Paciente
@@ -226,8 +227,8 @@ class ClinicalRecord(BaseModel):
         verbose_name_plural = 'Historiales Clínicos'
         ordering = ['-fecha_atencion']
         indexes = [
-            models.Index(fields=['paciente', '-fecha_atencion']),
-            models.Index(fields=['estado', 'activo']),
+            models.Index(fields=['paciente', '-fecha_atencion'], name='idx_hc_paciente_act', condition=Q(activo=True)),
+            models.Index(fields=['estado', '-fecha_atencion'], name='idx_hc_estado_act', condition=Q(activo=True)),
             models.Index(fields=['odontologo_responsable', '-fecha_atencion']),
             models.Index(fields=['numero_historia_clinica_unica']),
         ]
@@ -80,7 +80,6 @@ class DiagnosticoCIEHistorial(models.Model):
         indexes = [
             models.Index(fields=['historial_clinico', 'tipo_cie', 'activo']),
             models.Index(fields=['fecha_creacion']),
-            models.Index(fields=['activo']),
         ]
 
     def __str__(self):
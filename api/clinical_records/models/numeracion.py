@@ -0,0 +1,38 @@
+# api/clinical_records/models/numeracion.py
+"""
+Numeración de historiales clínicos.
+
+- numero_historia_clinica_unica / numero_archivo: secuencia global de
+  PostgreSQL (SECUENCIA_HISTORIA_CLINICA). nextval no bloquea ni participa
+  de la transacción: un rollback deja un hueco, nunca un duplicado.
+- numero_hoja: contador por paciente (ContadorHojaPaciente). El incremento
+  bloquea solo la fila del paciente hasta el commit.
+"""
+from django.db import models
+from api.patients.models.paciente import Paciente
+
+SECUENCIA_HISTORIA_CLINICA = 'clinical_records_historia_clinica_seq'
+
+
+class ContadorHojaPaciente(models.Model):
+    """Última hoja asignada a cada paciente"""
+
+    paciente = models.OneToOneField(
+        Paciente,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='contador_hojas',
+        verbose_name='Paciente'
+    )
+    ultima_hoja = models.PositiveIntegerField(
+        default=0,
+        verbose_name='Última hoja asignada'
+    )
+
+    class Meta:
+        db_table = 'clinical_records_contador_hoja'
+        verbose_name = 'Contador de hojas'
+        verbose_name_plural = 'Contadores de hojas'
+
+    def __str__(self):
+        return f"{self.paciente_id}: hoja {self.ultima_hoja}"
@@ -0,0 +1,24 @@
+# api/clinical_records/pdf_worker.py
+"""
+Funciones de los procesos de render de la exportación masiva de PDF.
+
+Vive fuera de services/ porque los workers ('spawn') importan este módulo
+antes de que Django esté configurado: aquí no se importan modelos a nivel
+de módulo.
+"""
+
+
+def inicializar(nombre_bd: str) -> None:
+    """Inicializa Django en el worker apuntando a la misma base que el padre."""
+    from django.conf import settings
+    settings.DATABASES['default']['NAME'] = nombre_bd
+
+    import django
+    django.setup()
+
+
+def renderizar(historial, secciones=None) -> bytes:
+    from api.clinical_records.services.pdf.clinical_record_pdf_builder import (
+        ClinicalRecordPDFBuilder,
+    )
+    return ClinicalRecordPDFBuilder.generar(historial, secciones)
@@ -1,6 +1,6 @@
-from django.db.models import Q, Prefetch
-from api.clinical_records.models import ClinicalRecord
-from api.clinical_records.services.indices_caries_service import ClinicalRecordIndicesCariesService
+from django.db.models import Count, IntegerField, Max, OuterRef, Prefetch, Q, Subquery, Value
+from django.db.models.functions import Coalesce, Greatest
+from api.clinical_records.models import ClinicalRecord, ContadorHojaPaciente
 
 
 
@@ -91,32 +91,147 @@ class ClinicalRecordRepository:
         Obtiene los últimos datos guardados de todas las secciones de un paciente.
         Se usa para pre-cargar el formulario de historial clínico.
         """
-        from api.patients.models.antecedentes_personales import AntecedentesPersonales
-        from api.patients.models.antecedentes_familiares import AntecedentesFamiliares
-        from api.patients.models.constantes_vitales import ConstantesVitales
-        from api.patients.models.examen_estomatognatico import ExamenEstomatognatico
-        from api.odontogram.models import IndicadoresSaludBucal
-        
-        return {
-            'antecedentes_personales': AntecedentesPersonales.objects.filter(
-                paciente_id=paciente_id,
-                activo=True
-            ).order_by('-fecha_creacion').first(),
-            'antecedentes_familiares': AntecedentesFamiliares.objects.filter(
-                paciente_id=paciente_id,
-                activo=True
-            ).order_by('-fecha_creacion').first(),
-            'constantes_vitales': ConstantesVitales.objects.filter(
-                paciente_id=paciente_id,
-                activo=True
-            ).order_by('-fecha_creacion').first(),
-            'examen_estomatognatico': ExamenEstomatognatico.objects.filter(
-                paciente_id=paciente_id,
-                activo=True
-            ).order_by('-fecha_creacion').first(),
-            'indicadores_salud': IndicadoresSaludBucal.objects.filter(
-            paciente_id=paciente_id,
-            activo=True
-            ).order_by('-fecha', '-id').first(),
-            'indices_caries': ClinicalRecordIndicesCariesService.obtener_ultimos_indices(paciente_id),
+        contexto = ClinicalRecordRepository.obtener_contexto_clinico_paciente(paciente_id) or {}
+        return {seccion: contexto.get(seccion) for seccion in SECCIONES_ULTIMOS_DATOS}
+
+    @staticmethod
+    def obtener_contexto_clinico_paciente(paciente_id):
+        """
+        Contexto clínico del paciente para crear o pre-cargar un historial.
+
+        Un solo SELECT sobre Paciente resuelve, con subconsultas correlacionadas,
+        el id del último registro de cada sección y la última hoja asignada;
+        después solo se leen por clave primaria las secciones que
+        existen (un paciente nuevo cuesta una única consulta).
+
+        Returns:
+            None si el paciente no existe; si no, un dict con 'paciente',
+            las secciones de obtener_ultimos_datos_paciente, 'ultima_constante'
+            (por fecha de consulta), 'ultimo_historial', 'plan_tratamiento',
+            'examenes_complementarios' y 'ultima_hoja'.
+        """
+        from api.patients.models.paciente import Paciente
+
+        consultas = _consultas_ultimo_registro()
+        paciente = Paciente.objects.filter(id=paciente_id).annotate(
+            **{
+                f'_ultimo_{seccion}': Subquery(
+                    queryset.filter(paciente_id=OuterRef('pk')).values('pk')[:1]
+                )
+                for seccion, queryset in consultas.items()
+            },
+            _ultima_hoja=Coalesce(
+                Subquery(
+                    ContadorHojaPaciente.objects.filter(paciente_id=OuterRef('pk')).values('ultima_hoja'),
+                    output_field=IntegerField(),
+                ),
+                Value(0),
+            ),
+        ).first()
+        if paciente is None:
+            return None
+
+        ids = {seccion: getattr(paciente, f'_ultimo_{seccion}') for seccion in consultas}
+        contexto = {
+            'paciente': paciente,
+            'ultima_hoja': paciente._ultima_hoja,
         }
+        # La última constante por fecha de creación y por fecha de consulta
+        # suelen coincidir: se leen ambas en una sola consulta
+        constantes = {}
+        ids_constantes = {ids['constantes_vitales'], ids['ultima_constante']} - {None}
+        if ids_constantes:
+            constantes = consultas['constantes_vitales'].model.objects.in_bulk(ids_constantes)
+        for seccion, queryset in consultas.items():
+            if seccion in ('constantes_vitales', 'ultima_constante'):
+                contexto[seccion] = constantes.get(ids[seccion])
+            elif ids[seccion] is None:
+                contexto[seccion] = None
+            else:
+                contexto[seccion] = queryset.model.objects.filter(pk=ids[seccion]).first()
+        return contexto
+
+    @staticmethod
+    def obtener_version_detalle(clinical_record_id):
+        """
+        Marcador de versión del detalle de un historial, en una sola consulta:
+        la última modificación entre el historial y todo lo que serializa
+        (paciente, secciones, plan y sesiones, diagnósticos CIE, e indicadores
+        e índices del paciente que se muestran cuando el historial no los
+        tiene), más los conteos de sesiones y diagnósticos para notar bajas.
+
+        Returns:
+            (ultima_modificacion, total_sesiones, total_diagnosticos_cie) o
+            None si el historial no existe.
+        """
+        from api.clinical_records.models.diagnostico_cie import DiagnosticoCIEHistorial
+        from api.odontogram.models import IndicadoresSaludBucal, IndiceCariesSnapshot, SesionTratamiento
+
+        sesiones = SesionTratamiento.objects.filter(plan_tratamiento_id=OuterRef('plan_tratamiento_id'))
+        diagnosticos = DiagnosticoCIEHistorial.objects.filter(historial_clinico_id=OuterRef('pk'))
+        indicadores = IndicadoresSaludBucal.all_objects.filter(paciente_id=OuterRef('paciente_id'))
+        indices = IndiceCariesSnapshot.objects.filter(paciente_id=OuterRef('paciente_id'))
+
+        return (
+            ClinicalRecord.objects.filter(pk=clinical_record_id)
+            .order_by()
+            .annotate(
+                ultima_modificacion=Greatest(
+                    'fecha_modificacion',
+                    'paciente__fecha_modificacion',
+                    'odontologo_responsable__fecha_modificacion',
+                    'antecedentes_personales__fecha_modificacion',
+                    'antecedentes_familiares__fecha_modificacion',
+                    'constantes_vitales__fecha_modificacion',
+                    'examen_estomatognatico__fecha_modificacion',
+                    'examenes_complementarios__fecha_modificacion',
+                    'plan_tratamiento__fecha_modificacion',
+                    _subconsulta(sesiones, Max('fecha_modificacion')),
+                    _subconsulta(diagnosticos, Max('fecha_modificacion')),
+                    _subconsulta(indicadores, Max('fecha_modificacion')),
+                    _subconsulta(indices, Max('fecha')),
+                ),
+                total_sesiones=Coalesce(_subconsulta(sesiones, Count('id')), 0),
+                total_diagnosticos_cie=Coalesce(_subconsulta(diagnosticos, Count('id')), 0),
+            )
+            .values_list('ultima_modificacion', 'total_sesiones', 'total_diagnosticos_cie')
+            .first()
+        )
+
+
+def _subconsulta(queryset, agregado):
+    """Agregado de un queryset correlacionado (OuterRef) como subconsulta escalar"""
+    return Subquery(queryset.order_by().values(agrupado=Value(1)).annotate(valor=agregado).values('valor'))
+
+
+SECCIONES_ULTIMOS_DATOS = (
+    'antecedentes_personales',
+    'antecedentes_familiares',
+    'constantes_vitales',
+    'examen_estomatognatico',
+    'indicadores_salud',
+    'indices_caries',
+)
+
+
+def _consultas_ultimo_registro():
+    """Queryset ordenado (el primero es el último registro) de cada sección del contexto"""
+    from api.patients.models.antecedentes_personales import AntecedentesPersonales
+    from api.patients.models.antecedentes_familiares import AntecedentesFamiliares
+    from api.patients.models.constantes_vitales import ConstantesVitales
+    from api.patients.models.examen_estomatognatico import ExamenEstomatognatico
+    from api.patients.models.examenes_complementarios import ExamenesComplementarios
+    from api.odontogram.models import IndicadoresSaludBucal, IndiceCariesSnapshot, PlanTratamiento
+
+    return {
+        'antecedentes_personales': AntecedentesPersonales.objects.filter(activo=True).order_by('-fecha_creacion'),
+        'antecedentes_familiares': AntecedentesFamiliares.objects.filter(activo=True).order_by('-fecha_creacion'),
+        'constantes_vitales': ConstantesVitales.objects.filter(activo=True).order_by('-fecha_creacion'),
+        'ultima_constante': ConstantesVitales.objects.filter(activo=True).order_by('-fecha_consulta', '-fecha_creacion'),
+        'examen_estomatognatico': ExamenEstomatognatico.objects.filter(activo=True).order_by('-fecha_creacion'),
+        'indicadores_salud': IndicadoresSaludBucal.objects.filter(activo=True).order_by('-fecha', '-id'),
+        'indices_caries': IndiceCariesSnapshot.objects.order_by('-fecha'),
+        'ultimo_historial': ClinicalRecord.objects.filter(activo=True).order_by('-fecha_atencion'),
+        'plan_tratamiento': PlanTratamiento.objects.filter(activo=True).order_by('-fecha_creacion'),
+        'examenes_complementarios': ExamenesComplementarios.objects.filter(activo=True).order_by('-fecha_creacion'),
+    }
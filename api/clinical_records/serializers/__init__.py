@@ -36,6 +36,7 @@ from .clinical_record import (
     ClinicalRecordCreateSerializer,
     ClinicalRecordCloseSerializer,
     ClinicalRecordReopenSerializer,
+    ExportacionLotePDFSerializer,
 )
 
 # Exportar todo para compatibilidad con imports existentes
@@ -65,6 +66,7 @@ __all__ = [
     'ClinicalRecordCreateSerializer',
     'ClinicalRecordCloseSerializer',
     'ClinicalRecordReopenSerializer',
+    'ExportacionLotePDFSerializer',
     
     #odontograma
     
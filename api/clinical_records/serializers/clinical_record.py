@@ -813,5 +813,36 @@ class ClinicalRecordReopenSerializer(serializers.Serializer):
         required=True, 
         help_text='Motivo de la reapertura del historial'
     )
+
+
+class ExportacionLotePDFSerializer(serializers.Serializer):
+    """Filtro de la exportación masiva de historiales a PDF"""
+
+    exportacion_id = serializers.RegexField(
+        r'^[0-9a-f]{32}$',
+        required=False,
+        help_text='ID de una exportación previa para reanudarla',
+    )
+    desde = serializers.DateField(required=False)
+    hasta = serializers.DateField(required=False)
+    odontologo_id = serializers.UUIDField(required=False)
+    pacientes = serializers.ListField(
+        child=serializers.UUIDField(),
+        required=False,
+        allow_empty=False,
+    )
+    secciones = serializers.ListField(
+        child=serializers.CharField(),
+        required=False,
+        allow_empty=False,
+    )
+
+    def validate(self, attrs):
+        desde, hasta = attrs.get('desde'), attrs.get('hasta')
+        if desde and hasta and desde > hasta:
+            raise serializers.ValidationError(
+                {'hasta': 'La fecha final debe ser posterior a la inicial.'}
+            )
+        return attrs
     
 
@@ -9,6 +9,7 @@ CAMPOS REALES del modelo PlanTratamiento:
 
 from rest_framework import serializers
 from api.odontogram.models import PlanTratamiento, SesionTratamiento
+from api.odontogram.services.resumen_plan_service import ResumenPlanService
 
 
 class SesionTratamientoDetalleCompletoSerializer(serializers.ModelSerializer):
@@ -117,94 +118,30 @@ class PlanTratamientoCompletoSerializer(serializers.ModelSerializer):
         return SesionTratamientoDetalleCompletoSerializer(sesiones, many=True).data
     
     def get_resumen_estadistico(self, obj):
-        """Resumen estadÃ­stico del plan"""
-        sesiones = obj.sesiones.filter(activo=True)
-        
-        total_diagnosticos = 0
-        total_procedimientos = 0
-        total_prescripciones = 0
-        sesiones_completadas = 0
-        sesiones_planificadas = 0
-        sesiones_en_progreso = 0
-        
-        for sesion in sesiones:
-            # Contar diagnÃ³sticos
-            if sesion.diagnosticos_complicaciones:
-                total_diagnosticos += len(sesion.diagnosticos_complicaciones)
-            
-            # Contar procedimientos
-            if sesion.procedimientos:
-                total_procedimientos += len(sesion.procedimientos)
-            
-            # Contar prescripciones
-            if sesion.prescripciones:
-                total_prescripciones += len(sesion.prescripciones)
-            
-            # Contar por estado
-            if sesion.estado == SesionTratamiento.EstadoSesion.COMPLETADA:
-                sesiones_completadas += 1
-            elif sesion.estado == SesionTratamiento.EstadoSesion.PLANIFICADA:
-                sesiones_planificadas += 1
-            elif sesion.estado == SesionTratamiento.EstadoSesion.EN_PROGRESO:
-                sesiones_en_progreso += 1
-        
+        """Resumen estadístico del plan (precalculado en ResumenPlanTratamiento)"""
+        resumen = ResumenPlanService.obtener(obj)
+        por_estado = resumen.sesiones_por_estado
         return {
-            'total_sesiones': sesiones.count(),
-            'sesiones_completadas': sesiones_completadas,
-            'sesiones_planificadas': sesiones_planificadas,
-            'sesiones_en_progreso': sesiones_en_progreso,
-            'total_diagnosticos': total_diagnosticos,
-            'total_procedimientos': total_procedimientos,
-            'total_prescripciones': total_prescripciones,
+            'total_sesiones': resumen.total_sesiones,
+            'sesiones_completadas': por_estado.get(SesionTratamiento.EstadoSesion.COMPLETADA, 0),
+            'sesiones_planificadas': por_estado.get(SesionTratamiento.EstadoSesion.PLANIFICADA, 0),
+            'sesiones_en_progreso': por_estado.get(SesionTratamiento.EstadoSesion.EN_PROGRESO, 0),
+            'total_diagnosticos': resumen.total_diagnosticos,
+            'total_procedimientos': resumen.total_procedimientos,
+            'total_prescripciones': resumen.total_prescripciones,
         }
     
     def get_procedimientos_consolidados(self, obj):
-        """Consolidar todos los procedimientos de todas las sesiones"""
-        procedimientos = []
-        sesiones = obj.sesiones.filter(activo=True).order_by('numero_sesion')
-        
-        for sesion in sesiones:
-            if sesion.procedimientos:
-                for proc in sesion.procedimientos:
-                    procedimiento_con_sesion = proc.copy()
-                    procedimiento_con_sesion['sesion_numero'] = sesion.numero_sesion
-                    procedimiento_con_sesion['sesion_fecha'] = sesion.fecha_programada.isoformat() if sesion.fecha_programada else None
-                    procedimiento_con_sesion['sesion_estado'] = sesion.estado
-                    procedimientos.append(procedimiento_con_sesion)
-        
-        return procedimientos
+        """Procedimientos de todas las sesiones, con número, fecha y estado de su sesión"""
+        return ResumenPlanService.obtener(obj).procedimientos_consolidados
     
     def get_prescripciones_consolidadas(self, obj):
-        """Consolidar todas las prescripciones de todas las sesiones"""
-        prescripciones = []
-        sesiones = obj.sesiones.filter(activo=True).order_by('numero_sesion')
-        
-        for sesion in sesiones:
-            if sesion.prescripciones:
-                for pres in sesion.prescripciones:
-                    prescripcion_con_sesion = pres.copy()
-                    prescripcion_con_sesion['sesion_numero'] = sesion.numero_sesion
-                    prescripcion_con_sesion['sesion_fecha'] = sesion.fecha_programada.isoformat() if sesion.fecha_programada else None
-                    prescripcion_con_sesion['sesion_estado'] = sesion.estado
-                    prescripciones.append(prescripcion_con_sesion)
-        
-        return prescripciones
+        """Prescripciones de todas las sesiones, con número, fecha y estado de su sesión"""
+        return ResumenPlanService.obtener(obj).prescripciones_consolidadas
     
     def get_diagnosticos_consolidados(self, obj):
-        """Consolidar todos los diagnÃ³sticos de todas las sesiones"""
-        diagnosticos = []
-        sesiones = obj.sesiones.filter(activo=True).order_by('numero_sesion')
-        
-        for sesion in sesiones:
-            if sesion.diagnosticos_complicaciones:
-                for diag in sesion.diagnosticos_complicaciones:
-                    diagnostico_con_sesion = diag.copy()
-                    diagnostico_con_sesion['sesion_numero'] = sesion.numero_sesion
-                    diagnostico_con_sesion['sesion_fecha'] = sesion.fecha_programada.isoformat() if sesion.fecha_programada else None
-                    diagnostico_con_sesion['sesion_estado'] = sesion.estado
-                    diagnosticos.append(diagnostico_con_sesion)
-        
-        return diagnosticos
+        """Diagnósticos de todas las sesiones, con número, fecha y estado de su sesión"""
+        return ResumenPlanService.obtener(obj).diagnosticos_consolidados
 
 
 class PlanTratamientoResumenSerializer(serializers.ModelSerializer):
@@ -222,11 +159,10 @@ class PlanTratamientoResumenSerializer(serializers.ModelSerializer):
         ]
     
     def get_total_sesiones(self, obj):
-        return obj.sesiones.filter(activo=True).count()
+        return ResumenPlanService.obtener(obj).total_sesiones
     
     def get_sesiones_completadas(self, obj):
-        return obj.sesiones.filter(
-            activo=True,
-            estado=SesionTratamiento.EstadoSesion.COMPLETADA
-        ).count()
+        return ResumenPlanService.obtener(obj).sesiones_por_estado.get(
+            SesionTratamiento.EstadoSesion.COMPLETADA, 0
+        )
         
\ No newline at end of file
@@ -9,8 +9,15 @@ CAMBIOS (optimización BD remota lenta):
 - Se elimina la llamada a full_clean() manual antes del save(); Django ya la
   ejecuta internamente al llamar a model.save() cuando el modelo la sobreescribe.
   La única validación explícita necesaria es antes de construir el objeto.
+- Los últimos registros del paciente (secciones, constante vital, indicadores,
+  plan, exámenes y número de hoja) salen de un único contexto clínico
+  (ClinicalRecordRepository.obtener_contexto_clinico_paciente), compartido
+  con RecordLoaderService.
+- Los números (historia clínica única, archivo y hoja) se asignan en una sola
+  sentencia junto al INSERT (NumberGeneratorService.asignar_numeros).
 """
 import logging
+from django.db import transaction
 from django.utils import timezone
 from django.core.exceptions import ValidationError
 
@@ -19,13 +26,11 @@ from api.clinical_records.models import ClinicalRecord
 from api.patients.models.paciente import Paciente
 from api.clinical_records.config import INSTITUCION_CONFIG
 from api.clinical_records.services.form033_storage_service import Form033StorageService
-from api.clinical_records.services.indicadores_service import ClinicalRecordIndicadoresService
 
 from typing import Optional, Dict, Any
 
 from api.clinical_records.services.diagnostico_cie_service import DiagnosticosCIEService
 from api.odontogram.services.plan_tratamiento_service import PlanTratamientoService
-from api.clinical_records.services.plan_tratamiento_service import PlanTratamientoLinkService
 
 
 from .number_generator_service import NumberGeneratorService
@@ -55,35 +60,8 @@ class ClinicalRecordService:
         paciente_id = paciente.id
         creado_por = data.get('creado_por')
         
-        # === GENERAR NÚMEROS ÚNICOS ===
-        numero_historia_unica = (
-            NumberGeneratorService.generar_numero_historia_clinica_unica()
-        )
-        numero_archivo = NumberGeneratorService.generar_numero_archivo(
-            paciente_id
-        )
-        
-        # Validar longitud antes de continuar
-        if len(numero_archivo) > 50:
-            raise ValidationError({
-                'numero_archivo': (
-                    f'Número de archivo muy largo: {len(numero_archivo)} caracteres. '
-                    f'Máximo permitido: 50'
-                )
-            })
-        
-        if len(numero_historia_unica) > 50:
-            raise ValidationError({
-                'numero_historia_clinica_unica': (
-                    f'Número de historia clínica muy largo: {len(numero_historia_unica)} caracteres. '
-                    f'Máximo permitido: 50'
-                )
-            })
-        
-        # Asignar números generados
-        data['numero_historia_clinica_unica'] = numero_historia_unica
-        data['numero_archivo'] = numero_archivo
-        data['numero_hoja'] = NumberGeneratorService.generar_numero_hoja(paciente_id)
+        # === CONTEXTO CLÍNICO PREVIO (últimos registros de cada sección) ===
+        contexto = ClinicalRecordRepository.obtener_contexto_clinico_paciente(paciente_id) or {}
         
         # === DATOS POR DEFECTO ===
         if not data.get('establecimiento_salud'):
@@ -98,11 +76,6 @@ class ClinicalRecordService:
         if not data.get('embarazada'):
             data['embarazada'] = paciente.embarazada
         
-        # === CARGAR DATOS PREVIOS DEL PACIENTE ===
-        ultimos_datos = ClinicalRecordRepository.obtener_ultimos_datos_paciente(
-            paciente_id
-        )
-        
         # === MANEJAR CONSTANTES VITALES ===
         constantes_vitales_nuevas = False
         motivo_consulta_nuevo = False
@@ -124,7 +97,7 @@ class ClinicalRecordService:
                 enfermedad_actual_nueva = True
         else:
             # Usar última constante vital existente
-            ultima_constante = VitalSignsService.obtener_ultima_constante(paciente_id)
+            ultima_constante = contexto.get('ultima_constante')
             if ultima_constante:
                 data['constantes_vitales'] = ultima_constante
                 
@@ -162,15 +135,13 @@ class ClinicalRecordService:
             'indices_caries',
         ]
         for seccion in secciones:
-            if not data.get(seccion) and ultimos_datos.get(seccion):
-                data[seccion] = ultimos_datos[seccion]
+            if not data.get(seccion) and contexto.get(seccion):
+                data[seccion] = contexto[seccion]
         
         # === CARGAR INDICADORES ===
         if not data.get('indicadores_salud_bucal'):
             logger.info(f"Buscando indicadores para paciente {paciente_id}")
-            indicadores = ClinicalRecordIndicadoresService.obtener_indicadores_paciente(
-                str(paciente_id)
-            )
+            indicadores = contexto.get('indicadores_salud')
             
             if indicadores:
                 data['indicadores_salud_bucal'] = indicadores
@@ -181,7 +152,7 @@ class ClinicalRecordService:
         # === VINCULAR PLAN DE TRATAMIENTO ACTIVO ===
         if not data.get('plan_tratamiento'):
             logger.info(f"Buscando plan de tratamiento activo para paciente {paciente_id}")
-            plan_activo = PlanTratamientoLinkService.obtener_plan_activo_paciente(paciente_id)
+            plan_activo = contexto.get('plan_tratamiento')
             
             if plan_activo:
                 data['plan_tratamiento'] = plan_activo
@@ -197,8 +168,7 @@ class ClinicalRecordService:
         # === VINCULAR EXÁMENES COMPLEMENTARIOS ===
         if not data.get('examenes_complementarios'):
             logger.info(f"Buscando exámenes complementarios para paciente {paciente_id}")
-            from api.clinical_records.services.examenes_complementarios_service import ExamenesComplementariosLinkService
-            ultimo_examen = ExamenesComplementariosLinkService.obtener_ultimo_examen_paciente(paciente_id)
+            ultimo_examen = contexto.get('examenes_complementarios')
             
             if ultimo_examen:
                 data['examenes_complementarios'] = ultimo_examen
@@ -229,7 +199,11 @@ class ClinicalRecordService:
         
         cls._validar_datos_previo_insert(data, paciente)
 
-        historial = ClinicalRecord.objects.create(**data)
+        # === NÚMEROS ÚNICOS (secuencia + contador de hojas, sin reintentos) ===
+        # Si el INSERT falla, el rollback devuelve la hoja al contador
+        with transaction.atomic():
+            data.update(NumberGeneratorService.asignar_numeros(paciente_id)[0])
+            historial = ClinicalRecord.objects.create(**data)
         
         # === GUARDAR DIAGNÓSTICOS CIE SI SE PROPORCIONAN ===
         diagnosticos_data = data.get('diagnosticos_cie', [])
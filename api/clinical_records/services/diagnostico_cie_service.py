@@ -6,10 +6,15 @@ from api.odontogram.models import DiagnosticoDental, HistorialOdontograma
 from api.clinical_records.models import ClinicalRecord, DiagnosticoCIEHistorial
 from django.core.exceptions import ValidationError
 from collections import OrderedDict
-from django.db.models import Q
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Q, Subquery
 
 logger = logging.getLogger(__name__)
 
+LIMITE_DIAGNOSTICOS_NUEVOS = 50
+
+CAMPOS_ACTUALIZABLES = ['tipo_cie', 'activo', 'codigo_cie_personalizado', 'actualizado_por', 'fecha_modificacion']
+
 
 class DiagnosticosCIEService:
     """Servicio para cargar y gestionar diagnósticos CIE-10"""
@@ -30,101 +35,46 @@ class DiagnosticosCIEService:
 
     @staticmethod
     def obtener_diagnosticos_nuevos(paciente_id: str) -> List[Dict[str, Any]]:
+        """
+        Diagnósticos del odontograma cuyo par (diente FDI, código CIE) aún no
+        está cargado en ningún historial activo del paciente.
+
+        Una sola consulta: anti-join (NOT EXISTS) contra los diagnósticos CIE
+        cargados, DISTINCT ON (diente, código) para quedarse con el más
+        reciente de cada par y orden por fecha con el límite en la BD.
+        """
         try:
-            # Obtener TODOS los diagnósticos del paciente
-            todos_diagnosticos = DiagnosticoDental.objects.filter(
-                superficie__diente__paciente_id=paciente_id,
+            ya_cargado = DiagnosticoCIEHistorial.objects.filter(
+                historial_clinico__paciente_id=paciente_id,
+                historial_clinico__activo=True,
                 activo=True,
-            ).select_related(
-                'diagnostico_catalogo',
-                'superficie',
-                'superficie__diente',
-                'superficie__diente__paciente',
-                'odontologo',
+                diagnostico_dental__superficie__diente__codigo_fdi=OuterRef('superficie__diente__codigo_fdi'),
+                diagnostico_dental__diagnostico_catalogo__codigo_icd10=OuterRef('diagnostico_catalogo__codigo_icd10'),
             )
 
-            # 1. Obtener todos los historiales del paciente
-            historiales_paciente = ClinicalRecord.objects.filter(
+            mas_recientes = DiagnosticoDental.objects.filter(
                 paciente_id=paciente_id,
-                activo=True
-            ).values_list('id', flat=True)
-
-            # 2. Obtener diagnósticos CIE ya cargados en esos historiales
-            diagnosticos_cargados = DiagnosticoCIEHistorial.objects.filter(
-                historial_clinico_id__in=historiales_paciente,
-                activo=True
+                activo=True,
+            ).exclude(
+                Q(superficie__diente__codigo_fdi='') | Q(diagnostico_catalogo__codigo_icd10='')
+            ).filter(
+                ~Exists(ya_cargado)
+            ).order_by(
+                'superficie__diente__codigo_fdi',
+                'diagnostico_catalogo__codigo_icd10',
+                F('fecha').desc(nulls_first=True),
+            ).distinct(
+                'superficie__diente__codigo_fdi',
+                'diagnostico_catalogo__codigo_icd10',
+            ).values('id')
+
+            diagnosticos_unicos = DiagnosticoDental.objects.filter(
+                id__in=Subquery(mas_recientes)
             ).select_related(
-                'diagnostico_dental__superficie__diente',
-                'diagnostico_dental__diagnostico_catalogo'
-            )
-
-            # Crear un conjunto de claves únicas (diente_fdi + codigo_cie) ya cargadas
-            claves_cargadas = set()
-            for diag_cargado in diagnosticos_cargados:
-                diente_fdi = (
-                    diag_cargado.diagnostico_dental.superficie.diente.codigo_fdi
-                    if diag_cargado.diagnostico_dental and
-                    diag_cargado.diagnostico_dental.superficie and
-                    diag_cargado.diagnostico_dental.superficie.diente
-                    else ""
-                )
-                codigo_cie = (
-                    diag_cargado.diagnostico_dental.diagnostico_catalogo.codigo_icd10
-                    if diag_cargado.diagnostico_dental and
-                    diag_cargado.diagnostico_dental.diagnostico_catalogo
-                    else ""
-                )
-                if diente_fdi and codigo_cie:
-                    clave = f"{diente_fdi}_{codigo_cie}"
-                    claves_cargadas.add(clave)
-
-            logger.debug(f"DEBUG - Claves cargadas: {claves_cargadas}")
-
-            # 3. Filtrar diagnósticos "nuevos" - excluyendo por diente+código CIE
-            diagnosticos_nuevos = []
-            for diag in todos_diagnosticos:
-                diente_fdi = (
-                    diag.superficie.diente.codigo_fdi
-                    if diag.superficie and diag.superficie.diente else ""
-                )
-                codigo_cie = (
-                    diag.diagnostico_catalogo.codigo_icd10
-                    if diag.diagnostico_catalogo else ""
-                )
-
-                if not diente_fdi or not codigo_cie:
-                    continue
-
-                clave_diag = f"{diente_fdi}_{codigo_cie}"
-
-                if clave_diag not in claves_cargadas:
-                    diagnosticos_nuevos.append(diag)
-
-            logger.debug(f"DEBUG - Diagnósticos nuevos después de filtrar: {len(diagnosticos_nuevos)}")
-
-            # Ordenar por fecha (más recientes primero)
-            diagnosticos_nuevos.sort(
-                key=lambda x: x.fecha if x.fecha else timezone.now(),
-                reverse=True
-            )
-
-            # Agrupar por (diente_fdi, codigo_cie) para evitar duplicados en la respuesta
-            agrupados: dict[tuple[str, str], DiagnosticoDental] = OrderedDict()
-            for diag in diagnosticos_nuevos:
-                diente_fdi = (
-                    diag.superficie.diente.codigo_fdi
-                    if diag.superficie and diag.superficie.diente else ""
-                )
-                codigo_cie = (
-                    diag.diagnostico_catalogo.codigo_icd10
-                    if diag.diagnostico_catalogo else ""
-                )
-                clave = (diente_fdi, codigo_cie)
-
-                if clave not in agrupados:
-                    agrupados[clave] = diag
-
-            diagnosticos_unicos = list(agrupados.values())[:50]
+                'diagnostico_catalogo',
+                'superficie',
+                'superficie__diente',
+            ).order_by(F('fecha').desc(nulls_first=True))[:LIMITE_DIAGNOSTICOS_NUEVOS]
 
             return DiagnosticosCIEService.formatear_diagnosticos(diagnosticos_unicos)
         except Exception as e:
@@ -135,7 +85,7 @@ class DiagnosticosCIEService:
     def obtener_diagnosticos_todos(paciente_id: str) -> List[Dict[str, Any]]:
         try:
             diagnosticos = DiagnosticoDental.objects.filter(
-                superficie__diente__paciente_id=paciente_id,
+                paciente_id=paciente_id,
                 activo=True,
             ).select_related(
                 'diagnostico_catalogo',
@@ -229,102 +179,22 @@ class DiagnosticosCIEService:
             # Solo se permite personalizar códigos en BORRADOR
             puede_personalizar = historial_clinico.estado == 'BORRADOR'
 
-            # Obtener diagnósticos previos para este historial
-            diagnosticos_previos = DiagnosticoCIEHistorial.objects.filter(
-                historial_clinico=historial_clinico,
-                activo=True
-            )
+            # "nuevos" reemplaza los cargados; "todos" mantiene también los anteriores
+            with transaction.atomic():
+                cambios, vigentes = DiagnosticosCIEService._aplicar_diagnosticos(
+                    historial_clinico,
+                    diagnosticos_data,
+                    usuario,
+                    puede_personalizar=puede_personalizar,
+                    desactivar_resto=tipo_carga == 'nuevos',
+                )
+                diagnosticos_guardados = vigentes
 
-            # Marcar los previos como inactivos si estamos en modo "nuevos"
-            if tipo_carga == 'nuevos':
-                for diag_previo in diagnosticos_previos:
-                    diag_previo.activo = False
-                    diag_previo.actualizado_por = usuario
-                    diag_previo.save()
-
-            diagnosticos_guardados = []
-            diagnosticos_ids = set()
-
-            for diag_data in diagnosticos_data:
-                diagnostico_dental_id = diag_data.get('diagnostico_dental_id')
-                tipo_cie = diag_data.get('tipo_cie', 'PRE')
-                # NUEVO: código personalizado enviado por el profesional
-                codigo_personalizado = diag_data.get('codigo_cie_personalizado', None)
-
-                try:
-                    diagnostico_dental = DiagnosticoDental.objects.get(
-                        id=diagnostico_dental_id,
-                        activo=True
-                    )
-
-                    if not diagnostico_dental.diagnostico_catalogo or not diagnostico_dental.diagnostico_catalogo.codigo_icd10:
-                        logger.warning(f"Diagnóstico {diagnostico_dental_id} no tiene código CIE, saltando")
-                        continue
-
-                    diag_existente = DiagnosticoCIEHistorial.objects.filter(
-                        historial_clinico=historial_clinico,
-                        diagnostico_dental=diagnostico_dental
-                    ).first()
-
-                    if diag_existente:
-                        diag_existente.tipo_cie = tipo_cie
-                        diag_existente.activo = True
-                        diag_existente.actualizado_por = usuario
-                        # NUEVO: actualizar código personalizado solo en BORRADOR
-                        if puede_personalizar:
-                            if codigo_personalizado and codigo_personalizado.strip():
-                                diag_existente.codigo_cie_personalizado = codigo_personalizado.strip().upper()
-                            codigo_personalizado = diag_data.get('codigo_cie_personalizado')  # None si no viene
-
-                            if puede_personalizar:
-                                if codigo_personalizado is not None:  # Solo tocar si fue enviado explícitamente
-                                    if codigo_personalizado.strip():
-                                        diag_existente.codigo_cie_personalizado = codigo_personalizado.strip().upper()
-                                    else:
-                                        diag_existente.codigo_cie_personalizado = None 
-                        diag_existente.save()
-                        diag_cie = diag_existente
-                    else:
-                        # NUEVO: incluir codigo_cie_personalizado al crear
-                        crear_kwargs = {
-                            'historial_clinico': historial_clinico,
-                            'diagnostico_dental': diagnostico_dental,
-                            'tipo_cie': tipo_cie,
-                            'creado_por': usuario,
-                            'activo': True,
-                        }
-                        if puede_personalizar and codigo_personalizado and codigo_personalizado.strip():
-                            crear_kwargs['codigo_cie_personalizado'] = codigo_personalizado.strip().upper()
-
-                        diag_cie = DiagnosticoCIEHistorial.objects.create(**crear_kwargs)
-
-                    diagnosticos_guardados.append(diag_cie)
-                    diagnosticos_ids.add(str(diagnostico_dental_id))
-
-                except DiagnosticoDental.DoesNotExist:
-                    logger.warning(f"Diagnóstico dental {diagnostico_dental_id} no encontrado")
-                    continue
-
-            # Si estamos en modo "todos", mantener los anteriores activos también
-            if tipo_carga == 'todos':
-                for diag_previo in diagnosticos_previos:
-                    if str(diag_previo.diagnostico_dental_id) not in diagnosticos_ids:
-                        diag_previo.activo = True
-                        diag_previo.actualizado_por = usuario
-                        diag_previo.save()
-                        diagnosticos_guardados.append(diag_previo)
-
-            diagnosticos_ids_set = set()
-            for diag_data in diagnosticos_data:
-                diagnostico_dental_id = diag_data.get('diagnostico_dental_id')
-                if diagnostico_dental_id in diagnosticos_ids_set:
-                    logger.warning(f"Diagnóstico duplicado: {diagnostico_dental_id}")
-                    continue
-                diagnosticos_ids_set.add(diagnostico_dental_id)
-
-            historial_clinico.diagnosticos_cie_cargados = len(diagnosticos_guardados) > 0
-            historial_clinico.tipo_carga_diagnosticos = tipo_carga
-            historial_clinico.save()
+                historial_clinico.diagnosticos_cie_cargados = len(diagnosticos_guardados) > 0
+                historial_clinico.tipo_carga_diagnosticos = tipo_carga
+                historial_clinico.save(update_fields=[
+                    'diagnosticos_cie_cargados', 'tipo_carga_diagnosticos', 'fecha_modificacion'
+                ])
 
             logger.info(
                 f"{len(diagnosticos_guardados)} diagnósticos CIE cargados "
@@ -335,6 +205,8 @@ class DiagnosticosCIEService:
                 'success': True,
                 'total_diagnosticos': len(diagnosticos_guardados),
                 'tipo_carga': tipo_carga,
+                'estadisticas': {clave: len(ids) for clave, ids in cambios.items()},
+                'cambios': cambios,
                 'diagnosticos': [
                     {
                         'id': diag.id,
@@ -360,6 +232,130 @@ class DiagnosticosCIEService:
                 'error': str(e)
             }
 
+    @staticmethod
+    def _codigo_personalizado(valor: Optional[str]) -> Optional[str]:
+        """Normaliza el código enviado: mayúsculas, o None si viene vacío"""
+        return valor.strip().upper() if valor and valor.strip() else None
+
+    @staticmethod
+    def _aplicar_diagnosticos(
+        historial: ClinicalRecord,
+        diagnosticos_data: List[Dict[str, Any]],
+        usuario,
+        puede_personalizar: bool,
+        desactivar_resto: bool,
+    ):
+        """
+        Aplica la lista de diagnósticos al historial por conjuntos: una consulta
+        para los diagnósticos dentales, otra para las filas existentes, y
+        bulk_create / bulk_update solo para lo que cambia. Debe llamarse dentro
+        de una transacción.
+
+        Returns:
+            (cambios, vigentes): cambios = {'creados', 'actualizados',
+            'desactivados'} con los ids de DiagnosticoDental afectados;
+            vigentes = filas activas del historial tras aplicar la lista.
+        """
+        solicitados: Dict[str, Dict[str, Any]] = OrderedDict()
+        for diag_data in diagnosticos_data:
+            if diag_data.get('diagnostico_dental_id') is None:
+                continue
+            diagnostico_dental_id = str(diag_data['diagnostico_dental_id'])
+            if diagnostico_dental_id in solicitados:
+                logger.warning(f"Diagnóstico duplicado: {diagnostico_dental_id}")
+            solicitados[diagnostico_dental_id] = diag_data
+
+        dentales = DiagnosticoDental.objects.filter(
+            id__in=list(solicitados),
+            activo=True,
+        ).exclude(
+            diagnostico_catalogo__codigo_icd10=''
+        ).select_related(
+            'diagnostico_catalogo', 'superficie', 'superficie__diente'
+        ).in_bulk()
+        dentales = {str(pk): diag for pk, diag in dentales.items()}
+        for diagnostico_dental_id in solicitados.keys() - dentales.keys():
+            logger.warning(
+                f"Diagnóstico dental {diagnostico_dental_id} no encontrado o sin código CIE, saltando"
+            )
+
+        existentes = {
+            str(diag.diagnostico_dental_id): diag
+            for diag in DiagnosticoCIEHistorial.objects.filter(
+                historial_clinico=historial
+            ).select_related(
+                'diagnostico_dental',
+                'diagnostico_dental__diagnostico_catalogo',
+                'diagnostico_dental__superficie',
+                'diagnostico_dental__superficie__diente',
+            )
+        }
+
+        ahora = timezone.now()
+        cambios = {'creados': [], 'actualizados': [], 'desactivados': []}
+        crear, actualizar, vigentes = [], [], []
+
+        for diagnostico_dental_id, diag_data in solicitados.items():
+            diagnostico_dental = dentales.get(diagnostico_dental_id)
+            if diagnostico_dental is None:
+                continue
+            tipo_cie = diag_data.get('tipo_cie', 'PRE')
+            # Código personalizado enviado por el profesional (None = no se toca)
+            codigo_personalizado = diag_data.get('codigo_cie_personalizado')
+
+            diag_cie = existentes.get(diagnostico_dental_id)
+            if diag_cie is None:
+                diag_cie = DiagnosticoCIEHistorial(
+                    historial_clinico=historial,
+                    diagnostico_dental=diagnostico_dental,
+                    tipo_cie=tipo_cie,
+                    creado_por=usuario,
+                    activo=True,
+                    codigo_cie_personalizado=(
+                        DiagnosticosCIEService._codigo_personalizado(codigo_personalizado)
+                        if puede_personalizar else None
+                    ),
+                )
+                crear.append(diag_cie)
+                cambios['creados'].append(diagnostico_dental_id)
+            else:
+                nuevo_codigo = diag_cie.codigo_cie_personalizado
+                if puede_personalizar and codigo_personalizado is not None:
+                    nuevo_codigo = DiagnosticosCIEService._codigo_personalizado(codigo_personalizado)
+                if (diag_cie.tipo_cie, diag_cie.activo, diag_cie.codigo_cie_personalizado) != (
+                    tipo_cie, True, nuevo_codigo
+                ):
+                    diag_cie.tipo_cie = tipo_cie
+                    diag_cie.activo = True
+                    diag_cie.codigo_cie_personalizado = nuevo_codigo
+                    diag_cie.actualizado_por = usuario
+                    # bulk_update no aplica auto_now
+                    diag_cie.fecha_modificacion = ahora
+                    actualizar.append(diag_cie)
+                    cambios['actualizados'].append(diagnostico_dental_id)
+            vigentes.append(diag_cie)
+
+        restantes = [
+            diag for clave, diag in existentes.items()
+            if diag.activo and clave not in solicitados.keys() & dentales.keys()
+        ]
+        if desactivar_resto:
+            for diag in restantes:
+                diag.activo = False
+                diag.actualizado_por = usuario
+                diag.fecha_modificacion = ahora
+                actualizar.append(diag)
+                cambios['desactivados'].append(str(diag.diagnostico_dental_id))
+        else:
+            vigentes.extend(restantes)
+
+        if crear:
+            DiagnosticoCIEHistorial.objects.bulk_create(crear)
+        if actualizar:
+            DiagnosticoCIEHistorial.objects.bulk_update(actualizar, CAMPOS_ACTUALIZABLES)
+
+        return cambios, vigentes
+
     @staticmethod
     def obtener_diagnosticos_historial(historial_id: str) -> List[Dict[str, Any]]:
         """
@@ -501,85 +497,24 @@ class DiagnosticosCIEService:
             # Solo BORRADOR permite personalizar códigos
             puede_personalizar = historial.estado == 'BORRADOR'
 
-            diagnosticos_finales_ids = [
-                str(diag['diagnostico_dental_id']) for diag in diagnosticos_finales
-            ]
+            with transaction.atomic():
+                cambios, _ = DiagnosticosCIEService._aplicar_diagnosticos(
+                    historial,
+                    diagnosticos_finales,
+                    usuario,
+                    puede_personalizar=puede_personalizar,
+                    desactivar_resto=True,
+                )
 
-            # 1. Desactivar diagnósticos que no están en la lista final
-            diagnosticos_actuales = DiagnosticoCIEHistorial.objects.filter(
-                historial_clinico=historial,
-                activo=True
-            )
+                historial.tipo_carga_diagnosticos = tipo_carga
+                historial.diagnosticos_cie_cargados = len(diagnosticos_finales) > 0
+                historial.save(update_fields=[
+                    'tipo_carga_diagnosticos', 'diagnosticos_cie_cargados', 'fecha_modificacion'
+                ])
 
-            desactivados = 0
-            for diag_actual in diagnosticos_actuales:
-                if str(diag_actual.diagnostico_dental_id) not in diagnosticos_finales_ids:
-                    diag_actual.activo = False
-                    diag_actual.actualizado_por = usuario
-                    diag_actual.save()
-                    desactivados += 1
-
-            # 2. Activar/Crear diagnósticos que están en la lista final
-            creados = 0
-            actualizados = 0
-
-            for diag_data in diagnosticos_finales:
-                diagnostico_dental_id = diag_data['diagnostico_dental_id']
-                tipo_cie = diag_data['tipo_cie']
-                # NUEVO: código personalizado opcional
-                codigo_personalizado = diag_data.get('codigo_cie_personalizado', None)
-
-                try:
-                    diagnostico_dental = DiagnosticoDental.objects.get(
-                        id=diagnostico_dental_id,
-                        activo=True
-                    )
-
-                    if not diagnostico_dental.diagnostico_catalogo or not diagnostico_dental.diagnostico_catalogo.codigo_icd10:
-                        logger.warning(f"Diagnóstico {diagnostico_dental_id} no tiene código CIE, saltando")
-                        continue
-
-                    diag_existente = DiagnosticoCIEHistorial.objects.filter(
-                        historial_clinico=historial,
-                        diagnostico_dental=diagnostico_dental
-                    ).first()
-
-                    if diag_existente:
-                        diag_existente.tipo_cie = tipo_cie
-                        diag_existente.activo = True
-                        diag_existente.actualizado_por = usuario
-                        # NUEVO: actualizar código personalizado solo en BORRADOR
-                        if puede_personalizar:
-                            if codigo_personalizado and codigo_personalizado.strip():
-                                diag_existente.codigo_cie_personalizado = codigo_personalizado.strip().upper()
-                            elif codigo_personalizado == '':
-                                # Cadena vacía explícita → restaurar catálogo
-                                diag_existente.codigo_cie_personalizado = None
-                        diag_existente.save()
-                        actualizados += 1
-                    else:
-                        # NUEVO: incluir codigo_cie_personalizado al crear
-                        crear_kwargs = {
-                            'historial_clinico': historial,
-                            'diagnostico_dental': diagnostico_dental,
-                            'tipo_cie': tipo_cie,
-                            'creado_por': usuario,
-                            'activo': True,
-                        }
-                        if puede_personalizar and codigo_personalizado and codigo_personalizado.strip():
-                            crear_kwargs['codigo_cie_personalizado'] = codigo_personalizado.strip().upper()
-
-                        DiagnosticoCIEHistorial.objects.create(**crear_kwargs)
-                        creados += 1
-
-                except DiagnosticoDental.DoesNotExist:
-                    logger.warning(f"Diagnóstico dental {diagnostico_dental_id} no encontrado")
-                    continue
-
-            # 3. Actualizar tracking en el historial
-            historial.tipo_carga_diagnosticos = tipo_carga
-            historial.diagnosticos_cie_cargados = len(diagnosticos_finales) > 0
-            historial.save()
+            desactivados = len(cambios['desactivados'])
+            creados = len(cambios['creados'])
+            actualizados = len(cambios['actualizados'])
 
             logger.info(
                 f"Sincronización completada para historial {historial_id}: "
@@ -598,6 +533,7 @@ class DiagnosticosCIEService:
                     'creados': creados,
                     'actualizados': actualizados,
                 },
+                'cambios': cambios,
                 'diagnosticos': diagnosticos_actualizados,
             }
 
@@ -4,8 +4,10 @@ Servicio para procesar y almacenar datos del Formulario 033
 en el historial clínico
 """
 import logging
+import threading
 from typing import Dict, Any, Optional
 from django.core.exceptions import ValidationError
+from django.db import close_old_connections, transaction
 
 from api.clinical_records.models import Form033Snapshot
 from api.odontogram.services.form033_service import Form033Service
@@ -19,6 +21,66 @@ class Form033StorageService:
     Servicio para integrar datos del Form033 con historiales clínicos
     """
     
+    @classmethod
+    def programar_snapshot_automatico(cls, historial_id) -> None:
+        """
+        Crea el snapshot inicial del Form033 en un hilo de fondo cuando la
+        transacción confirma: generar el Form033 completo no bloquea la
+        creación del historial.
+        """
+        def _iniciar():
+            threading.Thread(
+                target=cls._snapshot_automatico_en_hilo,
+                args=(historial_id,),
+                name=f"form033-{historial_id}",
+                daemon=True,
+            ).start()
+        transaction.on_commit(_iniciar)
+    
+    @classmethod
+    def _snapshot_automatico_en_hilo(cls, historial_id) -> None:
+        try:
+            cls.crear_snapshot_automatico(historial_id)
+        except Exception as e:
+            # Sin esto el error mataría el hilo sin dejar rastro
+            logger.error(f"Error en el hilo del snapshot automático de HC {historial_id}: {e}", exc_info=True)
+        finally:
+            close_old_connections()
+    
+    @classmethod
+    def crear_snapshot_automatico(cls, historial_id) -> Optional[Form033Snapshot]:
+        """Snapshot inicial del historial (None si ya existe o el historial no está activo)"""
+        from api.clinical_records.models import ClinicalRecord
+        
+        historial = (
+            ClinicalRecord.objects
+            .select_related('paciente', 'odontologo_responsable')
+            .filter(id=historial_id, activo=True)
+            .first()
+        )
+        # Evitar duplicados (captura del odontograma o workers múltiples)
+        if historial is None or Form033Snapshot.objects.filter(historial_clinico_id=historial_id).exists():
+            return None
+        
+        try:
+            snapshot = cls.crear_snapshot_desde_paciente(
+                historial_clinico=historial,
+                usuario=historial.odontologo_responsable,
+                observaciones='Snapshot automático al crear historial clínico'
+            )
+        except Exception as e:
+            logger.error(
+                f"Error creando snapshot automático para HC {historial_id}: {str(e)}",
+                exc_info=True
+            )
+            return None
+        
+        logger.info(
+            f"Snapshot Form033 creado automáticamente para HC "
+            f"{historial.numero_historia_clinica_unica}: {snapshot.id}"
+        )
+        return snapshot
+    
     @classmethod
     def crear_snapshot_desde_paciente(
         cls,
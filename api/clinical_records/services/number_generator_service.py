@@ -1,88 +1,95 @@
 # api/clinical_records/services/number_generator_service.py
 """
-Servicio para generación de números únicos de historiales clínicos
+Servicio para generación de números únicos de historiales clínicos.
+
+Los números se asignan en una sola sentencia: el incremento del contador de
+hojas del paciente (INSERT ... ON CONFLICT DO UPDATE ... RETURNING) y los
+valores de la secuencia global. Son únicos por construcción, sin
+reintentos ni IntegrityError; `cantidad` reserva un bloque para cargas
+masivas.
 """
 import hashlib
+from typing import Dict, List, Optional
+
+from django.db import connection
 from django.utils import timezone
-from api.clinical_records.models import ClinicalRecord
+
+from api.clinical_records.models.numeracion import ContadorHojaPaciente, SECUENCIA_HISTORIA_CLINICA
+
+_TABLA_CONTADOR = ContadorHojaPaciente._meta.db_table
+
+SQL_ASIGNAR = f"""
+    WITH hoja AS (
+        INSERT INTO {_TABLA_CONTADOR} (paciente_id, ultima_hoja)
+        VALUES (%s, %s)
+        ON CONFLICT (paciente_id)
+        DO UPDATE SET ultima_hoja = {_TABLA_CONTADOR}.ultima_hoja + EXCLUDED.ultima_hoja
+        RETURNING ultima_hoja
+    )
+    SELECT hoja.ultima_hoja,
+           ARRAY(SELECT nextval('{SECUENCIA_HISTORIA_CLINICA}') FROM generate_series(1, %s))
+    FROM hoja
+"""
 
 
 class NumberGeneratorService:
     """Servicio para generar números únicos y optimizados"""
-    
-    @staticmethod
-    def generar_numero_archivo(paciente_id):
-        """
-        Genera número de archivo optimizado para no exceder 50 caracteres
-        Formato: PAC-{HASH6}-{TIMESTAMP}
-        Ejemplo: PAC-a1b2c3-260125-1530
-        Total: ~22 caracteres
-        """
-        # Hash de 6 caracteres del UUID del paciente
-        hash_paciente = hashlib.md5(
-            str(paciente_id).encode()
-        ).hexdigest()[:6]
-        
-        # Timestamp compacto (YYMMDD-HHMM = 11 chars)
-        timestamp = timezone.now().strftime('%y%m%d-%H%M')
-        
-        # PAC-{6chars}-{11chars} = 22 caracteres
-        return f"PAC-{hash_paciente}-{timestamp}"
-    
-    @staticmethod
-    def generar_numero_archivo_con_fecha(numero_base):
-        """
-        Genera variación del número de archivo con fecha adicional
-        Usado cuando ya existe un historial activo
-        Formato: {NUMERO_BASE}-{DATE}
-        """
-        import random
-        sufijo = random.randint(1, 999)
-        nuevo_numero = f"{numero_base}-{sufijo:03d}"
-        
-        # Validar longitud
-        if len(nuevo_numero) > 50:
-            max_base_length = 50 - 4  # 4 = guion + 3 dígitos
-            nuevo_numero = f"{numero_base[:max_base_length]}-{sufijo:03d}"
-        
-        return nuevo_numero
-    
+
     @staticmethod
-    def generar_numero_historia_clinica_unica():
+    def _hash_paciente(paciente_id) -> str:
+        """Hash de 6 caracteres del UUID del paciente"""
+        return hashlib.md5(str(paciente_id).encode()).hexdigest()[:6]
+
+    @classmethod
+    def formatear_numeros(cls, paciente_id, secuencia: int, numero_hoja: int, anio: Optional[int] = None) -> Dict:
         """
-        Genera número de historia clínica única
-        Formato: HCU-{TIMESTAMP}-{RANDOM}
-        Ejemplo: HCU-20260125-a1b2c3
-        Total: ~21 caracteres
+        Formatos (≤ 22 caracteres):
+            numero_historia_clinica_unica: HCU-{AÑO}-{SECUENCIA:07d}   p. ej. HCU-2026-0000042
+            numero_archivo:                PAC-{HASH6}-{SECUENCIA:07d} p. ej. PAC-a1b2c3-0000042
         """
-        timestamp = timezone.now().strftime('%Y%m%d')
-        
-        # Generar hash aleatorio corto
-        random_hash = hashlib.md5(
-            f"{timestamp}{timezone.now().microsecond}".encode()
-        ).hexdigest()[:6]
-        
-        return f"HCU-{timestamp}-{random_hash}"
-    
-    @staticmethod
-    def generar_numero_hoja(paciente_id):
+        anio = anio or timezone.now().year
+        return {
+            'numero_historia_clinica_unica': f"HCU-{anio}-{secuencia:07d}",
+            'numero_archivo': f"PAC-{cls._hash_paciente(paciente_id)}-{secuencia:07d}",
+            'numero_hoja': numero_hoja,
+        }
+
+    @classmethod
+    def asignar_numeros(cls, paciente_id, cantidad: int = 1) -> List[Dict]:
         """
-        Genera número de hoja basado en historiales existentes
+        Asigna los números de `cantidad` historiales nuevos del paciente.
+
+        Returns:
+            Lista (en orden de hoja) de dicts con numero_historia_clinica_unica,
+            numero_archivo y numero_hoja.
         """
-        count = ClinicalRecord.objects.filter(
-            paciente_id=paciente_id,
-            activo=True
-        ).count()
-        
-        return count + 1
-    
-    
-    @staticmethod
-    def obtener_numero_archivo_existente(paciente_id):
+        if cantidad < 1:
+            raise ValueError("cantidad debe ser al menos 1")
+        with connection.cursor() as cursor:
+            cursor.execute(SQL_ASIGNAR, [str(paciente_id), cantidad, cantidad])
+            ultima_hoja, secuencias = cursor.fetchone()
+
+        anio = timezone.now().year
+        primera_hoja = ultima_hoja - cantidad + 1
+        return [
+            cls.formatear_numeros(paciente_id, secuencia, primera_hoja + indice, anio)
+            for indice, secuencia in enumerate(sorted(secuencias))
+        ]
+
+    @classmethod
+    def previsualizar_numeros(cls, paciente_id, ultima_hoja: Optional[int] = None) -> Dict:
         """
-        NOTA: Ya no es necesario reutilizar números de archivo.
-        Cada historial debe tener su propio número único generado
-        con generar_numero_archivo() que incluye timestamp.
+        Números probables del próximo historial, sin reservarlos
+        (para pre-cargar el formulario; los definitivos se asignan al crear).
         """
-        
-        return None
+        if ultima_hoja is None:
+            ultima_hoja = (
+                ContadorHojaPaciente.objects
+                .filter(paciente_id=paciente_id)
+                .values_list('ultima_hoja', flat=True)
+                .first()
+            ) or 0
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT last_value, is_called FROM {SECUENCIA_HISTORIA_CLINICA}")
+            ultimo, usado = cursor.fetchone()
+        return cls.formatear_numeros(paciente_id, ultimo + 1 if usado else ultimo, ultima_hoja + 1)
@@ -0,0 +1,388 @@
+# api/clinical_records/services/pdf/exportacion_lote_service.py
+"""
+Exportación masiva de historiales clínicos a PDF en un ZIP.
+
+USO:
+    from api.clinical_records.services.pdf.exportacion_lote_service import (
+        ExportacionPDFLoteService
+    )
+
+    resumen = ExportacionPDFLoteService.exportar(
+        '/ruta/auditoria_2025.zip',
+        desde=date(2025, 1, 1),
+        hasta=date(2025, 3, 31),
+        odontologo_id=odontologo.id,
+    )
+
+FUNCIONAMIENTO:
+    - Los historiales se cargan por bloques con las mismas relaciones que
+      ClinicalRecordViewSet.get_queryset (HISTORIAL_SELECT_RELATED).
+    - El render (ReportLab, CPU-bound) se reparte en un ProcessPoolExecutor.
+      Los workers se crean con 'spawn' e inicializan Django por su cuenta.
+    - Solo el proceso padre escribe el ZIP. Cada bloque se agrega y se cierra,
+      así el archivo queda consistente entre bloques.
+    - Reanudación: al volver a ejecutar sobre el mismo ZIP se omiten las
+      entradas que ya existen; los historiales con error se reintentan.
+    - El progreso se guarda en '<zip>.progreso.json' (lo consulta el endpoint).
+    - Un flock sobre '<zip>.lock' impide dos ejecuciones sobre el mismo ZIP;
+      el sistema lo libera si el proceso muere.
+    - El endpoint no renderiza: encola la solicitud (progreso en estado
+      'pendiente') y `manage.py exportar_historiales_pdf --pendientes` (cron)
+      la procesa fuera de los workers web.
+"""
+import json
+import logging
+import multiprocessing
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterable, List, Optional
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from api.clinical_records import pdf_worker
+from api.clinical_records.config import HISTORIAL_PREFETCH_DETALLE, HISTORIAL_SELECT_RELATED
+from api.clinical_records.models import ClinicalRecord
+
+logger = logging.getLogger(__name__)
+
+TAMANO_BLOQUE = 25
+SUFIJO_PROGRESO = '.progreso.json'
+
+
+class ExportacionLoteError(Exception):
+    """Error que impide iniciar o continuar una exportación."""
+
+
+class ExportacionPDFLoteService:
+    """
+    Genera un ZIP con el PDF de cada historial que cumple el filtro.
+    """
+
+    @staticmethod
+    def queryset(desde=None, hasta=None, odontologo_id=None, paciente_ids: Optional[Iterable] = None):
+        """Historiales activos filtrados por fecha de atención, odontólogo y pacientes."""
+        qs = (
+            ClinicalRecord.objects
+            .filter(activo=True)
+            .select_related(*HISTORIAL_SELECT_RELATED)
+            .prefetch_related(*HISTORIAL_PREFETCH_DETALLE)
+        )
+        if desde:
+            qs = qs.filter(fecha_atencion__date__gte=desde)
+        if hasta:
+            qs = qs.filter(fecha_atencion__date__lte=hasta)
+        if odontologo_id:
+            qs = qs.filter(odontologo_responsable_id=odontologo_id)
+        if paciente_ids:
+            qs = qs.filter(paciente_id__in=list(paciente_ids))
+        return qs.order_by('fecha_atencion', 'id')
+
+    @staticmethod
+    def nombre_entrada(historial) -> str:
+        """Nombre del PDF dentro del ZIP; estable entre ejecuciones para poder reanudar."""
+        numero = historial.numero_historia_clinica_unica or 'SIN_NUMERO'
+        return f"{historial.paciente.cedula_pasaporte}/HC_{numero}_{historial.id}.pdf"
+
+    @staticmethod
+    def ruta_progreso(ruta_zip) -> Path:
+        ruta_zip = Path(ruta_zip)
+        return ruta_zip.with_name(f"{ruta_zip.name}{SUFIJO_PROGRESO}")
+
+    @classmethod
+    def leer_progreso(cls, ruta_zip) -> Optional[dict]:
+        ruta = cls.ruta_progreso(ruta_zip)
+        if not ruta.exists():
+            return None
+        with open(ruta, encoding='utf-8') as archivo:
+            return json.load(archivo)
+
+    @classmethod
+    def en_curso(cls, ruta_zip) -> bool:
+        """True si otro proceso o hilo está escribiendo este ZIP."""
+        try:
+            with cls._bloqueo(Path(ruta_zip)):
+                return False
+        except ExportacionLoteError:
+            return True
+
+    @staticmethod
+    def max_workers() -> int:
+        """Tope de procesos de render (EXPORTACION_PDF_MAX_WORKERS)."""
+        return max(0, settings.EXPORTACION_PDF_MAX_WORKERS)
+
+    @classmethod
+    def encolar(cls, ruta_zip, filtros: dict) -> dict:
+        """
+        Registra una exportación pendiente para el comando de exportación.
+
+        El bloqueo se toma antes de comprobar el estado, así dos solicitudes
+        simultáneas sobre el mismo ZIP no quedan ambas aceptadas.
+
+        Raises:
+            ExportacionLoteError: si la exportación ya está en curso o en cola.
+        """
+        ruta_zip = Path(ruta_zip)
+        with cls._bloqueo(ruta_zip):
+            previo = cls.leer_progreso(ruta_zip)
+            if previo and previo['estado'] == 'pendiente':
+                raise ExportacionLoteError(f"La exportación {ruta_zip.name} ya está en cola")
+            estado = {
+                'estado': 'pendiente',
+                'archivo': str(ruta_zip),
+                'filtros': cls._filtros_a_json(filtros),
+                'solicitado': timezone.now().isoformat(),
+            }
+            cls._guardar_progreso(ruta_zip, estado)
+        return estado
+
+    @classmethod
+    def procesar_pendientes(cls, directorio, workers: Optional[int] = None,
+                            progreso: Optional[Callable[[dict], None]] = None) -> List[dict]:
+        """
+        Ejecuta las exportaciones encoladas en `directorio` (una tras otra).
+        Las que otro proceso está exportando se omiten.
+
+        Returns:
+            Lista con el estado final de cada exportación procesada.
+        """
+        resultados = []
+        for ruta in sorted(Path(directorio).glob(f"*.zip{SUFIJO_PROGRESO}")):
+            ruta_zip = ruta.with_name(ruta.name[:-len(SUFIJO_PROGRESO)])
+            try:
+                with cls._bloqueo(ruta_zip):
+                    # Se relee con el bloqueo: otro proceso pudo tomarla antes
+                    previo = cls.leer_progreso(ruta_zip)
+                    if not previo or previo['estado'] != 'pendiente':
+                        continue
+                    resultados.append(cls._exportar(
+                        ruta_zip, workers=workers, progreso=progreso,
+                        **cls._filtros_desde_json(previo['filtros']),
+                    ))
+            except ExportacionLoteError as e:
+                logger.info(f"[ExportacionPDF] {ruta_zip.name} omitida: {e}")
+            except Exception as e:
+                # _exportar ya dejó el estado 'fallido' en el progreso
+                logger.error(f"[ExportacionPDF] {ruta_zip.name} fallida: {e}")
+        return resultados
+
+    @classmethod
+    def exportar(cls, ruta_zip, **kwargs) -> dict:
+        """
+        Exporta los historiales del filtro a `ruta_zip`.
+
+        Args:
+            ruta_zip:         Ruta local del ZIP (se reanuda si ya existe).
+            desde, hasta:     Rango de fecha de atención (inclusive).
+            odontologo_id:    Odontólogo responsable.
+            paciente_ids:     Lista de pacientes.
+            secciones:        Secciones del PDF (ver ClinicalRecordPDFBuilder).
+            workers:          Procesos de render, con tope en EXPORTACION_PDF_MAX_WORKERS.
+                              None = el tope; 0 = render en el proceso actual.
+            destino_storage:  Si se indica, el ZIP terminado se sube al
+                              almacenamiento por defecto con ese nombre.
+            reiniciar:        Descarta el ZIP y el progreso previos.
+            progreso:         Callback invocado tras cada bloque con el estado.
+
+        Returns:
+            dict con el estado final (mismo contenido que el archivo de progreso).
+
+        Raises:
+            ExportacionLoteError: si el ZIP ya se está exportando o está dañado.
+        """
+        ruta_zip = Path(ruta_zip)
+        ruta_zip.parent.mkdir(parents=True, exist_ok=True)
+        with cls._bloqueo(ruta_zip):
+            return cls._exportar(ruta_zip, **kwargs)
+
+    @classmethod
+    def _exportar(
+        cls,
+        ruta_zip: Path,
+        *,
+        desde=None,
+        hasta=None,
+        odontologo_id=None,
+        paciente_ids: Optional[Iterable] = None,
+        secciones: Optional[List[str]] = None,
+        workers: Optional[int] = None,
+        destino_storage: Optional[str] = None,
+        reiniciar: bool = False,
+        progreso: Optional[Callable[[dict], None]] = None,
+    ) -> dict:
+        if reiniciar:
+            ruta_zip.unlink(missing_ok=True)
+            cls.ruta_progreso(ruta_zip).unlink(missing_ok=True)
+
+        existentes = cls._entradas_existentes(ruta_zip)
+        queryset = cls.queryset(desde, hasta, odontologo_id, paciente_ids)
+        ids = list(queryset.values_list('id', flat=True))
+        workers = cls.max_workers() if workers is None else min(workers, cls.max_workers())
+
+        estado = {
+            'estado': 'en_proceso',
+            'archivo': str(ruta_zip),
+            'total': len(ids),
+            'procesados': 0,
+            'exportados': 0,
+            'omitidos': 0,
+            'errores': [],
+            'storage': None,
+            'inicio': timezone.now().isoformat(),
+            'fin': None,
+        }
+        cls._guardar_progreso(ruta_zip, estado)
+        logger.info(
+            f"[ExportacionPDF] {len(ids)} historial(es) → {ruta_zip} "
+            f"({len(existentes)} ya exportado(s), {workers} worker(s))"
+        )
+
+        ejecutor = None
+        if workers > 0 and ids:
+            ejecutor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=pdf_worker.inicializar,
+                initargs=(settings.DATABASES['default']['NAME'],),
+            )
+
+        try:
+            for inicio in range(0, len(ids), TAMANO_BLOQUE):
+                bloque = ids[inicio:inicio + TAMANO_BLOQUE]
+                pendientes = []
+                for historial in queryset.filter(id__in=bloque):
+                    if cls.nombre_entrada(historial) in existentes:
+                        estado['omitidos'] += 1
+                    else:
+                        pendientes.append(historial)
+
+                generados = cls._renderizar_bloque(ejecutor, pendientes, secciones, estado)
+                if generados:
+                    # PDF ya comprime su contenido: ZIP_STORED evita recomprimir en el padre
+                    with zipfile.ZipFile(ruta_zip, 'a', compression=zipfile.ZIP_STORED) as zf:
+                        for nombre, pdf_bytes in generados:
+                            zf.writestr(nombre, pdf_bytes)
+                    existentes.update(nombre for nombre, _ in generados)
+                    estado['exportados'] += len(generados)
+
+                estado['procesados'] += len(bloque)
+                cls._guardar_progreso(ruta_zip, estado)
+                if progreso:
+                    progreso(estado)
+        except Exception as e:
+            estado['estado'] = 'fallido'
+            estado['fin'] = timezone.now().isoformat()
+            estado['errores'].append({'historial_id': None, 'error': str(e)})
+            cls._guardar_progreso(ruta_zip, estado)
+            logger.error(f"[ExportacionPDF] Exportación interrumpida: {e}", exc_info=True)
+            raise
+        finally:
+            if ejecutor is not None:
+                ejecutor.shutdown(wait=True, cancel_futures=True)
+
+        if destino_storage and not estado['errores']:
+            with open(ruta_zip, 'rb') as archivo:
+                estado['storage'] = default_storage.save(destino_storage, File(archivo))
+
+        estado['estado'] = 'completado_con_errores' if estado['errores'] else 'completado'
+        estado['fin'] = timezone.now().isoformat()
+        cls._guardar_progreso(ruta_zip, estado)
+        logger.info(
+            f"[ExportacionPDF] {ruta_zip}: {estado['exportados']} exportado(s), "
+            f"{estado['omitidos']} omitido(s), {len(estado['errores'])} error(es)"
+        )
+        return estado
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Helpers privados
+    # ─────────────────────────────────────────────────────────────────────────
+    @classmethod
+    def _renderizar_bloque(cls, ejecutor, historiales, secciones, estado) -> list:
+        """Renderiza el bloque y retorna [(nombre, bytes)]; los errores van al estado."""
+        generados = []
+
+        def registrar_error(historial, error):
+            logger.error(f"[ExportacionPDF] Error en historial {historial.id}: {error}")
+            estado['errores'].append({'historial_id': str(historial.id), 'error': str(error)})
+
+        if ejecutor is None:
+            for historial in historiales:
+                try:
+                    generados.append((cls.nombre_entrada(historial), pdf_worker.renderizar(historial, secciones)))
+                except Exception as e:
+                    registrar_error(historial, e)
+            return generados
+
+        futuros = {
+            ejecutor.submit(pdf_worker.renderizar, historial, secciones): historial
+            for historial in historiales
+        }
+        for futuro in as_completed(futuros):
+            historial = futuros[futuro]
+            try:
+                generados.append((cls.nombre_entrada(historial), futuro.result()))
+            except Exception as e:
+                registrar_error(historial, e)
+        return generados
+
+    @staticmethod
+    def _filtros_a_json(filtros: dict) -> dict:
+        return {
+            'desde': filtros['desde'].isoformat() if filtros.get('desde') else None,
+            'hasta': filtros['hasta'].isoformat() if filtros.get('hasta') else None,
+            'odontologo_id': str(filtros['odontologo_id']) if filtros.get('odontologo_id') else None,
+            'paciente_ids': [str(p) for p in filtros['paciente_ids']] if filtros.get('paciente_ids') else None,
+            'secciones': filtros.get('secciones'),
+        }
+
+    @staticmethod
+    def _filtros_desde_json(filtros: dict) -> dict:
+        return {
+            **filtros,
+            'desde': parse_date(filtros['desde']) if filtros.get('desde') else None,
+            'hasta': parse_date(filtros['hasta']) if filtros.get('hasta') else None,
+        }
+
+    @staticmethod
+    @contextmanager
+    def _bloqueo(ruta_zip: Path):
+        # fcntl solo existe en POSIX: se importa al exportar, no al cargar las vistas
+        import fcntl
+
+        ruta_zip.parent.mkdir(parents=True, exist_ok=True)
+        with open(ruta_zip.with_name(f"{ruta_zip.name}.lock"), 'w') as candado:
+            try:
+                fcntl.flock(candado, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError as e:
+                raise ExportacionLoteError(f"La exportación {ruta_zip.name} ya está en curso") from e
+            try:
+                yield
+            finally:
+                fcntl.flock(candado, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _entradas_existentes(ruta_zip: Path) -> set:
+        if not ruta_zip.exists():
+            return set()
+        try:
+            with zipfile.ZipFile(ruta_zip) as zf:
+                return set(zf.namelist())
+        except zipfile.BadZipFile as e:
+            raise ExportacionLoteError(
+                f"El ZIP {ruta_zip} está dañado (interrupción durante la escritura de un bloque); "
+                f"reinicie la exportación"
+            ) from e
+
+    @classmethod
+    def _guardar_progreso(cls, ruta_zip: Path, estado: dict) -> None:
+        ruta = cls.ruta_progreso(ruta_zip)
+        temporal = ruta.with_name(f"{ruta.name}.tmp")
+        with open(temporal, 'w', encoding='utf-8') as archivo:
+            json.dump(estado, archivo, ensure_ascii=False, indent=2)
+        os.replace(temporal, ruta)
@@ -0,0 +1,269 @@
+# api/clinical_records/services/pdf/odontograma_drawing_template.py
+"""
+Plantilla precompilada del odontograma como Drawing de ReportLab.
+
+La geometría estática (fondo, títulos, coronas, divisiones de superficies,
+badges FDI y casillas vacías de movilidad/recesión) se construye una sola
+vez por proceso. Por paciente solo se agregan las capas variables:
+relleno de diagnóstico, símbolos, movilidad y recesión.
+
+Evita construir el SVG y re-parsearlo con svg2rlg al generar el PDF.
+El SVG (OdontogramaSVGGenerator) se mantiene para la vista previa web.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+from functools import lru_cache
+
+from reportlab.graphics.shapes import Drawing, Group, Line, Path, Rect, String
+from reportlab.lib import colors
+
+from api.clinical_records.services.pdf.odontograma_svg_generator import (
+    BADGE_H,
+    C_BADGE_BG,
+    C_BADGE_FG,
+    C_BORDE,
+    C_CROWN_FILL,
+    C_CROWN_STROKE,
+    C_EMPTY,
+    C_EMPTY_B,
+    C_GRIS,
+    C_MOV_BG,
+    C_MOV_BOR,
+    C_MOV_FG,
+    C_NEGRO,
+    C_REC_BG,
+    C_REC_BOR,
+    C_REC_FG,
+    META_H,
+    PAD_Y,
+    QUAD_PERM,
+    TH,
+    TW,
+    _PATH_OUTLINE,
+    _SURFACE_PATHS,
+    OdontogramaSVGGenerator,
+    capa_diagnostico,
+    dimensiones,
+    posiciones_arco,
+    posiciones_diente,
+)
+
+logger = logging.getLogger(__name__)
+
+FUENTE      = "Helvetica"
+FUENTE_BOLD = "Helvetica-Bold"
+N_DIENTES   = 8
+
+# Operadores de reportlab.graphics.shapes.Path
+_MOVETO, _LINETO, _CURVETO, _CLOSEPATH = 0, 1, 2, 3
+_OPERADORES = {"M": (_MOVETO, 1), "L": (_LINETO, 1), "C": (_CURVETO, 3), "Z": (_CLOSEPATH, 0)}
+
+
+def _parsear_path(norm_path: str) -> tuple[list[int], list[tuple[float, float]]]:
+    """Convierte un path normalizado (0..1) a operadores y puntos."""
+    tokens = norm_path.split()
+    operadores: list[int] = []
+    puntos: list[tuple[float, float]] = []
+    i = 0
+    while i < len(tokens):
+        operador, n_puntos = _OPERADORES[tokens[i]]
+        operadores.append(operador)
+        for _ in range(n_puntos):
+            i += 1
+            nx, ny = tokens[i].split(",")
+            puntos.append((float(nx), float(ny)))
+        i += 1
+    return operadores, puntos
+
+
+_OUTLINE = _parsear_path(_PATH_OUTLINE)
+_SUPERFICIES = {nombre: _parsear_path(p) for nombre, p in _SURFACE_PATHS.items()}
+
+
+@lru_cache(maxsize=64)
+def _color(valor: str):
+    try:
+        return colors.HexColor(valor)
+    except (ValueError, TypeError):
+        logger.warning("Color no convertible a reportlab: %s", valor)
+        return colors.HexColor(C_NEGRO)
+
+
+class _Lienzo:
+    """Convierte coordenadas SVG (origen arriba) a ReportLab (origen abajo)."""
+
+    def __init__(self, alto: float):
+        self.alto = alto
+
+    def geometria(self, forma, x: float, y: float) -> tuple[list[int], list[float]]:
+        operadores, puntos = forma
+        plano: list[float] = []
+        for nx, ny in puntos:
+            plano.append(x + nx * TW)
+            plano.append(self.alto - (y + ny * TH))
+        return operadores, plano
+
+    def rect(self, x: float, y: float, w: float, h: float, **props) -> Rect:
+        return Rect(x, self.alto - y - h, w, h, **props)
+
+    def texto(
+        self, x: float, y: float, label: str, size: float = 10, bold: bool = False,
+        color: str = C_NEGRO,
+    ) -> String:
+        # Línea base en y, igual que svg2rlg (ignora dominant-baseline)
+        return String(
+            x, self.alto - y, label,
+            fontName=FUENTE_BOLD if bold else FUENTE,
+            fontSize=size, fillColor=_color(color), textAnchor="middle",
+        )
+
+
+def _path(geometria: tuple[list[int], list[float]], **props) -> Path:
+    operadores, puntos = geometria
+    return Path(points=list(puntos), operators=list(operadores), **props)
+
+
+class _Plantilla:
+    """Capas estáticas y geometría por diente, construidas una sola vez."""
+
+    def __init__(self):
+        self.ancho, self.alto = dimensiones(N_DIENTES)
+        lienzo = self.lienzo = _Lienzo(self.alto)
+        cx = self.ancho / 2
+        y_start = float(PAD_Y) + 22
+        y0 = y_start + 16
+
+        self.base = Group()
+        self.superior = Group()
+        self.base.add(Rect(0, 0, self.ancho, self.alto, fillColor=colors.white, strokeColor=None))
+        self.base.add(lienzo.texto(
+            cx, PAD_Y + 12, "ODONTOGRAMA – Formulario 033 MSP Ecuador", size=12, bold=True,
+        ))
+        self.base.add(lienzo.texto(
+            cx, y_start + 11, "DENTICIÓN PERMANENTE", size=9, bold=True, color=C_GRIS,
+        ))
+        fila_h = META_H * 2 + BADGE_H + TH
+        self.base.add(Line(
+            cx, self.alto - (y0 - 2), cx, self.alto - (y0 + fila_h * 2 + 2),
+            strokeColor=_color(C_BORDE), strokeWidth=1.5, strokeDashArray=[4, 3],
+        ))
+
+        # Por diente: (cuadrante, i, fdi, x, y_rec, y_mov, y_corona, superficies escaladas)
+        self.dientes = []
+        for q, i, fdi, x, y_row in posiciones_arco(QUAD_PERM, cx, y0, N_DIENTES):
+            y_rec, y_mov, y_badge, y_crown = posiciones_diente(y_row, q["upper"])
+            contorno = lienzo.geometria(_OUTLINE, x, y_crown)
+            superficies = {
+                nombre: lienzo.geometria(forma, x, y_crown)
+                for nombre, forma in _SUPERFICIES.items()
+            }
+            self.dientes.append((q, i, fdi, x, y_rec, y_mov, y_crown, superficies))
+
+            # Corona blanca y divisiones de superficies (debajo del diagnóstico)
+            self.base.add(_path(contorno, fillColor=_color(C_CROWN_FILL), strokeColor=None))
+            for nombre in ("V", "L", "D", "M"):
+                self.base.add(_path(
+                    superficies[nombre], fillColor=None, strokeColor=_color(C_BORDE),
+                    strokeWidth=0.35, strokeDashArray=[1.2, 1.2],
+                ))
+            self.base.add(_path(
+                superficies["O"], fillColor=None, strokeColor=_color(C_BORDE), strokeWidth=0.35,
+            ))
+
+            # Contorno, badge FDI y casillas vacías (encima del diagnóstico)
+            self.superior.add(_path(
+                contorno, fillColor=None, strokeColor=_color(C_CROWN_STROKE), strokeWidth=0.8,
+            ))
+            self.superior.add(lienzo.rect(
+                x + 1, y_badge + 1, TW - 2, BADGE_H - 2, rx=2, ry=2,
+                fillColor=_color(C_BADGE_BG), strokeColor=_color(C_BORDE), strokeWidth=0.5,
+            ))
+            self.superior.add(lienzo.texto(
+                x + TW / 2, y_badge + BADGE_H / 2 + 1, fdi,
+                size=8, bold=True, color=C_BADGE_FG,
+            ))
+            for y_meta in (y_mov, y_rec):
+                self.superior.add(lienzo.rect(
+                    x + 3, y_meta + 1, TW - 6, META_H - 2, rx=2, ry=2,
+                    fillColor=_color(C_EMPTY), strokeColor=_color(C_EMPTY_B),
+                    strokeWidth=0.4, strokeDashArray=[2, 2],
+                ))
+
+
+class OdontogramaDrawingTemplate:
+    """
+    Genera el Drawing del odontograma permanente a partir de datos Form033
+    reutilizando la plantilla estática del proceso.
+    """
+
+    _plantilla: _Plantilla | None = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def plantilla(cls) -> _Plantilla:
+        if cls._plantilla is None:
+            with cls._lock:
+                if cls._plantilla is None:
+                    cls._plantilla = _Plantilla()
+        return cls._plantilla
+
+    @classmethod
+    def construir_drawing(cls, datos_form033: dict) -> Drawing:
+        plantilla = cls.plantilla()
+        lienzo = plantilla.lienzo
+
+        odo_p = datos_form033.get("odontograma_permanente") or {}
+        dp = odo_p.get("dientes",   [[], [], [], []])
+        mp = odo_p.get("movilidad", [[], [], [], []])
+        rp = odo_p.get("recesion",  [[], [], [], []])
+
+        diagnosticos = Group()
+        metadatos = Group()
+        for q, i, fdi, x, y_rec, y_mov, y_crown, superficies in plantilla.dientes:
+            if i == 0:
+                d_row, m_row, r_row = OdontogramaSVGGenerator.filas_cuadrante(q, dp, mp, rp)
+
+            capa = capa_diagnostico(d_row[i] if i < len(d_row) else None)
+            if capa and capa["mode"] == "surfaces":
+                color = _color(capa["color"])
+                for nombre in capa["surfaces"]:
+                    diagnosticos.add(_path(
+                        superficies[nombre], fillColor=color, fillOpacity=0.72,
+                        strokeColor=color, strokeWidth=0.6,
+                    ))
+            elif capa:
+                diagnosticos.add(lienzo.texto(
+                    x + TW / 2, y_crown + TH * 0.54, capa["label"], size=capa["size"],
+                    bold=capa["bold"], color=capa["color"],
+                ))
+
+            movilidad = m_row[i] if i < len(m_row) else None
+            if movilidad:
+                cls._casilla(metadatos, lienzo, x, y_mov, f"M{movilidad.get('grado', '')}",
+                             C_MOV_BG, C_MOV_BOR, C_MOV_FG)
+            recesion = r_row[i] if i < len(r_row) else None
+            if recesion:
+                cls._casilla(metadatos, lienzo, x, y_rec, f"R{recesion.get('nivel', '')}",
+                             C_REC_BG, C_REC_BOR, C_REC_FG)
+
+        drawing = Drawing(plantilla.ancho, plantilla.alto)
+        drawing.add(plantilla.base)
+        drawing.add(diagnosticos)
+        drawing.add(plantilla.superior)
+        drawing.add(metadatos)
+        return drawing
+
+    @staticmethod
+    def _casilla(grupo: Group, lienzo: _Lienzo, x: float, y: float, label: str,
+                 fondo: str, borde: str, texto: str) -> None:
+        """Casilla de movilidad/recesión rellena; tapa la casilla vacía de la plantilla."""
+        grupo.add(lienzo.rect(
+            x + 3, y + 1, TW - 6, META_H - 2, rx=2, ry=2,
+            fillColor=_color(fondo), strokeColor=_color(borde), strokeWidth=0.5,
+        ))
+        grupo.add(lienzo.texto(
+            x + TW / 2, y + META_H / 2 + 1, label, size=7, bold=True,
+            color=texto,
+        ))
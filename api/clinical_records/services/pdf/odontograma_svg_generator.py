@@ -276,6 +276,103 @@ def _surface(name: str, x: float, y: float) -> str:
     return _scale_path(p, x, y, TW, TH) if p else ""
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Layout y capas compartidas (SVG web y plantilla Drawing del PDF)
+# ─────────────────────────────────────────────────────────────────────────────
+
+def dimensiones(n: int = 8) -> tuple[float, float]:
+    """Ancho y alto total del odontograma."""
+    half_w  = n * (TW + GAP_H)
+    total_w = PAD_X * 2 + half_w * 2 + GAP_H * 2
+    fila_h  = TH + BADGE_H + (META_H * 2) + 15
+    arc_h   = (fila_h * 2) + ROW_GAP
+    total_h = PAD_Y + 30 + arc_h + 40
+    return total_w, total_h
+
+
+def posiciones_arco(quadrants: list[dict], cx: float, y0: float, n: int):
+    """Genera (cuadrante, i, fdi, x_celda, y_fila) para cada diente del arco."""
+    fila_h = META_H * 2 + BADGE_H + TH
+    for q in quadrants:
+        y_row = y0 if q["upper"] else y0 + fila_h + ROW_GAP
+        for i in range(n):
+            fdi = q["fdi_start"] + q["fdi_step"] * i
+            x_cell = (
+                cx - GAP_H - (i + 1) * (TW + GAP_H)
+                if q["side"] == "left"
+                else cx + GAP_H + i * (TW + GAP_H)
+            )
+            yield q, i, str(fdi), x_cell, y_row
+
+
+def posiciones_diente(y_row: float, is_upper: bool) -> tuple[float, float, float, float]:
+    """(y_recesion, y_movilidad, y_badge, y_corona) de un diente."""
+    S = 4    # gap entre rectángulos
+    SEP = 10 # gap entre corona y rectángulos
+    if is_upper:
+        # Orden Superior (de arriba hacia abajo): Recesión -> Movilidad -> Badge -> [SEP] -> Corona
+        y_rec   = y_row
+        y_mov   = y_row + META_H + S
+        y_badge = y_row + (META_H + S) + (META_H + S)
+        y_crown = y_badge + BADGE_H + SEP
+    else:
+        # Orden Inferior (de arriba hacia abajo): Corona -> [SEP] -> Badge -> Movilidad -> Recesión
+        y_crown = y_row
+        y_badge = y_row + TH + SEP
+        y_mov   = y_badge + BADGE_H + S
+        y_rec   = y_mov + META_H + S
+    return y_rec, y_mov, y_badge, y_crown
+
+
+def capa_diagnostico(diente: dict | None) -> dict | None:
+    """
+    Decide cómo pintar el diagnóstico de un diente:
+    {"mode": "surfaces", "surfaces": [...], "color": ...},
+    {"mode": "text", "label", "color", "bold", "size"} o None.
+    """
+    if not diente:
+        return None
+
+    simbolo    = (diente.get("simbolo") or "").strip()
+    diente_col = _resolve_color(diente.get("color", ""))
+    # Normalizar superficies: del backend llegan en español
+    # ("vestibular", "oclusal"…); los convertimos a letras SVG (V/L/O/D/M)
+    raw_sups = diente.get("superficies_afectadas") or []
+    sups = [
+        norm
+        for raw in raw_sups
+        if (norm := _normalize_surface(raw)) is not None
+    ]
+
+    meta = SIMBOLO_RENDER.get(simbolo, {})
+    # Activar modo superficies si:
+    #   a) el símbolo está registrado como "surfaces" (ej: "O"), o
+    #   b) hay superficies afectadas válidas aunque el símbolo sea otro
+    #      (caries/obturación sin símbolo explícito, o símbolo "o" minúscula)
+    mode = meta.get("mode", "text")
+    if mode != "surfaces" and sups:
+        mode = "surfaces"
+
+    if mode == "surfaces" and sups:
+        # Periféricas primero (V, L, D, M), oclusal encima (O)
+        orden = [s for s in sups if s in ("V", "L", "D", "M")]
+        if "O" in sups:
+            orden.append("O")
+        return {"mode": "surfaces", "surfaces": orden, "color": diente_col}
+
+    # Modo texto: mostrar símbolo centrado en la corona
+    label = meta.get("label", simbolo) if meta else simbolo
+    if not label:   # no renderizar si no hay label (diente sin diagnóstico)
+        return None
+    return {
+        "mode":  "text",
+        "label": label,
+        "color": meta.get("fixed_color", diente_col) if meta else diente_col,
+        "bold":  meta.get("bold", False),
+        "size":  meta.get("size", 12),
+    }
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Generador
 # ─────────────────────────────────────────────────────────────────────────────
@@ -291,14 +388,9 @@ class OdontogramaSVGGenerator:
         rp = odo_p.get("recesion",  [[], [], [], []])
 
         n       = 8
-        half_w  = n * (TW + GAP_H)
-        total_w = PAD_X * 2 + half_w * 2 + GAP_H * 2
+        total_w, total_h = dimensiones(n)
         fila_h  = TH + BADGE_H + (META_H * 2) + 15
         arc_h   = (fila_h * 2) + ROW_GAP
-        total_h = PAD_Y + 30 + arc_h + 40
-        S = 4
-        SEP = 10
-        item_h = TH + SEP + BADGE_H + (META_H + S) * 2
         cx = total_w / 2
         y  = float(PAD_Y)
         out: list[str] = []
@@ -376,34 +468,29 @@ class OdontogramaSVGGenerator:
             f'stroke="{C_BORDE}" stroke-width="1.5" stroke-dasharray="4,3"/>'
         )
 
-        for q in quadrants:
-            row      = q["row"]
-            side     = q["side"]
-            is_upper = q["upper"]
-
-            d_row = list(dientes[row])   if row < len(dientes)   else []
-            m_row = list(movilidad[row]) if row < len(movilidad) else []
-            r_row = list(recesion[row])  if row < len(recesion)  else []
-
-            if q["reverse"]:
-                d_row.reverse(); m_row.reverse(); r_row.reverse()
-
-            y_row = y0 if is_upper else y0 + fila_h + ROW_GAP
-
-            for i in range(n):
-                fdi   = q["fdi_start"] + q["fdi_step"] * i
-                d     = d_row[i] if i < len(d_row) else None
-                mov   = m_row[i] if i < len(m_row) else None
-                rec   = r_row[i] if i < len(r_row) else None
-                x_cell = (
-                    cx - GAP_H - (i + 1) * (TW + GAP_H)
-                    if side == "left"
-                    else cx + GAP_H + i * (TW + GAP_H)
-                )
-                out.extend(cls._diente(d, mov, rec, x_cell, y_row, str(fdi), is_upper))
+        filas = cls.filas_cuadrante
+        for q, i, fdi, x_cell, y_row in posiciones_arco(quadrants, cx, y0, n):
+            if i == 0:
+                d_row, m_row, r_row = filas(q, dientes, movilidad, recesion)
+            d   = d_row[i] if i < len(d_row) else None
+            mov = m_row[i] if i < len(m_row) else None
+            rec = r_row[i] if i < len(r_row) else None
+            out.extend(cls._diente(d, mov, rec, x_cell, y_row, fdi, q["upper"]))
 
         return out
 
+    @staticmethod
+    def filas_cuadrante(q: dict, dientes: list, movilidad: list, recesion: list):
+        """Filas de datos Form033 del cuadrante, en el orden de dibujo."""
+        row = q["row"]
+        d_row = list(dientes[row])   if row < len(dientes)   else []
+        m_row = list(movilidad[row]) if row < len(movilidad) else []
+        r_row = list(recesion[row])  if row < len(recesion)  else []
+
+        if q["reverse"]:
+            d_row.reverse(); m_row.reverse(); r_row.reverse()
+        return d_row, m_row, r_row
+
     # ── Diente individual ──────────────────────────────────────────────────
 
     @classmethod
@@ -419,23 +506,7 @@ class OdontogramaSVGGenerator:
     ) -> list[str]:
         out: list[str] = []
         cx = x + TW / 2
-        
-        # Separación entre elementos individuales
-        S = 4  # gap entre rectángulos
-        SEP = 10 # gap entre corona y rectángulos
-
-        if is_upper:
-            # Orden Superior (de arriba hacia abajo): Recesión -> Movilidad -> Badge -> [SEP] -> Corona
-            y_rec   = y_row
-            y_mov   = y_row + META_H + S
-            y_badge = y_row + (META_H + S) + (META_H + S)
-            y_crown = y_badge + BADGE_H + SEP 
-        else:
-            # Orden Inferior (de arriba hacia abajo): Corona -> [SEP] -> Badge -> Movilidad -> Recesión
-            y_crown = y_row
-            y_badge = y_row + TH + SEP
-            y_mov   = y_badge + BADGE_H + S
-            y_rec   = y_mov + META_H + S
+        y_rec, y_mov, y_badge, y_crown = posiciones_diente(y_row, is_upper)
 
         crown_outline = _outline(x, y_crown)
 
@@ -464,62 +535,26 @@ class OdontogramaSVGGenerator:
             )
 
         # 3. Relleno de diagnóstico
-        if diente:
-            simbolo    = (diente.get("simbolo") or "").strip()
-            diente_col = _resolve_color(diente.get("color", ""))
-            # Normalizar superficies: del backend llegan en español
-            # ("vestibular", "oclusal"…); los convertimos a letras SVG (V/L/O/D/M)
-            raw_sups = diente.get("superficies_afectadas") or []
-            sups = [
-                norm
-                for raw in raw_sups
-                if (norm := _normalize_surface(raw)) is not None
-            ]
-
-            meta = SIMBOLO_RENDER.get(simbolo, {})
-            # Activar modo superficies si:
-            #   a) el símbolo está registrado como "surfaces" (ej: "O"), o
-            #   b) hay superficies afectadas válidas aunque el símbolo sea otro
-            #      (caries/obturación sin símbolo explícito, o símbolo "o" minúscula)
-            mode = meta.get("mode", "text")
-            if mode != "surfaces" and sups:
-                mode = "surfaces"
-
-            if mode == "surfaces" and sups:
-                # Resolver el color UNA VEZ para todas las superficies
-                diente_color = _resolve_color(diente.get("color", ""))
-                logger.debug(
-                    f"Renderizando superficies {sups} con color: {diente_color}"
-                )
-                # Periféricas primero (V, L, D, M), oclusal encima (O)
-                for sup in [s for s in sups if s in ("V", "L", "D", "M")]:
-                    sp = _surface(sup, x, y_crown)
-                    if sp:
-                        out.append(
-                            f'<path d="{sp}" '
-                            f'fill="{diente_color}" fill-opacity="0.72" '
-                            f'stroke="{diente_color}" stroke-width="0.6"/>'
-                        )
-                if "O" in sups:
-                    sp = _surface("O", x, y_crown)
-                    if sp:
-                        out.append(
-                            f'<path d="{sp}" '
-                            f'fill="{diente_color}" fill-opacity="0.72" '
-                            f'stroke="{diente_color}" stroke-width="0.6"/>'
-                        )
-            else:
-                # Modo texto: mostrar símbolo centrado en la corona
-                label    = meta.get("label", simbolo) if meta else simbolo
-                ov_color = meta.get("fixed_color", diente_col) if meta else diente_col
-                bold     = meta.get("bold", False)
-                size     = meta.get("size", 12)
-                if label:   # no renderizar si no hay label (diente sin diagnóstico)
-                    out.append(cls._txt(
-                        cx, y_crown + TH * 0.54, label,
-                        size=size, bold=bold, anchor="middle",
-                        color=ov_color, dominant="middle",
-                    ))
+        capa = capa_diagnostico(diente)
+        if capa and capa["mode"] == "surfaces":
+            diente_color = capa["color"]
+            logger.debug(
+                f"Renderizando superficies {capa['surfaces']} con color: {diente_color}"
+            )
+            for sup in capa["surfaces"]:
+                sp = _surface(sup, x, y_crown)
+                if sp:
+                    out.append(
+                        f'<path d="{sp}" '
+                        f'fill="{diente_color}" fill-opacity="0.72" '
+                        f'stroke="{diente_color}" stroke-width="0.6"/>'
+                    )
+        elif capa:
+            out.append(cls._txt(
+                cx, y_crown + TH * 0.54, capa["label"],
+                size=capa["size"], bold=capa["bold"], anchor="middle",
+                color=capa["color"], dominant="middle",
+            ))
 
         # 4. Contorno exterior encima de todo (borde limpio)
         out.append(
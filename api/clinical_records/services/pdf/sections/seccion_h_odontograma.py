@@ -7,11 +7,13 @@ sin almacenar ningún archivo (ni en disco ni en S3).
 
 Flujo por solicitud de PDF (en orden de prioridad):
     1. Lee datos_form033 del Form033Snapshot asociado al historial.
-    2. OdontogramaSVGGenerator construye el SVG vectorial en RAM.
-    3a. [PREFERIDO]  svglib.svg2rlg + renderPDF  →  Drawing vectorial al PDF
+    2. [PREFERIDO]   OdontogramaDrawingTemplate: plantilla Drawing precompilada
+                     por proceso + capas del paciente. Sin SVG ni parseo.
+    3. Si falla, OdontogramaSVGGenerator construye el SVG vectorial en RAM:
+    3a. [FALLBACK 1] svglib.svg2rlg + renderPDF  →  Drawing vectorial al PDF
                      100 % Python, SIN libcairo, funciona en Windows.
-    3b. [FALLBACK 1] cairosvg / svglib+renderPM  →  PNG en RAM (requiere cairo).
-    3c. [FALLBACK 2] Tabla textual con hallazgos resumidos.
+    3b. [FALLBACK 2] cairosvg / svglib+renderPM  →  PNG en RAM (requiere cairo).
+    3c. [FALLBACK 3] Tabla textual con hallazgos resumidos.
 
 Por qué 3a funciona sin cairo:
     svglib convierte el SVG a un objeto Drawing de reportlab.
@@ -33,6 +35,9 @@ from api.clinical_records.services.pdf.sections.base_section import (
 from api.clinical_records.services.pdf.odontograma_svg_generator import (
     OdontogramaSVGGenerator,
 )
+from api.clinical_records.services.pdf.odontograma_drawing_template import (
+    OdontogramaDrawingTemplate,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -124,11 +129,17 @@ class SeccionHOdontograma(BaseSeccion):
 
     def _renderizar(self, datos: dict) -> List[Flowable]:
         """
-        Intenta tres estrategias en orden:
+        Intenta las estrategias en orden:
+          0. Plantilla Drawing precompilada (sin SVG)
           1. SVG → Drawing (svglib) insertado como vector en el PDF  [sin cairo]
           2. SVG → PNG (cairosvg / svglib+renderPM) insertado como imagen
           3. Tabla textual de hallazgos como último recurso
         """
+        # ── Estrategia 0: plantilla precompilada ──────────────────────────
+        resultado = self._intentar_plantilla(datos)
+        if resultado is not None:
+            return resultado
+
         svg_str = OdontogramaSVGGenerator.generar_svg(datos)
 
         # ── Estrategia 1: vector directo (SIN cairo) ──────────────────────
@@ -145,6 +156,35 @@ class SeccionHOdontograma(BaseSeccion):
         logger.warning("Todas las estrategias de renderizado fallaron. Usando tabla textual.")
         return self._tabla_fallback(datos)
 
+    # ── Estrategia 0: plantilla Drawing precompilada ──────────────────────
+
+    def _intentar_plantilla(self, datos: dict) -> List[Flowable] | None:
+        try:
+            drawing = OdontogramaDrawingTemplate.construir_drawing(datos)
+            return [self._envolver_drawing(drawing)]
+        except Exception as exc:
+            logger.warning("Plantilla de odontograma falló: %s", exc, exc_info=True)
+            return None
+
+    @staticmethod
+    def _envolver_drawing(drawing) -> Table:
+        """Escala el Drawing manteniendo aspect ratio y lo enmarca en una tabla."""
+        ratio    = min(ANCHO_MAX / drawing.width, ALTO_MAX / drawing.height, 1.0)
+        target_w = drawing.width  * ratio
+        target_h = drawing.height * ratio
+
+        flowable = _SVGDrawingFlowable(drawing, target_w, target_h)
+
+        tabla = Table([[flowable]], colWidths=[ANCHO_MAX])
+        tabla.setStyle(TableStyle([
+            ("ALIGN",         (0, 0), (-1, -1), "CENTER"),
+            ("VALIGN",        (0, 0), (-1, -1), "MIDDLE"),
+            ("BOX",           (0, 0), (-1, -1), 0.5, COLOR_BORDE),
+            ("TOPPADDING",    (0, 0), (-1, -1), 6),  # Aumentado de 4 a 6
+            ("BOTTOMPADDING", (0, 0), (-1, -1), 6),  # Aumentado de 4 a 6
+        ]))
+        return tabla
+
     # ── Estrategia 1: svglib → Drawing → PDF vectorial ────────────────────
 
     def _intentar_svg_vectorial(self, svg_str: str) -> List[Flowable] | None:
@@ -168,21 +208,7 @@ class SeccionHOdontograma(BaseSeccion):
                 logger.warning("svg2rlg devolvió None para el odontograma.")
                 return None
 
-            # Calcular dimensiones destino manteniendo aspect ratio
-            ratio    = min(ANCHO_MAX / drawing.width, ALTO_MAX / drawing.height, 1.0)
-            target_w = drawing.width  * ratio
-            target_h = drawing.height * ratio
-
-            flowable = _SVGDrawingFlowable(drawing, target_w, target_h)
-
-            tabla = Table([[flowable]], colWidths=[ANCHO_MAX])
-            tabla.setStyle(TableStyle([
-                ("ALIGN",         (0, 0), (-1, -1), "CENTER"),
-                ("VALIGN",        (0, 0), (-1, -1), "MIDDLE"),
-                ("BOX",           (0, 0), (-1, -1), 0.5, COLOR_BORDE),
-                ("TOPPADDING",    (0, 0), (-1, -1), 6),  # Aumentado de 4 a 6
-                ("BOTTOMPADDING", (0, 0), (-1, -1), 6),  # Aumentado de 4 a 6
-            ]))
+            tabla = self._envolver_drawing(drawing)
 
             logger.debug("Odontograma insertado como SVG vectorial (sin cairo).")
             return [tabla]
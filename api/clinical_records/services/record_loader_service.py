@@ -4,9 +4,6 @@
 Servicio para carga de datos iniciales de historiales
 """
 import logging
-from api.patients.models.paciente import Paciente
-from api.patients.models.constantes_vitales import ConstantesVitales
-from api.clinical_records.models import ClinicalRecord
 from api.clinical_records.repositories import ClinicalRecordRepository
 from api.patients.serializers import (
     AntecedentesPersonalesSerializer,
@@ -16,13 +13,10 @@ from api.patients.serializers import (
 )
 from api.clinical_records.config import INSTITUCION_CONFIG
 from api.clinical_records.serializers.indices_caries_serializers import IndicesCariesSerializer
-from api.clinical_records.services.indices_caries_service import ClinicalRecordIndicesCariesService
 from api.clinical_records.services.diagnostico_cie_service import DiagnosticosCIEService
-from api.odontogram.models import PlanTratamiento
 from api.odontogram.serializers.plan_tratamiento_serializers import PlanTratamientoDetailSerializer
 from .number_generator_service import NumberGeneratorService
 
-from .indicadores_service import ClinicalRecordIndicadoresService
 from api.clinical_records.serializers.oral_health_indicators import OralHealthIndicatorsSerializer
 
 
@@ -49,36 +43,19 @@ class RecordLoaderService:
         Carga los últimos datos guardados de un paciente
         para prellenar el formulario de creación de historial
         """
-        try:
-            paciente = Paciente.objects.get(id=paciente_id)
-        except Paciente.DoesNotExist:
+        # Últimos registros de cada sección (mismo contexto que crear_historial)
+        ultimos_datos = ClinicalRecordRepository.obtener_contexto_clinico_paciente(paciente_id)
+        if ultimos_datos is None:
             raise ValueError(f"Paciente {paciente_id} no encontrado")
         
-        # Obtener últimos datos del paciente
-        ultimos_datos = ClinicalRecordRepository.obtener_ultimos_datos_paciente(
-            paciente_id
-        )
-        
-        # Obtener última constante vital
-        ultima_constante = ConstantesVitales.objects.filter(
-            paciente_id=paciente_id,
-            activo=True
-        ).order_by('-fecha_consulta', '-fecha_creacion').first()
-        
-        ultimo_historial = ClinicalRecord.objects.filter(
-            paciente_id=paciente_id,
-            activo=True
-        ).order_by('-fecha_atencion').first()
+        paciente = ultimos_datos['paciente']
+        ultima_constante = ultimos_datos['ultima_constante']
+        ultimo_historial = ultimos_datos['ultimo_historial']
+        indicadores = ultimos_datos['indicadores_salud']
         
-        # AGREGAR: Obtener indicadores de salud bucal más recientes
-        indicadores = ClinicalRecordIndicadoresService.obtener_indicadores_paciente(paciente_id)
-        
-        # Generar números automáticos
-        numero_historia_unica = (
-            NumberGeneratorService.generar_numero_historia_clinica_unica()
-        )
-        numero_archivo = NumberGeneratorService.generar_numero_archivo(
-            paciente_id
+        # Números probables del nuevo historial (se asignan al crearlo)
+        numeros = NumberGeneratorService.previsualizar_numeros(
+            paciente_id, ultimos_datos['ultima_hoja']
         )
         
         if ultimo_historial:
@@ -86,13 +63,11 @@ class RecordLoaderService:
             institucion_sistema = ultimo_historial.institucion_sistema
             unicodigo = INSTITUCION_CONFIG['UNICODIGO_DEFAULT']
             establecimiento_salud = ultimo_historial.establecimiento_salud
-            numero_hoja = ultimo_historial.numero_hoja + 1
         else:
             # Valores por defecto para primer historial
             institucion_sistema = "SISTEMA NACIONAL DE SALUD"
             unicodigo = "1213141516001-150"  # Valor por defecto
             establecimiento_salud = "FamySALUD"  
-            numero_hoja = 1
             
         # Serializar datos completos de cada sección
         antecedentes_personales_data = cls._serializar_seccion(
@@ -125,7 +100,7 @@ class RecordLoaderService:
             'indicadores de salud bucal'
         )
         
-        indices_caries = ClinicalRecordIndicesCariesService.obtener_ultimos_indices(paciente_id)
+        indices_caries = ultimos_datos['indices_caries']
         
         indices_caries_data = cls._serializar_seccion(
             indices_caries,
@@ -142,12 +117,7 @@ class RecordLoaderService:
             'nuevos'
         )
         plan_tratamiento = None
-        plan = (
-            PlanTratamiento.objects
-            .filter(paciente_id=paciente_id, activo=True)
-            .order_by('-fecha_creacion')
-            .first()
-        )
+        plan = ultimos_datos['plan_tratamiento']
 
         if plan:
             plan_tratamiento = PlanTratamientoDetailSerializer(
@@ -190,9 +160,9 @@ class RecordLoaderService:
                 'institucion_sistema': institucion_sistema,
                 'unicodigo': unicodigo,
                 'establecimiento_salud': establecimiento_salud,
-                'numero_historia_clinica_unica': numero_historia_unica,
-                'numero_archivo': numero_archivo,
-                'numero_hoja': numero_hoja,
+                'numero_historia_clinica_unica': numeros['numero_historia_clinica_unica'],
+                'numero_archivo': numeros['numero_archivo'],
+                'numero_hoja': numeros['numero_hoja'],
             },
             
             # Datos completos de cada sección
@@ -61,39 +61,14 @@ def crear_snapshot_form033_automaticamente(sender, instance, created, **kwargs):
     Signal que crea automáticamente un snapshot del Form033
     cuando se crea un nuevo historial clínico.
 
-    OPTIMIZACIÓN: usa select_related para evitar un query extra al acceder
-    a instance.odontologo_responsable, y hace la verificación del snapshot
-    con una query directa en lugar de acceder al reverse-OneToOne (que lanza
-    excepción si no existe en vez de retornar None).
+    OPTIMIZACIÓN: el snapshot (Form033 completo del paciente) se genera en
+    segundo plano cuando la transacción confirma, fuera de la creación del
+    historial. Si la transacción se revierte, no se genera.
     """
     if not created or not instance.activo:
         return
 
-    try:
-        # Verificar si ya existe un snapshot para este historial
-        # (evitar duplicados en entornos con workers múltiples)
-        from api.clinical_records.models.form033_snapshot import Form033Snapshot
-        if Form033Snapshot.objects.filter(historial_clinico_id=instance.pk).exists():
-            logger.info(f"Snapshot Form033 ya existe para HC {instance.id}")
-            return
-        
-        # Crear snapshot automáticamente
-        snapshot = Form033StorageService.crear_snapshot_desde_paciente(
-            historial_clinico=instance,
-            usuario=instance.odontologo_responsable,
-            observaciones='Snapshot automático al crear historial clínico'
-        )
-        
-        logger.info(
-            f"Snapshot Form033 creado automáticamente para HC "
-            f"{instance.numero_historia_clinica_unica}: {snapshot.id}"
-        )
-        
-    except Exception as e:
-        logger.error(
-            f"Error creando snapshot automático para HC {instance.id}: {str(e)}",
-            exc_info=True
-        )
+    Form033StorageService.programar_snapshot_automatico(instance.pk)
 
             
 @receiver(pre_save, sender=ClinicalRecord)
@@ -0,0 +1,162 @@
+# api/clinical_records/tests/test_contexto_clinico.py
+"""
+Tests del contexto clínico compartido por crear_historial y la precarga,
+y del snapshot Form033 diferido al commit.
+"""
+import time
+from datetime import date, timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.clinical_records.models import ClinicalRecord, Form033Snapshot
+from api.clinical_records.repositories import ClinicalRecordRepository
+from api.clinical_records.services import ClinicalRecordService, RecordLoaderService
+from api.clinical_records.services.form033_storage_service import Form033StorageService
+from api.patients.models import Paciente
+from api.patients.models.constantes_vitales import ConstantesVitales
+
+User = get_user_model()
+
+
+@pytest.fixture
+def odontologo(db):
+    return User.objects.create_user(
+        username='contexto_clinico', correo='contexto@test.com', password='x',
+        nombres='Ana', apellidos='Contexto', rol='Odontologo', telefono='0999999999',
+    )
+
+
+@pytest.fixture
+def paciente(db):
+    return Paciente.objects.create(
+        nombres='Luis', apellidos='Contexto', cedula_pasaporte='1300000009', sexo='M', edad=40,
+        condicion_edad='A', fecha_nacimiento=date(1985, 1, 1), fecha_ingreso=date(2025, 1, 1),
+        telefono='0999999999',
+    )
+
+
+def _crear(paciente, odontologo, **extra):
+    return ClinicalRecordService.crear_historial({
+        'paciente': paciente,
+        'odontologo_responsable': odontologo,
+        'creado_por': odontologo,
+        'motivo_consulta': 'Control',
+        **extra,
+    })
+
+
+@pytest.mark.django_db
+def test_contexto_de_paciente_nuevo_es_una_consulta(paciente):
+    with CaptureQueriesContext(connection) as consultas:
+        contexto = ClinicalRecordRepository.obtener_contexto_clinico_paciente(paciente.id)
+
+    assert len(consultas) == 1
+    assert contexto['paciente'] == paciente
+    assert contexto['ultima_hoja'] == 0
+    assert contexto['ultima_constante'] is None and contexto['ultimo_historial'] is None
+    assert ClinicalRecordRepository.obtener_contexto_clinico_paciente(
+        '00000000-0000-0000-0000-000000000000') is None
+
+
+@pytest.mark.django_db
+def test_contexto_toma_el_ultimo_registro_de_cada_seccion(paciente, odontologo):
+    hoy = date.today()
+    antigua = ConstantesVitales.objects.create(paciente=paciente, fecha_consulta=hoy, motivo_consulta='A')
+    reciente = ConstantesVitales.objects.create(
+        paciente=paciente, fecha_consulta=hoy - timedelta(days=3), motivo_consulta='B')
+    ConstantesVitales.objects.create(paciente=paciente, fecha_consulta=hoy, motivo_consulta='C', activo=False)
+    primero = _crear(paciente, odontologo)
+
+    contexto = ClinicalRecordRepository.obtener_contexto_clinico_paciente(paciente.id)
+
+    assert contexto['constantes_vitales'] == reciente    # última por fecha de creación
+    assert contexto['ultima_constante'] == antigua       # última por fecha de consulta
+    assert contexto['ultimo_historial'] == primero
+    assert contexto['ultima_hoja'] == 1
+    assert ClinicalRecordRepository.obtener_ultimos_datos_paciente(paciente.id)['constantes_vitales'] == reciente
+
+    segundo = _crear(paciente, odontologo)
+    assert (primero.numero_hoja, segundo.numero_hoja) == (1, 2)
+    antigua.refresh_from_db()
+    assert antigua.motivo_consulta == 'Control'  # el motivo actualiza la última constante
+
+    datos = RecordLoaderService.cargar_datos_iniciales_paciente(paciente.id)
+    assert datos['motivo_consulta'] == 'Control'
+    assert datos['campos_formulario']['numero_hoja'] == 3
+    assert datos['constantes_vitales']['id'] == str(reciente.id)
+
+
+@pytest.mark.django_db
+def test_snapshot_form033_se_crea_tras_el_commit(
+    paciente, odontologo, monkeypatch, django_capture_on_commit_callbacks
+):
+    class HiloSincrono:
+        def __init__(self, target, args, **kwargs):
+            self.target, self.args = target, args
+
+        def start(self):
+            self.target(*self.args)
+
+    monkeypatch.setattr('api.clinical_records.services.form033_storage_service.threading.Thread', HiloSincrono)
+    monkeypatch.setattr('api.clinical_records.services.form033_storage_service.close_old_connections', lambda: None)
+
+    with django_capture_on_commit_callbacks() as callbacks:
+        historial = _crear(paciente, odontologo)
+    assert not Form033Snapshot.objects.filter(historial_clinico=historial).exists()
+
+    for callback in callbacks:
+        callback()
+    assert Form033Snapshot.objects.filter(historial_clinico=historial).count() == 1
+
+    # Idempotente: un segundo disparo no duplica el snapshot
+    for callback in callbacks:
+        callback()
+    assert Form033Snapshot.objects.filter(historial_clinico=historial).count() == 1
+
+
+@pytest.mark.django_db
+def test_snapshot_form033_registra_cualquier_error(paciente, odontologo, monkeypatch):
+    historial = _crear(paciente, odontologo)
+    errores = []
+
+    def fallar(**kwargs):
+        raise RuntimeError('Form033 no disponible')
+
+    monkeypatch.setattr(Form033StorageService, 'crear_snapshot_desde_paciente', fallar)
+    monkeypatch.setattr('api.clinical_records.services.form033_storage_service.close_old_connections', lambda: None)
+
+    monkeypatch.setattr(
+        'api.clinical_records.services.form033_storage_service.logger.error',
+        lambda mensaje, **kwargs: errores.append((mensaje, kwargs)),
+    )
+
+    Form033StorageService._snapshot_automatico_en_hilo(historial.id)
+    assert len(errores) == 1
+    assert 'Form033 no disponible' in errores[0][0]
+    assert errores[0][1].get('exc_info') is True
+
+
+@pytest.mark.performance
+@pytest.mark.django_db
+def test_rendimiento_creacion_historial(paciente, odontologo):
+    for n in range(20):
+        ConstantesVitales.objects.create(paciente=paciente, fecha_consulta=date.today(), motivo_consulta=f'M{n}')
+
+    duraciones, total_consultas = [], []
+    for _ in range(10):
+        with CaptureQueriesContext(connection) as consultas:
+            inicio = time.perf_counter()
+            _crear(paciente, odontologo)
+            duraciones.append(time.perf_counter() - inicio)
+        total_consultas.append(len(consultas))
+
+    duraciones.sort()
+    print(
+        f"\nCreación de historial: mediana {duraciones[len(duraciones) // 2] * 1000:.1f} ms | "
+        f"p90 {duraciones[int(len(duraciones) * 0.9)] * 1000:.1f} ms | {max(total_consultas)} consultas"
+    )
+    assert ClinicalRecord.objects.filter(paciente=paciente).count() == 10
+    assert max(total_consultas) <= 14  # incluye SAVEPOINT/RELEASE de la asignación de números
@@ -0,0 +1,189 @@
+# api/clinical_records/tests/test_diagnosticos_cie_lote.py
+"""
+Tests de la carga y sincronización de diagnósticos CIE por conjuntos:
+anti-join para los "nuevos" y bulk_create / bulk_update con el diff.
+"""
+import time
+from datetime import date
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.clinical_records.models import DiagnosticoCIEHistorial
+from api.clinical_records.services import ClinicalRecordService
+from api.clinical_records.services.diagnostico_cie_service import DiagnosticosCIEService
+from api.odontogram.models import (
+    CategoriaDiagnostico, Diagnostico, DiagnosticoDental, Diente, SuperficieDental,
+)
+from api.patients.models import Paciente
+
+User = get_user_model()
+
+FDI = ['11', '12', '13', '14', '15', '16', '17', '18', '21', '22', '23', '24', '25', '26', '27', '28',
+       '31', '32', '33', '34', '35', '36', '37', '38', '41', '42', '43', '44', '45', '46', '47', '48']
+SUPERFICIES = ['oclusal', 'vestibular', 'mesial', 'distal']
+
+
+@pytest.fixture
+def odontologo(db):
+    return User.objects.create_user(
+        username='diagnosticos_lote', correo='lote@test.com', password='x',
+        nombres='Eva', apellidos='Lote', rol='Odontologo', telefono='0999999999',
+    )
+
+
+@pytest.fixture
+def paciente(db):
+    return Paciente.objects.create(
+        nombres='Mario', apellidos='Lote', cedula_pasaporte='1300000012', sexo='M', edad=50,
+        condicion_edad='A', fecha_nacimiento=date(1975, 1, 1), fecha_ingreso=date(2025, 1, 1),
+        telefono='0999999999',
+    )
+
+
+@pytest.fixture
+def catalogo(db):
+    categoria = CategoriaDiagnostico.objects.create(
+        key='lote', nombre='Lote', color_key='#ff0000', prioridad_key='alta')
+    diagnosticos = [
+        Diagnostico.objects.create(
+            key=f'lote_{n}', categoria=categoria, nombre=f'Diagnóstico {n}', siglas=f'L{n}',
+            simbolo_color='rojo', prioridad=1, codigo_icd10=f'K0{n}.1',
+        )
+        for n in range(5)
+    ]
+    sin_codigo = Diagnostico.objects.create(
+        key='lote_sin_codigo', categoria=categoria, nombre='Sin código', siglas='LSC',
+        simbolo_color='rojo', prioridad=1)
+    return diagnosticos, sin_codigo
+
+
+def _diagnosticos(paciente, odontologo, catalogo, dientes=FDI, superficies=SUPERFICIES):
+    """Un DiagnosticoDental por (diente, superficie, código del catálogo)"""
+    piezas = Diente.objects.bulk_create([Diente(paciente=paciente, codigo_fdi=fdi) for fdi in dientes])
+    caras = SuperficieDental.objects.bulk_create([
+        SuperficieDental(diente=diente, nombre=nombre) for diente in piezas for nombre in superficies
+    ])
+    return DiagnosticoDental.objects.bulk_create([
+        DiagnosticoDental(superficie=cara, diagnostico_catalogo=diagnostico, odontologo=odontologo, paciente=paciente)
+        for cara in caras for diagnostico in catalogo
+    ])
+
+
+def _historial(paciente, odontologo):
+    return ClinicalRecordService.crear_historial({
+        'paciente': paciente, 'odontologo_responsable': odontologo,
+        'creado_por': odontologo, 'motivo_consulta': 'Control',
+    })
+
+
+def _items(diagnosticos, tipo_cie='PRE', **extra):
+    return [{'diagnostico_dental_id': str(d.id), 'tipo_cie': tipo_cie, **extra} for d in diagnosticos]
+
+
+@pytest.mark.django_db
+def test_nuevos_excluye_pares_ya_cargados_en_una_consulta(paciente, odontologo, catalogo):
+    diagnosticos, sin_codigo = catalogo
+    dentales = _diagnosticos(paciente, odontologo, diagnosticos[:2], dientes=['11', '12'],
+                             superficies=['oclusal', 'mesial'])
+    _diagnosticos(paciente, odontologo, [sin_codigo], dientes=['13'])
+    historial = _historial(paciente, odontologo)
+
+    with CaptureQueriesContext(connection) as consultas:
+        nuevos = DiagnosticosCIEService.obtener_diagnosticos_nuevos(paciente.id)
+    assert len(consultas) == 1
+    # Un diagnóstico por (diente, código): la superficie no duplica
+    assert sorted((d['diente_fdi'], d['codigo_cie']) for d in nuevos) == [
+        ('11', 'K00.1'), ('11', 'K01.1'), ('12', 'K00.1'), ('12', 'K01.1'),
+    ]
+
+    cargado = next(d for d in dentales if d.superficie.diente.codigo_fdi == '11'
+                   and d.diagnostico_catalogo == diagnosticos[0])
+    DiagnosticosCIEService.cargar_diagnosticos_a_historial(historial, _items([cargado]), 'nuevos', odontologo)
+
+    nuevos = DiagnosticosCIEService.obtener_diagnosticos_nuevos(paciente.id)
+    # La otra superficie del mismo diente y código también se considera cargada
+    assert ('11', 'K00.1') not in {(d['diente_fdi'], d['codigo_cie']) for d in nuevos}
+    assert len(nuevos) == 3
+
+
+@pytest.mark.django_db
+def test_carga_y_sincronizacion_devuelven_el_diff(paciente, odontologo, catalogo):
+    diagnosticos, sin_codigo = catalogo
+    dentales = _diagnosticos(paciente, odontologo, diagnosticos[:3], dientes=['21'], superficies=['oclusal'])
+    invalido = _diagnosticos(paciente, odontologo, [sin_codigo], dientes=['22'], superficies=['oclusal'])[0]
+    historial = _historial(paciente, odontologo)
+
+    resultado = DiagnosticosCIEService.cargar_diagnosticos_a_historial(
+        historial, _items(dentales[:2], codigo_cie_personalizado=' k02.9 ') + _items([invalido]),
+        'nuevos', odontologo,
+    )
+    assert resultado['success'] and resultado['total_diagnosticos'] == 2
+    assert resultado['estadisticas'] == {'creados': 2, 'actualizados': 0, 'desactivados': 0}
+    assert {d['codigo_cie'] for d in resultado['diagnosticos']} == {'K02.9'}
+    historial.refresh_from_db()
+    assert historial.diagnosticos_cie_cargados and historial.tipo_carga_diagnosticos == 'nuevos'
+
+    # "todos" mantiene los anteriores; los que no cambian no se reescriben
+    resultado = DiagnosticosCIEService.cargar_diagnosticos_a_historial(
+        historial, _items(dentales[2:]), 'todos', odontologo)
+    assert resultado['total_diagnosticos'] == 3
+    assert resultado['estadisticas'] == {'creados': 1, 'actualizados': 0, 'desactivados': 0}
+
+    resultado = DiagnosticosCIEService.sincronizar_diagnosticos_historial(
+        historial.id,
+        _items(dentales[:1], tipo_cie='DEF', codigo_cie_personalizado='') + _items(dentales[1:2]),
+        'todos', odontologo,
+    )
+    assert resultado['estadisticas'] == {'desactivados': 1, 'creados': 0, 'actualizados': 1}
+    assert resultado['cambios'] == {
+        'creados': [], 'actualizados': [str(dentales[0].id)], 'desactivados': [str(dentales[2].id)],
+    }
+    filas = {f.diagnostico_dental_id: f for f in DiagnosticoCIEHistorial.objects.filter(historial_clinico=historial)}
+    assert (filas[dentales[0].id].tipo_cie, filas[dentales[0].id].codigo_cie_personalizado) == ('DEF', None)
+    assert filas[dentales[1].id].codigo_cie_personalizado == 'K02.9'
+    assert filas[dentales[0].id].fecha_modificacion > filas[dentales[1].id].fecha_modificacion
+    assert not filas[dentales[2].id].activo
+
+    # Reactivar un diagnóstico desactivado reutiliza su fila
+    resultado = DiagnosticosCIEService.sincronizar_diagnosticos_historial(
+        historial.id, _items(dentales), 'todos', odontologo)
+    assert resultado['estadisticas'] == {'desactivados': 0, 'creados': 0, 'actualizados': 2}
+    assert DiagnosticoCIEHistorial.objects.filter(historial_clinico=historial).count() == 3
+
+
+@pytest.mark.performance
+@pytest.mark.django_db
+def test_rendimiento_diagnosticos_cie(paciente, odontologo, catalogo):
+    diagnosticos, _ = catalogo
+    dentales = _diagnosticos(paciente, odontologo, diagnosticos)  # 32 dientes × 4 caras × 5 códigos
+    historiales = [_historial(paciente, odontologo) for _ in range(24)]
+    for indice, historial in enumerate(historiales):
+        DiagnosticosCIEService.cargar_diagnosticos_a_historial(
+            historial, _items(dentales[indice * 10:indice * 10 + 30]), 'nuevos', odontologo)
+
+    with CaptureQueriesContext(connection) as consultas_nuevos:
+        inicio = time.perf_counter()
+        nuevos = DiagnosticosCIEService.obtener_diagnosticos_nuevos(paciente.id)
+        duracion_nuevos = time.perf_counter() - inicio
+
+    historial = historiales[-1]
+    with CaptureQueriesContext(connection) as consultas_sync:
+        inicio = time.perf_counter()
+        resultado = DiagnosticosCIEService.sincronizar_diagnosticos_historial(
+            historial.id, _items(dentales[:300], tipo_cie='DEF'), 'todos', odontologo)
+        duracion_sync = time.perf_counter() - inicio
+
+    print(
+        f"\nDiagnósticos CIE ({len(dentales)} diagnósticos, {len(historiales)} historiales): "
+        f"nuevos {duracion_nuevos * 1000:.1f} ms / {len(consultas_nuevos)} consulta(s) | "
+        f"sincronización de 300 {duracion_sync * 1000:.1f} ms / {len(consultas_sync)} consultas"
+    )
+    assert len(consultas_nuevos) == 1
+    assert 0 < len(nuevos) <= 50
+    assert resultado['total_diagnosticos'] == 300
+    assert resultado['estadisticas']['creados'] == 270
+    # Independiente del número de diagnósticos
+    assert len(consultas_sync) <= 12
@@ -0,0 +1,87 @@
+from datetime import date
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api.clinical_records.models import ClinicalRecord
+from api.odontogram.models import PlanTratamiento, SesionTratamiento
+from api.patients.models import Paciente
+
+User = get_user_model()
+
+
+@pytest.fixture
+def historial(db):
+    odontologo = User.objects.create_user(
+        username='etag_historial', correo='etag_historial@test.com', password='x',
+        nombres='Hugo', apellidos='Etag', rol='Odontologo', telefono='0999999999',
+    )
+    paciente = Paciente.objects.create(
+        nombres='Paciente', apellidos='Etag', cedula_pasaporte='1300000900', sexo='M', edad=45,
+        condicion_edad='A', fecha_nacimiento=date(1980, 1, 1), fecha_ingreso=date(2025, 1, 1),
+        telefono='0999999999',
+    )
+    plan = PlanTratamiento.objects.create(paciente=paciente, creado_por=odontologo, titulo='Plan')
+    return ClinicalRecord.objects.create(
+        paciente=paciente,
+        odontologo_responsable=odontologo,
+        numero_historia_clinica_unica='HC-202500900',
+        motivo_consulta='Control',
+        plan_tratamiento=plan,
+    )
+
+
+@pytest.fixture
+def client(historial):
+    client = APIClient()
+    client.force_authenticate(user=historial.odontologo_responsable)
+    return client
+
+
+def _url(historial):
+    return f'/api/clinical-records/{historial.id}/'
+
+
+@pytest.mark.django_db
+def test_detalle_responde_304_con_una_consulta(client, historial):
+    primera = client.get(_url(historial))
+    assert primera.status_code == 200
+    etag = primera['ETag']
+
+    with CaptureQueriesContext(connection) as consultas:
+        respuesta = client.get(_url(historial), HTTP_IF_NONE_MATCH=etag)
+    assert respuesta.status_code == 304
+    assert len(consultas) == 1
+
+    # If-Modified-Since con la fecha devuelta también evita el payload
+    respuesta = client.get(_url(historial), HTTP_IF_MODIFIED_SINCE=primera['Last-Modified'])
+    assert respuesta.status_code == 304
+
+
+@pytest.mark.django_db
+def test_detalle_cambia_de_etag_con_datos_relacionados(client, historial):
+    etag = client.get(_url(historial))['ETag']
+
+    # Una sesión nueva del plan forma parte del payload del detalle
+    SesionTratamiento.objects.create(
+        plan_tratamiento=historial.plan_tratamiento, numero_sesion=1,
+        fecha_programada=date(2025, 6, 1), odontologo=historial.odontologo_responsable,
+    )
+    respuesta = client.get(_url(historial), HTTP_IF_NONE_MATCH=etag)
+    assert respuesta.status_code == 200
+    nuevo = respuesta['ETag']
+    assert nuevo != etag
+
+    historial.paciente.nombres = 'Renombrado'
+    historial.paciente.save()
+    assert client.get(_url(historial), HTTP_IF_NONE_MATCH=nuevo).status_code == 200
+
+
+@pytest.mark.django_db
+def test_detalle_inexistente_sin_etag(client):
+    respuesta = client.get('/api/clinical-records/00000000-0000-0000-0000-000000000000/')
+    assert respuesta.status_code == 404
+    assert 'ETag' not in respuesta
@@ -0,0 +1,158 @@
+import zipfile
+from datetime import date
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from api.clinical_records.models import ClinicalRecord
+from api.clinical_records.services.pdf.exportacion_lote_service import (
+    ExportacionLoteError,
+    ExportacionPDFLoteService,
+)
+from api.patients.models import Paciente
+
+User = get_user_model()
+
+SECCIONES = ['establecimiento_paciente', 'motivo_consulta']
+
+
+@pytest.fixture
+def historiales(db):
+    odontologo = User.objects.create_user(
+        username='exportacion_lote', correo='exportacion@test.com', password='x',
+        nombres='Ana', apellidos='Lote', rol='Odontologo', telefono='0999999999',
+    )
+    registros = []
+    for n, cedula in enumerate(['1300000001', '1300000001', '1300000002']):
+        paciente, _ = Paciente.objects.get_or_create(
+            cedula_pasaporte=cedula,
+            defaults=dict(
+                nombres='Paciente', apellidos=f'Lote {cedula[-1]}', sexo='F', edad=30,
+                condicion_edad='A', fecha_nacimiento=date(1995, 1, 1),
+                fecha_ingreso=date(2025, 1, 1), telefono='0999999999',
+            ),
+        )
+        registros.append(ClinicalRecord.objects.create(
+            paciente=paciente,
+            odontologo_responsable=odontologo,
+            numero_historia_clinica_unica=f'HC-2025{n:05d}',
+            motivo_consulta='Control',
+        ))
+    return registros
+
+
+def _entradas(ruta):
+    with zipfile.ZipFile(ruta) as zf:
+        assert zf.testzip() is None
+        return {nombre: zf.read(nombre) for nombre in zf.namelist()}
+
+
+@pytest.mark.django_db
+def test_exportacion_filtra_y_se_reanuda(historiales, tmp_path):
+    ruta = tmp_path / 'lote.zip'
+    paciente = historiales[2].paciente
+
+    # Primera ejecución parcial: solo un paciente
+    estado = ExportacionPDFLoteService.exportar(
+        ruta, paciente_ids=[paciente.id], secciones=SECCIONES, workers=0,
+    )
+    assert (estado['total'], estado['exportados']) == (1, 1)
+
+    # Reanudación sobre el mismo ZIP: no vuelve a renderizar lo existente
+    avances = []
+    estado = ExportacionPDFLoteService.exportar(
+        ruta, secciones=SECCIONES, workers=0, progreso=lambda e: avances.append(e['procesados']),
+    )
+    assert (estado['total'], estado['exportados'], estado['omitidos']) == (3, 2, 1)
+    assert estado['estado'] == 'completado'
+    assert avances == [3]
+    assert ExportacionPDFLoteService.leer_progreso(ruta)['exportados'] == 2
+
+    entradas = _entradas(ruta)
+    assert set(entradas) == {ExportacionPDFLoteService.nombre_entrada(h) for h in historiales}
+    assert all(pdf.startswith(b'%PDF') for pdf in entradas.values())
+
+
+@pytest.mark.django_db
+def test_exportacion_rechaza_zip_danado_y_concurrente(historiales, tmp_path):
+    ruta = tmp_path / 'danado.zip'
+    ruta.write_bytes(b'no es un zip')
+    with pytest.raises(ExportacionLoteError):
+        ExportacionPDFLoteService.exportar(ruta, workers=0)
+
+    with ExportacionPDFLoteService._bloqueo(ruta):
+        assert ExportacionPDFLoteService.en_curso(ruta)
+        with pytest.raises(ExportacionLoteError):
+            ExportacionPDFLoteService.exportar(ruta, workers=0, reiniciar=True)
+    assert not ExportacionPDFLoteService.en_curso(ruta)
+
+
+@pytest.mark.django_db(transaction=True)
+def test_comando_renderiza_en_pool_de_procesos(historiales, tmp_path, capsys):
+    ruta = tmp_path / 'pool.zip'
+    odontologo = historiales[0].odontologo_responsable
+
+    call_command(
+        'exportar_historiales_pdf', salida=str(ruta), odontologo=str(odontologo.id),
+        desde='2000-01-01', secciones=SECCIONES, workers=2,
+    )
+
+    assert '3 PDF(s) exportado(s)' in capsys.readouterr().out
+    assert len(_entradas(ruta)) == 3
+
+
+@pytest.mark.django_db
+def test_endpoint_exportacion_solo_administradores(historiales):
+    cliente = APIClient()
+    cliente.force_authenticate(historiales[0].odontologo_responsable)
+    respuesta = cliente.post('/api/clinical-records/pdf/exportar-lote/', {}, format='json')
+    assert respuesta.status_code == 403
+
+    admin = User.objects.create_user(
+        username='exportacion_admin', correo='exportacion_admin@test.com', password='x',
+        nombres='Admin', apellidos='Lote', rol='Administrador', telefono='0999999999',
+    )
+    cliente.force_authenticate(admin)
+    respuesta = cliente.post(
+        '/api/clinical-records/pdf/exportar-lote/',
+        {'desde': '2025-02-01', 'hasta': '2025-01-01'}, format='json',
+    )
+    assert respuesta.status_code == 400
+    respuesta = cliente.get(f"/api/clinical-records/pdf/exportar-lote/{'0' * 32}/")
+    assert respuesta.status_code == 404
+
+
+@pytest.mark.django_db
+def test_endpoint_encola_y_el_comando_procesa(historiales, tmp_path, settings):
+    settings.EXPORTACION_PDF_DIR = str(tmp_path)
+    admin = User.objects.create_user(
+        username='exportacion_cola', correo='exportacion_cola@test.com', password='x',
+        nombres='Admin', apellidos='Cola', rol='Administrador', telefono='0999999999',
+    )
+    cliente = APIClient()
+    cliente.force_authenticate(admin)
+
+    respuesta = cliente.post(
+        '/api/clinical-records/pdf/exportar-lote/',
+        {'pacientes': [str(historiales[2].paciente_id)], 'secciones': SECCIONES, 'desde': '2000-01-01'},
+        format='json',
+    )
+    assert respuesta.status_code == 202
+    exportacion_id = respuesta.data['exportacion_id']
+    assert respuesta.data['estado'] == 'pendiente'
+
+    # El web worker no renderiza: solo queda la solicitud
+    assert not (tmp_path / f'{exportacion_id}.zip').exists()
+    repetida = cliente.post(
+        '/api/clinical-records/pdf/exportar-lote/', {'exportacion_id': exportacion_id}, format='json',
+    )
+    assert repetida.status_code == 409
+
+    call_command('exportar_historiales_pdf', pendientes=True, workers=0)
+
+    progreso = cliente.get(f'/api/clinical-records/pdf/exportar-lote/{exportacion_id}/').data
+    assert (progreso['estado'], progreso['exportados'], progreso['activa']) == ('completado', 1, False)
+    assert len(_entradas(tmp_path / f'{exportacion_id}.zip')) == 1
+
@@ -0,0 +1,66 @@
+# api/clinical_records/tests/test_numeracion.py
+"""
+Tests de la numeración de historiales: secuencia global + contador de hojas
+por paciente, asignados en una sola sentencia.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+
+import pytest
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api.clinical_records.models import ContadorHojaPaciente
+from api.clinical_records.services import NumberGeneratorService
+from api.patients.models import Paciente
+
+
+def _paciente(cedula='1300000010'):
+    return Paciente.objects.create(
+        nombres='Rosa', apellidos='Numeración', cedula_pasaporte=cedula, sexo='F', edad=30,
+        condicion_edad='A', fecha_nacimiento=date(1995, 1, 1), fecha_ingreso=date(2025, 1, 1),
+        telefono='0999999999',
+    )
+
+
+@pytest.mark.django_db
+def test_asignacion_en_una_sentencia_y_por_bloques():
+    paciente = _paciente()
+
+    prevision = NumberGeneratorService.previsualizar_numeros(paciente.id)
+    with CaptureQueriesContext(connection) as consultas:
+        primero = NumberGeneratorService.asignar_numeros(paciente.id)[0]
+    assert len(consultas) == 1
+    assert primero == prevision  # la previsualización no reserva
+    assert primero['numero_hoja'] == 1
+    assert len(primero['numero_historia_clinica_unica']) <= 50 and len(primero['numero_archivo']) <= 50
+
+    bloque = NumberGeneratorService.asignar_numeros(paciente.id, cantidad=5)
+    assert [n['numero_hoja'] for n in bloque] == [2, 3, 4, 5, 6]
+    unicos = {n['numero_historia_clinica_unica'] for n in [primero, *bloque]}
+    assert len(unicos) == 6
+    assert ContadorHojaPaciente.objects.get(paciente=paciente).ultima_hoja == 6
+
+    # Un rollback devuelve las hojas (la secuencia global solo deja un hueco)
+    with pytest.raises(RuntimeError), transaction.atomic():
+        NumberGeneratorService.asignar_numeros(paciente.id)
+        raise RuntimeError
+    assert NumberGeneratorService.asignar_numeros(paciente.id)[0]['numero_hoja'] == 7
+
+
+@pytest.mark.django_db(transaction=True)
+def test_asignacion_concurrente_sin_duplicados():
+    paciente = _paciente('1300000011')
+
+    def asignar(_):
+        try:
+            return [NumberGeneratorService.asignar_numeros(paciente.id)[0] for _ in range(5)]
+        finally:
+            connection.close()
+
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        numeros = [n for lote in pool.map(asignar, range(8)) for n in lote]
+
+    assert sorted(n['numero_hoja'] for n in numeros) == list(range(1, 41))
+    assert len({n['numero_historia_clinica_unica'] for n in numeros}) == 40
+    assert len({n['numero_archivo'] for n in numeros}) == 40
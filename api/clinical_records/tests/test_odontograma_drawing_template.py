@@ -0,0 +1,89 @@
+import io
+import time
+
+import pytest
+from reportlab.graphics import renderPDF
+from reportlab.graphics.shapes import Group, Path, String, mmult
+
+from api.clinical_records.services.pdf.odontograma_drawing_template import (
+    OdontogramaDrawingTemplate,
+)
+from api.clinical_records.services.pdf.odontograma_svg_generator import OdontogramaSVGGenerator
+
+
+def _datos_form033():
+    dientes = [[None] * 8 for _ in range(4)]
+    movilidad = [[None] * 8 for _ in range(4)]
+    recesion = [[None] * 8 for _ in range(4)]
+    dientes[0][2] = {"simbolo": "O", "color": "#FF0000", "superficies_afectadas": ["oclusal", "mesial"]}
+    dientes[1][0] = {"simbolo": "A", "color": "#000000", "superficies_afectadas": []}
+    dientes[2][5] = {"simbolo": "X", "color": "azul", "superficies_afectadas": []}
+    dientes[3][7] = {"simbolo": "o", "color": "#0000FF", "superficies_afectadas": ["vestibular", "distal"]}
+    movilidad[0][2] = {"grado": 2}
+    recesion[3][7] = {"nivel": 1}
+    return {"odontograma_permanente": {"dientes": dientes, "movilidad": movilidad, "recesion": recesion}}
+
+
+def _aplanar(nodo, t=(1, 0, 0, 1, 0, 0), salida=None):
+    """Textos y rellenos con coordenadas absolutas, para comparar rutas de render."""
+    salida = [] if salida is None else salida
+    for hijo in getattr(nodo, "contents", []):
+        if isinstance(hijo, Group):
+            _aplanar(hijo, mmult(t, hijo.transform), salida)
+            continue
+
+        def absoluto(x, y):
+            return (round(t[0] * x + t[2] * y + t[4], 1), round(t[1] * x + t[3] * y + t[5], 1))
+
+        if isinstance(hijo, String):
+            salida.append(("texto", hijo.text, absoluto(hijo.x, hijo.y)))
+        elif isinstance(hijo, Path) and hijo.fillColor is not None:
+            x0, y0, x1, y1 = hijo.getBounds()
+            (ax, ay), (bx, by) = absoluto(x0, y0), absoluto(x1, y1)
+            salida.append(("relleno", hijo.fillColor.hexval(), (min(ax, bx), min(ay, by))))
+    return sorted(salida)
+
+
+def _ruta_svg(datos):
+    from svglib.svglib import svg2rlg
+    return svg2rlg(io.BytesIO(OdontogramaSVGGenerator.generar_svg(datos).encode("utf-8")))
+
+
+def test_plantilla_equivale_a_ruta_svg():
+    pytest.importorskip("svglib")
+    datos = _datos_form033()
+
+    drawing = OdontogramaDrawingTemplate.construir_drawing(datos)
+    referencia = _ruta_svg(datos)
+
+    assert (drawing.width, drawing.height) == (referencia.width, referencia.height)
+    assert _aplanar(drawing) == _aplanar(referencia)
+    assert renderPDF.drawToString(drawing).startswith(b"%PDF")
+
+
+def test_plantilla_estatica_se_construye_una_vez():
+    primero = OdontogramaDrawingTemplate.construir_drawing(_datos_form033())
+    segundo = OdontogramaDrawingTemplate.construir_drawing({})
+
+    assert primero.contents[0] is segundo.contents[0]
+    assert len(segundo.contents[1].contents) == 0
+
+
+@pytest.mark.performance
+def test_rendimiento_plantilla_vs_svg():
+    pytest.importorskip("svglib")
+    datos = _datos_form033()
+    iteraciones = 30
+
+    inicio = time.perf_counter()
+    for _ in range(iteraciones):
+        _ruta_svg(datos)
+    duracion_svg = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for _ in range(iteraciones):
+        OdontogramaDrawingTemplate.construir_drawing(datos)
+    duracion_plantilla = time.perf_counter() - inicio
+
+    print(f"\nSVG + svg2rlg: {duracion_svg:.3f}s | plantilla: {duracion_plantilla:.3f}s ({iteraciones} odontogramas)")
+    assert duracion_plantilla * 5 < duracion_svg
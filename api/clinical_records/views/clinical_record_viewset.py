@@ -4,6 +4,7 @@ ViewSet principal para gestión de historiales clínicos
 """
 from django.conf import settings
 from django.db.models import Q
+from django.utils.decorators import method_decorator
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
@@ -18,6 +19,7 @@ from api.clinical_records.serializers.clinical_record_with_plan_serializer impor
 )
 
 
+from api.clinical_records.config import HISTORIAL_PREFETCH_DETALLE, HISTORIAL_SELECT_RELATED
 from api.clinical_records.models import ClinicalRecord
 from api.clinical_records.serializers import (
     ClinicalRecordSerializer,
@@ -38,6 +40,7 @@ from api.clinical_records.serializers.vital_signs import WritableConstantesVital
 from api.clinical_records.services.vital_signs_service import VitalSignsService
 from api.clinical_records.serializers.oral_health_indicators import OralHealthIndicatorsSerializer
 from api.odontogram.models import IndiceCariesSnapshot, PlanTratamiento, SesionTratamiento
+from api.odontogram.services.resumen_plan_service import ResumenPlanService
 from api.odontogram.serializers.indices_caries_serializers import WritableIndiceCariesSnapshotSerializer
 from api.clinical_records.serializers.indices_caries_serializers import WritableIndicesCariesSerializer
 from api.clinical_records.services.diagnostico_cie_service import DiagnosticosCIEService
@@ -51,6 +54,7 @@ from api.clinical_records.serializers.plan_tratamiento_serializers import (
 from api.clinical_records.serializers.examenes_complementarios import WritableExamenesComplementariosSerializer
 from api.clinical_records.services.examenes_complementarios_service import ExamenesComplementariosLinkService
 from api.clinical_records.views.pdf_viewset import ClinicalRecordPDFMixin
+from api.utils.conditional_get import etag_de, get_condicional
 
 
 
@@ -67,6 +71,16 @@ from .base import (
 )
 
 
+def _version_historial(request, pk=None):
+    """ETag / Last-Modified del detalle a partir de las fechas de modificación"""
+    version = ClinicalRecordRepository.obtener_version_detalle(pk)
+    if version is None:
+        return None
+    ultima_modificacion, total_sesiones, total_diagnosticos = version
+    return etag_de('historial', pk, ultima_modificacion, total_sesiones, total_diagnosticos), ultima_modificacion
+
+
+@method_decorator(get_condicional(_version_historial), name='retrieve')
 class ClinicalRecordViewSet(
     BasePermissionMixin,
     ClinicalRecordPDFMixin,
@@ -133,28 +147,11 @@ class ClinicalRecordViewSet(
         qs = super().get_queryset()
 
         # Optimización: traer relaciones en una sola query
-        qs = qs.select_related(
-            'paciente',
-            'odontologo_responsable',
-            'antecedentes_personales',
-            'antecedentes_familiares',
-            'constantes_vitales',
-            'examen_estomatognatico',
-            'indicadores_salud_bucal',
-            'indices_caries',
-            'creado_por',
-            'plan_tratamiento',
-            'plan_tratamiento__paciente',
-            'plan_tratamiento__creado_por',
-            'examenes_complementarios',
-        )
+        qs = qs.select_related(*HISTORIAL_SELECT_RELATED)
 
         # Prefetch adicional solo para vistas de detalle
         if self.action in ['retrieve', 'by_paciente']:
-            qs = qs.prefetch_related(
-                'plan_tratamiento__sesiones',
-                'plan_tratamiento__sesiones__odontologo',
-            )
+            qs = qs.prefetch_related(*HISTORIAL_PREFETCH_DETALLE)
 
         return qs
     
@@ -1848,59 +1845,15 @@ class ClinicalRecordViewSet(
         
         try:
             plan = historial.plan_tratamiento
-            sesiones = SesionTratamiento.objects.filter(
-                plan_tratamiento=plan,
-                activo=True
-            ).order_by('numero_sesion')
-            
-            # Consolidar información
-            procedimientos_consolidados = []
-            prescripciones_consolidadas = []
-            sesiones_detalle = []
-            
-            for sesion in sesiones:
-                # Detalle de la sesión
-                sesion_detalle = {
-                    'numero_sesion': sesion.numero_sesion,
-                    'fecha_programada': sesion.fecha_programada.isoformat() if sesion.fecha_programada else None,
-                    'fecha_realizacion': sesion.fecha_realizacion.isoformat() if sesion.fecha_realizacion else None,
-                    'estado': sesion.estado,
-                    'estado_display': sesion.get_estado_display(),
-                    'diagnosticos_complicaciones': sesion.diagnosticos_complicaciones or [],
-                    'procedimientos': sesion.procedimientos or [],
-                    'prescripciones': sesion.prescripciones or [],
-                    'notas': sesion.notas,
-                    'observaciones': sesion.observaciones,
-                }
-                sesiones_detalle.append(sesion_detalle)
-                
-                # Consolidar procedimientos
-                if sesion.procedimientos:
-                    for proc in sesion.procedimientos:
-                        proc['sesion'] = sesion.numero_sesion
-                        procedimientos_consolidados.append(proc)
-                
-                # Consolidar prescripciones
-                if sesion.prescripciones:
-                    for pres in sesion.prescripciones:
-                        pres['sesion'] = sesion.numero_sesion
-                        prescripciones_consolidadas.append(pres)
-            
-            # Generar texto de prescripciones
-            texto_prescripciones = "PRESCRIPCIONES MÉDICAS\n"
-            texto_prescripciones += "=" * 30 + "\n"
-            
-            if prescripciones_consolidadas:
-                for i, pres in enumerate(prescripciones_consolidadas, 1):
-                    texto_prescripciones += f"\n{i}. {pres.get('medicamento', 'Medicamento no especificado')}\n"
-                    texto_prescripciones += f"   Dosis: {pres.get('dosis', 'No especificada')}\n"
-                    texto_prescripciones += f"   Frecuencia: {pres.get('frecuencia', 'No especificada')}\n"
-                    texto_prescripciones += f"   Duración: {pres.get('duracion', 'No especificada')}\n"
-                    if pres.get('observaciones'):
-                        texto_prescripciones += f"   Observaciones: {pres['observaciones']}\n"
-                    texto_prescripciones += f"   (Sesión #{pres.get('sesion', 'N/A')})\n"
-            else:
-                texto_prescripciones += "\nNo hay prescripciones registradas.\n"
+            # Resumen precalculado al guardar las sesiones: una sola fila
+            resumen = ResumenPlanService.obtener(plan)
+
+            procedimientos_consolidados = [
+                {**proc, 'sesion': proc['sesion_numero']} for proc in resumen.procedimientos_consolidados
+            ]
+            prescripciones_consolidadas = [
+                {**pres, 'sesion': pres['sesion_numero']} for pres in resumen.prescripciones_consolidadas
+            ]
             
             return Response({
                 'success': True,
@@ -1908,15 +1861,17 @@ class ClinicalRecordViewSet(
                 'plan_titulo': plan.titulo,
                 'plan_notas_generales': plan.notas_generales,
                 'fecha_creacion': plan.fecha_creacion.isoformat(),
-                'total_sesiones': len(sesiones_detalle),
-                'sesiones_detalle': sesiones_detalle,
+                'total_sesiones': resumen.total_sesiones,
+                'sesiones_detalle': resumen.sesiones,
                 'procedimientos_consolidados': procedimientos_consolidados,
                 'prescripciones_consolidadas': prescripciones_consolidadas,
-                'texto_prescripciones_completo': texto_prescripciones,
+                'texto_prescripciones_completo': ResumenPlanService.texto_prescripciones(
+                    resumen.prescripciones_consolidadas
+                ),
                 'resumen': {
-                    'total_diagnosticos': sum(len(s['diagnosticos_complicaciones']) for s in sesiones_detalle),
-                    'total_procedimientos': len(procedimientos_consolidados),
-                    'total_prescripciones': len(prescripciones_consolidadas),
+                    'total_diagnosticos': resumen.total_diagnosticos,
+                    'total_procedimientos': resumen.total_procedimientos,
+                    'total_prescripciones': resumen.total_prescripciones,
                 }
             })
             
@@ -8,16 +8,24 @@ del ViewSet (solo JSONRenderer), no puede satisfacer Accept: application/pdf
 y devuelve 406 Not Acceptable.
 """
 import logging
+import uuid
+from pathlib import Path
 
-from django.http import HttpResponse
+from django.conf import settings
+from django.http import FileResponse, HttpResponse
 from rest_framework import renderers, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from api.clinical_records.models import ClinicalRecord
+from api.clinical_records.serializers import ExportacionLotePDFSerializer
 from api.clinical_records.services.pdf.clinical_record_pdf_builder import (
     ClinicalRecordPDFBuilder,
 )
+from api.clinical_records.services.pdf.exportacion_lote_service import (
+    ExportacionLoteError,
+    ExportacionPDFLoteService,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -42,6 +50,12 @@ class PDFRenderer(renderers.BaseRenderer):
         return data
 
 
+class ZIPRenderer(PDFRenderer):
+    """Igual que PDFRenderer, para la descarga del ZIP de exportación masiva."""
+    media_type = "application/zip"
+    format = "zip"
+
+
 class ClinicalRecordPDFMixin:
     """
     Mixin para añadir las acciones de PDF al ClinicalRecordViewSet.
@@ -131,8 +145,118 @@ class ClinicalRecordPDFMixin:
         })
 
     # ─────────────────────────────────────────────────────────────────────────
-    # Helper privado
+    # POST /api/clinical-records/pdf/exportar-lote/
+    # Body: {"desde", "hasta", "odontologo_id", "pacientes", "secciones",
+    #        "exportacion_id" (para reanudar)}
+    # ─────────────────────────────────────────────────────────────────────────
+    @action(detail=False, methods=["post"], url_path="pdf/exportar-lote")
+    def exportar_lote_pdf(self, request):
+        """
+        Encola (o reanuda) la exportación masiva de historiales a un ZIP de PDFs.
+        Solo administradores. Responde 202 con el ID para consultar el progreso;
+        el render lo hace `manage.py exportar_historiales_pdf --pendientes`.
+        """
+        if not self._es_administrador(request.user):
+            return Response(
+                {"detail": "Solo un administrador puede exportar historiales en lote"},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        serializer = ExportacionLotePDFSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        datos = serializer.validated_data
+
+        exportacion_id = datos.get("exportacion_id") or uuid.uuid4().hex
+        filtros = {
+            "desde": datos.get("desde"),
+            "hasta": datos.get("hasta"),
+            "odontologo_id": datos.get("odontologo_id"),
+            "paciente_ids": datos.get("pacientes"),
+            "secciones": datos.get("secciones"),
+        }
+        try:
+            ExportacionPDFLoteService.encolar(self._ruta_exportacion(exportacion_id), filtros)
+        except ExportacionLoteError as e:
+            return Response(
+                {"detail": str(e), "exportacion_id": exportacion_id},
+                status=status.HTTP_409_CONFLICT,
+            )
+
+        logger.info(
+            f"Exportación masiva {exportacion_id} encolada por {request.user.username}"
+        )
+        return Response(
+            {"exportacion_id": exportacion_id, "estado": "pendiente"},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # GET /api/clinical-records/pdf/exportar-lote/{exportacion_id}/
     # ─────────────────────────────────────────────────────────────────────────
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"pdf/exportar-lote/(?P<exportacion_id>[0-9a-f]{32})",
+    )
+    def estado_exportacion_lote_pdf(self, request, exportacion_id=None):
+        """Progreso de una exportación masiva."""
+        if not self._es_administrador(request.user):
+            return Response(status=status.HTTP_403_FORBIDDEN)
+
+        ruta_zip = self._ruta_exportacion(exportacion_id)
+        progreso = ExportacionPDFLoteService.leer_progreso(ruta_zip)
+        if progreso is None:
+            return Response(
+                {"detail": "Exportación no encontrada"},
+                status=status.HTTP_404_NOT_FOUND,
+            )
+        progreso["activa"] = ExportacionPDFLoteService.en_curso(ruta_zip)
+        return Response(progreso)
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # GET /api/clinical-records/pdf/exportar-lote/{exportacion_id}/descargar/
+    # ─────────────────────────────────────────────────────────────────────────
+    @action(
+        detail=False,
+        methods=["get"],
+        url_path=r"pdf/exportar-lote/(?P<exportacion_id>[0-9a-f]{32})/descargar",
+        renderer_classes=[ZIPRenderer],
+    )
+    def descargar_exportacion_lote_pdf(self, request, exportacion_id=None):
+        """Descarga el ZIP de una exportación terminada."""
+        if not self._es_administrador(request.user):
+            return HttpResponse(status=403)
+
+        ruta_zip = self._ruta_exportacion(exportacion_id)
+        progreso = ExportacionPDFLoteService.leer_progreso(ruta_zip)
+        if (
+            progreso is None
+            or not progreso["estado"].startswith("completado")
+            or not ruta_zip.exists()
+        ):
+            return HttpResponse(
+                '{"detail": "La exportación no está disponible para descarga"}',
+                content_type="application/json",
+                status=404,
+            )
+        return FileResponse(
+            open(ruta_zip, "rb"),
+            as_attachment=True,
+            filename=f"historiales_{exportacion_id}.zip",
+            content_type="application/zip",
+        )
+
+    # ─────────────────────────────────────────────────────────────────────────
+    # Helpers privados
+    # ─────────────────────────────────────────────────────────────────────────
+    @staticmethod
+    def _es_administrador(user):
+        return user.is_superuser or getattr(user, "rol", None) == "Administrador"
+
+    @staticmethod
+    def _ruta_exportacion(exportacion_id):
+        return Path(settings.EXPORTACION_PDF_DIR) / f"{exportacion_id}.zip"
+
     def _get_historial_con_relaciones(self, pk):
         """
         Obtiene el historial con todas las relaciones pre-cargadas
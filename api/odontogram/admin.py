@@ -1,6 +1,8 @@
 # api/odontogram/admin.py
 
 from django.contrib import admin
+
+from api.utils.admin_changelist import ChangelistEficienteMixin, conteo_relacionados
 from .models import (
     CategoriaDiagnostico,
     Diagnostico,
@@ -62,10 +64,11 @@ class SuperficieDentalInline(admin.TabularInline):
 
 
 # ADMIN 1: SuperficieDental (con inlines de diagnósticos)
-class SuperficieDentalAdmin(admin.ModelAdmin):
+class SuperficieDentalAdmin(ChangelistEficienteMixin, admin.ModelAdmin):
     """Admin para superficies dentales con diagnósticos anidados"""
 
     list_display = ("diente_info", "nombre", "diagnosticos_count", "fecha_creacion")
+    list_select_related = ("diente__paciente",)
     search_fields = (
         "diente__codigo_fdi",
         "diente__paciente__nombres",
@@ -88,6 +91,11 @@ class SuperficieDentalAdmin(admin.ModelAdmin):
         ),
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            diagnosticos_activos=conteo_relacionados(DiagnosticoDental.objects.filter(activo=True), "superficie"),
+        )
+
     def diente_info(self, obj):
         """Muestra info del diente con paciente"""
         paciente = obj.diente.paciente
@@ -97,15 +105,16 @@ class SuperficieDentalAdmin(admin.ModelAdmin):
 
     def diagnosticos_count(self, obj):
         """Cuenta de diagnósticos en esta superficie"""
-        return obj.diagnosticos.filter(activo=True).count()
+        return obj.diagnosticos_activos
 
     diagnosticos_count.short_description = "Diagnósticos"
+    diagnosticos_count.admin_order_field = "diagnosticos_activos"
 
 
 # ADMIN 2: Diente (con inlines de superficies y diagnósticos en cascada)
 
 
-class DienteAdmin(admin.ModelAdmin):
+class DienteAdmin(ChangelistEficienteMixin, admin.ModelAdmin):
     """Admin para dientes con superficies anidadas"""
 
     list_display = (
@@ -116,6 +125,7 @@ class DienteAdmin(admin.ModelAdmin):
         "diagnosticos_count",
         "fecha_creacion",
     )
+    list_select_related = ("paciente",)
     search_fields = (
         "codigo_fdi",
         "paciente__nombres",
@@ -153,6 +163,14 @@ class DienteAdmin(admin.ModelAdmin):
         ),
     )
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            superficies_total=conteo_relacionados(SuperficieDental.objects.all(), "diente"),
+            diagnosticos_activos=conteo_relacionados(
+                DiagnosticoDental.objects.filter(activo=True), "superficie__diente"
+            ),
+        )
+
     def paciente_info(self, obj):
         """Muestra nombre del paciente"""
         return f"{obj.paciente.nombres} {obj.paciente.apellidos}"
@@ -161,18 +179,17 @@ class DienteAdmin(admin.ModelAdmin):
 
     def superficies_count(self, obj):
         """Cuenta de superficies"""
-        return obj.superficies.count()
+        return obj.superficies_total
 
     superficies_count.short_description = "Superficies"
+    superficies_count.admin_order_field = "superficies_total"
 
     def diagnosticos_count(self, obj):
         """Cuenta total de diagnósticos"""
-        total = 0
-        for superficie in obj.superficies.all():
-            total += superficie.diagnosticos.filter(activo=True).count()
-        return total
+        return obj.diagnosticos_activos
 
     diagnosticos_count.short_description = "Total Diagnósticos"
+    diagnosticos_count.admin_order_field = "diagnosticos_activos"
 
     def guardar_odontograma_completo(self, request, queryset):
         """
@@ -254,7 +271,7 @@ class DienteAdmin(admin.ModelAdmin):
 
 
 # ADMIN 3: DiagnosticoDental (lectura con contexto)
-class DiagnosticoDentalAdmin(admin.ModelAdmin):
+class DiagnosticoDentalAdmin(ChangelistEficienteMixin, admin.ModelAdmin):
     """Admin para diagnósticos dentales registrados"""
 
     list_display = (
@@ -265,6 +282,7 @@ class DiagnosticoDentalAdmin(admin.ModelAdmin):
         "prioridad_efectiva",
         "fecha",
     )
+    list_select_related = ("diagnostico_catalogo", "superficie__diente")
     search_fields = (
         "diagnostico_catalogo__nombre",
         "diagnostico_catalogo__siglas",
@@ -361,7 +379,7 @@ class DiagnosticoDentalAdmin(admin.ModelAdmin):
 
 
 # ADMIN 4: HistorialOdontograma (solo lectura)
-class HistorialOdontogramaAdmin(admin.ModelAdmin):
+class HistorialOdontogramaAdmin(ChangelistEficienteMixin, admin.ModelAdmin):
     """Admin para historial de cambios"""
 
     list_display = (
@@ -371,6 +389,7 @@ class HistorialOdontogramaAdmin(admin.ModelAdmin):
         "fecha",
         "descripcion_truncada",
     )
+    list_select_related = ("diente__paciente", "odontologo")
 
     search_fields = (
         "descripcion",
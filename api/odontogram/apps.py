@@ -8,5 +8,11 @@ class OdontogramConfig(AppConfig):
     def ready(self):
         # Importa las señales cuando la aplicación se inicie
         import api.odontogram.signals
+
+        from django.conf import settings
+        if getattr(settings, 'ODONTOGRAMA_CATALOGO_PRECARGAR', False):
+            # Catálogo en memoria antes del primer request, sin bloquear el arranque
+            from api.odontogram.services.catalogo_service import CatalogoDiagnosticosService
+            CatalogoDiagnosticosService.precargar_en_segundo_plano()
         print("Sistema de Odontograma inicializado")
         print("Signals (Observer Pattern) registrados")
@@ -0,0 +1,53 @@
+# api/odontogram/management/commands/auditar_indices.py
+# python manage.py auditar_indices [--app odontogram] [--modelo HistorialOdontograma] [--solo-problemas]
+# Reporta por modelo los índices sin uso (pg_stat_user_indexes) y los redundantes
+
+from django.core.management.base import BaseCommand
+
+from api.odontogram.services.auditoria_indices_service import AuditoriaIndicesService
+
+
+class Command(BaseCommand):
+    help = 'Reporta índices sin uso o redundantes de los modelos del proyecto'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--app', help='Solo los modelos de esta app (app_label)')
+        parser.add_argument('--modelo', help='Solo este modelo (nombre de la clase)')
+        parser.add_argument(
+            '--solo-problemas',
+            action='store_true',
+            help='Muestra únicamente los índices sin uso o redundantes',
+        )
+
+    def handle(self, *args, **options):
+        reporte = AuditoriaIndicesService.auditar(app_label=options['app'], modelo=options['modelo'])
+        reinicio = AuditoriaIndicesService.reinicio_estadisticas()
+        self.stdout.write(f"Estadísticas desde: {reinicio or 'el inicio del servidor'}")
+
+        sin_uso = redundantes = 0
+        for modelo in reporte:
+            indices = modelo['indices']
+            if options['solo_problemas']:
+                indices = [i for i in indices if i['sin_uso'] or i['redundante_con']]
+                if not indices:
+                    continue
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{modelo['modelo']} ({modelo['tabla']})"))
+            for indice in indices:
+                marcas = []
+                if indice['sin_uso']:
+                    marcas.append('SIN USO')
+                    sin_uso += 1
+                if indice['redundante_con']:
+                    marcas.append(f"REDUNDANTE con {indice['redundante_con']}")
+                    redundantes += 1
+                linea = (
+                    f"  {indice['nombre']}: {indice['escaneos']} escaneo(s), "
+                    f"{indice['tamano'] / 1024:.0f} KiB"
+                )
+                if marcas:
+                    self.stdout.write(self.style.WARNING(f"{linea} [{', '.join(marcas)}]"))
+                else:
+                    self.stdout.write(linea)
+
+        resumen = f"\n{sin_uso} índice(s) sin uso, {redundantes} redundante(s)"
+        self.stdout.write(self.style.WARNING(resumen) if sin_uso or redundantes else self.style.SUCCESS(resumen))
@@ -0,0 +1,38 @@
+# api/odontogram/management/commands/compactar_versiones_odontograma.py
+# python manage.py compactar_versiones_odontograma [--paciente <uuid>]
+# Pasa los SNAPSHOT_COMPLETO con el odontograma en datos_nuevos al almacén de deltas
+
+from django.core.management.base import BaseCommand
+
+from api.odontogram.models import HistorialOdontograma
+from api.odontogram.services.versiones_service import VersionesOdontogramaService
+
+
+class Command(BaseCommand):
+    help = 'Compacta los snapshots completos del odontograma en versiones delta con keyframes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--paciente',
+            action='append',
+            dest='pacientes',
+            help='ID del paciente a compactar (repetible)',
+        )
+
+    def handle(self, *args, **options):
+        queryset = HistorialOdontograma.objects.filter(
+            tipo_cambio=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO,
+        ).exclude(datos_nuevos={})
+        if options.get('pacientes'):
+            queryset = queryset.filter(paciente_id__in=options['pacientes'])
+
+        pacientes = queryset.order_by().values_list('paciente_id', flat=True).distinct()
+        total_pacientes = total_snapshots = 0
+        # Una transacción por paciente
+        for paciente_id in list(pacientes):
+            total_snapshots += VersionesOdontogramaService.compactar_paciente(paciente_id)
+            total_pacientes += 1
+
+        self.stdout.write(self.style.SUCCESS(
+            f'{total_snapshots} snapshot(s) compactado(s) en {total_pacientes} paciente(s)'
+        ))
@@ -0,0 +1,65 @@
+# api/odontogram/management/commands/particiones_historial.py
+# python manage.py particiones_historial [--meses-futuros 3] [--archivar [--retencion 24]]
+# python manage.py particiones_historial --restaurar odonto_historial_odontograma 2024-03
+# Mantenimiento de las tablas de historial particionadas por mes (programar en cron, p. ej. diario)
+
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from common.services.particiones_service import PARTICIONADAS, ParticionesService
+
+
+class Command(BaseCommand):
+    help = 'Crea las particiones futuras del historial y archiva en el storage los meses antiguos'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--meses-futuros',
+            type=int,
+            help='Meses siguientes al actual con partición creada (por defecto HISTORIAL_PARTICIONES_MESES_FUTUROS)',
+        )
+        parser.add_argument(
+            '--archivar',
+            action='store_true',
+            help='Exporta y borra las particiones más antiguas que la retención',
+        )
+        parser.add_argument(
+            '--retencion',
+            type=int,
+            help='Meses que se conservan en la base (por defecto HISTORIAL_ARCHIVO_MESES)',
+        )
+        parser.add_argument(
+            '--restaurar',
+            nargs=2,
+            metavar=('TABLA', 'AAAA-MM'),
+            help='Vuelve a cargar un mes archivado',
+        )
+
+    def handle(self, *args, **options):
+        if options['restaurar']:
+            tabla, mes = options['restaurar']
+            if tabla not in PARTICIONADAS:
+                raise CommandError(f"Tabla no particionada: {tabla} (opciones: {', '.join(PARTICIONADAS)})")
+            try:
+                mes = datetime.strptime(mes, '%Y-%m').date()
+                filas = ParticionesService.restaurar(tabla, mes)
+            except (ValueError, FileNotFoundError) as e:
+                raise CommandError(str(e))
+            self.stdout.write(self.style.SUCCESS(f'{tabla} {mes:%Y-%m}: {filas} fila(s) restaurada(s)'))
+            return
+
+        creadas = ParticionesService.crear_futuras(options['meses_futuros'])
+        for nombre in creadas:
+            self.stdout.write(f'Partición creada: {nombre}')
+        self.stdout.write(self.style.SUCCESS(f'{len(creadas)} partición(es) creada(s)'))
+
+        if options['archivar']:
+            archivadas = ParticionesService.archivar(options['retencion'])
+            for archivada in archivadas:
+                self.stdout.write(
+                    f"Archivada: {archivada['tabla']} {archivada['mes']:%Y-%m} -> {archivada['object_key']} "
+                    f"({archivada['filas']} fila(s), {archivada['bytes'] / 1024:.0f} KiB, "
+                    f"{archivada['conservadas']} conservada(s) en la base)"
+                )
+            self.stdout.write(self.style.SUCCESS(f'{len(archivadas)} partición(es) archivada(s)'))
@@ -0,0 +1,33 @@
+# api/odontogram/management/commands/rellenar_paciente_odontograma.py
+# python manage.py rellenar_paciente_odontograma [--lote 5000]
+# Backfill en línea de paciente_id en diagnósticos dentales e historial del odontograma
+
+from django.core.management.base import BaseCommand
+
+from api.odontogram.services.paciente_desnormalizado_service import (
+    LOTE_POR_DEFECTO,
+    PacienteDesnormalizadoService,
+)
+
+
+class Command(BaseCommand):
+    help = 'Rellena por lotes la columna paciente_id desnormalizada del odontograma'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=LOTE_POR_DEFECTO,
+            help=f'Filas por transacción (por defecto {LOTE_POR_DEFECTO})',
+        )
+
+    def handle(self, *args, **options):
+        actualizadas = PacienteDesnormalizadoService.rellenar(lote=options['lote'], verbose=True)
+        for tabla, total in actualizadas.items():
+            self.stdout.write(f'{tabla}: {total} fila(s) actualizada(s)')
+
+        pendientes = PacienteDesnormalizadoService.pendientes()
+        if any(pendientes.values()):
+            self.stdout.write(self.style.WARNING(f'Filas aún sin paciente: {pendientes}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('Todas las filas tienen paciente_id'))
@@ -0,0 +1,51 @@
+# api/odontogram/management/commands/resumir_versiones_odontograma.py
+# python manage.py resumir_versiones_odontograma [--paciente <uuid>] [--todas] [--lote 1000]
+# Crea las cabeceras de versión (ResumenVersionOdontograma) a partir del historial existente
+
+from django.core.management.base import BaseCommand
+
+from api.odontogram.models import HistorialOdontograma, ResumenVersionOdontograma
+from api.odontogram.services.resumen_version_service import ResumenVersionService
+
+
+class Command(BaseCommand):
+    help = 'Crea o recalcula las cabeceras de versión del odontograma desde HistorialOdontograma'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--paciente',
+            action='append',
+            dest='pacientes',
+            help='ID del paciente a resumir (repetible)',
+        )
+        parser.add_argument(
+            '--todas',
+            action='store_true',
+            help='Recalcula también las versiones que ya tienen cabecera',
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Versiones por lote (por defecto 1000)',
+        )
+
+    def handle(self, *args, **options):
+        versiones = HistorialOdontograma.objects.order_by()
+        if options.get('pacientes'):
+            versiones = versiones.filter(paciente_id__in=options['pacientes'])
+        if not options['todas']:
+            versiones = versiones.exclude(
+                version_id__in=ResumenVersionOdontograma.objects.values('version_id')
+            )
+
+        lote, total = [], 0
+        for version_id in versiones.values_list('version_id', flat=True).distinct().iterator():
+            lote.append(version_id)
+            if len(lote) >= options['lote']:
+                total += len(ResumenVersionService.resumir(lote))
+                lote = []
+        if lote:
+            total += len(ResumenVersionService.resumir(lote))
+
+        self.stdout.write(self.style.SUCCESS(f'{total} cabecera(s) de versión creada(s) o actualizada(s)'))
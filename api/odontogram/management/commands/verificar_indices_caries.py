@@ -0,0 +1,65 @@
+# api/odontogram/management/commands/verificar_indices_caries.py
+# python manage.py verificar_indices_caries [--paciente <uuid>] [--corregir] [--reconstruir]
+# Pensado para ejecutarse periódicamente (cron) y detectar deriva del CPO/ceo incremental
+
+from django.core.management.base import BaseCommand
+
+from api.patients.models import Paciente
+from api.odontogram.services.indice_caries_incremental_service import (
+    IndiceCariesIncrementalService,
+)
+
+
+class Command(BaseCommand):
+    help = 'Compara los índices CPO/ceo acumulados con un recálculo completo y reporta deriva'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--paciente',
+            action='append',
+            dest='pacientes',
+            help='ID del paciente a verificar (repetible)',
+        )
+        parser.add_argument(
+            '--corregir',
+            action='store_true',
+            help='Reconstruye los acumulados con deriva',
+        )
+        parser.add_argument(
+            '--reconstruir',
+            action='store_true',
+            help='Crea o reconstruye el acumulado de todos los pacientes con odontograma',
+        )
+
+    def handle(self, *args, **options):
+        pacientes = options.get('pacientes')
+
+        if options['reconstruir']:
+            queryset = Paciente.objects.filter(dientes__isnull=False).distinct()
+            if pacientes:
+                queryset = queryset.filter(id__in=pacientes)
+            total = 0
+            for paciente_id in queryset.values_list('id', flat=True).iterator():
+                IndiceCariesIncrementalService.reconstruir(str(paciente_id))
+                total += 1
+            self.stdout.write(self.style.SUCCESS(f'{total} acumulado(s) reconstruido(s)'))
+            return
+
+        derivas = IndiceCariesIncrementalService.verificar(
+            paciente_ids=pacientes,
+            corregir=options['corregir'],
+        )
+
+        if not derivas:
+            self.stdout.write(self.style.SUCCESS('Sin deriva en los índices acumulados'))
+            return
+
+        for deriva in derivas:
+            detalle = ', '.join(
+                f"{campo}: {valores['acumulado']} != {valores['recalculado']}"
+                for campo, valores in deriva['diferencias'].items()
+            )
+            self.stdout.write(self.style.WARNING(f"Paciente {deriva['paciente_id']}: {detalle}"))
+
+        accion = 'corregido(s)' if options['corregir'] else 'con deriva'
+        self.stdout.write(self.style.WARNING(f'{len(derivas)} paciente(s) {accion}'))
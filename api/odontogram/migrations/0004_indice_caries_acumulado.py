@@ -0,0 +1,37 @@
+# Generated by Django 5.1.6 on 2026-10-18 21:03
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('odontogram', '0003_cargar_catalogo_csv'),
+        ('patients', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='IndiceCariesAcumulado',
+            fields=[
+                ('paciente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='indice_caries_acumulado', serialize=False, to='patients.paciente', verbose_name='Paciente')),
+                ('piezas', models.JSONField(blank=True, default=dict)),
+                ('cpo_c', models.PositiveIntegerField(default=0)),
+                ('cpo_p', models.PositiveIntegerField(default=0)),
+                ('cpo_o', models.PositiveIntegerField(default=0)),
+                ('cpo_total', models.PositiveIntegerField(default=0)),
+                ('ceo_c', models.PositiveIntegerField(default=0)),
+                ('ceo_e', models.PositiveIntegerField(default=0)),
+                ('ceo_o', models.PositiveIntegerField(default=0)),
+                ('ceo_total', models.PositiveIntegerField(default=0)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('fecha_verificacion', models.DateTimeField(blank=True, help_text='Última comparación contra el recálculo completo', null=True)),
+            ],
+            options={
+                'verbose_name': 'Índice de caries acumulado',
+                'verbose_name_plural': 'Índices de caries acumulados',
+                'db_table': 'odonto_indice_caries_acumulado',
+            },
+        ),
+    ]
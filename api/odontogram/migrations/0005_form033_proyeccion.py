@@ -0,0 +1,29 @@
+# Generated by Django 5.1.6 on 2026-10-18 21:07
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('odontogram', '0004_indice_caries_acumulado'),
+        ('patients', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Form033Proyeccion',
+            fields=[
+                ('paciente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='form033_proyeccion', serialize=False, to='patients.paciente', verbose_name='Paciente')),
+                ('version_id', models.UUIDField(blank=True, help_text='HistorialOdontograma.version_id con el que se construyó', null=True)),
+                ('matrices', models.JSONField(blank=True, default=dict)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Proyección Form033',
+                'verbose_name_plural': 'Proyecciones Form033',
+                'db_table': 'odonto_form033_proyeccion',
+            },
+        ),
+    ]
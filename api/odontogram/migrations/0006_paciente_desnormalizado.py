@@ -0,0 +1,35 @@
+# Generated by Django 5.1.6 on 2026-10-18 22:32
+
+import django.db.models.deletion
+from django.conf import settings
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Columna nullable (sin reescribir la tabla) e índices CONCURRENTLY:
+    # se aplica sin bloquear escrituras. El relleno va en 0007.
+    atomic = False
+
+    dependencies = [
+        ('odontogram', '0005_form033_proyeccion'),
+        ('patients', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='diagnosticodental',
+            name='paciente',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='diagnosticos_dentales', to='patients.paciente'),
+        ),
+        migrations.AddField(
+            model_name='historialodontograma',
+            name='paciente',
+            field=models.ForeignKey(db_index=False, editable=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='historial_odontograma', to='patients.paciente'),
+        ),
+        AddIndexConcurrently(
+            model_name='historialodontograma',
+            index=models.Index(fields=['paciente', '-fecha'], name='idx_historial_paciente_fecha'),
+        ),
+    ]
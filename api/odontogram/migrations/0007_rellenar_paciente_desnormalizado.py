@@ -0,0 +1,50 @@
+from django.db import migrations, transaction
+
+LOTE = 5000
+
+# Sin SKIP LOCKED: cada lote espera a las filas bloqueadas, así un lote vacío
+# significa que no quedan filas sin paciente_id
+SQL_LOTES = [
+    """
+    UPDATE odonto_diagnostico_dental AS d
+    SET paciente_id = di.paciente_id
+    FROM odonto_superficie_dental s, odontogram_diente di
+    WHERE d.id IN (SELECT id FROM odonto_diagnostico_dental WHERE paciente_id IS NULL LIMIT %s)
+    AND s.id = d.superficie_id
+    AND di.id = s.diente_id
+    """,
+    """
+    UPDATE odonto_historial_odontograma AS h
+    SET paciente_id = di.paciente_id
+    FROM odontogram_diente di
+    WHERE h.id IN (SELECT id FROM odonto_historial_odontograma WHERE paciente_id IS NULL LIMIT %s)
+    AND di.id = h.diente_id
+    """,
+]
+
+
+def rellenar_paciente(apps, schema_editor):
+    """Rellena paciente_id por lotes (una transacción por lote).
+
+    Con tablas grandes puede omitirse aquí y correr después, en línea:
+        python manage.py rellenar_paciente_odontograma
+    """
+    conexion = schema_editor.connection
+    for sql in SQL_LOTES:
+        while True:
+            with transaction.atomic(using=conexion.alias), conexion.cursor() as cursor:
+                cursor.execute(sql, [LOTE])
+                if cursor.rowcount == 0:
+                    break
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('odontogram', '0006_paciente_desnormalizado'),
+    ]
+
+    operations = [
+        migrations.RunPython(rellenar_paciente, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.6 on 2026-10-18 22:44
+
+import django.db.models.deletion
+import django.utils.timezone
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('odontogram', '0007_rellenar_paciente_desnormalizado'),
+        ('patients', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionOdontograma',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('version_id', models.UUIDField(help_text='HistorialOdontograma.version_id del snapshot', unique=True)),
+                ('numero', models.PositiveIntegerField(help_text='Orden de la versión dentro del paciente (1, 2, ...)')),
+                ('es_keyframe', models.BooleanField(default=False)),
+                ('comprimido', models.BooleanField(default=False)),
+                ('contenido', models.BinaryField(help_text='JSON del estado (keyframe) o del delta; zlib si comprimido')),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('paciente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='versiones_odontograma', to='patients.paciente', verbose_name='Paciente')),
+            ],
+            options={
+                'verbose_name': 'Versión de odontograma',
+                'verbose_name_plural': 'Versiones de odontograma',
+                'db_table': 'odonto_version_odontograma',
+                'ordering': ['paciente', 'numero'],
+                'constraints': [models.UniqueConstraint(fields=('paciente', 'numero'), name='uniq_version_odontograma_numero')],
+            },
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.1.6 on 2026-10-18 22:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('odontogram', '0008_version_odontograma'),
+        ('patients', '0002_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenVersionOdontograma',
+            fields=[
+                ('version_id', models.UUIDField(editable=False, primary_key=True, serialize=False)),
+                ('fecha', models.DateTimeField(help_text='Fecha del primer cambio de la versión')),
+                ('fecha_ultimo_cambio', models.DateTimeField()),
+                ('total_cambios', models.PositiveIntegerField(default=0)),
+                ('cambios_por_tipo', models.JSONField(blank=True, default=dict, help_text='{tipo_cambio: cantidad}')),
+                ('guardado_completo', models.BooleanField(default=False, help_text='La versión tiene SNAPSHOT_COMPLETO')),
+                ('odontologo', models.ForeignKey(null=True, on_delete=django.db.models.deletion.PROTECT, related_name='versiones_odontograma', to=settings.AUTH_USER_MODEL)),
+                ('paciente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_version_odontograma', to='patients.paciente', verbose_name='Paciente')),
+                ('snapshot_caries', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='odontogram.indicecariessnapshot')),
+            ],
+            options={
+                'verbose_name': 'Resumen de versión del odontograma',
+                'verbose_name_plural': 'Resúmenes de versiones del odontograma',
+                'db_table': 'odonto_resumen_version_odontograma',
+                'ordering': ['-fecha', '-version_id'],
+                'indexes': [models.Index(fields=['paciente', '-fecha', '-version_id'], name='idx_resumen_paciente_fecha')],
+            },
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.1.6 on 2026-10-18 22:57
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Índices parciales (WHERE activo) creados CONCURRENTLY antes de borrar los
+    # completos que reemplazan: las consultas calientes no quedan sin índice y
+    # la migración no bloquea escrituras. Si un CREATE INDEX CONCURRENTLY se
+    # interrumpe queda un índice INVALID: borrarlo y volver a migrar. Revertir
+    # recrea los índices anteriores.
+    atomic = False
+
+    dependencies = [
+        ('odontogram', '0009_resumen_version_odontograma'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='diagnosticodental',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['paciente', '-fecha'], name='idx_diag_paciente_act'),
+        ),
+        AddIndexConcurrently(
+            model_name='indicadoressaludbucal',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['paciente', '-fecha'], name='idx_indicador_paciente_act'),
+        ),
+        AddIndexConcurrently(
+            model_name='plantratamiento',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['paciente', '-fecha_creacion'], name='idx_plan_paciente_act'),
+        ),
+        AddIndexConcurrently(
+            model_name='sesiontratamiento',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['plan_tratamiento', 'numero_sesion'], name='idx_sesion_plan_act'),
+        ),
+        AddIndexConcurrently(
+            model_name='sesiontratamiento',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['fecha_programada'], name='idx_sesion_fecha_act'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='indicadoressaludbucal',
+            name='idx_indicador_paciente',
+        ),
+        RemoveIndexConcurrently(
+            model_name='indicadoressaludbucal',
+            name='idx_indicador_activo',
+        ),
+        RemoveIndexConcurrently(
+            model_name='sesiontratamiento',
+            name='odontogram__plan_tr_9a4cf9_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='sesiontratamiento',
+            name='odontogram__fecha_p_140599_idx',
+        ),
+    ]
@@ -0,0 +1,55 @@
+# Generated by Django 5.1.6 on 2026-10-18 23:06
+
+import django.db.models.deletion
+import uuid
+from django.conf import settings
+from django.contrib.postgres.operations import RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Índices redundantes del historial: prefijos de otro índice (idx_diente,
+    # idx_odontologo, idx_version y los implícitos de diente_id, odontologo_id
+    # y version_id) o que ninguna consulta necesita: idx_tipo_fecha (tipo_cambio
+    # siempre va junto a version_id o paciente).
+    # Solo se borran índices: los AlterField únicamente hacen DROP INDEX.
+    atomic = False
+
+    dependencies = [
+        ('odontogram', '0010_indices_parciales_activos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        RemoveIndexConcurrently(
+            model_name='historialodontograma',
+            name='idx_diente',
+        ),
+        RemoveIndexConcurrently(
+            model_name='historialodontograma',
+            name='idx_odontologo',
+        ),
+        RemoveIndexConcurrently(
+            model_name='historialodontograma',
+            name='idx_version',
+        ),
+        RemoveIndexConcurrently(
+            model_name='historialodontograma',
+            name='idx_tipo_fecha',
+        ),
+        migrations.AlterField(
+            model_name='historialodontograma',
+            name='diente',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='historial', to='odontogram.diente'),
+        ),
+        migrations.AlterField(
+            model_name='historialodontograma',
+            name='odontologo',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.PROTECT, related_name='cambios_odontograma', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='historialodontograma',
+            name='version_id',
+            field=models.UUIDField(default=uuid.uuid4, editable=False, help_text='ID de la versión del odontograma'),
+        ),
+    ]
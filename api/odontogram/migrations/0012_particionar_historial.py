@@ -0,0 +1,175 @@
+import re
+
+from django.db import migrations, transaction
+
+# Tabla -> columna de partición
+TABLAS = {'odonto_historial_odontograma': 'fecha'}
+MESES_FUTUROS = 3
+LOTE = 5000
+
+
+def _nueva(tabla):
+    return f'{tabla}_particionada'
+
+
+def _sumar_meses(mes, cantidad):
+    indice = mes.year * 12 + mes.month - 1 + cantidad
+    return mes.replace(year=indice // 12, month=indice % 12 + 1, day=1)
+
+
+def _existe(cursor, nombre):
+    cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [nombre])
+    return cursor.fetchone()[0]
+
+
+def _es_particionada(cursor, tabla):
+    cursor.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = %s::regclass", [tabla])
+    return cursor.fetchone()[0]
+
+
+def _definiciones(cursor, tabla):
+    """(nombre de la PK, índices, FK) de `tabla`"""
+    cursor.execute(
+        "SELECT conname, contype, pg_get_constraintdef(oid) FROM pg_constraint "
+        "WHERE conrelid = %s::regclass AND contype IN ('p', 'f')",
+        [tabla],
+    )
+    restricciones = cursor.fetchall()
+    cursor.execute(
+        "SELECT c.relname, pg_get_indexdef(x.indexrelid) "
+        "FROM pg_index x JOIN pg_class c ON c.oid = x.indexrelid "
+        "WHERE x.indrelid = %s::regclass AND NOT x.indisprimary ORDER BY c.relname",
+        [tabla],
+    )
+    indices = cursor.fetchall()
+    pk = next(nombre for nombre, tipo, _ in restricciones if tipo == 'p')
+    fks = [(nombre, definicion) for nombre, tipo, definicion in restricciones if tipo == 'f']
+    return pk, indices, fks
+
+
+def _crear_indices(cursor, tabla, origen, indices, sufijo=''):
+    en_origen = re.compile(rf' ON (ONLY )?(\S+\.)?{re.escape(origen)} ')
+    for nombre, definicion in indices:
+        definicion = en_origen.sub(f' ON {tabla} ', definicion)
+        cursor.execute(definicion.replace(f' INDEX {nombre} ', f' INDEX {nombre}{sufijo} ', 1))
+
+
+def _crear_fks(cursor, tabla, fks):
+    for nombre, definicion in fks:
+        cursor.execute(f'ALTER TABLE {tabla} ADD CONSTRAINT {nombre} {definicion}')
+
+
+def _particionar(conexion, tabla, columna, lote=LOTE):
+    """
+    Convierte `tabla` en particionada por mes. Las filas se copian por lotes
+    (una transacción cada uno) a `<tabla>_particionada` mientras la tabla
+    original sigue en uso; al final, con la tabla bloqueada, se copian las
+    filas insertadas durante la copia, se quitan las borradas y se cambia una
+    tabla por la otra. Las filas modificadas durante la copia no se vuelven a
+    copiar (el historial solo recibe inserciones: no correr
+    compactar_versiones_odontograma a la vez).
+    """
+    nueva = _nueva(tabla)
+    with transaction.atomic(using=conexion.alias), conexion.cursor() as cursor:
+        if _es_particionada(cursor, tabla):
+            return
+        pk, indices, fks = _definiciones(cursor, tabla)
+        if _existe(cursor, nueva):
+            # Restos de una corrida interrumpida
+            cursor.execute(f'DROP TABLE {nueva}')
+        cursor.execute(
+            f'CREATE TABLE {nueva} (LIKE {tabla} INCLUDING DEFAULTS INCLUDING STORAGE) '
+            f'PARTITION BY RANGE ({columna})'
+        )
+        cursor.execute(
+            f"SELECT date_trunc('month', MIN({columna}) AT TIME ZONE 'UTC')::date, "
+            f"date_trunc('month', now() AT TIME ZONE 'UTC')::date FROM {tabla}"
+        )
+        primero, actual = cursor.fetchone()
+        mes = min(primero or actual, actual)
+        while mes <= _sumar_meses(actual, MESES_FUTUROS):
+            cursor.execute(
+                f'CREATE TABLE {tabla}_p{mes:%Y%m} PARTITION OF {nueva} FOR VALUES FROM (%s) TO (%s)',
+                [f'{mes:%Y-%m-%d} 00:00:00+00', f'{_sumar_meses(mes, 1):%Y-%m-%d} 00:00:00+00'],
+            )
+            mes = _sumar_meses(mes, 1)
+        cursor.execute(f'CREATE TABLE {tabla}_pdefault PARTITION OF {nueva} DEFAULT')
+        cursor.execute(f'ALTER TABLE {nueva} ADD CONSTRAINT {nueva}_pkey PRIMARY KEY (id, {columna})')
+
+    desde = '00000000-0000-0000-0000-000000000000'
+    while True:
+        with transaction.atomic(using=conexion.alias), conexion.cursor() as cursor:
+            cursor.execute(
+                f'SELECT id FROM (SELECT id FROM {tabla} WHERE id > %s ORDER BY id LIMIT %s) lote '
+                f'ORDER BY id DESC LIMIT 1',
+                [desde, lote],
+            )
+            fila = cursor.fetchone()
+            if fila is None:
+                break
+            hasta = fila[0]
+            cursor.execute(f'INSERT INTO {nueva} SELECT * FROM {tabla} WHERE id > %s AND id <= %s', [desde, hasta])
+        desde = hasta
+
+    # Índices con nombre provisional: se construyen antes del bloqueo
+    with transaction.atomic(using=conexion.alias), conexion.cursor() as cursor:
+        _crear_indices(cursor, nueva, tabla, indices, sufijo='_nuevo')
+
+    with transaction.atomic(using=conexion.alias), conexion.cursor() as cursor:
+        cursor.execute(f'LOCK TABLE {tabla} IN ACCESS EXCLUSIVE MODE')
+        cursor.execute(
+            f'INSERT INTO {nueva} SELECT * FROM {tabla} t '
+            f'WHERE NOT EXISTS (SELECT 1 FROM {nueva} n WHERE n.id = t.id)'
+        )
+        cursor.execute(
+            f'DELETE FROM {nueva} n WHERE NOT EXISTS (SELECT 1 FROM {tabla} t WHERE t.id = n.id)'
+        )
+        cursor.execute(f'DROP TABLE {tabla}')
+        cursor.execute(f'ALTER TABLE {nueva} RENAME TO {tabla}')
+        cursor.execute(f'ALTER TABLE {tabla} RENAME CONSTRAINT {nueva}_pkey TO {pk}')
+        for nombre, _ in indices:
+            cursor.execute(f'ALTER INDEX {nombre}_nuevo RENAME TO {nombre}')
+        _crear_fks(cursor, tabla, fks)
+
+
+def _despartir(conexion, tabla):
+    """Vuelve `tabla` a una tabla simple con todas sus filas (los meses archivados no se recuperan)"""
+    simple = f'{tabla}_simple'
+    with transaction.atomic(using=conexion.alias), conexion.cursor() as cursor:
+        if not _es_particionada(cursor, tabla):
+            return
+        pk, indices, fks = _definiciones(cursor, tabla)
+        cursor.execute(f'CREATE TABLE {simple} (LIKE {tabla} INCLUDING DEFAULTS INCLUDING STORAGE)')
+        cursor.execute(f'INSERT INTO {simple} SELECT * FROM {tabla}')
+        cursor.execute(f'DROP TABLE {tabla} CASCADE')
+        cursor.execute(f'ALTER TABLE {simple} RENAME TO {tabla}')
+        cursor.execute(f'ALTER TABLE {tabla} ADD CONSTRAINT {pk} PRIMARY KEY (id)')
+        _crear_indices(cursor, tabla, simple, indices)
+        _crear_fks(cursor, tabla, fks)
+
+
+def particionar(apps, schema_editor):
+    for tabla, columna in TABLAS.items():
+        _particionar(schema_editor.connection, tabla, columna)
+
+
+def despartir(apps, schema_editor):
+    for tabla in TABLAS:
+        _despartir(schema_editor.connection, tabla)
+
+
+class Migration(migrations.Migration):
+    # En adelante los índices de esta tabla no admiten CONCURRENTLY (índices
+    # particionados): usar AddIndex/RemoveIndex.
+    #
+    # SQL congelado aquí (no usa ParticionesService). Sin transacción propia:
+    # cada lote de la copia confirma por separado.
+    atomic = False
+
+    dependencies = [
+        ('odontogram', '0011_consolidar_indices_historial'),
+    ]
+
+    operations = [
+        migrations.RunPython(particionar, despartir),
+    ]
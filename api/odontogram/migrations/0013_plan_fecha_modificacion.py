@@ -0,0 +1,18 @@
+# Generated by Django 5.1.6 on 2026-10-18 23:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('odontogram', '0012_particionar_historial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='plantratamiento',
+            name='fecha_modificacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.1.6 on 2026-10-18 23:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('odontogram', '0013_plan_fecha_modificacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenPlanTratamiento',
+            fields=[
+                ('plan', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='resumen', serialize=False, to='odontogram.plantratamiento')),
+                ('total_sesiones', models.PositiveIntegerField(default=0)),
+                ('sesiones_por_estado', models.JSONField(blank=True, default=dict, help_text='{estado: cantidad}')),
+                ('total_diagnosticos', models.PositiveIntegerField(default=0)),
+                ('total_procedimientos', models.PositiveIntegerField(default=0)),
+                ('total_prescripciones', models.PositiveIntegerField(default=0)),
+                ('fecha_ultima_sesion', models.DateTimeField(blank=True, null=True)),
+                ('sesiones', models.JSONField(blank=True, default=list, help_text='Detalle de las sesiones activas ordenadas por número')),
+                ('diagnosticos_consolidados', models.JSONField(blank=True, default=list)),
+                ('procedimientos_consolidados', models.JSONField(blank=True, default=list)),
+                ('prescripciones_consolidadas', models.JSONField(blank=True, default=list)),
+                ('fecha_calculo', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Resumen de plan de tratamiento',
+                'verbose_name_plural': 'Resúmenes de planes de tratamiento',
+                'db_table': 'odontogram_resumen_plan_tratamiento',
+            },
+        ),
+    ]
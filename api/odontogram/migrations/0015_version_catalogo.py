@@ -0,0 +1,33 @@
+# Generated by Django 5.1.6 on 2026-10-19 00:30
+
+from django.db import migrations, models
+
+
+def crear_fila_version(apps, schema_editor):
+    """Fila única del contador de versiones del catálogo"""
+    VersionCatalogo = apps.get_model('odontogram', 'VersionCatalogo')
+    VersionCatalogo.objects.get_or_create(pk=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('odontogram', '0014_resumen_plan_tratamiento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VersionCatalogo',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('fecha_modificacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Versión del catálogo',
+                'verbose_name_plural': 'Versión del catálogo',
+                'db_table': 'odonto_version_catalogo',
+            },
+        ),
+        migrations.RunPython(crear_fila_version, migrations.RunPython.noop),
+    ]
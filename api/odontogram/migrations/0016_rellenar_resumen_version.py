@@ -0,0 +1,78 @@
+from django.db import migrations, transaction
+
+LOTE = 1000
+
+# Siguiente lote de versiones (orden de version_id, usa idx_version_fecha)
+SQL_LIMITE = """
+    SELECT version_id FROM (
+        SELECT DISTINCT version_id FROM odonto_historial_odontograma
+        WHERE version_id > %(desde)s ORDER BY version_id LIMIT %(lote)s
+    ) lote ORDER BY version_id DESC LIMIT 1
+"""
+
+# Cabeceras de las versiones en (desde, hasta]; mismo cálculo que ResumenVersionService.resumir
+SQL_RESUMIR = """
+    WITH por_tipo AS (
+        SELECT version_id, tipo_cambio, COUNT(*) AS cantidad, MIN(fecha) AS primera, MAX(fecha) AS ultima
+        FROM odonto_historial_odontograma
+        WHERE version_id > %(desde)s AND version_id <= %(hasta)s
+        GROUP BY version_id, tipo_cambio
+    ), versiones AS (
+        SELECT version_id, MIN(primera) AS fecha, MAX(ultima) AS fecha_ultimo_cambio,
+               SUM(cantidad) AS total_cambios, jsonb_object_agg(tipo_cambio, cantidad) AS cambios_por_tipo,
+               bool_or(tipo_cambio = 'snapshot_completo') AS guardado_completo
+        FROM por_tipo GROUP BY version_id
+    ), primeros AS (
+        SELECT DISTINCT ON (h.version_id) h.version_id, h.odontologo_id,
+               COALESCE(h.paciente_id, d.paciente_id) AS paciente_id
+        FROM odonto_historial_odontograma h JOIN odontogram_diente d ON d.id = h.diente_id
+        WHERE h.version_id > %(desde)s AND h.version_id <= %(hasta)s
+        ORDER BY h.version_id, h.fecha, h.id
+    ), caries AS (
+        SELECT DISTINCT ON (version_id) version_id, id
+        FROM odonto_indice_caries_snapshot
+        WHERE version_id > %(desde)s AND version_id <= %(hasta)s
+        ORDER BY version_id, fecha DESC
+    )
+    INSERT INTO odonto_resumen_version_odontograma (
+        version_id, paciente_id, odontologo_id, fecha, fecha_ultimo_cambio, total_cambios,
+        cambios_por_tipo, guardado_completo, snapshot_caries_id
+    )
+    SELECT v.version_id, p.paciente_id, p.odontologo_id, v.fecha, v.fecha_ultimo_cambio, v.total_cambios,
+           v.cambios_por_tipo, v.guardado_completo, c.id
+    FROM versiones v
+    JOIN primeros p ON p.version_id = v.version_id
+    LEFT JOIN caries c ON c.version_id = v.version_id
+    WHERE p.paciente_id IS NOT NULL
+    ON CONFLICT (version_id) DO NOTHING
+"""
+
+
+def rellenar_resumenes(apps, schema_editor):
+    """
+    Crea las cabeceras de las versiones existentes, una transacción por lote.
+    Corre después de 0012, que ya copió el historial a la tabla particionada.
+    """
+    conexion = schema_editor.connection
+    desde = '00000000-0000-0000-0000-000000000000'
+    while True:
+        with transaction.atomic(using=conexion.alias), conexion.cursor() as cursor:
+            cursor.execute(SQL_LIMITE, {'desde': desde, 'lote': LOTE})
+            fila = cursor.fetchone()
+            if fila is None:
+                return
+            hasta = fila[0]
+            cursor.execute(SQL_RESUMIR, {'desde': desde, 'hasta': hasta})
+        desde = hasta
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('odontogram', '0015_version_catalogo'),
+    ]
+
+    operations = [
+        migrations.RunPython(rellenar_resumenes, migrations.RunPython.noop),
+    ]
@@ -7,11 +7,13 @@ Estructura:
 """
 
 from django.db import models
+from django.db.models import Q
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator, MaxValueValidator
 import uuid
 
-from api.patients.models import Paciente
+from api.patients.models import ActivosManager, Paciente, SoftDeleteManager
+from common.services.particiones_service import HistorialParticionadoQuerySet
 from api.odontogram.constants import FDI_CHOICES, FDIConstants
 from api.odontogram.validators.validator_fdi import validar_codigo_fdi
 from django.utils import timezone
@@ -189,11 +191,35 @@ class DiagnosticoAtributoClinico(models.Model):
         return f"{self.diagnostico.siglas} → {self.tipo_atributo.nombre}"
 
 
+class VersionCatalogo(models.Model):
+    """
+    Contador de cambios del catálogo (una sola fila). Las señales del catálogo
+    lo incrementan en la misma transacción que el cambio; cada worker lo
+    compara con la versión de su copia en memoria y lo usa como ETag.
+    """
+    version = models.PositiveBigIntegerField(default=0)
+    fecha_modificacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'odonto_version_catalogo'
+        verbose_name = 'Versión del catálogo'
+        verbose_name_plural = 'Versión del catálogo'
+
+    def __str__(self):
+        return f"Catálogo v{self.version}"
+
+
 # =============================================================================
 # PARTE 2: ESTRUCTURA DE INSTANCIAS (PACIENTE -> DIENTE -> SUPERFICIE -> DIAGNÓSTICO)
 # =============================================================================
 
 
+def _agregar_update_field(kwargs, campo):
+    """Incluye `campo` en un save(update_fields=...) parcial"""
+    if kwargs.get('update_fields') is not None:
+        kwargs['update_fields'] = {*kwargs['update_fields'], campo}
+
+
 class Diente(models.Model):
     """
     Registro de diente de un paciente
@@ -476,6 +502,16 @@ class DiagnosticoDental(models.Model):
 
     # Relaciones
     superficie = models.ForeignKey(SuperficieDental, on_delete=models.CASCADE, related_name='diagnosticos')
+    # Desnormalizado de superficie.diente.paciente: las consultas por paciente
+    # usan un índice de esta tabla en vez de unir superficie y diente
+    paciente = models.ForeignKey(
+        Paciente,
+        on_delete=models.CASCADE,
+        related_name='diagnosticos_dentales',
+        null=True,
+        editable=False,
+        db_index=False,
+    )
     diagnostico_catalogo = models.ForeignKey(
         Diagnostico,
         on_delete=models.PROTECT,
@@ -560,6 +596,9 @@ class DiagnosticoDental(models.Model):
     # Control
     activo = models.BooleanField(default=True)
 
+    objects = SoftDeleteManager()
+    activos = ActivosManager()
+
     class Meta:
         db_table = 'odonto_diagnostico_dental'
         verbose_name = 'Diagnóstico Dental'
@@ -569,6 +608,7 @@ class DiagnosticoDental(models.Model):
             models.Index(fields=['superficie']),
             models.Index(fields=['estado_tratamiento']),
             models.Index(fields=['fecha']),
+            models.Index(fields=['paciente', '-fecha'], name='idx_diag_paciente_act', condition=Q(activo=True)),
         ]
 
     def __str__(self):
@@ -579,15 +619,16 @@ class DiagnosticoDental(models.Model):
         """Retorna la prioridad asignada o la del catálogo"""
         return self.prioridad_asignada or self.diagnostico_catalogo.prioridad
 
+    def save(self, *args, **kwargs):
+        if self.paciente_id is None:
+            self.paciente_id = self.superficie.diente.paciente_id
+            _agregar_update_field(kwargs, 'paciente')
+        super().save(*args, **kwargs)
+
     @property
     def diente(self):
         """Acceso rápido al diente"""
         return self.superficie.diente
-
-    @property
-    def paciente(self):
-        """Acceso rápido al paciente"""
-        return self.superficie.diente.paciente
     # Colores para renderización en formulario 033
     @property
     def color_hex(self):
@@ -650,7 +691,17 @@ class HistorialOdontograma(models.Model):
     """
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
 
-    diente = models.ForeignKey(Diente, on_delete=models.CASCADE, related_name='historial')
+    # Sin índice propio en las FK: los cubren idx_diente_fecha / idx_odontologo_fecha
+    diente = models.ForeignKey(Diente, on_delete=models.CASCADE, related_name='historial', db_index=False)
+    # Desnormalizado de diente.paciente (versiones y estadísticas por paciente)
+    paciente = models.ForeignKey(
+        Paciente,
+        on_delete=models.CASCADE,
+        related_name='historial_odontograma',
+        null=True,
+        editable=False,
+        db_index=False,
+    )
 
     class TipoCambio(models.TextChoices):
         DIAGNOSTICO_AGREGADO = 'diagnostico_agregado', 'Diagnóstico Agregado'
@@ -666,7 +717,9 @@ class HistorialOdontograma(models.Model):
     descripcion = models.TextField(help_text="Descripción del cambio")
 
     # Quién lo hizo
-    odontologo = models.ForeignKey(User, on_delete=models.PROTECT, related_name='cambios_odontograma')
+    odontologo = models.ForeignKey(
+        User, on_delete=models.PROTECT, related_name='cambios_odontograma', db_index=False
+    )
 
     # Cuándo
     fecha = models.DateTimeField(auto_now_add=True)
@@ -674,7 +727,10 @@ class HistorialOdontograma(models.Model):
     # Datos adicionales
     datos_anteriores = models.JSONField(default=dict, blank=True, help_text="Estado anterior (para auditoría)")
     datos_nuevos = models.JSONField(default=dict, blank=True, help_text="Estado nuevo (para auditoría)")
-    version_id = models.UUIDField(default=uuid.uuid4, editable=False, help_text="ID de la versión del odontograma", db_index=True)
+    version_id = models.UUIDField(default=uuid.uuid4, editable=False, help_text="ID de la versión del odontograma")
+
+    # Tabla particionada por mes (common/services/particiones_service.py)
+    objects = HistorialParticionadoQuerySet.as_manager()
 
     class Meta:
         db_table = 'odonto_historial_odontograma'
@@ -682,23 +738,67 @@ class HistorialOdontograma(models.Model):
         verbose_name_plural = 'Historial Odontogramas'
         ordering = ['-fecha']
         
+        # Tabla con más inserciones del sistema: cada índice extra se paga en
+        # cada guardado. Revisar con `python manage.py auditar_indices`.
         indexes = [
+            # Cambios de una versión (por_version, cabeceras, snapshot por versión)
             models.Index(fields=['version_id', '-fecha'], name='idx_version_fecha'),
+            # Historial por diente; también cubre el CASCADE desde Diente
             models.Index(fields=['diente', '-fecha'], name='idx_diente_fecha'),
+            # Filtro por odontólogo; también cubre el PROTECT desde Usuario
             models.Index(fields=['odontologo', '-fecha'], name='idx_odontologo_fecha'),
-            models.Index(fields=['diente'], name='idx_diente'),
+            # Historial y último snapshot del paciente
+            models.Index(fields=['paciente', '-fecha'], name='idx_historial_paciente_fecha'),
+            # Listado general ordenado por fecha (API y admin)
             models.Index(fields=['fecha'], name='idx_fecha'),
-            models.Index(fields=['odontologo'], name='idx_odontologo'),
-            models.Index(fields=['version_id'], name='idx_version'),
-            
-            models.Index(fields=['tipo_cambio', '-fecha'], name='idx_tipo_fecha'),
         ]
 
     def __str__(self):
         return f"{self.get_tipo_cambio_display()} - {self.diente.codigo_fdi} - {self.fecha.strftime('%d/%m/%Y')}"
-    
-    
-    
+
+    def save(self, *args, **kwargs):
+        if self.paciente_id is None:
+            self.paciente_id = self.diente.paciente_id
+            _agregar_update_field(kwargs, 'paciente')
+        super().save(*args, **kwargs)
+
+
+class VersionOdontograma(models.Model):
+    """
+    Estado del odontograma por versión guardada, codificado como delta por
+    diente respecto a la versión anterior del paciente, con un keyframe
+    (estado completo) cada ODONTOGRAMA_VERSIONES_KEYFRAME versiones.
+    Se lee con VersionesOdontogramaService.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+
+    paciente = models.ForeignKey(
+        Paciente,
+        on_delete=models.CASCADE,
+        related_name='versiones_odontograma',
+        verbose_name='Paciente'
+    )
+    version_id = models.UUIDField(unique=True, help_text="HistorialOdontograma.version_id del snapshot")
+    numero = models.PositiveIntegerField(help_text="Orden de la versión dentro del paciente (1, 2, ...)")
+    es_keyframe = models.BooleanField(default=False)
+    comprimido = models.BooleanField(default=False)
+    contenido = models.BinaryField(help_text="JSON del estado (keyframe) o del delta; zlib si comprimido")
+    fecha = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'odonto_version_odontograma'
+        verbose_name = 'Versión de odontograma'
+        verbose_name_plural = 'Versiones de odontograma'
+        ordering = ['paciente', 'numero']
+        constraints = [
+            models.UniqueConstraint(fields=['paciente', 'numero'], name='uniq_version_odontograma_numero'),
+        ]
+
+    def __str__(self):
+        tipo = 'keyframe' if self.es_keyframe else 'delta'
+        return f"Versión {self.numero} ({tipo}) - {self.paciente_id}"
+
+
 class IndiceCariesSnapshot(models.Model):
     """
     Snapshot de índices de caries (CPO / ceo) ligado a una versión del odontograma.
@@ -747,19 +847,130 @@ class IndiceCariesSnapshot(models.Model):
 
     def __str__(self):
         return f"CPO {self.cpo_total} / ceo {self.ceo_total} - {self.paciente_id} - {self.fecha.date()}"
-    
-class IndicadoresSaludBucalManager(models.Manager):
+
+
+class ResumenVersionOdontograma(models.Model):
+    """
+    Cabecera de una versión del odontograma (una fila por version_id):
+    quién y cuándo, cuántos cambios de cada tipo y el snapshot CPO asociado.
+    Sirve el listado de versiones sin agrupar HistorialOdontograma.
+    """
+    version_id = models.UUIDField(primary_key=True, editable=False)
+
+    paciente = models.ForeignKey(
+        Paciente,
+        on_delete=models.CASCADE,
+        related_name='resumenes_version_odontograma',
+        verbose_name='Paciente'
+    )
+    odontologo = models.ForeignKey(
+        User,
+        on_delete=models.PROTECT,
+        null=True,
+        related_name='versiones_odontograma',
+    )
+    fecha = models.DateTimeField(help_text="Fecha del primer cambio de la versión")
+    fecha_ultimo_cambio = models.DateTimeField()
+    total_cambios = models.PositiveIntegerField(default=0)
+    cambios_por_tipo = models.JSONField(default=dict, blank=True, help_text="{tipo_cambio: cantidad}")
+    guardado_completo = models.BooleanField(default=False, help_text="La versión tiene SNAPSHOT_COMPLETO")
+    snapshot_caries = models.ForeignKey(
+        IndiceCariesSnapshot,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+    )
+
+    class Meta:
+        db_table = 'odonto_resumen_version_odontograma'
+        verbose_name = 'Resumen de versión del odontograma'
+        verbose_name_plural = 'Resúmenes de versiones del odontograma'
+        ordering = ['-fecha', '-version_id']
+        indexes = [
+            models.Index(fields=['paciente', '-fecha', '-version_id'], name='idx_resumen_paciente_fecha'),
+        ]
+
+    def __str__(self):
+        return f"Versión {self.version_id} - {self.total_cambios} cambios - {self.fecha.strftime('%d/%m/%Y')}"
+
+
+class IndiceCariesAcumulado(models.Model):
+    """
+    Conteo vigente de CPO / ceo por paciente, mantenido de forma incremental.
+    `piezas` guarda por diente los contadores de diagnósticos activos que
+    aportan cada bandera: {fdi: [caries, obturado, perdido, extraccion_indicada, ausente]}.
+    """
+    paciente = models.OneToOneField(
+        Paciente,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='indice_caries_acumulado',
+        verbose_name='Paciente'
+    )
+    piezas = models.JSONField(default=dict, blank=True)
+
+    cpo_c = models.PositiveIntegerField(default=0)
+    cpo_p = models.PositiveIntegerField(default=0)
+    cpo_o = models.PositiveIntegerField(default=0)
+    cpo_total = models.PositiveIntegerField(default=0)
+
+    ceo_c = models.PositiveIntegerField(default=0)
+    ceo_e = models.PositiveIntegerField(default=0)
+    ceo_o = models.PositiveIntegerField(default=0)
+    ceo_total = models.PositiveIntegerField(default=0)
+
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+    fecha_verificacion = models.DateTimeField(
+        null=True,
+        blank=True,
+        help_text="Última comparación contra el recálculo completo"
+    )
+
+    class Meta:
+        db_table = 'odonto_indice_caries_acumulado'
+        verbose_name = 'Índice de caries acumulado'
+        verbose_name_plural = 'Índices de caries acumulados'
+
+    def __str__(self):
+        return f"CPO {self.cpo_total} / ceo {self.ceo_total} - {self.paciente_id}"
+
+
+class Form033Proyeccion(models.Model):
+    """
+    Proyección materializada del Formulario 033 (matrices permanente y temporal)
+    para la última versión del odontograma del paciente.
+    """
+    paciente = models.OneToOneField(
+        Paciente,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='form033_proyeccion',
+        verbose_name='Paciente'
+    )
+    version_id = models.UUIDField(
+        null=True,
+        blank=True,
+        help_text="HistorialOdontograma.version_id con el que se construyó"
+    )
+    matrices = models.JSONField(default=dict, blank=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'odonto_form033_proyeccion'
+        verbose_name = 'Proyección Form033'
+        verbose_name_plural = 'Proyecciones Form033'
+
+    def __str__(self):
+        return f"Form033 {self.paciente_id} - versión {self.version_id}"
+
+
+class IndicadoresSaludBucalManager(ActivosManager):
     """Manager que filtra solo registros activos por defecto"""
-    
-    def get_queryset(self):
-        return super().get_queryset().filter(activo=True)
 
 
-class IndicadoresSaludBucalAllManager(models.Manager):
+class IndicadoresSaludBucalAllManager(SoftDeleteManager):
     """Manager que incluye todos los registros (activos e inactivos)"""
-    
-    def get_queryset(self):
-        return super().get_queryset()
 class IndicadoresSaludBucal(models.Model):
     class NivelPeriodontal(models.TextChoices):
         LEVE = "LEVE", "Leve"
@@ -958,8 +1169,7 @@ class IndicadoresSaludBucal(models.Model):
         verbose_name = 'Indicador de Salud Bucal'
         verbose_name_plural = 'Indicadores de Salud Bucal'
         indexes = [
-            models.Index(fields=['paciente', '-fecha', 'activo'], name='idx_indicador_paciente'),
-            models.Index(fields=['activo'], name='idx_indicador_activo'),
+            models.Index(fields=['paciente', '-fecha'], name='idx_indicador_paciente_act', condition=Q(activo=True)),
         ]
     
     def __str__(self):
@@ -1017,6 +1227,8 @@ class PlanTratamiento(models.Model):
         related_name='planes_editados'
     )
     fecha_edicion = models.DateTimeField(null=True, blank=True)
+    # Cambia con cualquier save (también sin usuario); marcador de versión para ETag
+    fecha_modificacion = models.DateTimeField(auto_now=True)
     
     # Eliminado lógico
     activo = models.BooleanField(default=True)
@@ -1028,12 +1240,20 @@ class PlanTratamiento(models.Model):
         related_name='planes_eliminados'
     )
     fecha_eliminacion = models.DateTimeField(null=True, blank=True)
+
+    objects = SoftDeleteManager()
+    activos = ActivosManager()
     
     class Meta:
         db_table = 'odontogram_plan_tratamiento'
         ordering = ['-fecha_creacion']
         verbose_name = 'Plan de Tratamiento'
         verbose_name_plural = 'Planes de Tratamiento'
+        indexes = [
+            models.Index(
+                fields=['paciente', '-fecha_creacion'], name='idx_plan_paciente_act', condition=Q(activo=True),
+            ),
+        ]
     
     def __str__(self):
         return f"Plan {self.paciente.nombres} {self.paciente.apellidos} - {self.fecha_creacion.date()}"
@@ -1154,6 +1374,9 @@ class SesionTratamiento(models.Model):
         related_name='sesiones_eliminadas'
     )
     fecha_eliminacion = models.DateTimeField(null=True, blank=True)
+
+    objects = SoftDeleteManager()
+    activos = ActivosManager()
     
     class Meta:
         db_table = 'odontogram_sesion_tratamiento'
@@ -1162,8 +1385,10 @@ class SesionTratamiento(models.Model):
         verbose_name = 'Sesión de Tratamiento'
         verbose_name_plural = 'Sesiones de Tratamiento'
         indexes = [
-            models.Index(fields=['plan_tratamiento', 'numero_sesion']),
-            models.Index(fields=['fecha_programada']),
+            models.Index(
+                fields=['plan_tratamiento', 'numero_sesion'], name='idx_sesion_plan_act', condition=Q(activo=True),
+            ),
+            models.Index(fields=['fecha_programada'], name='idx_sesion_fecha_act', condition=Q(activo=True)),
             models.Index(fields=['estado']),
         ]
     
@@ -1232,3 +1457,40 @@ class SesionTratamiento(models.Model):
     
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_modificacion = models.DateTimeField(auto_now=True)
+
+
+class ResumenPlanTratamiento(models.Model):
+    """
+    Resumen precalculado de un plan de tratamiento (una fila por plan):
+    sesiones por estado, totales y listas consolidadas de diagnósticos,
+    procedimientos y prescripciones. Se recalcula al guardar o eliminar
+    sesiones; los endpoints de resumen y estadísticas lo leen sin recorrer
+    los JSON de cada SesionTratamiento.
+    """
+    plan = models.OneToOneField(
+        PlanTratamiento,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='resumen',
+    )
+    total_sesiones = models.PositiveIntegerField(default=0)
+    sesiones_por_estado = models.JSONField(default=dict, blank=True, help_text="{estado: cantidad}")
+    total_diagnosticos = models.PositiveIntegerField(default=0)
+    total_procedimientos = models.PositiveIntegerField(default=0)
+    total_prescripciones = models.PositiveIntegerField(default=0)
+    fecha_ultima_sesion = models.DateTimeField(null=True, blank=True)
+    sesiones = models.JSONField(
+        default=list, blank=True, help_text="Detalle de las sesiones activas ordenadas por número"
+    )
+    diagnosticos_consolidados = models.JSONField(default=list, blank=True)
+    procedimientos_consolidados = models.JSONField(default=list, blank=True)
+    prescripciones_consolidadas = models.JSONField(default=list, blank=True)
+    fecha_calculo = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'odontogram_resumen_plan_tratamiento'
+        verbose_name = 'Resumen de plan de tratamiento'
+        verbose_name_plural = 'Resúmenes de planes de tratamiento'
+
+    def __str__(self):
+        return f"Resumen plan {self.plan_id} - {self.total_sesiones} sesiones"
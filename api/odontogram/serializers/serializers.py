@@ -22,6 +22,7 @@ from api.odontogram.models import (
 )
 from api.odontogram.constants import ESCALA_CALCULO, ESCALA_GINGIVITIS, ESCALA_PLACA, NIVELES_FLUOROSIS, NIVELES_PERIODONTAL, TIPOS_OCLUSION
 from api.odontogram.services.piezas_service import PiezasIndiceService    
+from api.odontogram.services.versiones_service import VersionesOdontogramaService
 import logging
 logger = logging.getLogger(__name__)
 User = get_user_model()
@@ -345,7 +346,7 @@ class PacienteDetailSerializer(serializers.ModelSerializer):
 
     def get_total_diagnosticos(self, obj):
         return DiagnosticoDental.objects.filter(
-            superficie__diente__paciente=obj,
+            paciente=obj,
             activo=True
         ).count()
 
@@ -422,29 +423,22 @@ class DiagnosticoListSerializer(serializers.ModelSerializer):
     
     def get_atributos_relacionados(self, obj):
         """
-        Obtiene los atributos clínicos relacionados al diagnóstico
-        desde la tabla intermedia DiagnosticoAtributoClinico
+        Atributos clínicos relacionados al diagnóstico (tabla intermedia
+        DiagnosticoAtributoClinico), leídos del catálogo en memoria
         """
-        from api.odontogram.models import DiagnosticoAtributoClinico
-        
-        # Obtener relaciones de este diagnóstico
-        relaciones = DiagnosticoAtributoClinico.objects.filter(
-            diagnostico=obj
-        ).select_related('tipo_atributo').prefetch_related('tipo_atributo__opciones')
-        
-        atributos = []
-        for rel in relaciones:
-            tipo_attr = rel.tipo_atributo
-            
-            # Obtener opciones activas ordenadas
-            opciones = tipo_attr.opciones.filter(activo=True).order_by('orden')
-            
-            atributos.append({
+        from api.odontogram.services.catalogo_service import CatalogoDiagnosticosService
+
+        diagnostico = CatalogoDiagnosticosService.obtener().diagnostico_por_id(obj.id)
+        if diagnostico is None:
+            return []
+
+        return [
+            {
                 'key': tipo_attr.key,
                 'nombre': tipo_attr.nombre,
                 'descripcion': tipo_attr.descripcion,
                 'tipo_input': 'select',  # Puedes hacerlo dinámico si tienes un campo en TipoAtributoClinico
-                'requerido': rel.requerido if hasattr(rel, 'requerido') else False,
+                'requerido': False,
                 'opciones': [
                     {
                         'key': opc.key,
@@ -452,11 +446,11 @@ class DiagnosticoListSerializer(serializers.ModelSerializer):
                         'prioridad': opc.prioridad,
                         'orden': opc.orden,
                     }
-                    for opc in opciones
+                    for opc in tipo_attr.opciones_activas
                 ]
-            })
-        
-        return atributos
+            }
+            for tipo_attr in diagnostico.atributos
+        ]
 
 # =============================================================================
 # SERIALIZERS PARA HISTORIAL
@@ -475,6 +469,13 @@ class HistorialOdontogramaSerializer(serializers.ModelSerializer):
             'datos_anteriores', 'datos_nuevos', 'version_id'
         ]
         read_only_fields = ['id', 'fecha']
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Los snapshots nuevos guardan el odontograma en el almacén de versiones
+        if instance.tipo_cambio == HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO and not instance.datos_nuevos:
+            data['datos_nuevos'] = VersionesOdontogramaService.estado(instance.version_id) or {}
+        return data
     
     def get_odontologo_nombre(self, obj):
         if obj.odontologo:
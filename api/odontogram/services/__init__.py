@@ -4,6 +4,8 @@ from .piezas_service import PiezasIndiceService
 from .calculos_service import CalculosIndicadoresService
 from .odontogram_services import OdontogramaService
 from .indice_caries_service import IndiceCariesService
+from .indice_caries_incremental_service import IndiceCariesIncrementalService
+from .epidemiologia_service import EpidemiologiaService
 
 __all__ = [
     'IndicadoresSaludBucalService',
@@ -11,4 +13,6 @@ __all__ = [
     'CalculosIndicadoresService',
     'OdontogramaService',
     'IndiceCariesService',
+    'IndiceCariesIncrementalService',
+    'EpidemiologiaService',
 ]
\ No newline at end of file
@@ -0,0 +1,150 @@
+# api/odontogram/services/auditoria_indices_service.py
+"""
+Auditoría de índices a partir de las estadísticas de PostgreSQL.
+
+Para cada modelo del proyecto cruza pg_stat_user_indexes con pg_index y marca:
+- sin uso: idx_scan = 0 desde el último reinicio de estadísticas (no se
+  cuentan claves primarias ni índices únicos, que sostienen restricciones);
+- redundante: sus columnas son un prefijo de otro índice de la misma tabla
+  con la misma condición (el índice más largo ya sirve esas búsquedas).
+
+En las tablas particionadas (historial) se reporta el índice de la tabla
+padre con los escaneos y el tamaño sumados de todas sus particiones.
+
+Las estadísticas son por servidor y se acumulan con el tráfico real, así que
+el reporte es útil en producción o en una réplica, no en una base recién creada.
+"""
+import logging
+from typing import Any, Dict, List, Optional
+
+from django.apps import apps
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# Los índices de las particiones se suman en el índice particionado de la tabla padre
+SQL_INDICES = """
+    WITH uso AS (
+        SELECT COALESCE(tabla_padre.relname, s.relname) AS tabla,
+               COALESCE(indice_padre.inhparent, s.indexrelid) AS indexrelid,
+               s.idx_scan,
+               pg_relation_size(s.indexrelid) AS tamano
+        FROM pg_stat_user_indexes s
+        LEFT JOIN pg_inherits indice_padre ON indice_padre.inhrelid = s.indexrelid
+        LEFT JOIN pg_inherits particion ON particion.inhrelid = s.relid
+        LEFT JOIN pg_class tabla_padre ON tabla_padre.oid = particion.inhparent
+    )
+    SELECT uso.tabla,
+           c.relname,
+           SUM(uso.idx_scan)::bigint,
+           SUM(uso.tamano)::bigint,
+           i.indisunique,
+           i.indisprimary,
+           i.indkey::int2[],
+           i.indoption::int2[],
+           i.indexprs IS NOT NULL,
+           pg_get_expr(i.indpred, i.indrelid),
+           pg_get_indexdef(uso.indexrelid)
+    FROM uso
+    JOIN pg_index i ON i.indexrelid = uso.indexrelid
+    JOIN pg_class c ON c.oid = uso.indexrelid
+    WHERE uso.tabla = ANY(%s)
+    GROUP BY uso.tabla, c.relname, uso.indexrelid, i.indisunique, i.indisprimary,
+             i.indkey, i.indoption, i.indexprs, i.indpred, i.indrelid
+    ORDER BY uso.tabla, c.relname
+"""
+
+SQL_REINICIO_ESTADISTICAS = "SELECT stats_reset FROM pg_stat_database WHERE datname = current_database()"
+
+_DESC = 1  # bit de indoption para columnas DESC
+
+
+class AuditoriaIndicesService:
+    """Uso y redundancia de los índices de los modelos del proyecto"""
+
+    @classmethod
+    def auditar(cls, app_label: Optional[str] = None, modelo: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Returns:
+            Un dict por modelo: {'modelo', 'tabla', 'indices': [...]}, donde
+            cada índice trae nombre, definicion, escaneos, tamano, unico,
+            sin_uso y redundante_con (nombre del índice que lo cubre o None).
+        """
+        tablas = {m._meta.db_table: m._meta.label for m in cls._modelos(app_label, modelo)}
+        if not tablas:
+            return []
+
+        with connection.cursor() as cursor:
+            cursor.execute(SQL_INDICES, [list(tablas)])
+            filas = cursor.fetchall()
+
+        por_tabla: Dict[str, List[Dict[str, Any]]] = {}
+        for (tabla, nombre, escaneos, tamano, unico, primario,
+             columnas, opciones, expresiones, condicion, definicion) in filas:
+            por_tabla.setdefault(tabla, []).append({
+                'nombre': nombre,
+                'definicion': definicion,
+                'escaneos': escaneos,
+                'tamano': tamano,
+                'unico': unico or primario,
+                'columnas': list(columnas),
+                'opciones': list(opciones),
+                'expresiones': expresiones,
+                'condicion': condicion,
+            })
+
+        reporte = []
+        for tabla, indices in sorted(por_tabla.items()):
+            for indice in indices:
+                indice['sin_uso'] = not indice['unico'] and indice['escaneos'] == 0
+                indice['redundante_con'] = cls._cubierto_por(indice, indices)
+            reporte.append({
+                'modelo': tablas[tabla],
+                'tabla': tabla,
+                'indices': [
+                    {k: v for k, v in indice.items() if k not in ('columnas', 'opciones', 'expresiones', 'condicion')}
+                    for indice in indices
+                ],
+            })
+        return reporte
+
+    @staticmethod
+    def reinicio_estadisticas():
+        """Desde cuándo cuenta pg_stat_user_indexes (None si nunca se reinició)"""
+        with connection.cursor() as cursor:
+            cursor.execute(SQL_REINICIO_ESTADISTICAS)
+            fila = cursor.fetchone()
+        return fila[0] if fila else None
+
+    @staticmethod
+    def _modelos(app_label: Optional[str], modelo: Optional[str]):
+        for model in apps.get_models():
+            meta = model._meta
+            if not meta.managed or meta.proxy or not model.__module__.startswith('api.'):
+                continue
+            if app_label and meta.app_label != app_label:
+                continue
+            if modelo and meta.model_name != modelo.lower():
+                continue
+            yield model
+
+    @staticmethod
+    def _cubierto_por(indice: Dict[str, Any], indices: List[Dict[str, Any]]) -> Optional[str]:
+        """Nombre de otro índice cuyas primeras columnas son las de `indice`"""
+        if indice['unico'] or indice['expresiones']:
+            return None
+        n = len(indice['columnas'])
+        direcciones = [o & _DESC for o in indice['opciones']]
+        for otro in indices:
+            if otro is indice or otro['expresiones'] or otro['condicion'] != indice['condicion']:
+                continue
+            if otro['columnas'][:n] != indice['columnas']:
+                continue
+            # Los iguales se reportan una sola vez (el de nombre mayor es el redundante)
+            if len(otro['columnas']) == n and not otro['unico'] and otro['nombre'] > indice['nombre']:
+                continue
+            otras = [o & _DESC for o in otro['opciones'][:n]]
+            # Un btree se recorre en ambos sentidos: sirve el orden igual o el invertido
+            if otras == direcciones or otras == [d ^ _DESC for d in direcciones]:
+                return otro['nombre']
+        return None
@@ -0,0 +1,304 @@
+# api/odontogram/services/catalogo_service.py
+"""
+Catálogo del odontograma en memoria (por proceso).
+
+El catálogo (Diagnostico, CategoriaDiagnostico, AreaAfectada,
+TipoAtributoClinico, OpcionAtributoClinico y sus tablas de relación) solo
+cambia al correr `cargar_odontograma_csv` o al editarlo en el admin, así que
+se carga completo en pocas consultas y se sirve como dataclasses inmutables
+indexadas por id y key.
+
+Invalidación:
+- Las señales de los modelos del catálogo incrementan VersionCatalogo en la
+  misma transacción que el cambio y descartan la copia local.
+- Cada proceso compara su versión con la de la BD como mucho cada
+  ODONTOGRAMA_CATALOGO_VERIFICAR_SEGUNDOS y recarga si difiere. Al vivir
+  en la BD, la versión es la misma para todos los workers sin depender de
+  una caché compartida.
+"""
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from api.odontogram.models import (
+    AreaAfectada,
+    CategoriaDiagnostico,
+    Diagnostico,
+    DiagnosticoAreaAfectada,
+    DiagnosticoAtributoClinico,
+    OpcionAtributoClinico,
+    TipoAtributoClinico,
+    VersionCatalogo,
+)
+
+logger = logging.getLogger(__name__)
+
+FILA_VERSION = 1
+
+_CAMPOS_DIAGNOSTICO = (
+    'id', 'key', 'nombre', 'siglas', 'simbolo_color', 'prioridad', 'activo', 'codigo_icd10',
+    'codigo_cdt', 'codigo_fhir', 'tipo_recurso_fhir', 'simbolo_formulario_033', 'categoria_id',
+)
+_CAMPOS_CATEGORIA = ('id', 'key', 'nombre', 'color_key', 'prioridad_key', 'activo')
+
+
+def _instancia(modelo, valores: dict):
+    """Instancia "cargada" del modelo; los campos no incluidos quedan diferidos"""
+    campos = [f.attname for f in modelo._meta.concrete_fields if f.attname in valores]
+    return modelo.from_db('default', campos, [valores[campo] for campo in campos])
+
+
+@dataclass(frozen=True)
+class CategoriaCatalogo:
+    id: int
+    key: str
+    nombre: str
+    color_key: str
+    prioridad_key: str
+    activo: bool
+
+
+@dataclass(frozen=True)
+class AreaCatalogo:
+    id: int
+    key: str
+    nombre: str
+    activo: bool
+
+
+@dataclass(frozen=True)
+class OpcionCatalogo:
+    id: int
+    key: str
+    nombre: str
+    prioridad: Optional[int]
+    orden: int
+    activo: bool
+
+
+@dataclass(frozen=True)
+class TipoAtributoCatalogo:
+    id: int
+    key: str
+    nombre: str
+    descripcion: str
+    activo: bool
+    opciones: Tuple[OpcionCatalogo, ...]  # ordenadas por (orden, nombre)
+
+    def opcion(self, key: str) -> Optional[OpcionCatalogo]:
+        return next((o for o in self.opciones if o.key == key), None)
+
+    @property
+    def opciones_activas(self) -> Tuple[OpcionCatalogo, ...]:
+        return tuple(o for o in self.opciones if o.activo)
+
+
+@dataclass(frozen=True)
+class DiagnosticoCatalogo:
+    id: int
+    key: str
+    nombre: str
+    siglas: str
+    simbolo_color: str
+    prioridad: int
+    activo: bool
+    codigo_icd10: str
+    codigo_cdt: str
+    codigo_fhir: str
+    tipo_recurso_fhir: str
+    simbolo_formulario_033: str
+    superficie_aplicables: Tuple[str, ...]
+    categoria: CategoriaCatalogo
+    areas: Tuple[AreaCatalogo, ...]
+    atributos: Tuple[TipoAtributoCatalogo, ...]
+
+    @property
+    def areas_keys(self) -> Tuple[str, ...]:
+        return tuple(a.key for a in self.areas)
+
+    def como_modelo(self) -> Diagnostico:
+        """
+        Instancia de Diagnostico (con su categoría) armada sin consultar la
+        BD, para asignarla a ForeignKeys y leerla desde señales. Cada llamada
+        devuelve un objeto nuevo.
+        """
+        valores = {campo: getattr(self, campo) for campo in _CAMPOS_DIAGNOSTICO if campo != 'categoria_id'}
+        valores.update(categoria_id=self.categoria.id, superficie_aplicables=list(self.superficie_aplicables))
+        diagnostico = _instancia(Diagnostico, valores)
+        diagnostico.categoria = _instancia(
+            CategoriaDiagnostico, {campo: getattr(self.categoria, campo) for campo in _CAMPOS_CATEGORIA}
+        )
+        return diagnostico
+
+
+@dataclass(frozen=True)
+class Catalogo:
+    version: str
+    diagnosticos: Mapping[int, DiagnosticoCatalogo]
+    diagnosticos_por_key: Mapping[str, DiagnosticoCatalogo]
+    categorias: Mapping[str, CategoriaCatalogo]
+    areas: Mapping[str, AreaCatalogo]
+    atributos: Mapping[str, TipoAtributoCatalogo]
+
+    def diagnostico(self, key: str, solo_activos: bool = True) -> Optional[DiagnosticoCatalogo]:
+        diagnostico = self.diagnosticos_por_key.get(key)
+        if diagnostico is None or (solo_activos and not diagnostico.activo):
+            return None
+        return diagnostico
+
+    def diagnostico_por_id(self, diagnostico_id: int) -> Optional[DiagnosticoCatalogo]:
+        return self.diagnosticos.get(diagnostico_id)
+
+    def opcion(self, tipo_atributo_key: str, opcion_key: str) -> Optional[OpcionCatalogo]:
+        tipo = self.atributos.get(tipo_atributo_key)
+        return tipo.opcion(opcion_key) if tipo else None
+
+
+class CatalogoDiagnosticosService:
+    """Acceso al catálogo del odontograma cargado en memoria."""
+
+    _catalogo: Optional[Catalogo] = None
+    _verificado_en: float = 0.0
+    _lock = threading.Lock()
+
+    @classmethod
+    def obtener(cls) -> Catalogo:
+        """Catálogo vigente; lo carga o recarga si la versión de la BD cambió"""
+        catalogo = cls._catalogo
+        ahora = time.monotonic()
+        if catalogo is not None and ahora - cls._verificado_en < cls._intervalo_verificacion():
+            return catalogo
+
+        with cls._lock:
+            catalogo = cls._catalogo
+            version = cls.version()
+            if catalogo is None or version != catalogo.version:
+                catalogo = cls._cargar(version)
+                cls._catalogo = catalogo
+            cls._verificado_en = time.monotonic()
+        return catalogo
+
+    @staticmethod
+    def _intervalo_verificacion() -> float:
+        return float(getattr(settings, 'ODONTOGRAMA_CATALOGO_VERIFICAR_SEGUNDOS', 5))
+
+    @classmethod
+    def diagnostico(cls, key: str, solo_activos: bool = True) -> DiagnosticoCatalogo:
+        """Diagnóstico por key; lanza Diagnostico.DoesNotExist como el ORM"""
+        diagnostico = cls.obtener().diagnostico(key, solo_activos=solo_activos)
+        if diagnostico is None:
+            raise Diagnostico.DoesNotExist(f"Diagnóstico '{key}' no existe en el catálogo")
+        return diagnostico
+
+    @classmethod
+    def version(cls) -> str:
+        """Versión del catálogo en la BD; cambia con cada edición (ETag de las vistas del catálogo)"""
+        version = VersionCatalogo.objects.filter(pk=FILA_VERSION).values_list('version', flat=True).first()
+        return str(version or 0)
+
+    @classmethod
+    def invalidar(cls) -> None:
+        """Incrementa la versión en la transacción del cambio y descarta la copia local"""
+        cls._incrementar_version()
+        cls.descartar()
+        transaction.on_commit(cls.descartar)
+
+    @classmethod
+    def descartar(cls) -> None:
+        """Descarta solo la copia de este proceso (se recarga en el próximo uso)"""
+        cls._catalogo = None
+
+    @staticmethod
+    def _incrementar_version() -> None:
+        try:
+            with transaction.atomic():
+                actualizadas = VersionCatalogo.objects.filter(pk=FILA_VERSION).update(
+                    version=F('version') + 1, fecha_modificacion=timezone.now()
+                )
+                if not actualizadas:
+                    VersionCatalogo.objects.create(pk=FILA_VERSION, version=1)
+        except DatabaseError as e:
+            # p. ej. cargar_odontograma_csv desde la migración 0003, antes de crear la tabla
+            logger.warning(f"[Catalogo] No se pudo incrementar la versión del catálogo: {e}")
+
+    @classmethod
+    def precargar_en_segundo_plano(cls) -> None:
+        """Carga el catálogo fuera del primer request"""
+        def _ejecutar():
+            try:
+                cls.obtener()
+                logger.info("[Catalogo] Catálogo del odontograma precargado")
+            except Exception as e:
+                # p. ej. migraciones pendientes: se cargará en el primer uso
+                logger.warning(f"[Catalogo] No se pudo precargar el catálogo: {e}")
+            finally:
+                close_old_connections()
+
+        threading.Thread(target=_ejecutar, name='catalogo-odontograma', daemon=True).start()
+
+    @classmethod
+    def _cargar(cls, version: Optional[str]) -> Catalogo:
+        if version is None:
+            version = cls.version()
+
+        categorias = {
+            fila['id']: CategoriaCatalogo(**fila)
+            for fila in CategoriaDiagnostico.objects.values(*_CAMPOS_CATEGORIA)
+        }
+        areas = {
+            fila['id']: AreaCatalogo(**fila)
+            for fila in AreaAfectada.objects.values('id', 'key', 'nombre', 'activo')
+        }
+
+        opciones_por_tipo: Dict[int, List[OpcionCatalogo]] = {}
+        for fila in OpcionAtributoClinico.objects.order_by('orden', 'nombre').values(
+            'id', 'key', 'nombre', 'prioridad', 'orden', 'activo', 'tipo_atributo_id'
+        ):
+            tipo_id = fila.pop('tipo_atributo_id')
+            opciones_por_tipo.setdefault(tipo_id, []).append(OpcionCatalogo(**fila))
+        tipos = {
+            fila['id']: TipoAtributoCatalogo(**fila, opciones=tuple(opciones_por_tipo.get(fila['id'], ())))
+            for fila in TipoAtributoClinico.objects.values('id', 'key', 'nombre', 'descripcion', 'activo')
+        }
+
+        areas_por_diagnostico = cls._agrupar(
+            DiagnosticoAreaAfectada.objects.order_by('id').values_list('diagnostico_id', 'area_id'), areas)
+        atributos_por_diagnostico = cls._agrupar(
+            DiagnosticoAtributoClinico.objects.order_by('id').values_list('diagnostico_id', 'tipo_atributo_id'),
+            tipos)
+
+        diagnosticos = {}
+        for fila in Diagnostico.objects.values(*_CAMPOS_DIAGNOSTICO, 'superficie_aplicables'):
+            diagnostico_id = fila['id']
+            fila['categoria'] = categorias[fila.pop('categoria_id')]
+            fila['superficie_aplicables'] = tuple(fila['superficie_aplicables'] or ())
+            diagnosticos[diagnostico_id] = DiagnosticoCatalogo(
+                **fila,
+                areas=areas_por_diagnostico.get(diagnostico_id, ()),
+                atributos=atributos_por_diagnostico.get(diagnostico_id, ()),
+            )
+
+        logger.debug(f"[Catalogo] Cargado: {len(diagnosticos)} diagnósticos (versión {version})")
+        return Catalogo(
+            version=version,
+            diagnosticos=MappingProxyType(diagnosticos),
+            diagnosticos_por_key=MappingProxyType({d.key: d for d in diagnosticos.values()}),
+            categorias=MappingProxyType({c.key: c for c in categorias.values()}),
+            areas=MappingProxyType({a.key: a for a in areas.values()}),
+            atributos=MappingProxyType({t.key: t for t in tipos.values()}),
+        )
+
+    @staticmethod
+    def _agrupar(pares: Iterable[Tuple[int, int]], destino: Mapping) -> Dict[int, tuple]:
+        agrupado: Dict[int, list] = {}
+        for diagnostico_id, relacionado_id in pares:
+            agrupado.setdefault(diagnostico_id, []).append(destino[relacionado_id])
+        return {diagnostico_id: tuple(items) for diagnostico_id, items in agrupado.items()}
@@ -114,8 +114,8 @@ class CDAGenerationService:
             return {}
 
         # Obtener diagnósticos activos con relaciones
-        diagnosticos_qs = DiagnosticoDental.objects.filter(
-            superficie__diente__paciente=paciente, activo=True
+        diagnosticos_qs = DiagnosticoDental.activos.filter(
+            paciente=paciente
         ).select_related(
             "diagnostico_catalogo", "superficie__diente__paciente", "odontologo"
         )
@@ -1,15 +1,10 @@
 # api/odontogram/services/diagnostico_text_service.py
 
 from typing import Iterable, List, Literal
-from django.db.models import Prefetch
-
-from api.odontogram.models import (
-    Diagnostico,
-    AreaAfectada,
-    DiagnosticoAreaAfectada,
-    DiagnosticoAtributoClinico,
-    TipoAtributoClinico,
-    OpcionAtributoClinico,
+
+from api.odontogram.services.catalogo_service import (
+    CatalogoDiagnosticosService,
+    DiagnosticoCatalogo,
 )
 
 
@@ -24,11 +19,8 @@ def _formatear_lista_nombres(items: List[str]) -> str:
     return f"{', '.join(items[:-1])} y {items[-1]}"
 
 
-def _obtener_areas_diagnostico(diagnostico: Diagnostico) -> List[str]:
-    areas_rel = DiagnosticoAreaAfectada.objects.filter(
-        diagnostico=diagnostico
-    ).select_related("area")
-    nombres = [rel.area.nombre for rel in areas_rel]
+def _obtener_areas_diagnostico(diagnostico: DiagnosticoCatalogo) -> List[str]:
+    nombres = [area.nombre for area in diagnostico.areas]
 
     seen = set()
     result = []
@@ -39,7 +31,7 @@ def _obtener_areas_diagnostico(diagnostico: Diagnostico) -> List[str]:
     return result
 
 
-def _resumir_areas(diagnosticos: Iterable[Diagnostico]) -> str:
+def _resumir_areas(diagnosticos: Iterable[DiagnosticoCatalogo]) -> str:
     all_areas: List[str] = []
     for d in diagnosticos:  # ← sin tilde
         all_areas.extend(_obtener_areas_diagnostico(d))
@@ -53,14 +45,14 @@ def _resumir_areas(diagnosticos: Iterable[Diagnostico]) -> str:
     return _formatear_lista_nombres(unique)
 
 
-def _obtener_categoria_dominante(diagnosticos: Iterable[Diagnostico]) -> str:
+def _obtener_categoria_dominante(diagnosticos: Iterable[DiagnosticoCatalogo]) -> str:
     for d in diagnosticos:
         if d.categoria and d.categoria.nombre:
             return d.categoria.nombre
     return "diagnósticos del odontograma"
 
 
-def _construir_texto_un_diagnostico(d: Diagnostico) -> str:
+def _construir_texto_un_diagnostico(d: DiagnosticoCatalogo) -> str:
     categoria = d.categoria.nombre if d.categoria else "Diagnóstico"
     nombre_diag = d.nombre or d.siglas or d.key
     areas = _obtener_areas_diagnostico(d)
@@ -71,7 +63,7 @@ def _construir_texto_un_diagnostico(d: Diagnostico) -> str:
     return f"Procedimiento para {categoria}: {nombre_diag}."
 
 
-def _construir_texto_multiples_diagnosticos(diagnosticos: List[Diagnostico]) -> str:
+def _construir_texto_multiples_diagnosticos(diagnosticos: List[DiagnosticoCatalogo]) -> str:
     categoria_dominante = _obtener_categoria_dominante(diagnosticos)
     nombres_diag = [d.nombre or d.siglas or d.key for d in diagnosticos]  # ← sin tilde
     texto_diag = _formatear_lista_nombres(nombres_diag)
@@ -93,14 +85,14 @@ def construir_texto_procedimiento_desde_diagnosticos(
     if not ids_list:
         return ""
 
+    catalogo = CatalogoDiagnosticosService.obtener()
     if modo == "id":
-        filtro = {"id__in": ids_list}
+        buscar = lambda i: catalogo.diagnostico_por_id(_como_id(i))
     else:
-        filtro = {"key__in": ids_list}
+        buscar = lambda k: catalogo.diagnostico(str(k), solo_activos=False)
 
-    diagnosticos = list(
-        Diagnostico.objects.filter(**filtro).select_related("categoria")
-    )
+    encontrados = (buscar(i) for i in dict.fromkeys(ids_list))
+    diagnosticos = [d for d in encontrados if d is not None]
 
     if not diagnosticos:
         return ""
@@ -108,4 +100,11 @@ def construir_texto_procedimiento_desde_diagnosticos(
     if len(diagnosticos) == 1:
         return _construir_texto_un_diagnostico(diagnosticos[0])
 
-    return _construir_texto_multiples_diagnosticos(diagnosticos)
\ No newline at end of file
+    return _construir_texto_multiples_diagnosticos(diagnosticos)
+
+
+def _como_id(valor) -> int | None:
+    try:
+        return int(valor)
+    except (TypeError, ValueError):
+        return None
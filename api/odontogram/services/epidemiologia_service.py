@@ -0,0 +1,504 @@
+# api/odontogram/services/epidemiologia_service.py
+"""
+Motor poblacional de epidemiología bucal (CPO/ceo, OHI-S, GI por cohortes)
+
+Los datos se leen en forma columnar (values_list -> arrays NumPy) y los índices
+se calculan con operaciones vectorizadas, sin instanciar modelos por paciente.
+Las reglas CPO/ceo son las mismas de IndiceCariesService (flags_diagnostico).
+"""
+
+import logging
+from datetime import date
+from typing import Dict, Any, Optional, List
+
+import numpy as np
+from django.db.models.functions import ExtractMonth, ExtractYear
+
+from api.patients.models import Paciente
+from api.odontogram.constants import FDIConstants, interpretar_ohi_s, interpretar_gi
+from api.odontogram.models import (
+    DiagnosticoDental,
+    Diente,
+    IndicadoresSaludBucal,
+    IndiceCariesSnapshot,
+)
+from api.odontogram.services.catalogo_service import CatalogoDiagnosticosService
+from api.odontogram.services.indice_caries_service import (
+    FLAG_CARIES,
+    FLAG_EXTRACCION_INDICADA,
+    FLAG_OBTURADO,
+    FLAG_PERDIDO,
+    flags_diagnostico,
+)
+
+logger = logging.getLogger(__name__)
+
+# Columnas de la matriz paciente x pieza (orden de FDI_A_NUMERO_3D)
+TOTAL_PIEZAS = 52
+PIEZAS_PERMANENTES = slice(0, 32)
+PIEZAS_TEMPORALES = slice(32, 52)
+
+# Bandera extra para Diente.ausente (no proviene del catálogo)
+FLAG_DIENTE_AUSENTE = 16
+
+# Grupos etarios recomendados por la OMS para encuestas de salud bucal
+BANDAS_EDAD = [
+    ('0-5', 0, 5),
+    ('6-11', 6, 11),
+    ('12-14', 12, 14),
+    ('15-19', 15, 19),
+    ('20-34', 20, 34),
+    ('35-44', 35, 44),
+    ('45-64', 45, 64),
+    ('65+', 65, None),
+]
+AGRUPACIONES = ('edad', 'sexo')
+
+# FDI (como entero) -> columna de la matriz
+_FDI_A_COLUMNA = np.full(100, -1, dtype=np.int16)
+for _fdi, _numero in FDIConstants.FDI_A_NUMERO_3D.items():
+    _FDI_A_COLUMNA[int(_fdi)] = _numero - 1
+
+
+# =============================================================================
+# NÚCLEOS VECTORIZADOS (sin ORM)
+# =============================================================================
+
+def matriz_estado_piezas(
+    paciente_idx: np.ndarray,
+    codigos_fdi: np.ndarray,
+    flags: np.ndarray,
+    n_pacientes: int,
+) -> np.ndarray:
+    """
+    Construye la matriz (n_pacientes x 52) con el OR de banderas por pieza.
+    codigos_fdi puede venir como enteros o como strings ('11'...'85').
+    """
+    estado = np.zeros((n_pacientes, TOTAL_PIEZAS), dtype=np.uint8)
+    if len(paciente_idx) == 0:
+        return estado
+
+    columnas = _FDI_A_COLUMNA[np.asarray(codigos_fdi).astype(np.int16)]
+    validos = columnas >= 0
+    np.bitwise_or.at(
+        estado,
+        (np.asarray(paciente_idx)[validos], columnas[validos]),
+        np.asarray(flags, dtype=np.uint8)[validos],
+    )
+    return estado
+
+
+def calcular_cpo_ceo(estado: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Aplica las reglas de clasificar_cpo / clasificar_ceo a toda la matriz.
+    Retorna vectores por paciente: C, P, O, cpo, c, e, o, ceo.
+    """
+    perm = estado[:, PIEZAS_PERMANENTES]
+    perdido = (perm & (FLAG_PERDIDO | FLAG_DIENTE_AUSENTE)) != 0
+    cariado = ((perm & FLAG_CARIES) != 0) & ~perdido
+    obturado = ((perm & FLAG_OBTURADO) != 0) & ~perdido & ~cariado
+
+    temp = estado[:, PIEZAS_TEMPORALES]
+    extraccion = (temp & FLAG_EXTRACCION_INDICADA) != 0
+    cariado_t = ((temp & FLAG_CARIES) != 0) & ~extraccion
+    obturado_t = ((temp & FLAG_OBTURADO) != 0) & ~extraccion & ~cariado_t
+
+    resultado = {
+        'C': cariado.sum(axis=1),
+        'P': perdido.sum(axis=1),
+        'O': obturado.sum(axis=1),
+        'c': cariado_t.sum(axis=1),
+        'e': extraccion.sum(axis=1),
+        'o': obturado_t.sum(axis=1),
+    }
+    resultado['cpo'] = resultado['C'] + resultado['P'] + resultado['O']
+    resultado['ceo'] = resultado['c'] + resultado['e'] + resultado['o']
+    return resultado
+
+
+def resumen_estadistico(valores: np.ndarray) -> Dict[str, Any]:
+    """Promedio, mediana, percentiles y desviación ignorando NaN"""
+    valores = np.asarray(valores, dtype=float)
+    valores = valores[~np.isnan(valores)]
+    if valores.size == 0:
+        return {
+            'n': 0, 'promedio': None, 'mediana': None,
+            'p25': None, 'p75': None, 'desviacion': None,
+            'minimo': None, 'maximo': None,
+        }
+    p25, mediana, p75 = np.percentile(valores, [25, 50, 75])
+    return {
+        'n': int(valores.size),
+        'promedio': round(float(valores.mean()), 2),
+        'mediana': round(float(mediana), 2),
+        'p25': round(float(p25), 2),
+        'p75': round(float(p75), 2),
+        'desviacion': round(float(valores.std()), 2),
+        'minimo': round(float(valores.min()), 2),
+        'maximo': round(float(valores.max()), 2),
+    }
+
+
+def promedio_por_grupo(grupo: np.ndarray, valores: np.ndarray, n_grupos: int):
+    """
+    (conteo, promedio) por grupo con bincount; los NaN no cuentan.
+    """
+    valores = np.asarray(valores, dtype=float)
+    validos = ~np.isnan(valores)
+    conteo = np.bincount(grupo[validos], minlength=n_grupos)
+    suma = np.bincount(grupo[validos], weights=valores[validos], minlength=n_grupos)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        promedio = np.where(conteo > 0, suma / np.maximum(conteo, 1), np.nan)
+    return conteo, promedio
+
+
+def edades_en_anios(fechas_nacimiento: np.ndarray, referencia: date) -> np.ndarray:
+    """Edad cumplida (años) de un vector datetime64[D] a la fecha de referencia"""
+    nacimiento = np.asarray(fechas_nacimiento, dtype='datetime64[D]')
+    ref = np.datetime64(referencia, 'D')
+    anios = ref.astype('datetime64[Y]').astype(int) - nacimiento.astype('datetime64[Y]').astype(int)
+    # Restar un año si aún no cumple en el año de referencia
+    dia_anio_ref = (ref - ref.astype('datetime64[Y]')).astype(int)
+    dia_anio_nac = (nacimiento - nacimiento.astype('datetime64[Y]')).astype(int)
+    return anios - (dia_anio_nac > dia_anio_ref)
+
+
+def banda_edad(edades: np.ndarray) -> np.ndarray:
+    """Índice de BANDAS_EDAD para cada edad"""
+    cortes = np.array([inicio for _, inicio, _ in BANDAS_EDAD[1:]])
+    return np.digitize(edades, cortes)
+
+
+def _redondear(valor) -> Optional[float]:
+    if valor is None or np.isnan(valor):
+        return None
+    return round(float(valor), 2)
+
+
+# =============================================================================
+# SERVICIO
+# =============================================================================
+
+class EpidemiologiaService:
+    """
+    Indicadores poblacionales de salud bucal para reportes de salud pública
+    """
+
+    # ---------------------------------------------------------------- cohorte
+
+    @staticmethod
+    def filtrar_cohorte(
+        sexo: Optional[str] = None,
+        edad_min: Optional[int] = None,
+        edad_max: Optional[int] = None,
+        referencia: Optional[date] = None,
+    ):
+        """
+        Queryset de pacientes activos de la cohorte.
+        La edad se traduce a rangos de fecha_nacimiento para filtrar en BD.
+        """
+        referencia = referencia or date.today()
+        pacientes = Paciente.objects.filter(activo=True)
+
+        if sexo:
+            pacientes = pacientes.filter(sexo=sexo)
+        if edad_min is not None:
+            pacientes = pacientes.filter(
+                fecha_nacimiento__lte=EpidemiologiaService._restar_anios(referencia, edad_min)
+            )
+        if edad_max is not None:
+            limite = EpidemiologiaService._restar_anios(referencia, edad_max + 1)
+            pacientes = pacientes.filter(fecha_nacimiento__gt=limite)
+        return pacientes
+
+    @staticmethod
+    def _restar_anios(fecha: date, anios: int) -> date:
+        try:
+            return fecha.replace(year=fecha.year - anios)
+        except ValueError:
+            # 29 de febrero en año no bisiesto
+            return fecha.replace(year=fecha.year - anios, day=28)
+
+    # ------------------------------------------------------- carga columnar
+
+    @staticmethod
+    def _cargar_pacientes(pacientes_qs, referencia: date):
+        filas = list(pacientes_qs.values_list('id', 'sexo', 'fecha_nacimiento'))
+        ids = [f[0] for f in filas]
+        indice = {pid: i for i, pid in enumerate(ids)}
+        sexos = np.array([f[1] or '' for f in filas], dtype='U1')
+        nacimientos = np.array([f[2] for f in filas], dtype='datetime64[D]')
+        edades = edades_en_anios(nacimientos, referencia) if filas else np.zeros(0, dtype=int)
+        return ids, indice, sexos, edades
+
+    @staticmethod
+    def _tabla_flags_catalogo(max_id: int = 0) -> np.ndarray:
+        """
+        id de Diagnostico -> banderas CPO/ceo (el catálogo es pequeño). Cubre
+        hasta `max_id` aunque la copia en memoria del catálogo aún no tenga los
+        diagnósticos más nuevos: esos quedan sin banderas.
+        """
+        catalogo = [
+            (d.id, d.key, d.categoria.key) for d in CatalogoDiagnosticosService.obtener().diagnosticos.values()
+        ]
+        max_id = max(max_id, max((c[0] for c in catalogo), default=0))
+        tabla = np.zeros(max_id + 1, dtype=np.uint8)
+        for diag_id, key, categoria_key in catalogo:
+            tabla[diag_id] = flags_diagnostico(key, categoria_key)
+        return tabla
+
+    @staticmethod
+    def _cargar_estado_piezas(pacientes_qs, indice: Dict):
+        """
+        Matriz de banderas por pieza y máscara de pacientes con odontograma
+        (dientes registrados o diagnósticos), incluidos los libres de caries.
+        """
+        n = len(indice)
+
+        diagnosticos = list(
+            DiagnosticoDental.objects.filter(
+                activo=True,
+                paciente__in=pacientes_qs,
+            ).values_list(
+                'paciente_id',
+                'superficie__diente__codigo_fdi',
+                'diagnostico_catalogo_id',
+            )
+        )
+        dientes = list(
+            Diente.objects.filter(
+                paciente__in=pacientes_qs,
+            ).values_list('paciente_id', 'codigo_fdi', 'ausente')
+        )
+        ausentes = [d for d in dientes if d[2]]
+
+        pac = np.fromiter((indice[d[0]] for d in diagnosticos), dtype=np.int64, count=len(diagnosticos))
+        fdi = np.fromiter((int(d[1]) for d in diagnosticos), dtype=np.int16, count=len(diagnosticos))
+        catalogo_ids = np.fromiter((d[2] for d in diagnosticos), dtype=np.int64, count=len(diagnosticos))
+        tabla_flags = EpidemiologiaService._tabla_flags_catalogo(int(catalogo_ids.max(initial=0)))
+        estado = matriz_estado_piezas(pac, fdi, tabla_flags[catalogo_ids], n)
+
+        if ausentes:
+            pac_a = np.fromiter((indice[a[0]] for a in ausentes), dtype=np.int64, count=len(ausentes))
+            fdi_a = np.fromiter((int(a[1]) for a in ausentes), dtype=np.int16, count=len(ausentes))
+            estado |= matriz_estado_piezas(
+                pac_a, fdi_a, np.full(len(ausentes), FLAG_DIENTE_AUSENTE, dtype=np.uint8), n
+            )
+
+        con_datos = np.zeros(n, dtype=bool)
+        con_datos[pac] = True
+        con_datos[[indice[d[0]] for d in dientes]] = True
+        return estado, con_datos
+
+    @staticmethod
+    def _cargar_indicadores(pacientes_qs, indice: Dict, fecha_inicio=None, fecha_fin=None):
+        """Último registro activo de IndicadoresSaludBucal por paciente (DISTINCT ON)"""
+        n = len(indice)
+        qs = IndicadoresSaludBucal.objects.filter(paciente__in=pacientes_qs)
+        if fecha_inicio:
+            qs = qs.filter(fecha__date__gte=fecha_inicio)
+        if fecha_fin:
+            qs = qs.filter(fecha__date__lte=fecha_fin)
+        filas = list(
+            qs.order_by('paciente_id', '-fecha')
+            .distinct('paciente_id')
+            .values_list('paciente_id', 'ohi_promedio_placa', 'ohi_promedio_calculo', 'gi_promedio_gingivitis')
+        )
+
+        placa = np.full(n, np.nan)
+        calculo = np.full(n, np.nan)
+        gi = np.full(n, np.nan)
+        if filas:
+            pac = np.fromiter((indice[f[0]] for f in filas), dtype=np.int64, count=len(filas))
+            valores = np.array([f[1:] for f in filas], dtype=float)  # None -> NaN
+            placa[pac] = valores[:, 0]
+            calculo[pac] = valores[:, 1]
+            gi[pac] = valores[:, 2]
+        return placa, calculo, gi
+
+    # ---------------------------------------------------------------- reporte
+
+    @staticmethod
+    def calcular_indices_cohorte(
+        sexo: Optional[str] = None,
+        edad_min: Optional[int] = None,
+        edad_max: Optional[int] = None,
+        fecha_inicio: Optional[date] = None,
+        fecha_fin: Optional[date] = None,
+        agrupar_por: str = 'edad',
+    ) -> Dict[str, Any]:
+        """
+        Índices CPO/ceo, OHI-S y GI de toda la cohorte, agregados y por grupo.
+        fecha_inicio/fecha_fin acotan los registros de indicadores (OHI-S/GI);
+        CPO/ceo refleja el estado actual del odontograma.
+        """
+        referencia = date.today()
+        pacientes_qs = EpidemiologiaService.filtrar_cohorte(sexo, edad_min, edad_max, referencia)
+
+        ids, indice, sexos, edades = EpidemiologiaService._cargar_pacientes(pacientes_qs, referencia)
+        estado, con_odontograma = EpidemiologiaService._cargar_estado_piezas(pacientes_qs, indice)
+        placa, calculo, gi = EpidemiologiaService._cargar_indicadores(
+            pacientes_qs, indice, fecha_inicio, fecha_fin
+        )
+        ohi_s = placa + calculo
+
+        indices = calcular_cpo_ceo(estado)
+        logger.info(
+            f"[EPI] Cohorte {len(ids)} pacientes, {int(con_odontograma.sum())} con odontograma"
+        )
+
+        # CPO/ceo solo de pacientes con odontograma registrado
+        cpo = np.where(con_odontograma, indices['cpo'], np.nan)
+        ceo = np.where(con_odontograma, indices['ceo'], np.nan)
+
+        return {
+            'poblacion': {
+                'total_pacientes': len(ids),
+                'con_odontograma': int(con_odontograma.sum()),
+                'con_indicadores': int((~np.isnan(ohi_s) | ~np.isnan(gi)).sum()),
+            },
+            'cpo': EpidemiologiaService._resumen_indice(cpo, indices, ('C', 'P', 'O'), con_odontograma),
+            'ceo': EpidemiologiaService._resumen_indice(ceo, indices, ('c', 'e', 'o'), con_odontograma),
+            'ohi_s': {
+                **resumen_estadistico(ohi_s),
+                'placa_promedio': _redondear(np.nanmean(placa)) if (~np.isnan(placa)).any() else None,
+                'calculo_promedio': _redondear(np.nanmean(calculo)) if (~np.isnan(calculo)).any() else None,
+                'distribucion': EpidemiologiaService._distribucion_interpretacion(ohi_s, interpretar_ohi_s),
+            },
+            'gi': {
+                **resumen_estadistico(gi),
+                'distribucion': EpidemiologiaService._distribucion_interpretacion(gi, interpretar_gi),
+            },
+            'por_grupo': EpidemiologiaService._agregar_por_grupo(
+                agrupar_por, sexos, edades, cpo, ceo, ohi_s, gi
+            ),
+            'filtros': {
+                'sexo': sexo,
+                'edad_min': edad_min,
+                'edad_max': edad_max,
+                'fecha_inicio': fecha_inicio.isoformat() if fecha_inicio else None,
+                'fecha_fin': fecha_fin.isoformat() if fecha_fin else None,
+                'agrupar_por': agrupar_por,
+            },
+        }
+
+    @staticmethod
+    def _resumen_indice(total, indices, componentes, con_odontograma) -> Dict[str, Any]:
+        resumen = resumen_estadistico(total)
+        n = int(con_odontograma.sum())
+        if n == 0:
+            resumen.update({'componentes': {c: None for c in componentes}, 'libres_de_caries': None, 'distribucion': []})
+            return resumen
+
+        resumen['componentes'] = {
+            c: round(float(indices[c][con_odontograma].mean()), 2) for c in componentes
+        }
+        valores = total[con_odontograma].astype(np.int64)
+        resumen['libres_de_caries'] = round(float((valores == 0).mean() * 100), 2)
+        conteo = np.bincount(valores)
+        resumen['distribucion'] = [
+            {'valor': int(v), 'pacientes': int(conteo[v])} for v in np.flatnonzero(conteo)
+        ]
+        return resumen
+
+    @staticmethod
+    def _distribucion_interpretacion(valores, interpretar) -> Dict[str, int]:
+        """Conteo por categoría de interpretación (se interpreta cada valor único)"""
+        valores = valores[~np.isnan(valores)]
+        if valores.size == 0:
+            return {}
+        unicos, conteo = np.unique(np.round(valores, 2), return_counts=True)
+        distribucion: Dict[str, int] = {}
+        for valor, n in zip(unicos, conteo):
+            etiqueta = interpretar(float(valor))
+            distribucion[etiqueta] = distribucion.get(etiqueta, 0) + int(n)
+        return distribucion
+
+    @staticmethod
+    def _agregar_por_grupo(agrupar_por, sexos, edades, cpo, ceo, ohi_s, gi) -> List[Dict[str, Any]]:
+        if agrupar_por == 'sexo':
+            etiquetas, grupo = np.unique(sexos, return_inverse=True)
+            etiquetas = [str(e) for e in etiquetas]
+        else:
+            grupo = banda_edad(edades)
+            etiquetas = [nombre for nombre, _, _ in BANDAS_EDAD]
+
+        n_grupos = len(etiquetas)
+        if grupo.size == 0:
+            return []
+        pacientes = np.bincount(grupo, minlength=n_grupos)
+        n_cpo, prom_cpo = promedio_por_grupo(grupo, cpo, n_grupos)
+        _, prom_ceo = promedio_por_grupo(grupo, ceo, n_grupos)
+        n_ohi, prom_ohi = promedio_por_grupo(grupo, ohi_s, n_grupos)
+        _, prom_gi = promedio_por_grupo(grupo, gi, n_grupos)
+
+        return [
+            {
+                'grupo': etiquetas[g],
+                'pacientes': int(pacientes[g]),
+                'con_odontograma': int(n_cpo[g]),
+                'con_indicadores': int(n_ohi[g]),
+                'cpo_promedio': _redondear(prom_cpo[g]),
+                'ceo_promedio': _redondear(prom_ceo[g]),
+                'ohi_s_promedio': _redondear(prom_ohi[g]),
+                'gi_promedio': _redondear(prom_gi[g]),
+            }
+            for g in range(n_grupos)
+            if pacientes[g] > 0
+        ]
+
+    # -------------------------------------------------------------- tendencia
+
+    @staticmethod
+    def calcular_tendencia_cpo(
+        sexo: Optional[str] = None,
+        edad_min: Optional[int] = None,
+        edad_max: Optional[int] = None,
+        fecha_inicio: Optional[date] = None,
+        fecha_fin: Optional[date] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Evolución mensual del CPO/ceo promedio a partir de IndiceCariesSnapshot.
+        Por cada (paciente, mes) se toma el último snapshot del mes.
+        """
+        pacientes_qs = EpidemiologiaService.filtrar_cohorte(sexo, edad_min, edad_max)
+        qs = IndiceCariesSnapshot.objects.filter(paciente__in=pacientes_qs)
+        if fecha_inicio:
+            qs = qs.filter(fecha__date__gte=fecha_inicio)
+        if fecha_fin:
+            qs = qs.filter(fecha__date__lte=fecha_fin)
+
+        filas = list(
+            qs.annotate(mes=ExtractYear('fecha') * 12 + ExtractMonth('fecha') - 1)
+            .order_by('fecha')
+            .values_list('paciente_id', 'mes', 'cpo_total', 'ceo_total')
+        )
+        if not filas:
+            return []
+
+        indice: Dict = {}
+        pac = np.fromiter((indice.setdefault(f[0], len(indice)) for f in filas), dtype=np.int64, count=len(filas))
+        datos = np.array([f[1:] for f in filas], dtype=np.int64)
+        mes, cpo, ceo = datos[:, 0], datos[:, 1], datos[:, 2]
+
+        # Orden estable por (mes, paciente) conservando el orden cronológico
+        orden = np.lexsort((np.arange(len(filas)), pac, mes))
+        mes, pac, cpo, ceo = mes[orden], pac[orden], cpo[orden], ceo[orden]
+        ultimo = np.ones(len(mes), dtype=bool)
+        ultimo[:-1] = (mes[1:] != mes[:-1]) | (pac[1:] != pac[:-1])
+        mes, cpo, ceo = mes[ultimo], cpo[ultimo], ceo[ultimo]
+
+        meses, grupo = np.unique(mes, return_inverse=True)
+        pacientes = np.bincount(grupo)
+        suma_cpo = np.bincount(grupo, weights=cpo)
+        suma_ceo = np.bincount(grupo, weights=ceo)
+
+        return [
+            {
+                'periodo': f"{m // 12:04d}-{m % 12 + 1:02d}",
+                'pacientes': int(pacientes[i]),
+                'cpo_promedio': round(float(suma_cpo[i] / pacientes[i]), 2),
+                'ceo_promedio': round(float(suma_ceo[i] / pacientes[i]), 2),
+            }
+            for i, m in enumerate(meses)
+        ]
@@ -97,7 +97,7 @@ class FHIRService:
         query = DiagnosticoDental.objects.all()
         
         if patient_id:
-            query = query.filter(superficie__diente__paciente_id=patient_id)
+            query = query.filter(paciente_id=patient_id)
         
         if code:
             query = query.filter(codigo_fhir=code)
@@ -13,8 +13,10 @@ from api.odontogram.models import (
     Diente, 
     DiagnosticoDental, 
     SuperficieDental,
-    OpcionAtributoClinico
+    HistorialOdontograma,
+    Form033Proyeccion,
 )
+from api.odontogram.services.catalogo_service import CatalogoDiagnosticosService
 
 logger = logging.getLogger(__name__)
 
@@ -299,18 +301,8 @@ class Form033Service:
 
         # logger.info(f"[Form033] Generando datos para paciente {paciente.get_full_name()}")
 
-        # Obtener dientes con prefetch optimizado
-        dientes = self._obtener_dientes_optimizado(paciente)
-        
-        # Separar por dentición
-        permanentes = [d for d in dientes if self._es_permanente(d.codigo_fdi)]
-        temporales = [d for d in dientes if not self._es_permanente(d.codigo_fdi)]
-        
-        # logger.info(f"[Form033] Dientes permanentes: {len(permanentes)}, Temporales: {len(temporales)}")
-
-        # Construir matrices
-        odontograma_permanente = self._construir_matriz_permanente(permanentes)
-        odontograma_temporal = self._construir_matriz_temporal(temporales)
+        # Matrices desde la proyección materializada (se reconstruye si la versión cambió)
+        matrices = self.obtener_matrices(paciente)
         
         # Datos del paciente
         edad = self._calcular_edad(paciente.fecha_nacimiento) if paciente.fecha_nacimiento else None
@@ -326,11 +318,68 @@ class Form033Service:
                 "fecha_nacimiento": paciente.fecha_nacimiento.isoformat() if paciente.fecha_nacimiento else None,
                 "fecha_examen": date.today().isoformat(),
             },
-            "odontograma_permanente": odontograma_permanente,
-            "odontograma_temporal": odontograma_temporal,
+            "odontograma_permanente": matrices["odontograma_permanente"],
+            "odontograma_temporal": matrices["odontograma_temporal"],
             "timestamp": datetime.now().isoformat(),
         }
 
+    # ============================================================================
+    # PROYECCIÓN MATERIALIZADA POR VERSIÓN DEL ODONTOGRAMA
+    # ============================================================================
+
+    @staticmethod
+    def _version_actual(paciente_id) -> Optional[UUID]:
+        """version_id del último cambio registrado en el historial del paciente"""
+        return (
+            HistorialOdontograma.objects.filter(paciente_id=paciente_id)
+            .order_by('-fecha')
+            .values_list('version_id', flat=True)
+            .first()
+        )
+
+    def construir_matrices(self, paciente: Paciente) -> Dict[str, Any]:
+        """
+        Construye las matrices 4x8 / 4x5 recorriendo el odontograma completo
+        """
+        dientes = self._obtener_dientes_optimizado(paciente)
+
+        # Separar por dentición
+        permanentes = [d for d in dientes if self._es_permanente(d.codigo_fdi)]
+        temporales = [d for d in dientes if not self._es_permanente(d.codigo_fdi)]
+
+        return {
+            "odontograma_permanente": self._construir_matriz_permanente(permanentes),
+            "odontograma_temporal": self._construir_matriz_temporal(temporales),
+        }
+
+    def actualizar_proyeccion(self, paciente: Paciente, version_id=None) -> Form033Proyeccion:
+        """
+        Reconstruye y guarda la proyección del paciente para la versión indicada
+        (por defecto, la última del historial)
+        """
+        if version_id is None:
+            version_id = self._version_actual(paciente.id)
+        proyeccion, _ = Form033Proyeccion.objects.update_or_create(
+            paciente=paciente,
+            defaults={
+                "version_id": version_id,
+                "matrices": self.construir_matrices(paciente),
+            },
+        )
+        logger.debug(f"[Form033] Proyección actualizada paciente={paciente.id} version={version_id}")
+        return proyeccion
+
+    def obtener_matrices(self, paciente: Paciente) -> Dict[str, Any]:
+        """
+        Devuelve las matrices materializadas si corresponden a la última
+        versión del odontograma; si no, las reconstruye y las guarda.
+        """
+        version_id = self._version_actual(paciente.id)
+        proyeccion = Form033Proyeccion.objects.filter(paciente=paciente).first()
+        if proyeccion and proyeccion.version_id == version_id and proyeccion.matrices:
+            return proyeccion.matrices
+        return self.actualizar_proyeccion(paciente, version_id).matrices
+
     # ============================================================================
     # MÉTODOS DE CONSTRUCCIÓN DE MATRICES
     # ============================================================================
@@ -478,11 +527,8 @@ class Form033Service:
                     # 1. Primero buscar en atributos_clinicos
                     movilidad_key = diag.atributos_clinicos.get('movilidad_dental')
                     if movilidad_key:
-                        try:
-                            opcion = OpcionAtributoClinico.objects.get(
-                                tipo_atributo__key='movilidad_dental',
-                                key=movilidad_key
-                            )
+                        opcion = CatalogoDiagnosticosService.obtener().opcion('movilidad_dental', movilidad_key)
+                        if opcion is not None:
                             return {
                                 "grado": opcion.orden,  # 1, 2, 3, 4
                                 "key": opcion.key,
@@ -491,8 +537,7 @@ class Form033Service:
                                 "diagnostico_id": str(diag.id),
                                 "fecha_diagnostico": diag.fecha.isoformat(),
                             }
-                        except OpcionAtributoClinico.DoesNotExist:
-                            logger.warning(f"[Form033] Opción movilidad no encontrada: {movilidad_key}")
+                        logger.warning(f"[Form033] Opción movilidad no encontrada: {movilidad_key}")
                     
                     # 2. Si no hay atributo, usar valor por defecto
                     return {
@@ -512,11 +557,8 @@ class Form033Service:
                     
                 movilidad_key = diag.atributos_clinicos.get('movilidad_dental')
                 if movilidad_key:
-                    try:
-                        opcion = OpcionAtributoClinico.objects.get(
-                            tipo_atributo__key='movilidad_dental',
-                            key=movilidad_key
-                        )
+                    opcion = CatalogoDiagnosticosService.obtener().opcion('movilidad_dental', movilidad_key)
+                    if opcion is not None:
                         return {
                             "grado": opcion.orden,
                             "key": opcion.key,
@@ -525,8 +567,7 @@ class Form033Service:
                             "diagnostico_id": str(diag.id),
                             "fecha_diagnostico": diag.fecha.isoformat(),
                         }
-                    except OpcionAtributoClinico.DoesNotExist:
-                        logger.warning(f"[Form033] Opción movilidad no encontrada: {movilidad_key}")
+                    logger.warning(f"[Form033] Opción movilidad no encontrada: {movilidad_key}")
         
         # No hay movilidad registrada
         return None
@@ -547,11 +588,8 @@ class Form033Service:
                     # 1. Primero buscar en atributos_clinicos
                     recesion_key = diag.atributos_clinicos.get('gravedad_recesion')
                     if recesion_key:
-                        try:
-                            opcion = OpcionAtributoClinico.objects.get(
-                                tipo_atributo__key='gravedad_recesion',
-                                key=recesion_key
-                            )
+                        opcion = CatalogoDiagnosticosService.obtener().opcion('gravedad_recesion', recesion_key)
+                        if opcion is not None:
                             return {
                                 "nivel": opcion.orden,  # 1=leve, 2=moderada, 3=severa
                                 "key": opcion.key,
@@ -560,8 +598,7 @@ class Form033Service:
                                 "diagnostico_id": str(diag.id),
                                 "fecha_diagnostico": diag.fecha.isoformat(),
                             }
-                        except OpcionAtributoClinico.DoesNotExist:
-                            logger.warning(f"[Form033] Opción recesión no encontrada: {recesion_key}")
+                        logger.warning(f"[Form033] Opción recesión no encontrada: {recesion_key}")
                     
                     # 2. Si no hay atributo, usar valor por defecto
                     return {
@@ -581,11 +618,8 @@ class Form033Service:
                     
                 recesion_key = diag.atributos_clinicos.get('gravedad_recesion')
                 if recesion_key:
-                    try:
-                        opcion = OpcionAtributoClinico.objects.get(
-                            tipo_atributo__key='gravedad_recesion',
-                            key=recesion_key
-                        )
+                    opcion = CatalogoDiagnosticosService.obtener().opcion('gravedad_recesion', recesion_key)
+                    if opcion is not None:
                         return {
                             "nivel": opcion.orden,
                             "key": opcion.key,
@@ -594,8 +628,7 @@ class Form033Service:
                             "diagnostico_id": str(diag.id),
                             "fecha_diagnostico": diag.fecha.isoformat(),
                         }
-                    except OpcionAtributoClinico.DoesNotExist:
-                        logger.warning(f"[Form033] Opción recesión no encontrada: {recesion_key}")
+                    logger.warning(f"[Form033] Opción recesión no encontrada: {recesion_key}")
         
         # No hay recesión registrada
         return None
@@ -0,0 +1,268 @@
+# api/odontogram/services/indice_caries_incremental_service.py
+"""
+Mantenimiento incremental de índices CPO / ceo.
+
+En lugar de recalcular todo el odontograma en cada guardado, se aplican
+deltas por diagnóstico (alta, baja, cambio de catálogo, diente ausente)
+sobre un conteo acumulado por paciente (IndiceCariesAcumulado).
+El verificador recalcula desde cero con IndiceCariesService y reporta la deriva.
+"""
+
+import logging
+from typing import Iterable, List, NamedTuple, Optional
+
+from django.db import transaction
+from django.utils import timezone
+
+from api.odontogram.constants import FDIConstants
+from api.odontogram.models import (
+    DiagnosticoDental,
+    Diente,
+    IndiceCariesAcumulado,
+    IndiceCariesSnapshot,
+)
+from api.odontogram.services.indice_caries_service import (
+    FLAG_CARIES,
+    FLAG_EXTRACCION_INDICADA,
+    FLAG_OBTURADO,
+    FLAG_PERDIDO,
+    IndiceCariesService,
+    clasificar_ceo,
+    clasificar_cpo,
+    flags_diagnostico,
+)
+
+logger = logging.getLogger(__name__)
+
+# Posición de cada bandera en los contadores de IndiceCariesAcumulado.piezas
+BANDERAS = (FLAG_CARIES, FLAG_OBTURADO, FLAG_PERDIDO, FLAG_EXTRACCION_INDICADA)
+POS_AUSENTE = len(BANDERAS)
+
+CAMPOS_INDICES = ('cpo_c', 'cpo_p', 'cpo_o', 'ceo_c', 'ceo_e', 'ceo_o')
+
+
+class DeltaPieza(NamedTuple):
+    """
+    Cambio sobre un diente: signo +1 (diagnóstico activo agregado),
+    -1 (diagnóstico retirado) o 0 (solo cambia ausente).
+    """
+    codigo_fdi: str
+    flags: int
+    signo: int
+    ausente: Optional[bool] = None
+
+
+def _pieza_vacia() -> list:
+    return [0] * (len(BANDERAS) + 1)
+
+
+def _campo_componente(codigo_fdi: str, contadores: list) -> Optional[str]:
+    """
+    Campo del acumulado al que aporta el diente ('cpo_c', 'ceo_e', ...) o None
+    """
+    info = FDIConstants.obtener_info_fdi(codigo_fdi)
+    if not info:
+        return None
+    flags = 0
+    for posicion, bandera in enumerate(BANDERAS):
+        if contadores[posicion] > 0:
+            flags |= bandera
+    if info["denticion"] == "permanente":
+        componente = clasificar_cpo(flags, bool(contadores[POS_AUSENTE]))
+        return f"cpo_{componente.lower()}" if componente else None
+    componente = clasificar_ceo(flags)
+    return f"ceo_{componente}" if componente else None
+
+
+def _totales(piezas: dict) -> dict:
+    totales = dict.fromkeys(CAMPOS_INDICES, 0)
+    for codigo_fdi, contadores in piezas.items():
+        campo = _campo_componente(codigo_fdi, contadores)
+        if campo:
+            totales[campo] += 1
+    return totales
+
+
+def _asignar_totales(acumulado: IndiceCariesAcumulado, totales: dict) -> None:
+    for campo, valor in totales.items():
+        setattr(acumulado, campo, valor)
+    acumulado.cpo_total = acumulado.cpo_c + acumulado.cpo_p + acumulado.cpo_o
+    acumulado.ceo_total = acumulado.ceo_c + acumulado.ceo_e + acumulado.ceo_o
+
+
+class IndiceCariesIncrementalService:
+
+    @staticmethod
+    def delta_diagnostico(diagnostico_dental: DiagnosticoDental, signo: int) -> DeltaPieza:
+        """
+        Delta de un diagnóstico dental. Incluye el estado de ausencia del
+        diente, que las señales pueden haber actualizado al guardar.
+        """
+        diente = diagnostico_dental.superficie.diente
+        catalogo = diagnostico_dental.diagnostico_catalogo
+        return DeltaPieza(
+            codigo_fdi=diente.codigo_fdi,
+            flags=flags_diagnostico(catalogo.key, catalogo.categoria.key),
+            signo=signo,
+            ausente=diente.ausente,
+        )
+
+    @staticmethod
+    def delta_ausencia(diente: Diente) -> DeltaPieza:
+        return DeltaPieza(codigo_fdi=diente.codigo_fdi, flags=0, signo=0, ausente=diente.ausente)
+
+    @staticmethod
+    def _piezas_desde_bd(paciente_id: str) -> dict:
+        """
+        Reconstruye los contadores por diente desde los diagnósticos activos
+        """
+        piezas = {}
+        for codigo_fdi, ausente in Diente.objects.filter(
+            paciente_id=paciente_id
+        ).values_list("codigo_fdi", "ausente"):
+            contadores = piezas.setdefault(codigo_fdi, _pieza_vacia())
+            contadores[POS_AUSENTE] = int(ausente)
+
+        diagnosticos = DiagnosticoDental.activos.filter(
+            paciente_id=paciente_id,
+        ).values_list(
+            "superficie__diente__codigo_fdi",
+            "diagnostico_catalogo__key",
+            "diagnostico_catalogo__categoria__key",
+        )
+        for codigo_fdi, key, categoria_key in diagnosticos:
+            flags = flags_diagnostico(key, categoria_key)
+            contadores = piezas.setdefault(codigo_fdi, _pieza_vacia())
+            for posicion, bandera in enumerate(BANDERAS):
+                if flags & bandera:
+                    contadores[posicion] += 1
+        return piezas
+
+    @staticmethod
+    @transaction.atomic
+    def reconstruir(paciente_id: str) -> IndiceCariesAcumulado:
+        """
+        Recalcula desde cero el acumulado del paciente
+        """
+        piezas = IndiceCariesIncrementalService._piezas_desde_bd(paciente_id)
+        acumulado, _ = IndiceCariesAcumulado.objects.select_for_update().get_or_create(
+            paciente_id=paciente_id
+        )
+        acumulado.piezas = piezas
+        _asignar_totales(acumulado, _totales(piezas))
+        acumulado.fecha_verificacion = timezone.now()
+        acumulado.save()
+        logger.info(
+            f"[CPO] Acumulado reconstruido paciente={paciente_id} "
+            f"CPO={acumulado.cpo_total} ceo={acumulado.ceo_total}"
+        )
+        return acumulado
+
+    @staticmethod
+    @transaction.atomic
+    def aplicar_deltas(paciente_id: str, deltas: Iterable[DeltaPieza]) -> IndiceCariesAcumulado:
+        """
+        Aplica los deltas sobre el acumulado. Solo se reclasifican los dientes
+        tocados. Debe llamarse después de persistir los cambios: si el paciente
+        aún no tiene acumulado se reconstruye desde la BD (que ya los incluye).
+        """
+        acumulado = (
+            IndiceCariesAcumulado.objects.select_for_update()
+            .filter(paciente_id=paciente_id)
+            .first()
+        )
+        if acumulado is None:
+            return IndiceCariesIncrementalService.reconstruir(paciente_id)
+
+        deltas = list(deltas)
+        if not deltas:
+            return acumulado
+
+        piezas = acumulado.piezas
+        totales = {campo: getattr(acumulado, campo) for campo in CAMPOS_INDICES}
+        for delta in deltas:
+            contadores = piezas.setdefault(delta.codigo_fdi, _pieza_vacia())
+            antes = _campo_componente(delta.codigo_fdi, contadores)
+
+            if delta.signo:
+                for posicion, bandera in enumerate(BANDERAS):
+                    if delta.flags & bandera:
+                        contadores[posicion] = max(0, contadores[posicion] + delta.signo)
+            if delta.ausente is not None:
+                contadores[POS_AUSENTE] = int(delta.ausente)
+
+            despues = _campo_componente(delta.codigo_fdi, contadores)
+            if antes != despues:
+                if antes:
+                    totales[antes] = max(0, totales[antes] - 1)
+                if despues:
+                    totales[despues] += 1
+
+        _asignar_totales(acumulado, totales)
+        acumulado.save()
+        logger.debug(
+            f"[CPO] {len(deltas)} delta(s) aplicados paciente={paciente_id} "
+            f"CPO={acumulado.cpo_total} ceo={acumulado.ceo_total}"
+        )
+        return acumulado
+
+    @staticmethod
+    def crear_snapshot(
+        paciente_id: str, version_id=None, deltas: Optional[Iterable[DeltaPieza]] = None
+    ) -> IndiceCariesSnapshot:
+        """
+        Aplica los deltas pendientes y guarda el acumulado como snapshot,
+        sin recorrer el odontograma completo.
+        """
+        acumulado = IndiceCariesIncrementalService.aplicar_deltas(paciente_id, deltas or [])
+        snapshot = IndiceCariesSnapshot.objects.create(
+            paciente_id=paciente_id,
+            version_id=version_id,
+            cpo_total=acumulado.cpo_total,
+            ceo_total=acumulado.ceo_total,
+            **{campo: getattr(acumulado, campo) for campo in CAMPOS_INDICES},
+        )
+        logger.info(
+            f"[CPO] Snapshot incremental id={snapshot.id} paciente={paciente_id} "
+            f"version={version_id} CPO={snapshot.cpo_total} ceo={snapshot.ceo_total}"
+        )
+        return snapshot
+
+    @staticmethod
+    def verificar(paciente_ids: Optional[List[str]] = None, corregir: bool = False) -> List[dict]:
+        """
+        Compara cada acumulado con el recálculo completo.
+        Retorna la lista de pacientes con deriva; con corregir=True los reconstruye.
+        """
+        acumulados = IndiceCariesAcumulado.objects.all()
+        if paciente_ids:
+            acumulados = acumulados.filter(paciente_id__in=paciente_ids)
+
+        derivas = []
+        verificados = []
+        for acumulado in acumulados.iterator():
+            paciente_id = str(acumulado.paciente_id)
+            indices = IndiceCariesService.calcular_indices_paciente(paciente_id)
+            perm, temp = indices["permanente"], indices["temporal"]
+            esperado = {
+                "cpo_c": perm["C"], "cpo_p": perm["P"], "cpo_o": perm["O"],
+                "ceo_c": temp["c"], "ceo_e": temp["e"], "ceo_o": temp["o"],
+            }
+            diferencias = {
+                campo: {"acumulado": getattr(acumulado, campo), "recalculado": valor}
+                for campo, valor in esperado.items()
+                if getattr(acumulado, campo) != valor
+            }
+            if not diferencias:
+                verificados.append(acumulado.pk)
+                continue
+
+            logger.warning(f"[CPO] Deriva detectada paciente={paciente_id}: {diferencias}")
+            derivas.append({"paciente_id": paciente_id, "diferencias": diferencias})
+            if corregir:
+                IndiceCariesIncrementalService.reconstruir(paciente_id)
+
+        IndiceCariesAcumulado.objects.filter(pk__in=verificados).update(
+            fecha_verificacion=timezone.now()
+        )
+        return derivas
@@ -27,6 +27,63 @@ OBTURADO_KEYS = {
     "protesis_removible_realizada",
 }
 AUSENTE_KEYS = {"ausente"}
+PERDIDA_KEYS = {"extraccion_otra_causa", "perdida_otra_causa"}
+EXTRACCION_INDICADA_KEYS = {"extraccion_indicada"}
+
+# Banderas por diente: se combinan (OR) todos los diagnósticos activos del diente.
+# Las usan tanto el cálculo por paciente como el motor poblacional (epidemiologia_service)
+FLAG_CARIES = 1
+FLAG_OBTURADO = 2
+FLAG_PERDIDO = 4
+FLAG_EXTRACCION_INDICADA = 8
+
+
+def flags_diagnostico(key: str, categoria_key: str) -> int:
+    """
+    Traduce un diagnóstico del catálogo (key + categoría) a banderas CPO/ceo
+    """
+    flags = 0
+    if key in CARIES_KEYS and categoria_key == "patologia_activa":
+        flags |= FLAG_CARIES
+    if key in OBTURADO_KEYS and categoria_key == "tratamiento_realizado":
+        flags |= FLAG_OBTURADO
+    # Perdidas por caries registradas como tratamiento realizado
+    if key in PERDIDA_KEYS and categoria_key == "tratamiento_realizado":
+        flags |= FLAG_PERDIDO
+    # Ausencia (diagnóstico de ausencia en catálogo)
+    if key in AUSENTE_KEYS and categoria_key == "ausencia":
+        flags |= FLAG_PERDIDO
+    if key in EXTRACCION_INDICADA_KEYS and categoria_key == "patologia_activa":
+        flags |= FLAG_EXTRACCION_INDICADA
+    return flags
+
+
+def clasificar_cpo(flags: int, ausente: bool = False):
+    """
+    Componente CPO de un diente permanente: 'P', 'C', 'O' o None.
+    Prioridad: pérdida > caries (aunque esté obturado) > obturado.
+    """
+    if flags & FLAG_PERDIDO or ausente:
+        return "P"
+    if flags & FLAG_CARIES:
+        return "C"
+    if flags & FLAG_OBTURADO:
+        return "O"
+    return None
+
+
+def clasificar_ceo(flags: int):
+    """
+    Componente ceo de un diente temporal: 'e', 'c', 'o' o None.
+    La ausencia de un temporal no suma (exfoliación natural).
+    """
+    if flags & FLAG_EXTRACCION_INDICADA:
+        return "e"
+    if flags & FLAG_CARIES:
+        return "c"
+    if flags & FLAG_OBTURADO:
+        return "o"
+    return None
 
 
 class IndiceCariesService:
@@ -42,9 +99,8 @@ class IndiceCariesService:
         )
         
         diagnosticos = (
-            DiagnosticoDental.objects.filter(
-                superficie__diente__paciente_id=paciente_id,
-                activo=True,
+            DiagnosticoDental.activos.filter(
+                paciente_id=paciente_id,
             )
             
             .select_related(
@@ -89,67 +145,39 @@ class IndiceCariesService:
         logger.info(f"[CPO] Resultado índices: {indices}")
         return indices
 
+    @staticmethod
+    def _flags_diente(dx_diente) -> int:
+        flags = 0
+        for dx in dx_diente:
+            flags |= flags_diagnostico(
+                dx.diagnostico_catalogo.key,
+                dx.diagnostico_catalogo.categoria.key,
+            )
+        return flags
+
     @staticmethod
     def _acumular_cpo(diente, dx_diente, acumulador):
         logger.debug(
         f"[CPO] _acumular_cpo diente={diente.codigo_fdi} "
         f"dx={[dx.diagnostico_catalogo.key for dx in dx_diente]}"
     )
-
-        tiene_caries = False
-        tiene_obturado = False
-        tiene_perdida_por_carias = False
-
-        for dx in dx_diente:
-            key = dx.diagnostico_catalogo.key
-            cat = dx.diagnostico_catalogo.categoria.key 
-            
-            logger.debug(f"[CPO]   dx key={key} cat={cat}")
-
-            if key in {"caries"} and cat == "patologia_activa":
-                tiene_caries = True
-
-            if key in {
-                "obturacion",
-                "sellante_realizado",
-                "corona_realizada",
-                "protesis_fija_realizada",
-                "protesis_removible_realizada",
-            } and cat == "tratamiento_realizado":
-                tiene_obturado = True
-
-            # Perdidas por caries registradas como tratamiento realizado
-            if key in {"extraccion_otra_causa", "perdida_otra_causa"} and cat == "tratamiento_realizado":
-                tiene_perdida_por_carias = True
-
-            # Ausencia (diagnóstico de ausencia en catálogo)
-            if key == "ausente" and cat == "ausencia":
-                tiene_perdida_por_carias = True
-
-        # 1) P: cualquier forma de pérdida por caries / extracción
-        if tiene_perdida_por_carias or diente.ausente:
-            acumulador["P"] += 1
-            return
-
-        # 2) C: si hay caries, aunque también haya obturación
-        if tiene_caries:
-            acumulador["C"] += 1
-            return
-
-        # 3) O: restaurado sin caries
-        if tiene_obturado:
-            acumulador["O"] += 1
+        componente = clasificar_cpo(
+            IndiceCariesService._flags_diente(dx_diente), diente.ausente
+        )
+        if componente:
+            acumulador[componente] += 1
 
     @staticmethod
     def _acumular_ceo(diente, dx_diente, acumulador: dict):
         """
-        ceo (temporal) – placeholder:
+        ceo (temporal):
         - c: caries
         - e: extracción indicada
         - o: obturado
         """
-        # Lógica temporal - implementar según necesidad
-        return
+        componente = clasificar_ceo(IndiceCariesService._flags_diente(dx_diente))
+        if componente:
+            acumulador[componente] += 1
     
     @staticmethod
     def crear_snapshot_indices(paciente_id: str, version_id=None) -> IndiceCariesSnapshot:
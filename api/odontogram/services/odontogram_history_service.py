@@ -2,6 +2,7 @@
 from typing import List, Dict, Any
 from django.core.cache import cache
 from api.odontogram.models import HistorialOdontograma, Diente
+from api.odontogram.services.versiones_service import VersionesOdontogramaService
 
 class OdontogramHistoryService:
     def registrar_cambio(self, diente, tipo_cambio, descripcion, odontologo, 
@@ -43,11 +44,11 @@ class OdontogramHistoryService:
                 'odontologo'
             ).order_by('fecha', 'id')
             
-            # Reconstruir estado del odontograma
+            # Reconstruir estado del odontograma (keyframe + deltas)
             estado = {
                 'version_id': str(version_id),
                 'cambios': [],
-                'diagnosticos_activos': {},
+                'diagnosticos_activos': VersionesOdontogramaService.estado(version_id) or {},
                 'dientes_modificados': set()
             }
             
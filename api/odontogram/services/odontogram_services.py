@@ -19,6 +19,7 @@ from api.odontogram.models import (
     DiagnosticoDental,
     Diagnostico,
 )
+from api.odontogram.services.catalogo_service import CatalogoDiagnosticosService
 from api.odontogram.services.indicadores_service import IndicadoresSaludBucalService as NuevoIndicadoresService
 from api.odontogram.services.odontogramaDiagnostico_service import OdontogramaDiagnosticoService
 from api.odontogram.services.odontogramaEstadoDiente_service import OdontogramaEstadoDienteService
@@ -141,15 +142,15 @@ class OdontogramaService:
             superficie, created = SuperficieDental.objects.get_or_create(
                 diente=diente, nombre=nombre_superficie
             )
-            diagnostico = Diagnostico.objects.get(key=diagnostico_key, activo=True)
-            area_superficie = superficie.areaanatomica
-            if not diagnostico.areasrelacionadas.filter(area__key=area_superficie).exists():
+            diagnostico = CatalogoDiagnosticosService.diagnostico(diagnostico_key)
+            area_superficie = superficie.area_anatomica
+            if area_superficie not in diagnostico.areas_keys:
                 raise ValidationError(
                     f"El diagnóstico '{diagnostico.nombre}' no es aplicable al área '{area_superficie}'. "
-                    f"Áreas válidas: {[a.key for a in diagnostico.areasrelacionadas.all()]}"
+                    f"Áreas válidas: {list(diagnostico.areas_keys)}"
                 )
             diagnostico_dental = DiagnosticoDental.objects.create(
-                superficie=superficie, diagnostico_catalogo=diagnostico, **kwargs
+                superficie=superficie, diagnostico_catalogo=diagnostico.como_modelo(), **kwargs
             )
 
             return diagnostico_dental
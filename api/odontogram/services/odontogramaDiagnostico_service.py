@@ -15,6 +15,10 @@ from api.odontogram.models import (
 from django.db.models import Prefetch
 
 from api.odontogram.services.context_service import OperacionContexto
+from api.odontogram.services.indice_caries_incremental_service import (
+    IndiceCariesIncrementalService,
+)
+from api.odontogram.services.versiones_service import VersionesOdontogramaService
 
 User = get_user_model()
 
@@ -85,9 +89,16 @@ class OdontogramaDiagnosticoService:
         superficie_nombre = diagnostico.superficie.get_nombre_display()
 
         # 1. Soft delete
+        estaba_activo = diagnostico.activo
         diagnostico.activo = False
         diagnostico.save()
 
+        if estaba_activo:
+            IndiceCariesIncrementalService.aplicar_deltas(
+                paciente_id,
+                [IndiceCariesIncrementalService.delta_diagnostico(diagnostico, -1)],
+            )
+
         # 2. SIEMPRE crear registro simple de eliminación (SIN snapshot)
         print(f"[CONTEXTO] Eliminación individual - solo registro simple para paciente {paciente_id}")
         HistorialOdontograma.objects.create(
@@ -182,18 +193,17 @@ class OdontogramaDiagnosticoService:
         # 5. Crear snapshot completo
         primer_diente = dientes.first()
         if primer_diente:
-            HistorialOdontograma.objects.create(
+            VersionesOdontogramaService.registrar_snapshot(
                 diente=primer_diente,
-                tipo_cambio=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO,
+                odontologo=odontologo,
                 descripcion=(
                     f"Eliminado '{diagnostico_nombre}' de {superficie_nombre}. "
                     f"Odontograma actualizado: {total_diagnosticos} diagnósticos en "
                     f"{len(odontograma_snapshot)} dientes"
                 ),
-                odontologo=odontologo,
-                datos_nuevos=odontograma_snapshot,
-                fecha=now,
+                estado=odontograma_snapshot,
                 version_id=version_id,
+                fecha=now,
             )
 
         # 6. Invalidar caché
@@ -245,8 +255,13 @@ class OdontogramaDiagnosticoService:
                 f"{diag.diagnostico_catalogo.nombre} ({diag.superficie.get_nombre_display()})"
             )
 
-        # 7. Soft delete
+        # 7. Soft delete y deltas de índices (el snapshot de caries lo crea la señal)
+        deltas_caries = [
+            IndiceCariesIncrementalService.delta_diagnostico(diag, -1)
+            for diag in diagnosticos
+        ]
         diagnosticos.update(activo=False)
+        IndiceCariesIncrementalService.aplicar_deltas(paciente_id, deltas_caries)
 
         # 8. Obtener snapshot actualizado
         odontograma_snapshot = {}
@@ -319,14 +334,13 @@ class OdontogramaDiagnosticoService:
                 f"Odontograma actualizado: {total_diagnosticos} diagnósticos en {len(odontograma_snapshot)} dientes"
             )
 
-            HistorialOdontograma.objects.create(
+            VersionesOdontogramaService.registrar_snapshot(
                 diente=primer_diente,
-                tipo_cambio=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO,
-                descripcion=descripcion,
                 odontologo=odontologo,
-                datos_nuevos=odontograma_snapshot,
-                fecha=now,
+                descripcion=descripcion,
+                estado=odontograma_snapshot,
                 version_id=version_id,
+                fecha=now,
             )
 
         # 11. Invalidar caché
@@ -377,6 +391,8 @@ class OdontogramaDiagnosticoService:
             "diagnostico_catalogo_id": diagnostico.diagnostico_catalogo_id,
         }
 
+        delta_anterior = IndiceCariesIncrementalService.delta_diagnostico(diagnostico, -1)
+
         # Actualizar campos
         if descripcion is not None:
             diagnostico.descripcion = descripcion
@@ -400,6 +416,15 @@ class OdontogramaDiagnosticoService:
 
         diagnostico.save()
 
+        if diagnostico.diagnostico_catalogo_id != datos_anteriores["diagnostico_catalogo_id"]:
+            IndiceCariesIncrementalService.aplicar_deltas(
+                str(diagnostico.superficie.diente.paciente_id),
+                [
+                    delta_anterior,
+                    IndiceCariesIncrementalService.delta_diagnostico(diagnostico, +1),
+                ],
+            )
+
         # Crear historial de cambios
         datos_nuevos = {
             "descripcion": diagnostico.descripcion,
@@ -9,6 +9,9 @@ from api.odontogram.models import (
     Diente,
     HistorialOdontograma,
 )
+from api.odontogram.services.indice_caries_incremental_service import (
+    IndiceCariesIncrementalService,
+)
 User = get_user_model()
 
 
@@ -29,6 +32,9 @@ class OdontogramaEstadoDienteService:
         # 1. Marcar como ausente
         diente.ausente = True
         diente.save()
+        IndiceCariesIncrementalService.aplicar_deltas(
+            paciente_id, [IndiceCariesIncrementalService.delta_ausencia(diente)]
+        )
 
         # 2. SIEMPRE solo registro simple (SIN snapshot)
         print(f"[CONTEXTO] Diente ausente marcado - solo registro simple para paciente {paciente_id}")
@@ -123,8 +123,8 @@ class OdontogramaReadService:
             return []
 
         # Obtener todos los diagnósticos del paciente
-        diagnosticos = DiagnosticoDental.objects.filter(
-            superficie__diente__paciente=paciente, activo=True
+        diagnosticos = DiagnosticoDental.activos.filter(
+            paciente=paciente
         ).select_related("diagnostico_catalogo", "diagnostico_catalogo__categoria", "superficie__diente", "odontologo")
 
         if estado_tratamiento:
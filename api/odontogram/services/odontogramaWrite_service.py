@@ -14,7 +14,13 @@ from api.odontogram.models import (
     Diagnostico,
     IndiceCariesSnapshot,  
 )
+from api.odontogram.services.catalogo_service import CatalogoDiagnosticosService
 from api.odontogram.services.context_service import OperacionContexto
+from api.odontogram.services.indice_caries_incremental_service import (
+    IndiceCariesIncrementalService,
+)
+from api.odontogram.services.resumen_version_service import ResumenVersionService
+from api.odontogram.services.versiones_service import VersionesOdontogramaService
 
 
 User = get_user_model()
@@ -34,14 +40,12 @@ def _es_uuid_valido(valor: str) -> bool:
 
 class OdontogramaWriteService:
     
-    def _crear_snapshot_caries(self, paciente_id: str, version_id=None) -> IndiceCariesSnapshot:
+    def _crear_snapshot_caries(self, paciente_id: str, version_id=None, deltas=None) -> IndiceCariesSnapshot:
         """
-        Método interno para crear snapshot de índices de caries
-        Evita importación circular
+        Método interno para crear snapshot de índices de caries.
+        Aplica solo los deltas del guardado sobre el acumulado del paciente.
         """
-        # Importar localmente para evitar dependencia circular
-        from api.odontogram.services.indice_caries_service import IndiceCariesService
-        return IndiceCariesService.crear_snapshot_indices(paciente_id, version_id)
+        return IndiceCariesIncrementalService.crear_snapshot(paciente_id, version_id, deltas)
     
     @transaction.atomic
     def guardar_odontograma_completo(
@@ -80,6 +84,7 @@ class OdontogramaWriteService:
 
             version_id = uuid.uuid4()
             now = timezone.now()
+            deltas_caries = []
             print(f"[DEBUG] VERSION_ID generado: {version_id}")
             print(f"[CONTEXTO] Operación activa: {OperacionContexto.esta_en_operacion(paciente_id)}")
 
@@ -104,10 +109,9 @@ class OdontogramaWriteService:
                             # Procesar cada diagnóstico
                             for diag_data in diagnosticos_list:
                                 try:
-                                    diagnostico_cat = Diagnostico.objects.get(
-                                        key=diag_data["procedimientoId"],
-                                        activo=True,
-                                    )
+                                    diagnostico_cat = CatalogoDiagnosticosService.diagnostico(
+                                        diag_data["procedimientoId"]
+                                    ).como_modelo()
 
                                     attrs = diag_data.get("secondaryOptions", {}) or {}
                                     descripcion = diag_data.get("descripcion", "") or ""
@@ -243,6 +247,10 @@ class OdontogramaWriteService:
                                         estado_tratamiento=DiagnosticoDental.EstadoTratamiento.DIAGNOSTICADO,
                                     )
 
+                                    deltas_caries.append(
+                                        IndiceCariesIncrementalService.delta_diagnostico(diag_dental, +1)
+                                    )
+
                                     HistorialOdontograma.objects.create(
                                         diente=diente,
                                         tipo_cambio=HistorialOdontograma.TipoCambio.DIAGNOSTICO_AGREGADO,
@@ -302,13 +310,8 @@ class OdontogramaWriteService:
                             odontograma_snapshot[codigo_fdi][nombre_superficie] = []
                             for diag_data in diagnosticos_list:
                                 try:
-                                    diagnostico_cat = (
-                                        Diagnostico.objects.select_related("categoria")
-                                        .prefetch_related("areas_relacionadas__area")
-                                        .get(
-                                            key=diag_data["procedimientoId"],
-                                            activo=True,
-                                        )
+                                    diagnostico_cat = CatalogoDiagnosticosService.diagnostico(
+                                        diag_data["procedimientoId"]
                                     )
 
                                     diag_enriquecido = {
@@ -322,11 +325,7 @@ class OdontogramaWriteService:
                                         "categoria_color_key": diagnostico_cat.categoria.color_key,
                                         "prioridadKey": diagnostico_cat.categoria.prioridad_key,
                                         "prioridad": diagnostico_cat.prioridad,
-                                        "afectaArea": list(
-                                            diagnostico_cat.areas_relacionadas.values_list(
-                                                "area__key", flat=True
-                                            )
-                                        ),
+                                        "afectaArea": list(diagnostico_cat.areas_keys),
                                         "secondaryOptions": diag_data.get(
                                             "secondaryOptions", {}
                                         ),
@@ -342,18 +341,17 @@ class OdontogramaWriteService:
                                         nombre_superficie
                                     ].append(diag_data)
 
-                    snapshot_master = HistorialOdontograma.objects.create(
+                    snapshot_master = VersionesOdontogramaService.registrar_snapshot(
                         diente=primer_diente,
-                        tipo_cambio=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO,
+                        odontologo=odontologo,
                         descripcion=(
                             f"Odontograma guardado: {resultado['diagnosticos_guardados']} diagnósticos nuevos, "
                             f"{resultado['diagnosticos_modificados']} modificados en "
                             f"{len(resultado['dientes_procesados'])} dientes"
                         ),
-                        odontologo=odontologo,
-                        datos_nuevos=odontograma_snapshot,
-                        fecha=now,
+                        estado=odontograma_snapshot,
                         version_id=version_id,
+                        fecha=now,
                     )
 
                     print(
@@ -367,7 +365,8 @@ class OdontogramaWriteService:
                         print(f"[DEBUG] Creando snapshot de índices de caries para paciente {paciente_id}")
                         snapshot_caries = self._crear_snapshot_caries(
                             paciente_id=paciente_id,
-                            version_id=version_id
+                            version_id=version_id,
+                            deltas=deltas_caries,
                         )
 
                         resultado["snapshot_caries_creado"] = True
@@ -385,6 +384,10 @@ class OdontogramaWriteService:
                 resultado["snapshot_id"] = None
                 print(f"[DEBUG] Sin cambios reales (total_cambios={total_cambios}), NO se crea snapshot")
 
+            # Cabecera de la versión (una escritura por guardado)
+            if total_cambios > 0:
+                ResumenVersionService.registrar(version_id)
+
             # Configuración final de respuesta
             resultado["version_id"] = str(version_id)
             resultado["tiene_cambios"] = total_cambios > 0
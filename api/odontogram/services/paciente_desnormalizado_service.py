@@ -0,0 +1,118 @@
+# api/odontogram/services/paciente_desnormalizado_service.py
+"""
+Relleno de la columna desnormalizada `paciente_id` en
+odonto_diagnostico_dental y odonto_historial_odontograma.
+
+La columna se agrega nullable (sin reescribir la tabla) y se rellena por
+lotes con un UPDATE ... FROM por transacción, de modo que cada lote bloquea
+pocas filas y el backfill puede correr con la aplicación en línea. Los
+registros nuevos ya la traen desde save(); este servicio solo cubre las
+filas anteriores a la migración y las creadas con bulk_create sin paciente.
+"""
+import logging
+import time
+from typing import Dict
+
+from django.db import connection, transaction
+
+logger = logging.getLogger(__name__)
+
+LOTE_POR_DEFECTO = 5000
+# Lotes vacíos seguidos (filas bloqueadas por otras transacciones) antes de desistir
+REINTENTOS_SIN_AVANCE = 10
+ESPERA_REINTENTO = 0.5
+
+_TABLA_DIENTE = 'odontogram_diente'
+_TABLA_SUPERFICIE = 'odonto_superficie_dental'
+
+SQL_LOTE_DIAGNOSTICOS = f"""
+    UPDATE odonto_diagnostico_dental AS d
+    SET paciente_id = di.paciente_id
+    FROM {_TABLA_SUPERFICIE} s, {_TABLA_DIENTE} di
+    WHERE d.id IN (
+        SELECT id FROM odonto_diagnostico_dental
+        WHERE paciente_id IS NULL
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    AND s.id = d.superficie_id
+    AND di.id = s.diente_id
+"""
+
+SQL_LOTE_HISTORIAL = f"""
+    UPDATE odonto_historial_odontograma AS h
+    SET paciente_id = di.paciente_id
+    FROM {_TABLA_DIENTE} di
+    WHERE h.id IN (
+        SELECT id FROM odonto_historial_odontograma
+        WHERE paciente_id IS NULL
+        LIMIT %s
+        FOR UPDATE SKIP LOCKED
+    )
+    AND di.id = h.diente_id
+"""
+
+
+class PacienteDesnormalizadoService:
+    """Backfill por lotes de paciente_id en diagnósticos e historial"""
+
+    TABLAS = {
+        'diagnosticos': ('odonto_diagnostico_dental', SQL_LOTE_DIAGNOSTICOS),
+        'historial': ('odonto_historial_odontograma', SQL_LOTE_HISTORIAL),
+    }
+
+    @classmethod
+    def rellenar(cls, lote: int = LOTE_POR_DEFECTO, verbose: bool = False) -> Dict[str, int]:
+        """
+        Rellena paciente_id en todas las filas pendientes.
+
+        Returns:
+            Filas actualizadas por tabla ({'diagnosticos': n, 'historial': m})
+        """
+        if lote < 1:
+            raise ValueError("lote debe ser al menos 1")
+        return {
+            nombre: cls._rellenar_tabla(nombre, tabla, sql, lote, verbose)
+            for nombre, (tabla, sql) in cls.TABLAS.items()
+        }
+
+    @staticmethod
+    def _rellenar_tabla(nombre: str, tabla: str, sql: str, lote: int, verbose: bool) -> int:
+        total = sin_avance = 0
+        while True:
+            # Un lote por transacción: los bloqueos se liberan en cada commit
+            with transaction.atomic():
+                with connection.cursor() as cursor:
+                    cursor.execute(sql, [lote])
+                    actualizadas = cursor.rowcount
+            total += actualizadas
+            if verbose and actualizadas:
+                logger.info(f"[Backfill paciente] {nombre}: {total} filas")
+            if actualizadas == lote:
+                continue
+
+            # Lote incompleto: SKIP LOCKED pudo saltear filas que otra
+            # transacción tenía bloqueadas; se termina cuando no queda ninguna
+            with connection.cursor() as cursor:
+                cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {tabla} WHERE paciente_id IS NULL)')
+                if not cursor.fetchone()[0]:
+                    return total
+            if actualizadas:
+                sin_avance = 0
+                continue
+            sin_avance += 1
+            if sin_avance > REINTENTOS_SIN_AVANCE:
+                logger.warning(f"[Backfill paciente] {nombre}: quedan filas bloqueadas sin paciente_id")
+                return total
+            time.sleep(ESPERA_REINTENTO)
+
+    @staticmethod
+    def pendientes() -> Dict[str, int]:
+        """Filas que aún no tienen paciente_id"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT (SELECT COUNT(*) FROM odonto_diagnostico_dental WHERE paciente_id IS NULL), "
+                "(SELECT COUNT(*) FROM odonto_historial_odontograma WHERE paciente_id IS NULL)"
+            )
+            diagnosticos, historial = cursor.fetchone()
+        return {'diagnosticos': diagnosticos, 'historial': historial}
@@ -146,7 +146,7 @@ class PiezasIndiceService:
         try:
             # Obtener diagnósticos aplicados que excluyen piezas
             diagnosticos_excluidos = DiagnosticoDental.objects.filter(
-                superficie__diente__paciente_id=paciente_id,
+                paciente_id=paciente_id,
                 diagnostico_catalogo__key__in=PiezasIndiceService.DIAGNOSTICOS_EXCLUSION
             ).select_related('superficie__diente').values_list(
                 'superficie__diente__codigo_fdi', 
@@ -12,6 +12,7 @@ import uuid
 from api.appointment.models import EstadoCita
 from api.appointment.services.appointment_service import CitaService
 from api.odontogram.services.diagnostico_text_service import construir_texto_procedimiento_desde_diagnosticos
+from api.odontogram.services.versiones_service import VersionesOdontogramaService
 
 User = get_user_model()
 
@@ -27,7 +28,7 @@ class PlanTratamientoService:
         try:
             # Obtener el último snapshot completo del odontograma
             ultimo_historial = HistorialOdontograma.objects.filter(
-                diente__paciente_id=paciente_id,
+                paciente_id=paciente_id,
                 tipo_cambio=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO
             ).order_by('-fecha').first()
             
@@ -36,7 +37,7 @@ class PlanTratamientoService:
                 return PlanTratamientoService._obtener_diagnosticos_actuales(paciente_id)
             
             # Extraer diagnósticos del snapshot
-            odontograma_data = ultimo_historial.datos_nuevos
+            odontograma_data = VersionesOdontogramaService.estado(ultimo_historial.version_id) or {}
             diagnosticos = []
             
             for codigo_fdi, superficies in odontograma_data.items():
@@ -70,9 +71,8 @@ class PlanTratamientoService:
     @staticmethod
     def _obtener_diagnosticos_actuales(paciente_id: str) -> Dict[str, Any]:
         """Obtiene diagnósticos actuales si no hay snapshot"""
-        diagnosticos_activos = DiagnosticoDental.objects.filter(
-            superficie__diente__paciente_id=paciente_id,
-            activo=True
+        diagnosticos_activos = DiagnosticoDental.activos.filter(
+            paciente_id=paciente_id,
         ).select_related(
             'diagnostico_catalogo', 
             'diagnostico_catalogo__categoria',
@@ -245,7 +245,7 @@ class PlanTratamientoService:
         try:
             # Obtener el snapshot de la versión actual
             snapshot_actual = HistorialOdontograma.objects.filter(
-                diente__paciente_id=paciente_id,
+                paciente_id=paciente_id,
                 version_id=version_id,
                 tipo_cambio=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO
             ).first()
@@ -260,46 +260,36 @@ class PlanTratamientoService:
 
             # Obtener el snapshot anterior (si existe)
             snapshot_anterior = HistorialOdontograma.objects.filter(
-                diente__paciente_id=paciente_id,
+                paciente_id=paciente_id,
                 tipo_cambio=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO,
                 fecha__lt=snapshot_actual.fecha
             ).order_by('-fecha').first()
 
-            # IDs de diagnósticos anteriores
-            diagnosticos_anteriores_ids = set()
-            if snapshot_anterior:
-                odontograma_anterior = snapshot_anterior.datos_nuevos
-                for codigo_fdi, superficies in odontograma_anterior.items():
-                    for superficie_nombre, diags_list in superficies.items():
-                        for diag in diags_list:
-                            diag_id = diag.get('id')
-                            if diag_id:
-                                diagnosticos_anteriores_ids.add(diag_id)
-
-            # Extraer solo diagnósticos nuevos del snapshot actual
-            odontograma_actual = snapshot_actual.datos_nuevos
+            # Diagnósticos de la versión que NO estaban en la anterior
+            diferencia = VersionesOdontogramaService.diferencia(
+                snapshot_anterior.version_id if snapshot_anterior else None,
+                snapshot_actual.version_id,
+            )
             diagnosticos_nuevos = []
-            
-            for codigo_fdi, superficies in odontograma_actual.items():
-                for superficie_nombre, diags_list in superficies.items():
-                    for diag in diags_list:
-                        diag_id = diag.get('id')
-                        # Solo agregar si NO estaba en la versión anterior
-                        if diag_id and diag_id not in diagnosticos_anteriores_ids:
-                            diagnosticos_nuevos.append({
-                                'id': diag_id,
-                                'diente': codigo_fdi,
-                                'superficie': superficie_nombre,
-                                'diagnostico_key': diag.get('key') or diag.get('procedimientoId'),
-                                'diagnostico_nombre': diag.get('nombre'),
-                                'siglas': diag.get('siglas'),
-                                'color_hex': diag.get('colorHex'),
-                                'prioridad': diag.get('prioridad'),
-                                'categoria': diag.get('categoria_nombre'),
-                                'descripcion': diag.get('descripcion', ''),
-                                'estado_tratamiento': diag.get('estadotratamiento', 'diagnosticado'),
-                                'atributos_clinicos': diag.get('secondaryOptions', {}),
-                            })
+
+            for item in diferencia['agregados']:
+                diag = item['diagnostico']
+                diag_id = diag.get('id')
+                if diag_id:
+                    diagnosticos_nuevos.append({
+                        'id': diag_id,
+                        'diente': item['diente'],
+                        'superficie': item['superficie'],
+                        'diagnostico_key': diag.get('key') or diag.get('procedimientoId'),
+                        'diagnostico_nombre': diag.get('nombre'),
+                        'siglas': diag.get('siglas'),
+                        'color_hex': diag.get('colorHex'),
+                        'prioridad': diag.get('prioridad'),
+                        'categoria': diag.get('categoria_nombre'),
+                        'descripcion': diag.get('descripcion', ''),
+                        'estado_tratamiento': diag.get('estadotratamiento', 'diagnosticado'),
+                        'atributos_clinicos': diag.get('secondaryOptions', {}),
+                    })
 
             return {
                 'version_odontograma': str(snapshot_actual.version_id),
@@ -322,7 +312,7 @@ class PlanTratamientoService:
         try:
             # Obtener el último snapshot completo
             ultimo_historial = HistorialOdontograma.objects.filter(
-                diente__paciente_id=paciente_id,
+                paciente_id=paciente_id,
                 tipo_cambio=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO
             ).order_by('-fecha').first()
 
@@ -331,30 +321,26 @@ class PlanTratamientoService:
 
             # Obtener snapshot anterior para marcar nuevos
             snapshot_anterior = HistorialOdontograma.objects.filter(
-                diente__paciente_id=paciente_id,
+                paciente_id=paciente_id,
                 tipo_cambio=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO,
                 fecha__lt=ultimo_historial.fecha
             ).order_by('-fecha').first()
 
-            diagnosticos_anteriores_ids = set()
-            if snapshot_anterior:
-                odontograma_anterior = snapshot_anterior.datos_nuevos
-                for codigo_fdi, superficies in odontograma_anterior.items():
-                    for superficie_nombre, diags_list in superficies.items():
-                        for diag in diags_list:
-                            diag_id = diag.get('id')
-                            if diag_id:
-                                diagnosticos_anteriores_ids.add(diag_id)
+            diferencia = VersionesOdontogramaService.diferencia(
+                snapshot_anterior.version_id if snapshot_anterior else None,
+                ultimo_historial.version_id,
+            )
+            ids_nuevos = {item['diagnostico'].get('id') for item in diferencia['agregados']}
 
             # Extraer diagnósticos del snapshot actual con flag de nuevos
-            odontograma_data = ultimo_historial.datos_nuevos
+            odontograma_data = VersionesOdontogramaService.estado(ultimo_historial.version_id) or {}
             diagnosticos = []
             
             for codigo_fdi, superficies in odontograma_data.items():
                 for superficie_nombre, diags_list in superficies.items():
                     for diag in diags_list:
                         diag_id = diag.get('id')
-                        es_nuevo = diag_id not in diagnosticos_anteriores_ids if diag_id else True
+                        es_nuevo = diag_id in ids_nuevos if diag_id else True
                         
                         diagnosticos.append({
                             'id': diag_id,
@@ -388,9 +374,8 @@ class PlanTratamientoService:
         """Obtiene el plan de tratamiento activo de un paciente"""
         from api.odontogram.models import PlanTratamiento
         
-        return PlanTratamiento.objects.filter(
+        return PlanTratamiento.activos.filter(
             paciente_id=paciente_id,
-            activo=True,
             estado='ACTIVO'
         ).order_by('-fecha_creacion').first()
 
@@ -0,0 +1,161 @@
+# api/odontogram/services/resumen_plan_service.py
+"""
+Resumen precalculado de los planes de tratamiento (ResumenPlanTratamiento).
+
+La señal de SesionTratamiento recalcula el resumen del plan tras el commit
+cada vez que una sesión se guarda (crear, editar, completar, cancelar,
+eliminado lógico) o se borra. Los endpoints de resumen, datos completos y
+estadísticas leen esa fila en lugar de cargar todas las sesiones y
+recorrer sus JSON. Los planes sin resumen (anteriores a la tabla) se
+resumen en la primera lectura.
+"""
+import logging
+from typing import List, Optional
+
+from django.utils import timezone
+
+from api.odontogram.models import PlanTratamiento, ResumenPlanTratamiento, SesionTratamiento
+
+logger = logging.getLogger(__name__)
+
+_CAMPOS_SESION = (
+    'id', 'numero_sesion', 'fecha_programada', 'fecha_realizacion', 'estado',
+    'diagnosticos_complicaciones', 'procedimientos', 'prescripciones', 'notas', 'observaciones',
+)
+
+
+def _consolidar(items, sesion: dict) -> list:
+    """Copia de cada elemento con el número, fecha y estado de su sesión"""
+    return [
+        {
+            **item,
+            'sesion_numero': sesion['numero_sesion'],
+            'sesion_fecha': sesion['fecha_programada'],
+            'sesion_estado': sesion['estado'],
+        }
+        for item in items
+        if isinstance(item, dict)
+    ]
+
+
+class ResumenPlanService:
+    """Cálculo y lectura del resumen de un plan de tratamiento"""
+
+    @staticmethod
+    def recalcular(plan_id) -> Optional[ResumenPlanTratamiento]:
+        """
+        Rearma el resumen del plan desde sus sesiones activas (una consulta +
+        upsert). Devuelve None si el plan ya no existe (borrado en cascada).
+        """
+        estados_display = dict(SesionTratamiento.EstadoSesion.choices)
+        sesiones_por_estado = {estado: 0 for estado in SesionTratamiento.EstadoSesion.values}
+        sesiones: List[dict] = []
+        diagnosticos, procedimientos, prescripciones = [], [], []
+        fecha_ultima_sesion = None
+
+        filas = SesionTratamiento.objects.filter(plan_tratamiento_id=plan_id, activo=True).order_by('numero_sesion')
+        for fila in filas.values(*_CAMPOS_SESION):
+            if fila['fecha_realizacion'] and (
+                fecha_ultima_sesion is None or fila['fecha_realizacion'] > fecha_ultima_sesion
+            ):
+                fecha_ultima_sesion = fila['fecha_realizacion']
+
+            sesion = {
+                'id': str(fila['id']),
+                'numero_sesion': fila['numero_sesion'],
+                'fecha_programada': fila['fecha_programada'].isoformat() if fila['fecha_programada'] else None,
+                'fecha_realizacion': fila['fecha_realizacion'].isoformat() if fila['fecha_realizacion'] else None,
+                'estado': fila['estado'],
+                'estado_display': estados_display.get(fila['estado'], fila['estado']),
+                'diagnosticos_complicaciones': fila['diagnosticos_complicaciones'] or [],
+                'procedimientos': fila['procedimientos'] or [],
+                'prescripciones': fila['prescripciones'] or [],
+                'notas': fila['notas'],
+                'observaciones': fila['observaciones'],
+            }
+            sesiones.append(sesion)
+            sesiones_por_estado[fila['estado']] = sesiones_por_estado.get(fila['estado'], 0) + 1
+            diagnosticos.extend(_consolidar(sesion['diagnosticos_complicaciones'], sesion))
+            procedimientos.extend(_consolidar(sesion['procedimientos'], sesion))
+            prescripciones.extend(_consolidar(sesion['prescripciones'], sesion))
+
+        if not sesiones and not PlanTratamiento.objects.filter(pk=plan_id).exists():
+            return None
+
+        resumen, _ = ResumenPlanTratamiento.objects.update_or_create(
+            plan_id=plan_id,
+            defaults={
+                'total_sesiones': len(sesiones),
+                'sesiones_por_estado': sesiones_por_estado,
+                'total_diagnosticos': sum(len(s['diagnosticos_complicaciones']) for s in sesiones),
+                'total_procedimientos': sum(len(s['procedimientos']) for s in sesiones),
+                'total_prescripciones': sum(len(s['prescripciones']) for s in sesiones),
+                'fecha_ultima_sesion': fecha_ultima_sesion,
+                'sesiones': sesiones,
+                'diagnosticos_consolidados': diagnosticos,
+                'procedimientos_consolidados': procedimientos,
+                'prescripciones_consolidadas': prescripciones,
+            },
+        )
+        logger.debug(f"[ResumenPlan] Plan {plan_id} resumido: {len(sesiones)} sesión(es)")
+        return resumen
+
+    @classmethod
+    def obtener(cls, plan: PlanTratamiento) -> ResumenPlanTratamiento:
+        """Resumen del plan; lo calcula si todavía no existe"""
+        try:
+            return plan.resumen
+        except ResumenPlanTratamiento.DoesNotExist:
+            resumen = cls.recalcular(plan.pk)
+            plan.resumen = resumen
+            return resumen
+
+    @staticmethod
+    def proxima_sesion(resumen: ResumenPlanTratamiento) -> Optional[dict]:
+        """Primera sesión planificada con fecha desde hoy"""
+        hoy = timezone.localdate().isoformat()
+        pendientes = [
+            s for s in resumen.sesiones
+            if s['estado'] == SesionTratamiento.EstadoSesion.PLANIFICADA
+            and s['fecha_programada'] and s['fecha_programada'] >= hoy
+        ]
+        if not pendientes:
+            return None
+        proxima = min(pendientes, key=lambda s: (s['fecha_programada'], s['numero_sesion']))
+        return {'id': proxima['id'], 'fecha': proxima['fecha_programada'], 'numero_sesion': proxima['numero_sesion']}
+
+    @classmethod
+    def estadisticas(cls, resumen: ResumenPlanTratamiento) -> dict:
+        """Estadísticas del plan (endpoint /planes-tratamiento/{id}/estadisticas/)"""
+        por_estado = resumen.sesiones_por_estado
+        progreso = 0
+        if resumen.total_sesiones > 0:
+            progreso = round(
+                (por_estado.get(SesionTratamiento.EstadoSesion.COMPLETADA, 0) / resumen.total_sesiones) * 100, 2
+            )
+        return {
+            'total_sesiones': resumen.total_sesiones,
+            'sesiones_por_estado': {estado: por_estado.get(estado, 0) for estado in SesionTratamiento.EstadoSesion.values},
+            'progreso_porcentaje': progreso,
+            'fecha_ultima_sesion': resumen.fecha_ultima_sesion.isoformat() if resumen.fecha_ultima_sesion else None,
+            'proxima_sesion': cls.proxima_sesion(resumen),
+        }
+
+    @staticmethod
+    def texto_prescripciones(prescripciones: List[dict]) -> str:
+        """Texto plano de las prescripciones consolidadas (para imprimir)"""
+        texto = "PRESCRIPCIONES MÉDICAS\n"
+        texto += "=" * 30 + "\n"
+
+        if not prescripciones:
+            return texto + "\nNo hay prescripciones registradas.\n"
+
+        for i, pres in enumerate(prescripciones, 1):
+            texto += f"\n{i}. {pres.get('medicamento', 'Medicamento no especificado')}\n"
+            texto += f"   Dosis: {pres.get('dosis', 'No especificada')}\n"
+            texto += f"   Frecuencia: {pres.get('frecuencia', 'No especificada')}\n"
+            texto += f"   Duración: {pres.get('duracion', 'No especificada')}\n"
+            if pres.get('observaciones'):
+                texto += f"   Observaciones: {pres['observaciones']}\n"
+            texto += f"   (Sesión #{pres.get('sesion_numero', 'N/A')})\n"
+        return texto
@@ -0,0 +1,95 @@
+# api/odontogram/services/resumen_version_service.py
+"""
+Cabeceras de versión del odontograma (ResumenVersionOdontograma).
+
+guardar_odontograma_completo escribe la cabecera una vez al terminar; los
+cambios registrados fuera de un guardado completo (marcar tratado, ausencia,
+admin) y los cambios borrados la actualizan tras el commit desde las señales
+de HistorialOdontograma.
+El resumen se calcula por conjuntos, así que el mismo código sirve para el
+backfill (`python manage.py resumir_versiones_odontograma`).
+"""
+import logging
+import uuid
+from typing import Iterable, List
+
+from django.db.models import Count, Max, Min
+from django.db.models.functions import Coalesce
+
+from api.odontogram.models import HistorialOdontograma, IndiceCariesSnapshot, ResumenVersionOdontograma
+
+logger = logging.getLogger(__name__)
+
+_CAMPOS_ACTUALIZABLES = [
+    'paciente', 'odontologo', 'fecha', 'fecha_ultimo_cambio', 'total_cambios',
+    'cambios_por_tipo', 'guardado_completo', 'snapshot_caries',
+]
+
+
+class ResumenVersionService:
+    """Escritura de las cabeceras de versión a partir del historial"""
+
+    @classmethod
+    def registrar(cls, version_id) -> None:
+        cls.resumir([version_id])
+
+    @staticmethod
+    def resumir(version_ids: Iterable) -> List[ResumenVersionOdontograma]:
+        """
+        Crea o recalcula las cabeceras de `version_ids` (tres consultas + upsert)
+        y borra las de versiones que ya no tienen cambios en el historial.
+        """
+        version_ids = list(version_ids)
+        if not version_ids:
+            return []
+        historial = HistorialOdontograma.objects.filter(version_id__in=version_ids).order_by()
+
+        resumenes = {}
+        for fila in historial.values('version_id', 'tipo_cambio').annotate(
+            cantidad=Count('id'), primera=Min('fecha'), ultima=Max('fecha'),
+        ):
+            resumen = resumenes.setdefault(fila['version_id'], {
+                'cambios_por_tipo': {}, 'fecha': fila['primera'], 'fecha_ultimo_cambio': fila['ultima'],
+            })
+            resumen['cambios_por_tipo'][fila['tipo_cambio']] = fila['cantidad']
+            resumen['fecha'] = min(resumen['fecha'], fila['primera'])
+            resumen['fecha_ultimo_cambio'] = max(resumen['fecha_ultimo_cambio'], fila['ultima'])
+
+        # Paciente y odontólogo del primer cambio de cada versión
+        primeros = {
+            fila['version_id']: fila
+            for fila in historial.order_by('version_id', 'fecha', 'id').distinct('version_id').values(
+                'version_id', 'odontologo_id', paciente_ref=Coalesce('paciente_id', 'diente__paciente_id'),
+            )
+        }
+        snapshots_caries = dict(
+            IndiceCariesSnapshot.objects.filter(version_id__in=resumenes)
+            .order_by('version_id', '-fecha').distinct('version_id')
+            .values_list('version_id', 'id')
+        )
+
+        objetos = [
+            ResumenVersionOdontograma(
+                version_id=version_id,
+                paciente_id=primeros[version_id]['paciente_ref'],
+                odontologo_id=primeros[version_id]['odontologo_id'],
+                fecha=datos['fecha'],
+                fecha_ultimo_cambio=datos['fecha_ultimo_cambio'],
+                total_cambios=sum(datos['cambios_por_tipo'].values()),
+                cambios_por_tipo=datos['cambios_por_tipo'],
+                guardado_completo=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO in datos['cambios_por_tipo'],
+                snapshot_caries_id=snapshots_caries.get(version_id),
+            )
+            for version_id, datos in resumenes.items()
+        ]
+        ResumenVersionOdontograma.objects.bulk_create(
+            objetos,
+            update_conflicts=True,
+            unique_fields=['version_id'],
+            update_fields=_CAMPOS_ACTUALIZABLES,
+        )
+        sin_cambios = {uuid.UUID(str(version_id)) for version_id in version_ids} - set(resumenes)
+        if sin_cambios:
+            ResumenVersionOdontograma.objects.filter(version_id__in=sin_cambios).delete()
+        logger.debug(f"[ResumenVersion] {len(objetos)} cabecera(s) actualizada(s)")
+        return objetos
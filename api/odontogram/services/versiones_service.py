@@ -0,0 +1,317 @@
+# api/odontogram/services/versiones_service.py
+"""
+Almacén de versiones del odontograma codificado por deltas.
+
+Cada guardado registra el estado completo ({codigo_fdi: {superficie: [diagnósticos]}})
+como delta por diente respecto a la versión anterior del paciente:
+
+    {"dientes": {"11": {...estado del diente...}}, "eliminados": ["12"]}
+
+Cada ODONTOGRAMA_VERSIONES_KEYFRAME versiones (o cuando el delta no es más
+chico que el estado) se guarda un keyframe: el mismo formato aplicado sobre
+un odontograma vacío. Reconstruir cualquier versión lee como mucho N filas,
+en una consulta, y el resultado se cachea (las versiones no cambian).
+
+Las filas SNAPSHOT_COMPLETO anteriores a este almacén guardan el estado en
+datos_nuevos; estado() las sigue leyendo hasta compactarlas con
+`python manage.py compactar_versiones_odontograma`.
+"""
+import json
+import logging
+import zlib
+from typing import Any, Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from api.odontogram.models import (
+    HistorialOdontograma,
+    Paciente,
+    ResumenVersionOdontograma,
+    VersionOdontograma,
+)
+
+logger = logging.getLogger(__name__)
+
+CACHE_TIMEOUT = 86400  # 24 horas: una versión guardada no cambia
+
+Estado = Dict[str, Dict[str, List[Dict[str, Any]]]]
+
+
+def _clave_cache(version_id) -> str:
+    return f'odontograma:version_estado:{version_id}'
+
+
+class VersionesOdontogramaService:
+    """Registro y reconstrucción de versiones del odontograma"""
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def registrar_snapshot(
+        cls, diente, odontologo, descripcion: str, estado: Estado, version_id, fecha=None
+    ) -> HistorialOdontograma:
+        """
+        Crea la fila SNAPSHOT_COMPLETO de un guardado (sin el JSON completo)
+        y registra su estado en el almacén de versiones.
+        """
+        fecha = fecha or timezone.now()
+        cls.registrar(diente.paciente_id, version_id, estado, fecha)
+        return HistorialOdontograma.objects.create(
+            diente=diente,
+            tipo_cambio=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO,
+            descripcion=descripcion,
+            odontologo=odontologo,
+            datos_nuevos={},
+            fecha=fecha,
+            version_id=version_id,
+        )
+
+    @classmethod
+    @transaction.atomic
+    def registrar(cls, paciente_id, version_id, estado: Estado, fecha=None) -> VersionOdontograma:
+        """Guarda `estado` como la siguiente versión del paciente"""
+        # Serializa los guardados concurrentes del mismo paciente (numero único)
+        Paciente.objects.select_for_update().filter(pk=paciente_id).values_list('pk', flat=True).first()
+
+        ultima = (
+            VersionOdontograma.objects.filter(paciente_id=paciente_id)
+            .order_by('-numero')
+            .values('numero', 'version_id')
+            .first()
+        )
+        numero = ultima['numero'] + 1 if ultima else 1
+        anterior = cls.estado(ultima['version_id']) if ultima else {}
+
+        completo = cls._codificar({'dientes': estado, 'eliminados': []})
+        es_keyframe = (numero - 1) % cls._intervalo_keyframe() == 0
+        contenido = completo
+        if not es_keyframe:
+            delta = cls._codificar(cls._delta(anterior, estado))
+            es_keyframe = len(delta) >= len(completo)
+            contenido = completo if es_keyframe else delta
+
+        comprimido = cls._comprimir()
+        version = VersionOdontograma.objects.create(
+            paciente_id=paciente_id,
+            version_id=version_id,
+            numero=numero,
+            es_keyframe=es_keyframe,
+            comprimido=comprimido,
+            contenido=zlib.compress(contenido) if comprimido else contenido,
+            fecha=fecha or timezone.now(),
+        )
+        transaction.on_commit(lambda: cache.set(_clave_cache(version_id), estado, timeout=CACHE_TIMEOUT))
+        logger.debug(
+            f"[Versiones] paciente={paciente_id} versión {numero} "
+            f"({'keyframe' if es_keyframe else 'delta'}, {len(version.contenido)} bytes)"
+        )
+        return version
+
+    @classmethod
+    @transaction.atomic
+    def compactar_paciente(cls, paciente_id) -> int:
+        """
+        Pasa al almacén los snapshots del paciente que aún guardan el estado
+        en datos_nuevos, renumerando toda su cadena en orden de fecha. Las
+        versiones ya almacenadas se conservan aunque su fila del historial
+        esté archivada.
+
+        Returns:
+            Cantidad de snapshots compactados
+        """
+        snapshots = list(
+            HistorialOdontograma.objects.filter(
+                paciente_id=paciente_id,
+                tipo_cambio=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO,
+            ).order_by('fecha', 'id').values('id', 'version_id', 'fecha', 'datos_nuevos')
+        )
+        legados = [s['id'] for s in snapshots if s['datos_nuevos']]
+        if not legados:
+            return 0
+
+        versiones = {
+            version['version_id']: (cls.estado(version['version_id']) or {}, version['fecha'])
+            for version in VersionOdontograma.objects.filter(paciente_id=paciente_id)
+            .order_by('numero').values('version_id', 'fecha')
+        }
+        for snapshot in snapshots:
+            estado = snapshot['datos_nuevos'] or cls.estado(snapshot['version_id']) or {}
+            versiones[snapshot['version_id']] = (estado, snapshot['fecha'])
+        cadena = sorted(versiones.items(), key=lambda version: version[1][1])
+
+        VersionOdontograma.objects.filter(paciente_id=paciente_id).delete()
+        cache.delete_many([_clave_cache(version_id) for version_id in versiones])
+        for version_id, (estado, fecha) in cadena:
+            cls.registrar(paciente_id, version_id, estado, fecha)
+        HistorialOdontograma.objects.filter(id__in=legados).update(datos_nuevos={})
+        return len(legados)
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def estado(cls, version_id) -> Optional[Estado]:
+        """Odontograma completo en `version_id` (None si la versión no existe)"""
+        if version_id is None:
+            return None
+        estado = cache.get(_clave_cache(version_id))
+        if estado is not None:
+            return estado
+
+        estado = cls._reconstruir(version_id)
+        if estado is None:
+            estado = cls._estado_legado(version_id)
+        if estado is not None:
+            cache.set(_clave_cache(version_id), estado, timeout=CACHE_TIMEOUT)
+        return estado
+
+    @classmethod
+    def diferencia(cls, version_desde, version_hasta) -> Dict[str, Any]:
+        """
+        Cambios de `version_desde` (None = odontograma vacío) a `version_hasta`.
+
+        Returns:
+            dientes:    {codigo_fdi: estado del diente en "hasta" (None si se quitó)}
+            agregados:  diagnósticos de "hasta" cuyo id no estaba en "desde"
+            eliminados: diagnósticos de "desde" cuyo id ya no está en "hasta"
+            Cada diagnóstico como {'diente', 'superficie', 'diagnostico'}.
+        """
+        desde = cls.estado(version_desde) or {}
+        hasta = cls.estado(version_hasta) or {}
+        delta = cls._delta(desde, hasta)
+
+        ids_desde = cls._ids(desde)
+        ids_hasta = cls._ids(hasta)
+        agregados = [
+            item for item in cls._diagnosticos(hasta, delta['dientes'])
+            if item['diagnostico'].get('id') not in ids_desde or not item['diagnostico'].get('id')
+        ]
+        eliminados = [
+            item for item in cls._diagnosticos(desde, [*delta['dientes'], *delta['eliminados']])
+            if item['diagnostico'].get('id') and item['diagnostico']['id'] not in ids_hasta
+        ]
+        return {
+            'dientes': {**delta['dientes'], **{fdi: None for fdi in delta['eliminados']}},
+            'agregados': agregados,
+            'eliminados': eliminados,
+        }
+
+    @staticmethod
+    def anterior(version_id) -> Optional[str]:
+        """version_id de la versión previa del mismo paciente"""
+        previa = VersionOdontograma.objects.filter(
+            paciente_id=Subquery(
+                VersionOdontograma.objects.filter(version_id=version_id).values('paciente_id')[:1]),
+            numero__lt=Subquery(
+                VersionOdontograma.objects.filter(version_id=version_id).values('numero')[:1]),
+        ).order_by('-numero').values_list('version_id', flat=True).first()
+        return previa
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def _reconstruir(cls, version_id) -> Optional[Estado]:
+        objetivo = VersionOdontograma.objects.filter(version_id=version_id)
+        ultimo_keyframe = VersionOdontograma.objects.filter(
+            paciente_id=OuterRef('paciente_id'),
+            es_keyframe=True,
+            numero__lte=OuterRef('numero'),
+        ).order_by('-numero').values('numero')[:1]
+        # Fila objetivo + cadena keyframe..objetivo (≤ ODONTOGRAMA_VERSIONES_KEYFRAME filas)
+        rango = objetivo.annotate(desde=Subquery(ultimo_keyframe)).values('paciente_id', 'desde', 'numero')
+        cadena = list(
+            VersionOdontograma.objects.filter(
+                paciente_id=Subquery(rango.values('paciente_id')),
+                numero__gte=Subquery(rango.values('desde')),
+                numero__lte=Subquery(rango.values('numero')),
+            ).order_by('numero').values_list('contenido', 'comprimido')
+        )
+        if not cadena:
+            return None
+
+        estado: Estado = {}
+        for contenido, comprimido in cadena:
+            delta = cls._decodificar(contenido, comprimido)
+            estado.update(delta['dientes'])
+            for codigo_fdi in delta['eliminados']:
+                estado.pop(codigo_fdi, None)
+        return estado
+
+    @staticmethod
+    def _estado_legado(version_id) -> Optional[Estado]:
+        """
+        Estado guardado completo en datos_nuevos (snapshots previos al almacén).
+        Con el período de la versión (ResumenVersionOdontograma) la lectura
+        restaura su mes si ya se archivó.
+        """
+        snapshots = HistorialOdontograma.objects.filter(
+            version_id=version_id,
+            tipo_cambio=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO,
+        )
+        periodo = (
+            ResumenVersionOdontograma.objects.filter(version_id=version_id)
+            .values_list('fecha', 'fecha_ultimo_cambio')
+            .first()
+        )
+        if periodo is not None:
+            snapshots = snapshots.periodo(*periodo)
+        return (
+            snapshots
+            .order_by('-fecha')
+            .values_list('datos_nuevos', flat=True)
+            .first()
+        ) or None
+
+    @staticmethod
+    def _delta(anterior: Estado, nuevo: Estado) -> Dict[str, Any]:
+        return {
+            'dientes': {fdi: diente for fdi, diente in nuevo.items() if anterior.get(fdi) != diente},
+            'eliminados': [fdi for fdi in anterior if fdi not in nuevo],
+        }
+
+    @staticmethod
+    def _ids(estado: Estado) -> set:
+        return {
+            diagnostico.get('id')
+            for superficies in estado.values()
+            for diagnosticos in superficies.values()
+            for diagnostico in diagnosticos
+            if diagnostico.get('id')
+        }
+
+    @staticmethod
+    def _diagnosticos(estado: Estado, dientes) -> List[Dict[str, Any]]:
+        return [
+            {'diente': fdi, 'superficie': superficie, 'diagnostico': diagnostico}
+            for fdi in dientes
+            for superficie, diagnosticos in estado.get(fdi, {}).items()
+            for diagnostico in diagnosticos
+        ]
+
+    @staticmethod
+    def _codificar(datos: Dict[str, Any]) -> bytes:
+        return json.dumps(datos, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+    @staticmethod
+    def _decodificar(contenido, comprimido: bool) -> Dict[str, Any]:
+        contenido = bytes(contenido)
+        if comprimido:
+            contenido = zlib.decompress(contenido)
+        return json.loads(contenido)
+
+    @staticmethod
+    def _intervalo_keyframe() -> int:
+        return max(1, int(getattr(settings, 'ODONTOGRAMA_VERSIONES_KEYFRAME', 20)))
+
+    @staticmethod
+    def _comprimir() -> bool:
+        return getattr(settings, 'ODONTOGRAMA_VERSIONES_COMPRIMIR', True)
@@ -12,6 +12,7 @@ from django.dispatch import receiver, Signal
 from django.core.cache import cache
 from django.utils import timezone
 from django.db.models import Q
+from django.db import transaction
 import logging
 from django.contrib.auth import get_user_model
 
@@ -29,9 +30,14 @@ from api.odontogram.models import (
     SuperficieDental,
     DiagnosticoDental,
     HistorialOdontograma,
+    Form033Proyeccion,
+    SesionTratamiento,
 )
-from api.odontogram.services.indice_caries_service import IndiceCariesService
+from api.odontogram.services.catalogo_service import CatalogoDiagnosticosService
+from api.odontogram.services.indice_caries_incremental_service import IndiceCariesIncrementalService
 from api.odontogram.services.context_service import OperacionContexto
+from api.odontogram.services.resumen_version_service import ResumenVersionService
+from api.odontogram.services.resumen_plan_service import ResumenPlanService
 
 DIAGNOSTICOS_AUSENCIA = [
     'ausente',
@@ -259,6 +265,25 @@ def invalidar_cache_atributos(sender, instance, **kwargs):
     logger.debug("Caché de atributos invalidado")
 
 
+@receiver(post_save, sender=CategoriaDiagnostico)
+@receiver(post_delete, sender=CategoriaDiagnostico)
+@receiver(post_save, sender=Diagnostico)
+@receiver(post_delete, sender=Diagnostico)
+@receiver(post_save, sender=AreaAfectada)
+@receiver(post_delete, sender=AreaAfectada)
+@receiver(post_save, sender=TipoAtributoClinico)
+@receiver(post_delete, sender=TipoAtributoClinico)
+@receiver(post_save, sender=OpcionAtributoClinico)
+@receiver(post_delete, sender=OpcionAtributoClinico)
+@receiver(post_save, sender=DiagnosticoAreaAfectada)
+@receiver(post_delete, sender=DiagnosticoAreaAfectada)
+@receiver(post_save, sender=DiagnosticoAtributoClinico)
+@receiver(post_delete, sender=DiagnosticoAtributoClinico)
+def invalidar_catalogo_en_memoria(sender, instance, **kwargs):
+    """Recarga el catálogo en memoria de todos los procesos tras el commit"""
+    CatalogoDiagnosticosService.invalidar()
+
+
 # =============================================================================
 # RECEIVERS PARA VALIDACIONES
 # =============================================================================
@@ -464,11 +489,11 @@ def actualizar_estadisticas_paciente(sender, instance, **kwargs):
     paciente = instance.superficie.diente.paciente
     stats = {
         'total_diagnosticos': DiagnosticoDental.objects.filter(
-            superficie__diente__paciente=paciente,
+            paciente=paciente,
             activo=True
         ).count(),
         'diagnosticos_criticos': DiagnosticoDental.objects.filter(
-            superficie__diente__paciente=paciente,
+            paciente=paciente,
             activo=True
         ).filter(
             Q(prioridad_asignada__gte=4) |
@@ -489,14 +514,54 @@ def invalidar_cache_historial(sender, instance, **kwargs):
     version_id = instance.version_id
     
     # Invalidar cachés
-    cache.delete(f'historial:versiones:{paciente_id}')
-    cache.delete(f'historial:stats:{paciente_id}')
     cache.delete(f'odontograma:completo:{paciente_id}')
     cache.delete(f'odontograma:paciente:{paciente_id}')
     
     logger.debug(f"Caché invalidado para historial paciente {paciente_id}")
     
     
+@receiver(post_save, sender=HistorialOdontograma)
+def actualizar_resumen_version(sender, instance, created, **kwargs):
+    """
+    Mantiene la cabecera de la versión para cambios fuera de un guardado
+    completo (ese la escribe una sola vez al terminar).
+    """
+    if not created or OperacionContexto.esta_en_operacion(str(instance.paciente_id)):
+        return
+    _resumir_version_tras_commit(instance.version_id)
+
+
+@receiver(post_delete, sender=HistorialOdontograma)
+def actualizar_resumen_version_al_eliminar(sender, instance, **kwargs):
+    """Recalcula la cabecera de la versión, o la borra si ya no le quedan cambios"""
+    _resumir_version_tras_commit(instance.version_id)
+
+
+def _resumir_version_tras_commit(version_id):
+    def _resumir():
+        try:
+            ResumenVersionService.registrar(version_id)
+        except Exception as e:
+            logger.error(f"[ResumenVersion] Error resumiendo versión {version_id}: {str(e)}")
+
+    transaction.on_commit(_resumir)
+
+
+@receiver(post_save, sender=SesionTratamiento)
+@receiver(post_delete, sender=SesionTratamiento)
+def actualizar_resumen_plan(sender, instance, **kwargs):
+    """Recalcula el resumen del plan al guardar, completar, cancelar o eliminar una sesión"""
+    plan_id = instance.plan_tratamiento_id
+
+    def _resumir():
+        try:
+            ResumenPlanService.recalcular(plan_id)
+        except Exception as e:
+            logger.error(f"[ResumenPlan] Error resumiendo plan {plan_id}: {str(e)}")
+
+    transaction.on_commit(_resumir)
+
+
 @receiver(post_save, sender=HistorialOdontograma)
 def crear_snapshot_indices_despues_snapshot_completo(sender, instance, created, **kwargs):
     if not created:
@@ -519,7 +584,8 @@ def crear_snapshot_indices_despues_snapshot_completo(sender, instance, created,
     )
     
     try:
-        IndiceCariesService.crear_snapshot_indices(
+        # Los servicios ya aplicaron sus deltas: se guarda el acumulado vigente
+        IndiceCariesIncrementalService.crear_snapshot(
             paciente_id=paciente_id,
             version_id=version_id,
         )
@@ -527,6 +593,50 @@ def crear_snapshot_indices_despues_snapshot_completo(sender, instance, created,
         logger.error(f"[SIGNAL] Error creando snapshot de índices: {str(e)}")
     
     
+@receiver(post_save, sender=DiagnosticoDental)
+@receiver(post_delete, sender=DiagnosticoDental)
+@receiver(post_save, sender=Diente)
+def invalidar_proyeccion_form033(sender, instance, **kwargs):
+    """
+    Descarta la proyección Form033 ante cambios directos (admin, scripts).
+    Dentro de un guardado completo la reconstruye el SNAPSHOT_COMPLETO.
+    """
+    diente = instance if sender is Diente else instance.superficie.diente
+    paciente_id = str(diente.paciente_id)
+    if OperacionContexto.esta_en_operacion(paciente_id):
+        return
+    Form033Proyeccion.objects.filter(paciente_id=paciente_id).delete()
+
+
+@receiver(post_save, sender=HistorialOdontograma)
+def refrescar_proyeccion_form033(sender, instance, created, **kwargs):
+    """
+    Programa la reconstrucción de la proyección Form033 al confirmar la transacción.
+    En un guardado completo solo actúa el SNAPSHOT_COMPLETO final.
+    """
+    if not created:
+        return
+
+    paciente_id = str(instance.diente.paciente_id)
+    if (
+        instance.tipo_cambio != HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO
+        and OperacionContexto.esta_en_operacion(paciente_id)
+    ):
+        return
+
+    version_id = instance.version_id
+
+    def _refrescar():
+        from api.odontogram.services.form033_service import Form033Service
+        try:
+            paciente = instance.diente.paciente
+            Form033Service().actualizar_proyeccion(paciente, version_id)
+        except Exception as e:
+            logger.error(f"[Form033] Error actualizando proyección paciente={paciente_id}: {str(e)}")
+
+    transaction.on_commit(_refrescar)
+
+
 @receiver(post_save, sender=DiagnosticoDental)
 def actualizar_ausencia_en_guardar(sender, instance, created, **kwargs):
     """
@@ -0,0 +1,18 @@
+# api/odontogram/tests/conftest.py
+"""
+Fixtures compartidas para tests del odontograma.
+"""
+import pytest
+
+from api.odontogram.services.catalogo_service import CatalogoDiagnosticosService
+
+
+@pytest.fixture(autouse=True)
+def catalogo_en_memoria_limpio():
+    """
+    El catálogo en memoria vive en el proceso: se descarta entre tests porque
+    el rollback de la BD no dispara las señales que lo invalidan.
+    """
+    CatalogoDiagnosticosService.descartar()
+    yield
+    CatalogoDiagnosticosService.descartar()
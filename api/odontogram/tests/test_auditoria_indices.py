@@ -0,0 +1,120 @@
+# api/odontogram/tests/test_auditoria_indices.py
+"""
+Tests de la auditoría de índices (pg_stat_user_indexes) y benchmark de
+inserción en HistorialOdontograma con el juego de índices consolidado.
+"""
+import time
+import uuid
+from datetime import date
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+
+from api.odontogram.models import Diente, HistorialOdontograma
+from api.odontogram.services.auditoria_indices_service import AuditoriaIndicesService
+from api.patients.models import Paciente
+
+User = get_user_model()
+
+TABLA = HistorialOdontograma._meta.db_table
+
+# Índices que tenía el historial antes de la consolidación (incluye los implícitos de las FK)
+INDICES_ANTERIORES = [
+    f'CREATE INDEX bench_diente_fk ON {TABLA} (diente_id)',
+    f'CREATE INDEX bench_diente ON {TABLA} (diente_id)',
+    f'CREATE INDEX bench_odontologo_fk ON {TABLA} (odontologo_id)',
+    f'CREATE INDEX bench_odontologo ON {TABLA} (odontologo_id)',
+    f'CREATE INDEX bench_version_campo ON {TABLA} (version_id)',
+    f'CREATE INDEX bench_version ON {TABLA} (version_id)',
+    f'CREATE INDEX bench_tipo_fecha ON {TABLA} (tipo_cambio, fecha DESC)',
+    f'CREATE INDEX bench_paciente_version ON {TABLA} (paciente_id, version_id)',
+]
+
+
+def _indices_historial():
+    (modelo,) = AuditoriaIndicesService.auditar(app_label='odontogram', modelo='HistorialOdontograma')
+    return {i['nombre']: i for i in modelo['indices']}
+
+
+@pytest.fixture
+def diente(db):
+    paciente = Paciente.objects.create(
+        nombres='Iris', apellidos='Indices', cedula_pasaporte='1700000500', sexo='F', edad=50,
+        condicion_edad='A', fecha_nacimiento=date(1975, 1, 1), fecha_ingreso=date(2025, 1, 1),
+        telefono='0999999999',
+    )
+    return Diente.objects.create(paciente=paciente, codigo_fdi='11')
+
+
+@pytest.fixture
+def odontologo(db):
+    return User.objects.create_user(
+        username='indices', correo='indices@test.com', password='x',
+        nombres='Ivan', apellidos='Indices', rol='Odontologo', telefono='0999999999',
+    )
+
+
+@pytest.mark.django_db
+def test_historial_sin_indices_redundantes():
+    indices = _indices_historial()
+    assert set(indices) == {
+        'odonto_historial_odontograma_pkey', 'idx_version_fecha', 'idx_diente_fecha',
+        'idx_odontologo_fecha', 'idx_historial_paciente_fecha', 'idx_fecha',
+    }
+    assert not [nombre for nombre, i in indices.items() if i['redundante_con']]
+    assert not indices['odonto_historial_odontograma_pkey']['sin_uso']
+
+
+@pytest.mark.django_db
+def test_detecta_indices_redundantes_y_sin_uso():
+    with connection.cursor() as cursor:
+        for sql in INDICES_ANTERIORES[:2] + INDICES_ANTERIORES[-2:]:
+            cursor.execute(sql)
+
+    indices = _indices_historial()
+    # Prefijo de otro índice, en cualquier sentido de recorrido
+    assert indices['bench_diente_fk']['redundante_con'] in ('bench_diente', 'idx_diente_fecha')
+    assert indices['bench_diente']['redundante_con'] == 'idx_diente_fecha'
+    assert indices['bench_tipo_fecha']['redundante_con'] is None
+    assert indices['bench_paciente_version']['redundante_con'] is None
+    assert indices['bench_tipo_fecha']['sin_uso']
+
+    salida = StringIO()
+    call_command('auditar_indices', app='odontogram', modelo='HistorialOdontograma', solo_problemas=True, stdout=salida)
+    assert 'REDUNDANTE con idx_diente_fecha' in salida.getvalue()
+    assert 'odonto_historial_odontograma_pkey' not in salida.getvalue()
+
+
+@pytest.mark.performance
+@pytest.mark.django_db
+def test_rendimiento_insercion_historial(diente, odontologo):
+    def insertar(cantidad=5000, lote=250):
+        filas = [
+            HistorialOdontograma(
+                diente=diente, paciente_id=diente.paciente_id, odontologo=odontologo,
+                tipo_cambio=HistorialOdontograma.TipoCambio.DIAGNOSTICO_AGREGADO,
+                descripcion='Benchmark', version_id=uuid.uuid4(),
+            )
+            for _ in range(cantidad)
+        ]
+        inicio = time.perf_counter()
+        HistorialOdontograma.objects.bulk_create(filas, batch_size=lote)
+        return cantidad / (time.perf_counter() - inicio)
+
+    insertar(500)  # calentamiento
+    consolidado = insertar()
+    with connection.cursor() as cursor:
+        # Las FK son DEFERRABLE: sin esto el CREATE INDEX falla por triggers pendientes
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+        for sql in INDICES_ANTERIORES:
+            cursor.execute(sql)
+    anterior = insertar()
+
+    print(
+        f"\nInserción en HistorialOdontograma: {anterior:.0f} filas/s con {len(INDICES_ANTERIORES) + 5} índices, "
+        f"{consolidado:.0f} filas/s con 5 índices ({consolidado / anterior:.2f}x)"
+    )
+    assert len(_indices_historial()) == len(INDICES_ANTERIORES) + 6
@@ -0,0 +1,120 @@
+# api/odontogram/tests/test_catalogo_memoria.py
+"""
+Tests del catálogo del odontograma en memoria: carga, invalidación por
+señales / versión en la BD y uso desde los servicios.
+"""
+import dataclasses
+from datetime import date
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+
+from api.odontogram.models import Diagnostico, DiagnosticoDental, OpcionAtributoClinico, VersionCatalogo
+from api.odontogram.serializers.serializers import DiagnosticoListSerializer
+from api.odontogram.services.catalogo_service import FILA_VERSION, CatalogoDiagnosticosService
+from api.odontogram.services.diagnostico_text_service import (
+    construir_texto_procedimiento_desde_diagnosticos,
+)
+from api.odontogram.services.odontogram_services import OdontogramaService
+from api.patients.models import Paciente
+
+User = get_user_model()
+
+
+@pytest.fixture
+def catalogo_csv(db):
+    call_command('cargar_odontograma_csv', quiet=True)
+
+
+def _consultas_catalogo(consultas):
+    tablas = ('"odonto_diagnostico"', '"odonto_categoria', '"odonto_opcion_atributo', '"odonto_tipo_atributo',
+              '"odonto_area_afectada"', '"odonto_diagnostico_area"', '"odonto_diagnostico_atributo"')
+    return [q['sql'] for q in consultas if q['sql'].lstrip().startswith('SELECT')
+            and any(f'FROM {tabla}' in q['sql'] for tabla in tablas)]
+
+
+@pytest.mark.django_db
+def test_carga_completa_en_pocas_consultas_e_inmutable(catalogo_csv):
+    with CaptureQueriesContext(connection) as consultas:
+        catalogo = CatalogoDiagnosticosService.obtener()
+    assert len(consultas) <= 8  # versión + 7 tablas del catálogo
+
+    assert len(catalogo.diagnosticos) == Diagnostico.objects.count()
+    caries = catalogo.diagnostico('caries')
+    assert catalogo.diagnostico_por_id(caries.id) is caries
+    assert caries.categoria.key == 'patologia_activa'
+    assert caries.codigo_icd10 == 'K02.9'
+    assert 'oclusal' in caries.superficie_aplicables
+    assert caries.areas_keys
+    with pytest.raises(dataclasses.FrozenInstanceError):
+        caries.nombre = 'Otro'
+
+    opcion = OpcionAtributoClinico.objects.select_related('tipo_atributo').first()
+    assert catalogo.opcion(opcion.tipo_atributo.key, opcion.key).nombre == opcion.nombre
+
+    with CaptureQueriesContext(connection) as consultas:
+        assert CatalogoDiagnosticosService.obtener() is catalogo
+        with pytest.raises(Diagnostico.DoesNotExist):
+            CatalogoDiagnosticosService.diagnostico('no_existe')
+    assert len(consultas) == 0
+
+
+@pytest.mark.django_db
+def test_senales_y_version_en_bd_recargan_el_catalogo(catalogo_csv, settings):
+    settings.ODONTOGRAMA_CATALOGO_VERIFICAR_SEGUNDOS = 0
+    catalogo = CatalogoDiagnosticosService.obtener()
+
+    # Cambio en este proceso: la señal incrementa la versión y descarta la copia local
+    caries = Diagnostico.objects.get(key='caries')
+    caries.nombre = 'Caries dental'
+    caries.save()
+    actual = CatalogoDiagnosticosService.obtener()
+    assert actual.diagnostico('caries').nombre == 'Caries dental'
+    assert int(actual.version) > int(catalogo.version)
+
+    # Cambio de otro worker: sin señales en este proceso, se detecta por la versión de la BD
+    Diagnostico.objects.filter(key='caries').update(activo=False)
+    assert CatalogoDiagnosticosService.obtener() is actual
+    VersionCatalogo.objects.filter(pk=FILA_VERSION).update(version=F('version') + 1)
+    recargado = CatalogoDiagnosticosService.obtener()
+    assert recargado is not actual and recargado.version == CatalogoDiagnosticosService.version()
+    assert recargado.diagnostico('caries') is None
+    assert recargado.diagnostico('caries', solo_activos=False) is not None
+
+
+@pytest.mark.django_db
+def test_servicios_usan_el_catalogo_sin_consultarlo(catalogo_csv):
+    odontologo = User.objects.create_user(
+        username='catalogo_memoria', correo='catalogo@test.com', password='x',
+        nombres='Ana', apellidos='Catálogo', rol='Odontologo', telefono='0999999999',
+    )
+    paciente = Paciente.objects.create(
+        nombres='Luis', apellidos='Catálogo', cedula_pasaporte='1300000013', sexo='M', edad=40,
+        condicion_edad='A', fecha_nacimiento=date(1985, 1, 1), fecha_ingreso=date(2025, 1, 1),
+        telefono='0999999999',
+    )
+    CatalogoDiagnosticosService.obtener()
+
+    with CaptureQueriesContext(connection) as consultas:
+        resultado = OdontogramaService().guardar_odontograma_completo(
+            paciente_id=str(paciente.id),
+            odontologo_id=odontologo.id,
+            odontograma_data={
+                '16': {'oclusal': [{'procedimientoId': 'caries'}]},
+                '26': {'oclusal': [{'procedimientoId': 'caries'}], 'mesial': [{'procedimientoId': 'no_existe'}]},
+            },
+        )
+        texto = construir_texto_procedimiento_desde_diagnosticos(['caries', 'extraccion_indicada'], modo='key')
+        datos = DiagnosticoListSerializer(Diagnostico.objects.select_related('categoria'), many=True).data
+
+    assert resultado['diagnosticos_guardados'] == 2
+    assert resultado['errores'] == ['Diagnóstico no_existe no encontrado']
+    assert DiagnosticoDental.objects.filter(diagnostico_catalogo__key='caries').count() == 2
+    assert texto.startswith('Procedimiento integral para')
+    assert any(d['atributos_relacionados'] for d in datos)
+    # Solo el listado del serializer lee la tabla de diagnósticos
+    assert len(_consultas_catalogo(consultas)) == 1
@@ -0,0 +1,189 @@
+import time
+from datetime import date
+
+import numpy as np
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from api.patients.models import Paciente
+from api.odontogram.models import (
+    Diagnostico,
+    DiagnosticoDental,
+    Diente,
+    SuperficieDental,
+)
+from api.odontogram.services.catalogo_service import CatalogoDiagnosticosService
+from api.odontogram.services.epidemiologia_service import (
+    EpidemiologiaService,
+    calcular_cpo_ceo,
+    edades_en_anios,
+    matriz_estado_piezas,
+)
+from api.odontogram.services.indice_caries_service import (
+    FLAG_CARIES,
+    FLAG_OBTURADO,
+    FLAG_PERDIDO,
+    IndiceCariesService,
+)
+
+User = get_user_model()
+
+
+def test_cpo_vectorizado_respeta_prioridad_por_pieza():
+    """Pérdida > caries > obturado dentro de la misma pieza."""
+    pacientes = np.array([0, 0, 0, 0, 1])
+    fdi = np.array(['16', '16', '26', '36', '11'])
+    flags = np.array([FLAG_CARIES, FLAG_OBTURADO, FLAG_PERDIDO, FLAG_OBTURADO, FLAG_CARIES])
+
+    indices = calcular_cpo_ceo(matriz_estado_piezas(pacientes, fdi, flags, 2))
+
+    assert indices['C'].tolist() == [1, 1]
+    assert indices['P'].tolist() == [1, 0]
+    assert indices['O'].tolist() == [1, 0]
+    assert indices['cpo'].tolist() == [3, 1]
+    assert indices['ceo'].tolist() == [0, 0]
+
+
+def test_edades_en_anios_considera_cumpleanos():
+    nacimientos = np.array(['2010-06-15', '2010-06-16', '1990-01-01'], dtype='datetime64[D]')
+    assert edades_en_anios(nacimientos, date(2026, 6, 15)).tolist() == [16, 15, 36]
+
+
+def _crear_paciente(cedula, sexo, fecha_nacimiento):
+    return Paciente.objects.create(
+        nombres='Paciente',
+        apellidos=cedula,
+        cedula_pasaporte=cedula,
+        sexo=sexo,
+        edad=20,
+        condicion_edad='A',
+        fecha_nacimiento=fecha_nacimiento,
+        fecha_ingreso=date(2025, 1, 1),
+        telefono='0999999999',
+    )
+
+
+def _registrar(paciente, odontologo, fdi, diagnostico_key, superficie='oclusal'):
+    diente, _ = Diente.objects.get_or_create(paciente=paciente, codigo_fdi=fdi)
+    sup, _ = SuperficieDental.objects.get_or_create(diente=diente, nombre=superficie)
+    return DiagnosticoDental.objects.create(
+        superficie=sup,
+        diagnostico_catalogo=Diagnostico.objects.get(key=diagnostico_key),
+        odontologo=odontologo,
+    )
+
+
+@pytest.mark.django_db
+def test_indices_cohorte_coinciden_con_calculo_por_paciente():
+    call_command('cargar_odontograma_csv', quiet=True)
+    odontologo = User.objects.create_user(
+        username='epi_odontologo', correo='epi@test.com', password='x',
+        nombres='Ana', apellidos='Epi', rol='Odontologo', telefono='0999999999',
+    )
+    adulto = _crear_paciente('1000000001', 'F', date(1990, 3, 1))
+    nino = _crear_paciente('1000000002', 'M', date(2019, 3, 1))
+    _crear_paciente('1000000003', 'M', date(1985, 3, 1))  # sin odontograma
+
+    _registrar(adulto, odontologo, '16', 'caries')
+    _registrar(adulto, odontologo, '16', 'obturacion', 'mesial')
+    _registrar(adulto, odontologo, '26', 'obturacion')
+    _registrar(adulto, odontologo, '36', 'ausente', 'general')
+    _registrar(nino, odontologo, '55', 'caries')
+    _registrar(nino, odontologo, '65', 'extraccion_indicada', 'general')
+    _registrar(nino, odontologo, '75', 'obturacion')
+
+    data = EpidemiologiaService.calcular_indices_cohorte()
+
+    esperado_adulto = IndiceCariesService.calcular_indices_paciente(str(adulto.id))
+    esperado_nino = IndiceCariesService.calcular_indices_paciente(str(nino.id))
+    assert esperado_adulto['permanente']['total'] == 3
+    assert esperado_nino['temporal']['total'] == 3
+
+    assert data['poblacion'] == {'total_pacientes': 3, 'con_odontograma': 2, 'con_indicadores': 0}
+    assert data['cpo']['maximo'] == esperado_adulto['permanente']['total']
+    assert data['ceo']['maximo'] == esperado_nino['temporal']['total']
+    assert data['cpo']['componentes'] == {'C': 0.5, 'P': 0.5, 'O': 0.5}
+
+    grupos = {g['grupo']: g for g in data['por_grupo']}
+    assert grupos['35-44']['cpo_promedio'] == 3.0
+    assert grupos['35-44']['pacientes'] == 2
+    assert grupos['35-44']['con_odontograma'] == 1
+
+    solo_mujeres = EpidemiologiaService.calcular_indices_cohorte(sexo='F')
+    assert solo_mujeres['poblacion']['total_pacientes'] == 1
+
+
+@pytest.mark.django_db
+def test_pacientes_libres_de_caries_cuentan_en_la_poblacion():
+    call_command('cargar_odontograma_csv', quiet=True)
+    odontologo = User.objects.create_user(
+        username='epi_sanos', correo='epi_sanos@test.com', password='x',
+        nombres='Ana', apellidos='Epi', rol='Odontologo', telefono='0999999999',
+    )
+    con_caries = _crear_paciente('1000000011', 'F', date(1990, 3, 1))
+    sano = _crear_paciente('1000000012', 'F', date(1990, 3, 1))
+    solo_ausente = _crear_paciente('1000000013', 'F', date(1990, 3, 1))
+
+    _registrar(con_caries, odontologo, '16', 'caries')
+    Diente.objects.create(paciente=sano, codigo_fdi='11')
+    Diente.objects.create(paciente=solo_ausente, codigo_fdi='36', ausente=True, razon_ausencia='otra_causa')
+
+    data = EpidemiologiaService.calcular_indices_cohorte()
+
+    assert data['poblacion']['con_odontograma'] == 3
+    assert data['cpo']['promedio'] == round(2 / 3, 2)
+    assert data['cpo']['libres_de_caries'] == round(100 / 3, 2)
+
+
+@pytest.mark.django_db
+def test_diagnostico_fuera_de_la_copia_del_catalogo(monkeypatch):
+    call_command('cargar_odontograma_csv', quiet=True)
+    odontologo = User.objects.create_user(
+        username='epi_catalogo', correo='epi_catalogo@test.com', password='x',
+        nombres='Ana', apellidos='Epi', rol='Odontologo', telefono='0999999999',
+    )
+    paciente = _crear_paciente('1000000021', 'F', date(1990, 3, 1))
+    _registrar(paciente, odontologo, '16', 'caries')
+    # Copia en memoria anterior al diagnóstico nuevo (aún sin refrescar)
+    copia = CatalogoDiagnosticosService.obtener()
+    monkeypatch.setattr(CatalogoDiagnosticosService, 'obtener', classmethod(lambda cls: copia))
+    caries = Diagnostico.objects.get(key='caries')
+    Diagnostico.objects.create(
+        key='diagnostico_nuevo', categoria=caries.categoria, nombre='Nuevo', simbolo_color='#000000', prioridad=1,
+    )
+    _registrar(paciente, odontologo, '26', 'diagnostico_nuevo')
+
+    data = EpidemiologiaService.calcular_indices_cohorte()
+
+    assert data['cpo']['maximo'] == 1
+
+
+@pytest.mark.django_db
+def test_rango_de_edad_invertido_es_400():
+    client = APIClient()
+    client.force_authenticate(user=User.objects.create_user(
+        username='epi_rango', correo='epi_rango@test.com', password='x',
+        nombres='Ana', apellidos='Epi', rol='Odontologo', telefono='0999999999',
+    ))
+    respuesta = client.get('/api/odontogram/epidemiologia/indices/', {'edad_min': 40, 'edad_max': 20})
+    assert respuesta.status_code == 400
+    assert 'edad_min' in respuesta.json()['errors']
+
+
+@pytest.mark.performance
+def test_rendimiento_nucleo_vectorizado_50k_pacientes():
+    """50k pacientes x 20 diagnósticos deben procesarse en segundos."""
+    rng = np.random.default_rng(0)
+    n_pacientes, n_dx = 50_000, 1_000_000
+    fdi = rng.choice([11, 16, 26, 36, 46, 55, 65, 75, 85], size=n_dx)
+    flags = rng.choice([FLAG_CARIES, FLAG_OBTURADO, FLAG_PERDIDO], size=n_dx)
+    pacientes = rng.integers(0, n_pacientes, size=n_dx)
+
+    inicio = time.perf_counter()
+    indices = calcular_cpo_ceo(matriz_estado_piezas(pacientes, fdi, flags, n_pacientes))
+    duracion = time.perf_counter() - inicio
+
+    assert indices['cpo'].shape == (n_pacientes,)
+    assert duracion < 5
@@ -0,0 +1,127 @@
+# api/odontogram/tests/test_etag_odontograma.py
+"""
+Tests del GET condicional (ETag / Last-Modified) del odontograma completo y
+de las vistas del catálogo: 304 sin consultar el payload mientras la versión
+no cambie y 200 con ETag nuevo tras un cambio.
+"""
+from datetime import date
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from api.odontogram.models import CategoriaDiagnostico, Diente, HistorialOdontograma, VersionCatalogo
+from api.odontogram.services.catalogo_service import FILA_VERSION
+from api.patients.models import Paciente
+
+User = get_user_model()
+
+
+@pytest.fixture
+def odontologo(db):
+    return User.objects.create_user(
+        username='etag', correo='etag@test.com', password='x',
+        nombres='Elena', apellidos='Etag', rol='Odontologo', telefono='0999999999',
+    )
+
+
+@pytest.fixture
+def client(odontologo):
+    client = APIClient()
+    client.force_authenticate(user=odontologo)
+    return client
+
+
+@pytest.fixture
+def paciente(db):
+    return Paciente.objects.create(
+        nombres='Eva', apellidos='Etag', cedula_pasaporte='1700000700', sexo='F', edad=35,
+        condicion_edad='A', fecha_nacimiento=date(1990, 1, 1), fecha_ingreso=date(2025, 1, 1),
+        telefono='0999999999',
+    )
+
+
+@pytest.mark.django_db
+def test_odontograma_completo_responde_304_hasta_un_cambio(client, paciente, odontologo):
+    url = reverse('odontogram:odontograma-completo', args=[paciente.id])
+    primera = client.get(url)
+    assert primera.status_code == 200
+    etag = primera['ETag']
+    assert 'Last-Modified' in primera
+    assert 'no-cache' in primera['Cache-Control'] and 'private' in primera['Cache-Control']
+
+    with CaptureQueriesContext(connection) as consultas:
+        respuesta = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert respuesta.status_code == 304
+    assert not respuesta.content
+    # Solo la consulta del marcador de versión
+    assert len(consultas) == 1
+
+    diente = Diente.objects.create(paciente=paciente, codigo_fdi='11')
+    HistorialOdontograma.objects.create(
+        diente=diente, odontologo=odontologo, tipo_cambio=HistorialOdontograma.TipoCambio.NOTA_AGREGADA,
+        descripcion='Nota',
+    )
+    respuesta = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert respuesta.status_code == 200
+    assert respuesta['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_odontograma_cambia_de_etag_al_editar_el_catalogo(client, paciente):
+    url = reverse('odontogram:odontograma-completo', args=[paciente.id])
+    etag = client.get(url)['ETag']
+    # Edición hecha por otro worker: solo cambia la fila de VersionCatalogo
+    VersionCatalogo.objects.filter(pk=FILA_VERSION).update(version=F('version') + 1)
+    respuesta = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert respuesta.status_code == 200
+    assert respuesta['ETag'] != etag
+
+
+@pytest.mark.django_db
+def test_odontograma_de_paciente_inexistente_sin_etag(client):
+    respuesta = client.get(reverse('odontogram:odontograma-completo', args=['00000000-0000-0000-0000-000000000000']))
+    assert respuesta.status_code == 404
+    assert 'ETag' not in respuesta
+
+
+@pytest.mark.django_db
+def test_catalogo_cambia_de_etag_al_editarse(client, django_capture_on_commit_callbacks):
+    urls = [
+        reverse('odontogram:categoria-con-diagnosticos'),
+        reverse('odontogram:diagnostico-list'),
+        reverse('odontogram:area-list'),
+        reverse('odontogram:atributo-clinico-list'),
+    ]
+    etags = {}
+    for url in urls:
+        respuesta = client.get(url)
+        assert respuesta.status_code == 200
+        etags[url] = respuesta['ETag']
+        with CaptureQueriesContext(connection) as consultas:
+            assert client.get(url, HTTP_IF_NONE_MATCH=etags[url]).status_code == 304
+        # Solo la lectura de VersionCatalogo
+        assert len(consultas) == 1
+
+    with django_capture_on_commit_callbacks(execute=True):
+        CategoriaDiagnostico.objects.create(
+            key='etag_test', nombre='Categoría ETag', color_key='ROJO', prioridad_key='ALTA')
+
+    for url in urls:
+        respuesta = client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+        assert respuesta.status_code == 200
+        assert respuesta['ETag'] != etags[url]
+
+
+@pytest.mark.django_db
+def test_definiciones_superficies_condicionales(client):
+    url = reverse('odontogram:definiciones-superficies')
+    primera = client.get(url)
+    assert primera.status_code == 200
+    assert client.get(url, HTTP_IF_NONE_MATCH=primera['ETag']).status_code == 304
+    # Otro ETag (versión anterior del cliente) recibe el payload completo
+    assert client.get(url, HTTP_IF_NONE_MATCH='"otro"').status_code == 200
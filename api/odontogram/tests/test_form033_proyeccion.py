@@ -0,0 +1,70 @@
+from datetime import date
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from api.patients.models import Paciente
+from api.odontogram.models import DiagnosticoDental, Form033Proyeccion
+from api.odontogram.services.form033_service import Form033Service
+from api.odontogram.services.odontogramaDiagnostico_service import OdontogramaDiagnosticoService
+from api.odontogram.services.odontogramaWrite_service import OdontogramaWriteService
+
+User = get_user_model()
+
+
+@pytest.fixture
+def odontologo(db):
+    call_command('cargar_odontograma_csv', quiet=True)
+    return User.objects.create_user(
+        username='form033_proy', correo='form033@test.com', password='x',
+        nombres='Rosa', apellidos='Proyeccion', rol='Odontologo', telefono='0999999999',
+    )
+
+
+@pytest.fixture
+def paciente(db):
+    return Paciente.objects.create(
+        nombres='Pedro', apellidos='Form', cedula_pasaporte='1200000001',
+        sexo='M', edad=40, condicion_edad='A', fecha_nacimiento=date(1985, 2, 1),
+        fecha_ingreso=date(2025, 1, 1), telefono='0999999999',
+    )
+
+
+@pytest.mark.django_db
+def test_proyeccion_se_actualiza_al_confirmar_guardado(
+    odontologo, paciente, django_capture_on_commit_callbacks, django_assert_max_num_queries
+):
+    paciente_id = str(paciente.id)
+    with django_capture_on_commit_callbacks(execute=True):
+        resultado = OdontogramaWriteService().guardar_odontograma_completo(paciente_id, odontologo.id, {
+            '16': {'oclusal': [{'procedimientoId': 'caries', 'secondaryOptions': {}}]},
+            '55': {'oclusal': [{'procedimientoId': 'obturacion', 'secondaryOptions': {}}]},
+        })
+
+    proyeccion = Form033Proyeccion.objects.get(paciente=paciente)
+    assert str(proyeccion.version_id) == resultado['version_id']
+
+    # Lectura: paciente + versión vigente + proyección, sin recorrer el odontograma
+    with django_assert_max_num_queries(3):
+        datos = Form033Service().generar_datos_form033(paciente_id)
+    assert datos['odontograma_permanente'] == Form033Service().construir_matrices(paciente)['odontograma_permanente']
+    assert datos['odontograma_permanente']['dientes'][0][2]['codigo_fdi'] == '16'
+
+    caries = DiagnosticoDental.objects.get(superficie__diente__codigo_fdi='16')
+    with django_capture_on_commit_callbacks(execute=True):
+        OdontogramaDiagnosticoService().eliminar_diagnostico(str(caries.id), odontologo.id)
+
+    proyeccion.refresh_from_db()
+    assert str(proyeccion.version_id) != resultado['version_id']
+    assert proyeccion.matrices['odontograma_permanente']['dientes'][0][2] is None
+
+
+@pytest.mark.django_db
+def test_proyeccion_desactualizada_se_reconstruye(odontologo, paciente):
+    Form033Proyeccion.objects.create(paciente=paciente, version_id=None, matrices={})
+
+    datos = Form033Service().generar_datos_form033(str(paciente.id))
+
+    assert len(datos['odontograma_permanente']['dientes']) == 4
+    assert Form033Proyeccion.objects.get(paciente=paciente).matrices != {}
@@ -0,0 +1,97 @@
+from datetime import date
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+
+from api.patients.models import Paciente
+from api.odontogram.models import DiagnosticoDental, IndiceCariesAcumulado, IndiceCariesSnapshot
+from api.odontogram.services.indice_caries_incremental_service import (
+    IndiceCariesIncrementalService,
+)
+from api.odontogram.services.indice_caries_service import IndiceCariesService
+from api.odontogram.services.odontogramaDiagnostico_service import OdontogramaDiagnosticoService
+from api.odontogram.services.odontogramaWrite_service import OdontogramaWriteService
+
+User = get_user_model()
+
+
+@pytest.fixture
+def odontologo(db):
+    call_command('cargar_odontograma_csv', quiet=True)
+    return User.objects.create_user(
+        username='cpo_incremental', correo='cpo@test.com', password='x',
+        nombres='Luis', apellidos='Cpo', rol='Odontologo', telefono='0999999999',
+    )
+
+
+@pytest.fixture
+def paciente(db):
+    return Paciente.objects.create(
+        nombres='Marta', apellidos='Incremental', cedula_pasaporte='1100000001',
+        sexo='F', edad=30, condicion_edad='A', fecha_nacimiento=date(1995, 5, 1),
+        fecha_ingreso=date(2025, 1, 1), telefono='0999999999',
+    )
+
+
+def _totales_recalculados(paciente_id):
+    indices = IndiceCariesService.calcular_indices_paciente(paciente_id)
+    return indices['permanente']['total'], indices['temporal']['total']
+
+
+def _dx(key, superficie='oclusal'):
+    return {superficie: [{'procedimientoId': key, 'secondaryOptions': {}}]}
+
+
+@pytest.mark.django_db
+def test_deltas_del_guardado_coinciden_con_recalculo(odontologo, paciente):
+    paciente_id = str(paciente.id)
+    servicio = OdontogramaWriteService()
+
+    resultado = servicio.guardar_odontograma_completo(paciente_id, odontologo.id, {
+        '16': _dx('caries'),
+        '26': _dx('obturacion'),
+        '55': _dx('caries'),
+    })
+    assert (resultado['cpo_total'], resultado['ceo_total']) == _totales_recalculados(paciente_id)
+
+    # Segundo guardado: obturación sobre el 16 cariado y pérdida del 36
+    resultado = servicio.guardar_odontograma_completo(paciente_id, odontologo.id, {
+        '16': _dx('obturacion', 'mesial'),
+        '36': {'general': [{'procedimientoId': 'ausente', 'secondaryOptions': {}}]},
+    })
+    acumulado = IndiceCariesAcumulado.objects.get(paciente=paciente)
+    assert (acumulado.cpo_c, acumulado.cpo_p, acumulado.cpo_o) == (1, 1, 1)
+    assert (resultado['cpo_total'], resultado['ceo_total']) == _totales_recalculados(paciente_id)
+    assert IndiceCariesSnapshot.objects.filter(paciente=paciente).count() == 2
+
+    # Eliminación individual de la caries del 16: pasa a obturado
+    caries_16 = DiagnosticoDental.objects.get(
+        superficie__diente__paciente=paciente,
+        superficie__diente__codigo_fdi='16',
+        diagnostico_catalogo__key='caries',
+    )
+    OdontogramaDiagnosticoService().eliminar_diagnostico(str(caries_16.id), odontologo.id)
+    acumulado.refresh_from_db()
+    assert (acumulado.cpo_c, acumulado.cpo_o) == (0, 2)
+    assert IndiceCariesIncrementalService.verificar() == []
+
+
+@pytest.mark.django_db
+def test_verificador_reporta_y_corrige_deriva(odontologo, paciente):
+    paciente_id = str(paciente.id)
+    OdontogramaWriteService().guardar_odontograma_completo(paciente_id, odontologo.id, {
+        '11': _dx('caries'),
+        '21': _dx('caries'),
+    })
+
+    # Cambio fuera de los servicios: el acumulado queda desfasado
+    DiagnosticoDental.objects.filter(superficie__diente__codigo_fdi='21').update(activo=False)
+
+    derivas = IndiceCariesIncrementalService.verificar(corregir=True)
+    assert derivas == [{
+        'paciente_id': paciente_id,
+        'diferencias': {'cpo_c': {'acumulado': 2, 'recalculado': 1}},
+    }]
+    assert IndiceCariesAcumulado.objects.get(paciente=paciente).cpo_total == 1
+    assert IndiceCariesIncrementalService.verificar() == []
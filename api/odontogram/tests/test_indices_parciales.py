@@ -0,0 +1,67 @@
+# api/odontogram/tests/test_indices_parciales.py
+"""
+Tests de los índices parciales (WHERE activo = true): las consultas calientes
+hechas con los managers `activos` deben resolverse con el índice parcial.
+
+Las tablas de test están vacías, así que se desactiva el seq scan para que el
+planner muestre qué índice elegiría con datos reales.
+"""
+import uuid
+from datetime import date
+
+import pytest
+from django.db import connection
+
+from api.appointment.models import Cita
+from api.clinical_records.models import ClinicalRecord
+from api.odontogram.models import DiagnosticoDental, IndicadoresSaludBucal, PlanTratamiento, SesionTratamiento
+from api.patients.models import ConstantesVitales, Paciente
+
+ID = uuid.uuid4()
+
+CONSULTAS_CALIENTES = [
+    ('idx_diag_paciente_act', lambda: DiagnosticoDental.activos.filter(paciente_id=ID).order_by('-fecha')),
+    ('idx_cita_odontologo_act', lambda: Cita.activos.filter(odontologo_id=ID, fecha=date(2026, 1, 5)).order_by('hora_inicio')),
+    ('idx_cita_paciente_act', lambda: Cita.activos.filter(paciente_id=ID).order_by('-fecha')),
+    ('idx_hc_paciente_act', lambda: ClinicalRecord.activos.filter(paciente_id=ID).order_by('-fecha_atencion')),
+    ('idx_constantes_pac_act', lambda: ConstantesVitales.activos.filter(paciente_id=ID).order_by('-fecha_consulta')),
+    ('idx_plan_paciente_act', lambda: PlanTratamiento.activos.filter(paciente_id=ID).order_by('-fecha_creacion')),
+    ('idx_sesion_fecha_act', lambda: SesionTratamiento.activos.filter(fecha_programada__gte=date(2026, 1, 1))),
+    ('idx_indicador_paciente_act', lambda: IndicadoresSaludBucal.objects.filter(paciente_id=ID).order_by('-fecha')),
+    ('idx_paciente_nombre_act', lambda: Paciente.activos.order_by('apellidos', 'nombres')[:50]),
+]
+
+
+def _plan(queryset) -> str:
+    with connection.cursor() as cursor:
+        cursor.execute('SET LOCAL enable_seqscan = off')
+    return queryset.explain()
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('indice, consulta', CONSULTAS_CALIENTES, ids=[c[0] for c in CONSULTAS_CALIENTES])
+def test_consulta_caliente_usa_indice_parcial(indice, consulta):
+    assert indice in _plan(consulta())
+
+
+@pytest.mark.django_db
+def test_inactivos_no_usan_indice_parcial():
+    plan = _plan(DiagnosticoDental.objects.inactivos().filter(paciente_id=ID))
+    assert 'idx_diag_paciente_act' not in plan
+
+
+@pytest.mark.django_db
+def test_managers_de_eliminado_logico(django_assert_num_queries):
+    paciente = Paciente.objects.create(
+        nombres='Ana', apellidos='Parcial', cedula_pasaporte='1700000400', sexo='F', edad=30,
+        condicion_edad='A', fecha_nacimiento=date(1995, 1, 1), fecha_ingreso=date(2025, 1, 1),
+        telefono='0999999999',
+    )
+    assert list(Paciente.activos.all()) == [paciente]
+
+    with django_assert_num_queries(1):
+        assert Paciente.objects.filter(pk=paciente.pk).desactivar() == 1
+    assert not Paciente.activos.exists()
+    assert list(Paciente.objects.inactivos()) == [paciente]
+    # El manager por defecto no filtra: restauraciones y admin ven los inactivos
+    assert Paciente.objects.get(pk=paciente.pk).activo is False
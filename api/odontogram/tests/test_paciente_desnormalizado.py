@@ -0,0 +1,125 @@
+# api/odontogram/tests/test_paciente_desnormalizado.py
+"""
+Tests de la columna paciente_id desnormalizada en DiagnosticoDental e
+HistorialOdontograma: asignación en save(), backfill por lotes y consultas
+por paciente sin joins.
+"""
+from datetime import date
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.odontogram.models import (
+    CategoriaDiagnostico, Diagnostico, DiagnosticoDental, Diente, HistorialOdontograma, SuperficieDental,
+)
+from api.odontogram.services.paciente_desnormalizado_service import PacienteDesnormalizadoService
+from api.patients.models import Paciente
+
+User = get_user_model()
+
+
+@pytest.fixture
+def odontologo(db):
+    return User.objects.create_user(
+        username='desnormalizado', correo='desnormalizado@test.com', password='x',
+        nombres='Ana', apellidos='Paciente', rol='Odontologo', telefono='0999999999',
+    )
+
+
+@pytest.fixture
+def pacientes(db):
+    return [
+        Paciente.objects.create(
+            nombres=f'Paciente {n}', apellidos='Desnormalizado', cedula_pasaporte=f'170000010{n}', sexo='F',
+            edad=30, condicion_edad='A', fecha_nacimiento=date(1995, 1, 1), fecha_ingreso=date(2025, 1, 1),
+            telefono='0999999999',
+        )
+        for n in range(2)
+    ]
+
+
+@pytest.fixture
+def diagnostico(db):
+    categoria = CategoriaDiagnostico.objects.create(
+        key='desnormalizado', nombre='Desnormalizado', color_key='#ff0000', prioridad_key='alta')
+    return Diagnostico.objects.create(
+        key='desnormalizado', categoria=categoria, nombre='Caries', siglas='DSN',
+        simbolo_color='rojo', prioridad=1, codigo_icd10='K02.9')
+
+
+def _superficie(paciente, fdi='11'):
+    diente = Diente.objects.create(paciente=paciente, codigo_fdi=fdi)
+    return SuperficieDental.objects.create(diente=diente, nombre='oclusal')
+
+
+@pytest.mark.django_db
+def test_save_asigna_paciente_y_consultas_sin_join(pacientes, odontologo, diagnostico):
+    superficie = _superficie(pacientes[0])
+    dental = DiagnosticoDental.objects.create(
+        superficie=superficie, diagnostico_catalogo=diagnostico, odontologo=odontologo)
+    cambio = HistorialOdontograma.objects.create(
+        diente=superficie.diente, tipo_cambio=HistorialOdontograma.TipoCambio.DIAGNOSTICO_AGREGADO,
+        descripcion='Caries', odontologo=odontologo)
+    assert dental.paciente_id == cambio.paciente_id == pacientes[0].id
+
+    # save(update_fields=...) parcial también persiste el paciente faltante
+    DiagnosticoDental.objects.filter(pk=dental.pk).update(paciente=None)
+    dental.paciente_id = None
+    dental.descripcion = 'Editado'
+    dental.save(update_fields=['descripcion'])
+    assert DiagnosticoDental.objects.get(pk=dental.pk).paciente_id == pacientes[0].id
+
+    with CaptureQueriesContext(connection) as consultas:
+        assert list(DiagnosticoDental.objects.filter(paciente_id=pacientes[0].id, activo=True)) == [dental]
+        assert HistorialOdontograma.objects.filter(paciente_id=pacientes[0].id).count() == 1
+    for consulta in consultas:
+        assert 'JOIN' not in consulta['sql']
+
+
+@pytest.mark.django_db
+def test_backfill_por_lotes(pacientes, odontologo, diagnostico):
+    superficies = [_superficie(paciente, fdi) for paciente in pacientes for fdi in ('11', '21', '31')]
+    # bulk_create no pasa por save(): simula filas anteriores a la migración
+    DiagnosticoDental.objects.bulk_create([
+        DiagnosticoDental(superficie=s, diagnostico_catalogo=diagnostico, odontologo=odontologo)
+        for s in superficies
+    ])
+    HistorialOdontograma.objects.bulk_create([
+        HistorialOdontograma(diente=s.diente, tipo_cambio=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO,
+                             descripcion='Snapshot', odontologo=odontologo)
+        for s in superficies
+    ])
+    assert PacienteDesnormalizadoService.pendientes() == {'diagnosticos': 6, 'historial': 6}
+
+    salida = StringIO()
+    call_command('rellenar_paciente_odontograma', lote=4, stdout=salida)
+    assert 'diagnosticos: 6 fila(s)' in salida.getvalue()
+    assert PacienteDesnormalizadoService.pendientes() == {'diagnosticos': 0, 'historial': 0}
+
+    for dental in DiagnosticoDental.objects.select_related('superficie__diente'):
+        assert dental.paciente_id == dental.superficie.diente.paciente_id
+    for cambio in HistorialOdontograma.objects.select_related('diente'):
+        assert cambio.paciente_id == cambio.diente.paciente_id
+
+    # Idempotente
+    assert PacienteDesnormalizadoService.rellenar(lote=4) == {'diagnosticos': 0, 'historial': 0}
+
+
+@pytest.mark.django_db
+def test_backfill_sigue_tras_un_lote_incompleto(pacientes, odontologo, monkeypatch):
+    HistorialOdontograma.objects.bulk_create([
+        HistorialOdontograma(diente=_superficie(paciente, '11').diente, descripcion='Nota', odontologo=odontologo,
+                             tipo_cambio=HistorialOdontograma.TipoCambio.NOTA_AGREGADA)
+        for paciente in pacientes
+    ])
+    # Cada lote actualiza una sola fila, como si SKIP LOCKED hubiera salteado el resto
+    tabla, sql = PacienteDesnormalizadoService.TABLAS['historial']
+    monkeypatch.setitem(PacienteDesnormalizadoService.TABLAS, 'historial',
+                        (tabla, sql.replace('LIMIT %s', 'LIMIT LEAST(%s, 1)')))
+
+    assert PacienteDesnormalizadoService.rellenar(lote=4)['historial'] == len(pacientes)
+    assert PacienteDesnormalizadoService.pendientes()['historial'] == 0
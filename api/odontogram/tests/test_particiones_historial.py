@@ -0,0 +1,252 @@
+# api/odontogram/tests/test_particiones_historial.py
+"""
+Tests del particionado mensual de las tablas de historial: particiones
+futuras, archivo en el storage de los meses antiguos y restauración
+transparente al consultar un período archivado.
+"""
+import importlib
+from datetime import date, timedelta
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.odontogram.models import Diente, HistorialOdontograma
+from api.odontogram.services.resumen_version_service import ResumenVersionService
+from api.odontogram.services.versiones_service import VersionesOdontogramaService
+from api.patients.models import Paciente
+from common.services.particiones_service import PARTICIONADAS, ParticionesService
+from common.services.storage_backend import LocalBackend
+from common.services.storage_service import StorageService
+
+User = get_user_model()
+
+TABLA = 'odonto_historial_odontograma'
+
+
+def _relkind(tabla):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = %s::regclass", [tabla])
+        return cursor.fetchone()[0]
+
+
+def _indices(tabla):
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT indexname FROM pg_indexes WHERE tablename = %s", [tabla])
+        return {fila[0] for fila in cursor.fetchall()}
+
+
+@pytest.fixture
+def storage_local(tmp_path):
+    backend = LocalBackend({'bucket_name': 'plexident-test', 'root': tmp_path, 'secret_key': 'test-secret'})
+    backend.verificar()
+    cache.clear()
+    with StorageService.usar_backend(backend) as servicio:
+        yield servicio
+
+
+@pytest.fixture
+def odontologo(db):
+    return User.objects.create_user(
+        username='particiones', correo='particiones@test.com', password='x',
+        nombres='Pablo', apellidos='Particiones', rol='Odontologo', telefono='0999999999',
+    )
+
+
+@pytest.fixture
+def diente(db):
+    paciente = Paciente.objects.create(
+        nombres='Marta', apellidos='Particiones', cedula_pasaporte='1700000600', sexo='F', edad=70,
+        condicion_edad='A', fecha_nacimiento=date(1955, 1, 1), fecha_ingreso=date(2020, 1, 1),
+        telefono='0999999999',
+    )
+    return Diente.objects.create(paciente=paciente, codigo_fdi='11')
+
+
+def _cambios(diente, odontologo, fecha, cantidad):
+    ids = []
+    for n in range(cantidad):
+        cambio = HistorialOdontograma.objects.create(
+            diente=diente, odontologo=odontologo, tipo_cambio=HistorialOdontograma.TipoCambio.NOTA_AGREGADA,
+            descripcion=f'Cambio {n}', datos_nuevos={'nota': f'ñandú {n}', 'valores': [n, None]},
+        )
+        ids.append(cambio.id)
+    HistorialOdontograma.objects.filter(id__in=ids).update(fecha=fecha)
+    return ids
+
+
+@pytest.mark.django_db
+def test_tablas_particionadas_por_mes():
+    mes_actual = timezone.now().date().replace(day=1)
+    for tabla in PARTICIONADAS:
+        assert _relkind(tabla) == 'p'
+        assert mes_actual in ParticionesService.meses_en_base(tabla)
+        assert f'{tabla}_pdefault' in {fila for fila in _particiones(tabla)}
+    # Índices declarados en el modelo, ahora particionados
+    assert {'idx_version_fecha', 'idx_diente_fecha', 'idx_fecha'} <= _indices(TABLA)
+
+
+def _particiones(tabla):
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "WHERE i.inhparent = %s::regclass", [tabla])
+        return [fila[0] for fila in cursor.fetchall()]
+
+
+@pytest.mark.django_db
+def test_particion_futura_recibe_filas_de_la_default(diente, odontologo):
+    lejano = timezone.now() + timedelta(days=400)
+    (cambio_id,) = _cambios(diente, odontologo, lejano, 1)
+    mes = lejano.date().replace(day=1)
+    assert mes not in ParticionesService.meses_en_base(TABLA)
+
+    salida = StringIO()
+    call_command('particiones_historial', meses_futuros=14, stdout=salida)
+    assert f'{TABLA}_p{mes:%Y%m}' in salida.getvalue()
+
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT tableoid::regclass::text FROM {TABLA} WHERE id = %s", [cambio_id])
+        assert cursor.fetchone()[0] == f'{TABLA}_p{mes:%Y%m}'
+    call_command('particiones_historial', meses_futuros=14, stdout=salida)
+    assert '0 partición(es) creada(s)' in salida.getvalue()
+
+
+@pytest.mark.django_db
+def test_archiva_y_restaura_al_consultar_el_periodo(diente, odontologo, storage_local):
+    antiguo = timezone.now() - timedelta(days=31 * 30)
+    ids = _cambios(diente, odontologo, antiguo, 3)
+    recientes = _cambios(diente, odontologo, timezone.now(), 2)
+    originales = {c.id: (c.fecha, c.datos_nuevos) for c in HistorialOdontograma.objects.filter(id__in=ids)}
+    mes = antiguo.date().replace(day=1)
+
+    salida = StringIO()
+    call_command('particiones_historial', archivar=True, retencion=24, stdout=salida)
+    assert '1 partición(es) archivada(s)' in salida.getvalue()
+
+    clave = ParticionesService.clave_archivo(TABLA, mes)
+    assert storage_local.check_file_exists(clave)
+    assert mes not in ParticionesService.meses_en_base(TABLA)
+    assert not HistorialOdontograma.objects.filter(id__in=ids).exists()
+    assert HistorialOdontograma.objects.filter(id__in=recientes).count() == 2
+
+    # Lectura de auditoría del período: el mes vuelve desde el archivo
+    client = APIClient()
+    client.force_authenticate(user=odontologo)
+    respuesta = client.get(reverse('odontogram:historial-list'), {
+        'diente_id': str(diente.id), 'desde': (antiguo - timedelta(days=1)).date().isoformat(),
+        'hasta': (antiguo + timedelta(days=1)).date().isoformat(),
+    })
+    assert respuesta.status_code == 200
+    assert mes in ParticionesService.meses_en_base(TABLA)
+    restaurados = {c.id: (c.fecha, c.datos_nuevos) for c in HistorialOdontograma.objects.filter(id__in=ids)}
+    assert restaurados == originales
+
+    # Una segunda lectura no vuelve a restaurar
+    assert ParticionesService.asegurar_periodo(TABLA, antiguo) == []
+
+
+def _migracion_particionado():
+    return importlib.import_module('api.odontogram.migrations.0012_particionar_historial')
+
+
+@pytest.mark.django_db
+def test_migracion_copia_las_filas_por_lotes(diente, odontologo):
+    migracion = _migracion_particionado()
+    indices = _indices(TABLA)
+    with connection.cursor() as cursor:
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')  # FK diferidas de los inserts del test
+    migracion._despartir(connection, TABLA)
+    assert _relkind(TABLA) == 'r'
+    antiguo = timezone.now() - timedelta(days=31 * 5)
+    ids = _cambios(diente, odontologo, antiguo, 3) + _cambios(diente, odontologo, timezone.now(), 2)
+    with connection.cursor() as cursor:
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+    migracion._particionar(connection, TABLA, 'fecha', lote=2)
+
+    assert _relkind(TABLA) == 'p'
+    assert HistorialOdontograma.objects.filter(id__in=ids).count() == 5
+    # El mes más antiguo con filas tiene su propia partición
+    assert antiguo.date().replace(day=1) in ParticionesService.meses_en_base(TABLA)
+    assert {i for i in _indices(TABLA) if not i.startswith(f'{TABLA}_p')} == \
+        {i for i in indices if not i.startswith(f'{TABLA}_p')}
+    with connection.cursor() as cursor:
+        assert not ParticionesService._existe(cursor, migracion._nueva(TABLA))
+
+
+@pytest.mark.django_db
+def test_migracion_sin_filas_crea_los_meses_siguientes():
+    migracion = _migracion_particionado()
+    migracion._despartir(connection, TABLA)
+    migracion._particionar(connection, TABLA, 'fecha')
+    assert _relkind(TABLA) == 'p'
+    actual = timezone.now().date().replace(day=1)
+    assert actual in ParticionesService.meses_en_base(TABLA)
+
+
+def _snapshot(diente, odontologo, fecha):
+    snapshot = HistorialOdontograma.objects.create(
+        diente=diente, odontologo=odontologo, tipo_cambio=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO,
+        descripcion='Guardado completo', datos_nuevos={'11': {'oclusal': []}},
+    )
+    HistorialOdontograma.objects.filter(id=snapshot.id).update(fecha=fecha)
+    return snapshot.id
+
+
+def _ultimo_snapshot(paciente_id):
+    return HistorialOdontograma.objects.filter(
+        paciente_id=paciente_id, tipo_cambio=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO,
+    ).order_by('-fecha').values_list('id', flat=True).first()
+
+
+@pytest.mark.django_db
+def test_archivar_conserva_la_ultima_version_de_cada_paciente(diente, odontologo, storage_local):
+    with connection.cursor() as cursor:
+        # En producción cada restauración se confirma antes de archivar
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+    antiguo = timezone.now() - timedelta(days=31 * 30)
+    mes = antiguo.date().replace(day=1)
+    anterior = _snapshot(diente, odontologo, antiguo - timedelta(hours=1))
+    ultimo = _snapshot(diente, odontologo, antiguo)
+    _cambios(diente, odontologo, timezone.now(), 1)
+
+    archivadas = ParticionesService.archivar(24)
+    assert [(a['mes'], a['filas'], a['conservadas']) for a in archivadas] == [(mes, 1, 1)]
+    # El último snapshot sigue en la base (partición DEFAULT); el anterior se archivó
+    assert mes not in ParticionesService.meses_en_base(TABLA)
+    assert _ultimo_snapshot(diente.paciente_id) == ultimo
+    assert not HistorialOdontograma.objects.filter(id=anterior).exists()
+    # Mientras siga siendo el último no se vuelve a archivar
+    assert ParticionesService.archivar(24) == []
+
+    # Con un guardado nuevo deja de conservarse: el mes se restaura y se archiva completo
+    nuevo = _snapshot(diente, odontologo, timezone.now())
+    archivadas = ParticionesService.archivar(24)
+    assert [(a['mes'], a['filas'], a['conservadas']) for a in archivadas] == [(mes, 2, 0)]
+    assert _ultimo_snapshot(diente.paciente_id) == nuevo
+    assert not HistorialOdontograma.objects.filter(id__in=[anterior, ultimo]).exists()
+
+    ParticionesService.restaurar(TABLA, mes)
+    assert HistorialOdontograma.objects.filter(id__in=[anterior, ultimo]).count() == 2
+
+
+@pytest.mark.django_db
+def test_estado_legado_restaura_su_mes_archivado(diente, odontologo, storage_local):
+    with connection.cursor() as cursor:
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+    antiguo = timezone.now() - timedelta(days=31 * 30)
+    legado = HistorialOdontograma.objects.get(id=_snapshot(diente, odontologo, antiguo)).version_id
+    ResumenVersionService.registrar(legado)
+    _snapshot(diente, odontologo, timezone.now())
+
+    assert [a['filas'] for a in ParticionesService.archivar(24)] == [1]
+    cache.clear()
+    assert VersionesOdontogramaService.estado(legado) == {'11': {'oclusal': []}}
+    assert antiguo.date().replace(day=1) in ParticionesService.meses_en_base(TABLA)
@@ -0,0 +1,220 @@
+# api/odontogram/tests/test_renderer_json.py
+"""
+Tests del renderer JSON estándar (sobre escrito como bytes alrededor del
+payload codificado con orjson o con el encoder de DRF), de la compresión
+brotli/gzip de respuestas grandes y benchmark contra el renderer anterior
+con formas reales de payload: odontograma completo, semana de citas, lista
+CIE paginada y bundle FHIR.
+"""
+import copy
+import gzip
+import time
+import uuid
+from datetime import date, datetime, time as hora, timedelta
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+import brotli
+import pytest
+from django.http import HttpResponse
+from django.test import RequestFactory
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.settings import api_settings
+
+from api.utils import renderers
+from api.utils.compression import CompresionRespuestaMiddleware
+from api.utils.renderers import StandardizedJSONRenderer
+
+INICIO = datetime(2025, 3, 3, 8, 0, 0, 123456, tzinfo=dt_timezone.utc)
+
+
+class RendererAnterior(JSONRenderer):
+    """Implementación previa: dict de sobre nuevo + JSONRenderer (json de la stdlib)"""
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        response = renderer_context['response']
+        return super().render({
+            'success': response.status_code < 400,
+            'status_code': response.status_code,
+            'message': StandardizedJSONRenderer()._get_message(data, response),
+            'data': data if response.status_code < 400 else None,
+            'errors': data if response.status_code >= 400 else None,
+        }, accepted_media_type, renderer_context)
+
+
+def _odontograma():
+    return {
+        'paciente': {'id': str(uuid.uuid4()), 'nombres': 'Ana', 'apellidos': 'Pérez', 'cedula_pasaporte': '1700000001'},
+        'odontograma_data': {
+            str(fdi): {
+                superficie: [
+                    {
+                        'id': str(uuid.uuid4()), 'procedimientoId': 'caries', 'nombre': 'Caries dental',
+                        'siglas': 'C', 'colorHex': '#FF0000', 'secondaryOptions': {'profundidad': 'media'},
+                        'descripcion': 'Lesión activa — “control”', 'afectaArea': ['corona'],
+                        'estado_tratamiento': 'diagnosticado', 'prioridad': 4, 'categoria_nombre': 'Patología',
+                        'fecha': INICIO + timedelta(minutes=n),
+                    }
+                    for n in range(2)
+                ]
+                for superficie in ('oclusal', 'mesial', 'distal', 'vestibular', 'lingual')
+            }
+            for fdi in list(range(11, 19)) + list(range(21, 29)) + list(range(31, 39)) + list(range(41, 49))
+        },
+        'fecha_obtension': INICIO,
+    }
+
+
+def _semana_citas():
+    return [
+        {
+            'id': uuid.uuid4(), 'paciente': {'id': uuid.uuid4(), 'nombre_completo': f'Paciente {n}'},
+            'odontologo': n % 7, 'fecha': date(2025, 3, 3) + timedelta(days=n % 6),
+            'hora_inicio': hora(8 + n % 10, 30), 'hora_fin': hora(9 + n % 10, 0), 'duracion': 30,
+            'estado': 'PROGRAMADA', 'motivo_consulta': 'Control semestral',
+            'fecha_creacion': INICIO - timedelta(days=n), 'activo': True,
+        }
+        for n in range(300)
+    ]
+
+
+def _lista_cie():
+    return {
+        'count': 1000, 'next': 'http://testserver/api/odontogram/diagnosticos-cie/?page=2', 'previous': None,
+        'results': [
+            {'id': n, 'codigo': f'K02.{n % 10}', 'nombre': 'Caries de la dentina', 'tipo': 'PRE', 'activo': True,
+             'fecha_creacion': INICIO, 'fecha_modificacion': INICIO + timedelta(hours=n)}
+            for n in range(1000)
+        ],
+    }
+
+
+def _bundle_fhir():
+    return {
+        'resourceType': 'Bundle', 'type': 'collection', 'timestamp': INICIO,
+        'entry': [
+            {
+                'fullUrl': f'urn:uuid:{uuid.uuid4()}',
+                'resource': {
+                    'resourceType': 'Condition', 'id': str(uuid.uuid4()),
+                    'code': {'coding': [{'system': 'http://hl7.org/fhir/sid/icd-10', 'code': 'K02.1',
+                                         'display': 'Caries de la dentina'}]},
+                    'bodySite': [{'coding': [{'system': 'http://snomed.info/sct', 'code': '245555004'}]}],
+                    'recordedDate': INICIO + timedelta(seconds=n),
+                    'extension': [{'url': 'http://plexident/fhir/prioridad', 'valueDecimal': Decimal('4.5')}],
+                },
+            }
+            for n in range(500)
+        ],
+    }
+
+
+PAYLOADS = {
+    'odontograma': _odontograma,
+    'semana_citas': _semana_citas,
+    'lista_cie': _lista_cie,
+    'bundle_fhir': _bundle_fhir,
+}
+
+
+def _contexto(status_code=200):
+    return {'response': HttpResponse(status=status_code)}
+
+
+@pytest.mark.parametrize('nombre', PAYLOADS)
+@pytest.mark.parametrize('con_orjson', [True, False])
+def test_salida_identica_al_renderer_anterior(nombre, con_orjson, monkeypatch):
+    if not con_orjson:
+        monkeypatch.setattr(renderers, 'orjson', None)
+    datos = PAYLOADS[nombre]()
+    esperado = RendererAnterior().render(copy.deepcopy(datos), renderer_context=_contexto())
+    assert StandardizedJSONRenderer().render(datos, renderer_context=_contexto()) == esperado
+
+
+@pytest.mark.parametrize('con_orjson', [True, False])
+def test_sobre_con_mensaje_errores_y_caracteres_js(con_orjson, monkeypatch):
+    if not con_orjson:
+        monkeypatch.setattr(renderers, 'orjson', None)
+    renderer = StandardizedJSONRenderer()
+
+    creado = renderer.render({'message': 'Cita creada', 'id': 7, 'nota': 'a\u2028b'}, renderer_context=_contexto(201))
+    assert creado == (
+        b'{"success":true,"status_code":201,"message":"Cita creada","data":{"id":7,"nota":"a\\u2028b"},'
+        b'"errors":null}'
+    )
+    error = renderer.render({'fecha': ['Requerida']}, renderer_context=_contexto(400))
+    assert error == (
+        b'{"success":false,"status_code":400,"message":"Error en los datos enviados","data":null,'
+        b'"errors":{"fecha":["Requerida"]}}'
+    )
+    vacio = renderer.render(None, renderer_context=_contexto(204))
+    assert vacio == (
+        b'{"success":true,"status_code":204,"message":"Recurso eliminado exitosamente","data":null,"errors":null}'
+    )
+    # Respuestas ya estandarizadas y enteros fuera de 64 bits (fallback al encoder de DRF)
+    estandar = {'success': True, 'status_code': 200, 'data': 2 ** 70}
+    assert renderer.render(estandar, renderer_context=_contexto()) == JSONRenderer().render(estandar)
+
+
+def test_con_indentacion_usa_el_render_de_drf():
+    datos = {'id': 1}
+    salida = StandardizedJSONRenderer().render(datos, 'application/json; indent=2', _contexto())
+    assert salida.startswith(b'{\n  "success": true')
+
+
+def test_api_navegable_solo_con_debug(settings):
+    assert not settings.DEBUG
+    assert BrowsableAPIRenderer not in api_settings.DEFAULT_RENDERER_CLASSES
+
+
+def _middleware(contenido, content_type='application/json'):
+    return CompresionRespuestaMiddleware(lambda request: HttpResponse(contenido, content_type=content_type))
+
+
+@pytest.mark.parametrize('accept_encoding, codificacion', [
+    ('gzip, deflate, br', 'br'),
+    ('gzip, deflate', 'gzip'),
+    ('identity', None),
+])
+def test_compresion_negociada_para_respuestas_grandes(accept_encoding, codificacion):
+    contenido = StandardizedJSONRenderer().render(_lista_cie(), renderer_context=_contexto())
+    request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING=accept_encoding)
+
+    response = _middleware(contenido)(request)
+    assert response.get('Content-Encoding') == codificacion
+    assert 'Accept-Encoding' in response['Vary']
+    if codificacion == 'br':
+        assert brotli.decompress(response.content) == contenido
+    elif codificacion == 'gzip':
+        assert gzip.decompress(response.content) == contenido
+    else:
+        assert response.content == contenido
+    if codificacion:
+        assert int(response['Content-Length']) < len(contenido) // 5
+
+
+def test_compresion_omite_respuestas_pequenas_y_no_json():
+    request = RequestFactory().get('/', HTTP_ACCEPT_ENCODING='br')
+    assert not _middleware(b'{"success":true}')(request).has_header('Content-Encoding')
+    assert not _middleware(b'x' * 10000, 'application/pdf')(request).has_header('Content-Encoding')
+
+
+@pytest.mark.performance
+def test_rendimiento_renderers():
+    if renderers.orjson is None:
+        pytest.skip('orjson no instalado')
+
+    def medir(renderer, fabrica, repeticiones=20):
+        datos = [fabrica() for _ in range(repeticiones)]
+        inicio = time.perf_counter()
+        for d in datos:
+            renderer.render(d, renderer_context=_contexto())
+        return (time.perf_counter() - inicio) / repeticiones * 1000
+
+    lineas = []
+    for nombre, fabrica in PAYLOADS.items():
+        anterior = medir(RendererAnterior(), fabrica)
+        nuevo = medir(StandardizedJSONRenderer(), fabrica)
+        lineas.append(f'{nombre:<13} anterior {anterior:7.2f} ms   orjson {nuevo:7.2f} ms   ({anterior / nuevo:.1f}x)')
+        assert nuevo < anterior
+    print('\nRender JSON por respuesta:\n' + '\n'.join(lineas))
@@ -0,0 +1,148 @@
+# api/odontogram/tests/test_resumen_plan.py
+"""
+Tests del resumen precalculado de planes de tratamiento: mantenimiento desde
+las señales de SesionTratamiento (crear, completar, cancelar, eliminar) y
+lectura en los endpoints de resumen y estadísticas.
+"""
+from datetime import date, timedelta
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.clinical_records.models import ClinicalRecord
+from api.odontogram.models import PlanTratamiento, ResumenPlanTratamiento, SesionTratamiento
+from api.odontogram.services.resumen_plan_service import ResumenPlanService
+from api.patients.models import Paciente
+
+User = get_user_model()
+
+PROCEDIMIENTO = {'nombre': 'Resina', 'diente': '16', 'codigo': 'D2391'}
+PRESCRIPCION = {'medicamento': 'Ibuprofeno', 'dosis': '400 mg', 'frecuencia': 'c/8h', 'duracion': '3 días'}
+DIAGNOSTICO = {'key': 'caries', 'nombre': 'Caries dental', 'diente': '16'}
+
+
+@pytest.fixture
+def odontologo(db):
+    return User.objects.create_user(
+        username='resumen_plan', correo='resumen_plan@test.com', password='x',
+        nombres='Rosa', apellidos='Plan', rol='Odontologo', telefono='0999999999',
+    )
+
+
+@pytest.fixture
+def plan(odontologo):
+    paciente = Paciente.objects.create(
+        nombres='Paciente', apellidos='Plan', cedula_pasaporte='1300000950', sexo='F', edad=30,
+        condicion_edad='A', fecha_nacimiento=date(1995, 1, 1), fecha_ingreso=date(2025, 1, 1),
+        telefono='0999999999',
+    )
+    return PlanTratamiento.objects.create(paciente=paciente, creado_por=odontologo, titulo='Plan integral')
+
+
+def _sesion(plan, numero, dias, **campos):
+    return SesionTratamiento.objects.create(
+        plan_tratamiento=plan, numero_sesion=numero,
+        fecha_programada=timezone.localdate() + timedelta(days=dias), **campos,
+    )
+
+
+@pytest.fixture
+def sesiones(plan, django_capture_on_commit_callbacks):
+    with django_capture_on_commit_callbacks(execute=True):
+        return [
+            _sesion(plan, 1, -7, diagnosticos_complicaciones=[DIAGNOSTICO], procedimientos=[PROCEDIMIENTO],
+                    prescripciones=[PRESCRIPCION]),
+            _sesion(plan, 2, 3, procedimientos=[PROCEDIMIENTO, {**PROCEDIMIENTO, 'diente': '26'}]),
+            _sesion(plan, 3, 10),
+        ]
+
+
+@pytest.mark.django_db
+def test_resumen_se_mantiene_al_guardar_sesiones(plan, sesiones, odontologo, django_capture_on_commit_callbacks):
+    resumen = ResumenPlanTratamiento.objects.get(plan=plan)
+    assert resumen.total_sesiones == 3
+    assert resumen.sesiones_por_estado == {'planificada': 3, 'en_progreso': 0, 'completada': 0, 'cancelada': 0}
+    assert (resumen.total_diagnosticos, resumen.total_procedimientos, resumen.total_prescripciones) == (1, 3, 1)
+    assert [p['sesion_numero'] for p in resumen.procedimientos_consolidados] == [1, 2, 2]
+    assert resumen.prescripciones_consolidadas == [{
+        **PRESCRIPCION, 'sesion_numero': 1,
+        'sesion_fecha': sesiones[0].fecha_programada.isoformat(), 'sesion_estado': 'planificada',
+    }]
+
+    with django_capture_on_commit_callbacks(execute=True):
+        sesiones[0].completar_sesion(odontologo)
+        sesiones[1].estado = SesionTratamiento.EstadoSesion.CANCELADA
+        sesiones[1].save()
+        sesiones[2].eliminar_logicamente(odontologo)
+
+    resumen.refresh_from_db()
+    assert resumen.total_sesiones == 2
+    assert resumen.sesiones_por_estado == {'planificada': 0, 'en_progreso': 0, 'completada': 1, 'cancelada': 1}
+    assert resumen.fecha_ultima_sesion == SesionTratamiento.objects.get(pk=sesiones[0].pk).fecha_realizacion
+    assert ResumenPlanService.proxima_sesion(resumen) is None
+
+
+@pytest.mark.django_db
+def test_resumen_se_calcula_en_la_primera_lectura(plan, sesiones):
+    ResumenPlanTratamiento.objects.all().delete()
+    plan = PlanTratamiento.objects.get(pk=plan.pk)
+
+    resumen = ResumenPlanService.obtener(plan)
+    assert resumen.total_sesiones == 3
+    assert ResumenPlanTratamiento.objects.filter(plan=plan).exists()
+
+
+@pytest.mark.django_db
+def test_estadisticas_leen_una_fila(plan, sesiones, odontologo):
+    client = APIClient()
+    client.force_authenticate(user=odontologo)
+    url = f'/api/odontogram/planes-tratamiento/{plan.id}/estadisticas/'
+
+    with CaptureQueriesContext(connection) as consultas:
+        respuesta = client.get(url)
+    assert respuesta.status_code == 200
+    assert not any('odontogram_sesion_tratamiento' in q['sql'] for q in consultas.captured_queries)
+
+    datos = respuesta.json()['data']
+    assert datos['total_sesiones'] == 3
+    assert datos['sesiones_por_estado']['planificada'] == 3
+    assert datos['progreso_porcentaje'] == 0
+    # La sesión 1 ya pasó: la próxima es la 2
+    assert datos['proxima_sesion'] == {
+        'id': str(sesiones[1].id), 'fecha': sesiones[1].fecha_programada.isoformat(), 'numero_sesion': 2,
+    }
+
+
+@pytest.mark.django_db
+def test_resumen_del_historial_desde_el_resumen_precalculado(plan, sesiones, odontologo):
+    historial = ClinicalRecord.objects.create(
+        paciente=plan.paciente,
+        odontologo_responsable=odontologo,
+        numero_historia_clinica_unica='HC-202500950',
+        motivo_consulta='Control',
+        plan_tratamiento=plan,
+    )
+    client = APIClient()
+    client.force_authenticate(user=odontologo)
+
+    with CaptureQueriesContext(connection) as consultas:
+        respuesta = client.get(f'/api/clinical-records/{historial.id}/resumen-plan-tratamiento/')
+    assert respuesta.status_code == 200
+    assert not any('odontogram_sesion_tratamiento' in q['sql'] for q in consultas.captured_queries)
+
+    datos = respuesta.json()['data']
+    assert [s['numero_sesion'] for s in datos['sesiones_detalle']] == [1, 2, 3]
+    assert datos['resumen'] == {'total_diagnosticos': 1, 'total_procedimientos': 3, 'total_prescripciones': 1}
+    assert datos['prescripciones_consolidadas'][0]['sesion'] == 1
+    assert '1. Ibuprofeno' in datos['texto_prescripciones_completo']
+    assert '(Sesión #1)' in datos['texto_prescripciones_completo']
+
+    completo = client.get(f'/api/clinical-records/{historial.id}/datos-completos-plan/').json()['data']
+    plan_completo = completo['plan_tratamiento']
+    assert plan_completo['resumen_estadistico']['total_procedimientos'] == 3
+    assert len(plan_completo['procedimientos_consolidados']) == 3
+    assert plan_completo['diagnosticos_consolidados'][0]['sesion_estado'] == 'planificada'
@@ -0,0 +1,180 @@
+# api/odontogram/tests/test_resumen_versiones.py
+"""
+Tests de las cabeceras de versión del odontograma: escritura tras el commit,
+backfill desde el historial y listado con paginación por cursor.
+"""
+import importlib
+import uuid
+from datetime import date, timedelta
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from api.odontogram.models import Diente, HistorialOdontograma, IndiceCariesSnapshot, ResumenVersionOdontograma
+from api.odontogram.services.resumen_version_service import ResumenVersionService
+from api.patients.models import Paciente
+
+User = get_user_model()
+Tipo = HistorialOdontograma.TipoCambio
+
+
+@pytest.fixture
+def odontologo(db):
+    return User.objects.create_user(
+        username='resumen', correo='resumen@test.com', password='x',
+        nombres='Pedro', apellidos='Resumen', rol='Odontologo', telefono='0999999999',
+    )
+
+
+@pytest.fixture
+def paciente(db):
+    return Paciente.objects.create(
+        nombres='Lucía', apellidos='Resumen', cedula_pasaporte='1700000300', sexo='F', edad=40,
+        condicion_edad='A', fecha_nacimiento=date(1985, 1, 1), fecha_ingreso=date(2025, 1, 1),
+        telefono='0999999999',
+    )
+
+
+@pytest.fixture
+def dientes(paciente):
+    return [Diente.objects.create(paciente=paciente, codigo_fdi=fdi) for fdi in ('11', '21')]
+
+
+def _historial(dientes, odontologo, version_id, tipos):
+    return HistorialOdontograma.objects.bulk_create([
+        HistorialOdontograma(
+            diente=dientes[n % len(dientes)], paciente_id=dientes[0].paciente_id, tipo_cambio=tipo,
+            descripcion=tipo, odontologo=odontologo, version_id=version_id,
+        )
+        for n, tipo in enumerate(tipos)
+    ])
+
+
+@pytest.mark.django_db
+def test_cambio_fuera_de_guardado_escribe_la_cabecera(
+    dientes, odontologo, django_capture_on_commit_callbacks
+):
+    version_id = uuid.uuid4()
+    with django_capture_on_commit_callbacks(execute=True):
+        for tipo in (Tipo.DIAGNOSTICO_AGREGADO, Tipo.DIAGNOSTICO_AGREGADO, Tipo.DIAGNOSTICO_TRATADO):
+            HistorialOdontograma.objects.create(
+                diente=dientes[0], tipo_cambio=tipo, descripcion=tipo, odontologo=odontologo,
+                version_id=version_id)
+        snapshot = IndiceCariesSnapshot.objects.create(paciente_id=dientes[0].paciente_id, version_id=version_id)
+
+    resumen = ResumenVersionOdontograma.objects.get()
+    assert resumen.version_id == version_id and resumen.paciente_id == dientes[0].paciente_id
+    assert resumen.odontologo == odontologo
+    assert resumen.total_cambios == 3
+    assert resumen.cambios_por_tipo == {Tipo.DIAGNOSTICO_AGREGADO: 2, Tipo.DIAGNOSTICO_TRATADO: 1}
+    assert not resumen.guardado_completo
+    assert resumen.snapshot_caries_id == snapshot.id
+    assert resumen.fecha <= resumen.fecha_ultimo_cambio
+
+
+@pytest.mark.django_db
+def test_backfill_y_listado_por_cursor(paciente, dientes, odontologo):
+    versiones = [uuid.uuid4() for _ in range(5)]
+    for n, version_id in enumerate(versiones):
+        _historial(dientes, odontologo, version_id, [Tipo.DIAGNOSTICO_AGREGADO] * (n + 1) + [Tipo.SNAPSHOT_COMPLETO])
+    # Fechas distintas por versión (auto_now_add no deja fijarlas al crear)
+    ahora = timezone.now()
+    for n, version_id in enumerate(versiones):
+        HistorialOdontograma.objects.filter(version_id=version_id).update(fecha=ahora - timedelta(days=5 - n))
+
+    salida = StringIO()
+    call_command('resumir_versiones_odontograma', stdout=salida)
+    assert '5 cabecera(s)' in salida.getvalue()
+    call_command('resumir_versiones_odontograma', stdout=salida)
+    assert '0 cabecera(s)' in salida.getvalue()
+    assert ResumenVersionOdontograma.objects.get(version_id=versiones[2]).total_cambios == 4
+
+    client = APIClient()
+    client.force_authenticate(user=odontologo)
+    url = reverse('odontogram:paciente-versiones')
+    with CaptureQueriesContext(connection) as consultas:
+        respuesta = client.get(url, {'paciente_id': str(paciente.id), 'page_size': 2})
+    assert respuesta.status_code == 200
+    consultas_pagina = [q for q in consultas if 'odonto_resumen_version_odontograma' in q['sql']]
+    assert len(consultas_pagina) == 1
+
+    recibidas = []
+    while True:
+        recibidas += [str(v['version_id']) for v in respuesta.data['results']]
+        assert all(v['guardado_completo'] for v in respuesta.data['results'])
+        if not respuesta.data['next']:
+            break
+        respuesta = client.get(respuesta.data['next'])
+    assert recibidas == [str(v) for v in reversed(versiones)]
+
+    estadisticas = client.get(reverse('odontogram:paciente-estadisticas'), {'paciente_id': str(paciente.id)}).data
+    assert (estadisticas['total_versiones'], estadisticas['total_cambios']) == (5, 20)
+
+
+@pytest.mark.django_db
+def test_borrar_cambios_actualiza_la_cabecera(dientes, odontologo, django_capture_on_commit_callbacks):
+    version_id = uuid.uuid4()
+    cambios = _historial(dientes, odontologo, version_id, [Tipo.DIAGNOSTICO_AGREGADO, Tipo.DIAGNOSTICO_TRATADO])
+    call_command('resumir_versiones_odontograma', stdout=StringIO())
+
+    with django_capture_on_commit_callbacks(execute=True):
+        HistorialOdontograma.objects.filter(id=cambios[1].id).delete()
+    resumen = ResumenVersionOdontograma.objects.get(version_id=version_id)
+    assert (resumen.total_cambios, resumen.cambios_por_tipo) == (1, {Tipo.DIAGNOSTICO_AGREGADO: 1})
+
+    with django_capture_on_commit_callbacks(execute=True):
+        HistorialOdontograma.objects.filter(version_id=version_id).delete()
+    assert not ResumenVersionOdontograma.objects.filter(version_id=version_id).exists()
+
+
+@pytest.mark.django_db
+def test_migracion_rellena_las_cabeceras_por_lotes(paciente, dientes, odontologo, monkeypatch):
+    migracion = importlib.import_module('api.odontogram.migrations.0016_rellenar_resumen_version')
+    monkeypatch.setattr(migracion, 'LOTE', 2)
+    versiones = [uuid.uuid4() for _ in range(5)]
+    for version_id in versiones:
+        _historial(dientes, odontologo, version_id, [Tipo.DIAGNOSTICO_AGREGADO, Tipo.SNAPSHOT_COMPLETO])
+    snapshot = IndiceCariesSnapshot.objects.create(paciente_id=paciente.id, version_id=versiones[0])
+    ResumenVersionOdontograma.objects.all().delete()
+
+    with connection.schema_editor() as schema_editor:
+        migracion.rellenar_resumenes(None, schema_editor)
+
+    rellenados = list(ResumenVersionOdontograma.objects.all())
+    esperado = {version_id: ResumenVersionService.resumir([version_id])[0] for version_id in versiones}
+    for resumen in rellenados:
+        calculado = esperado.pop(resumen.version_id)
+        assert (resumen.paciente_id, resumen.odontologo_id, resumen.total_cambios, resumen.cambios_por_tipo,
+                resumen.guardado_completo, resumen.fecha) == \
+            (calculado.paciente_id, calculado.odontologo_id, calculado.total_cambios, calculado.cambios_por_tipo,
+             calculado.guardado_completo, calculado.fecha)
+    assert not esperado
+    assert ResumenVersionOdontograma.objects.get(version_id=versiones[0]).snapshot_caries_id == snapshot.id
+
+
+@pytest.mark.django_db
+def test_migraciones_resumen_el_historial_anterior_al_particionado(paciente, dientes, odontologo):
+    particionado = importlib.import_module('api.odontogram.migrations.0012_particionar_historial')
+    relleno = importlib.import_module('api.odontogram.migrations.0016_rellenar_resumen_version')
+    with connection.cursor() as cursor:
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')  # FK diferidas de los inserts del test
+    particionado._despartir(connection, 'odonto_historial_odontograma')
+    version_id = uuid.uuid4()
+    _historial(dientes, odontologo, version_id, [Tipo.DIAGNOSTICO_AGREGADO, Tipo.SNAPSHOT_COMPLETO])
+    ResumenVersionOdontograma.objects.all().delete()
+    with connection.cursor() as cursor:
+        cursor.execute('SET CONSTRAINTS ALL IMMEDIATE')
+
+    particionado._particionar(connection, 'odonto_historial_odontograma', 'fecha')
+    with connection.schema_editor() as schema_editor:
+        relleno.rellenar_resumenes(None, schema_editor)
+
+    resumen = ResumenVersionOdontograma.objects.get(version_id=version_id)
+    assert (resumen.paciente_id, resumen.total_cambios, resumen.guardado_completo) == (paciente.id, 2, True)
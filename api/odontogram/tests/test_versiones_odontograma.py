@@ -0,0 +1,204 @@
+# api/odontogram/tests/test_versiones_odontograma.py
+"""
+Tests del almacén de versiones del odontograma: deltas por diente con
+keyframes periódicos, reconstrucción acotada, diferencias entre versiones y
+compactación de los snapshots completos anteriores.
+"""
+import json
+import time
+import uuid
+from datetime import date
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from api.odontogram.models import Diente, HistorialOdontograma, VersionOdontograma
+from api.odontogram.services.plan_tratamiento_service import PlanTratamientoService
+from api.odontogram.services.versiones_service import VersionesOdontogramaService
+from api.patients.models import Paciente
+
+User = get_user_model()
+
+FDI = ['11', '12', '13', '14', '15', '16', '17', '18', '21', '22', '23', '24', '25', '26', '27', '28',
+       '31', '32', '33', '34', '35', '36', '37', '38', '41', '42', '43', '44', '45', '46', '47', '48']
+
+
+@pytest.fixture
+def odontologo(db):
+    return User.objects.create_user(
+        username='versiones', correo='versiones@test.com', password='x',
+        nombres='Luis', apellidos='Versiones', rol='Odontologo', telefono='0999999999',
+    )
+
+
+@pytest.fixture
+def paciente(db):
+    return Paciente.objects.create(
+        nombres='Rosa', apellidos='Versiones', cedula_pasaporte='1700000200', sexo='F', edad=60,
+        condicion_edad='A', fecha_nacimiento=date(1965, 1, 1), fecha_ingreso=date(2025, 1, 1),
+        telefono='0999999999',
+    )
+
+
+@pytest.fixture
+def diente(paciente):
+    return Diente.objects.create(paciente=paciente, codigo_fdi='11')
+
+
+@pytest.fixture
+def keyframe_cada_3(settings):
+    settings.ODONTOGRAMA_VERSIONES_KEYFRAME = 3
+    settings.ODONTOGRAMA_VERSIONES_COMPRIMIR = True
+
+
+def _diagnostico(fdi, superficie, n):
+    return {
+        'id': f'{fdi}-{superficie}-{n}', 'procedimientoId': 'caries', 'key': 'caries', 'nombre': 'Caries',
+        'siglas': 'C', 'colorHex': 'rojo', 'prioridad': 4, 'categoria_nombre': 'Patología activa',
+        'secondaryOptions': {'profundidad': 'media'}, 'descripcion': f'Hallazgo {n}',
+    }
+
+
+def _estados(cantidad):
+    """Odontogramas sucesivos: cada versión agrega un diagnóstico y a veces quita un diente"""
+    estado = {fdi: {'oclusal': [_diagnostico(fdi, 'oclusal', 0)]} for fdi in FDI}
+    estados = []
+    for n in range(1, cantidad + 1):
+        estado = json.loads(json.dumps(estado))
+        fdi = FDI[n % len(FDI)]
+        estado.setdefault(fdi, {}).setdefault('mesial', []).append(_diagnostico(fdi, 'mesial', n))
+        if n % 5 == 0:
+            estado.pop(FDI[(n + 7) % len(FDI)], None)
+        estados.append(estado)
+    return estados
+
+
+@pytest.mark.django_db
+def test_reconstruye_cada_version_con_keyframes_periodicos(paciente, keyframe_cada_3):
+    estados = _estados(8)
+    versiones = [VersionesOdontogramaService.registrar(paciente.id, uuid.uuid4(), e) for e in estados]
+
+    assert [v.numero for v in versiones] == list(range(1, 9))
+    assert [v.numero for v in versiones if v.es_keyframe] == [1, 4, 7]
+    assert all(v.comprimido for v in versiones)
+    assert len(versiones[1].contenido) < len(versiones[0].contenido)
+
+    cache.clear()
+    for version, esperado in zip(versiones, estados):
+        with CaptureQueriesContext(connection) as consultas:
+            assert VersionesOdontogramaService.estado(version.version_id) == esperado
+        # Keyframe + ≤ 2 deltas en una sola consulta
+        assert len(consultas) == 1
+    assert VersionesOdontogramaService.anterior(versiones[4].version_id) == versiones[3].version_id
+    assert VersionesOdontogramaService.estado(uuid.uuid4()) is None
+
+
+@pytest.mark.django_db
+def test_diferencia_entre_versiones(paciente):
+    v1, v2 = uuid.uuid4(), uuid.uuid4()
+    antes = {'11': {'oclusal': [{'id': 'a'}]}, '12': {'mesial': [{'id': 'b'}]}, '13': {}}
+    despues = {'11': {'oclusal': [{'id': 'a'}, {'id': 'c'}]}, '13': {}, '14': {'distal': [{'id': 'd'}]}}
+    VersionesOdontogramaService.registrar(paciente.id, v1, antes)
+    VersionesOdontogramaService.registrar(paciente.id, v2, despues)
+
+    diferencia = VersionesOdontogramaService.diferencia(v1, v2)
+    assert diferencia['dientes'] == {'11': despues['11'], '14': despues['14'], '12': None}
+    assert sorted((i['diente'], i['diagnostico']['id']) for i in diferencia['agregados']) == [('11', 'c'), ('14', 'd')]
+    assert [(i['diente'], i['superficie'], i['diagnostico']['id']) for i in diferencia['eliminados']] == [
+        ('12', 'mesial', 'b')]
+
+    desde_vacio = VersionesOdontogramaService.diferencia(None, v1)
+    assert {i['diagnostico']['id'] for i in desde_vacio['agregados']} == {'a', 'b'}
+
+
+@pytest.mark.django_db
+def test_snapshot_y_plan_usan_el_almacen(paciente, diente, odontologo):
+    estados = _estados(2)
+    versiones = [uuid.uuid4(), uuid.uuid4()]
+    for version_id, estado in zip(versiones, estados):
+        snapshot = VersionesOdontogramaService.registrar_snapshot(
+            diente=diente, odontologo=odontologo, descripcion='Guardado', estado=estado, version_id=version_id)
+        assert snapshot.datos_nuevos == {}
+
+    nuevos = PlanTratamientoService.obtener_diagnosticos_nuevos_version(str(paciente.id), str(versiones[1]))
+    assert [(d['diente'], d['superficie'], d['id']) for d in nuevos['diagnosticos']] == [('13', 'mesial', '13-mesial-2')]
+
+    ultimo = PlanTratamientoService.obtener_diagnosticos_ultimo_odontograma(str(paciente.id))
+    assert ultimo['version_odontograma'] == str(versiones[1])
+    assert [d['id'] for d in ultimo['diagnosticos'] if d['es_nuevo']] == ['13-mesial-2']
+    assert ultimo['total_diagnosticos'] == len(FDI) + 2
+
+
+@pytest.mark.django_db
+def test_compacta_snapshots_completos(paciente, diente, odontologo, keyframe_cada_3):
+    estados = _estados(5)
+    versiones = []
+    for estado in estados[:4]:
+        # Snapshots anteriores al almacén: odontograma completo en datos_nuevos
+        versiones.append(HistorialOdontograma.objects.create(
+            diente=diente, tipo_cambio=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO,
+            descripcion='Legado', odontologo=odontologo, datos_nuevos=estado).version_id)
+    versiones.append(uuid.uuid4())
+    VersionesOdontogramaService.registrar_snapshot(
+        diente=diente, odontologo=odontologo, descripcion='Nuevo', estado=estados[4], version_id=versiones[4])
+
+    assert VersionesOdontogramaService.estado(versiones[0]) == estados[0]
+
+    salida = StringIO()
+    call_command('compactar_versiones_odontograma', stdout=salida)
+    assert '4 snapshot(s) compactado(s) en 1 paciente(s)' in salida.getvalue()
+    assert not HistorialOdontograma.objects.exclude(datos_nuevos={}).exists()
+    assert list(VersionOdontograma.objects.values_list('version_id', flat=True)) == versiones
+
+    cache.clear()
+    for version_id, esperado in zip(versiones, estados):
+        assert VersionesOdontogramaService.estado(version_id) == esperado
+
+
+@pytest.mark.django_db
+def test_compactar_conserva_versiones_con_historial_archivado(paciente, diente, odontologo, keyframe_cada_3):
+    estados = _estados(2)
+    archivada = uuid.uuid4()
+    VersionesOdontogramaService.registrar_snapshot(
+        diente=diente, odontologo=odontologo, descripcion='Nuevo', estado=estados[0], version_id=archivada)
+    # Su fila del historial ya no está en la base (mes archivado)
+    HistorialOdontograma.objects.filter(version_id=archivada).delete()
+    legado = HistorialOdontograma.objects.create(
+        diente=diente, tipo_cambio=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO,
+        descripcion='Legado', odontologo=odontologo, datos_nuevos=estados[1]).version_id
+
+    assert VersionesOdontogramaService.compactar_paciente(paciente.id) == 1
+    assert list(VersionOdontograma.objects.values_list('version_id', flat=True)) == [archivada, legado]
+    cache.clear()
+    assert VersionesOdontogramaService.estado(archivada) == estados[0]
+    assert VersionesOdontogramaService.estado(legado) == estados[1]
+
+
+@pytest.mark.performance
+@pytest.mark.django_db
+def test_rendimiento_versiones(paciente, diente, odontologo):
+    estados = _estados(100)
+    tamano_completo = sum(len(json.dumps(e).encode()) for e in estados)
+
+    inicio = time.perf_counter()
+    versiones = [VersionesOdontogramaService.registrar(paciente.id, uuid.uuid4(), e) for e in estados]
+    duracion_registro = time.perf_counter() - inicio
+    tamano_almacen = sum(len(v.contenido) for v in versiones)
+
+    cache.clear()
+    inicio = time.perf_counter()
+    for version in versiones:
+        VersionesOdontogramaService.estado(version.version_id)
+    duracion_lectura = time.perf_counter() - inicio
+
+    print(
+        f"\nVersiones del odontograma (100 guardados): JSON completo {tamano_completo / 1024:.0f} KiB, "
+        f"almacén {tamano_almacen / 1024:.0f} KiB | registro {duracion_registro * 10:.2f} ms/versión, "
+        f"reconstrucción sin caché {duracion_lectura * 10:.2f} ms/versión"
+    )
+    assert tamano_almacen * 10 < tamano_completo
@@ -43,6 +43,12 @@ from api.odontogram.views import (
     verificar_disponibilidad_piezas,
 )
 
+# Epidemiología poblacional
+from api.odontogram.views import (
+    indices_poblacionales,
+    tendencia_cpo,
+)
+
 # Formulario 033
 from api.odontogram.views.form033_views import (
     obtener_form033_json,
@@ -160,6 +166,22 @@ urlpatterns = [
         name="verificar-piezas-disponibilidad",
     ),
 
+    # ==================== EPIDEMIOLOGÍA POBLACIONAL ====================
+
+    # GET /api/odontogram/epidemiologia/indices/
+    path(
+        "epidemiologia/indices/",
+        indices_poblacionales,
+        name="epidemiologia-indices",
+    ),
+
+    # GET /api/odontogram/epidemiologia/tendencia-cpo/
+    path(
+        "epidemiologia/tendencia-cpo/",
+        tendencia_cpo,
+        name="epidemiologia-tendencia-cpo",
+    ),
+
     # ==================== FHIR ENDPOINTS ====================
     
     # GET /api/odontogram/fhir/patient/{id}/
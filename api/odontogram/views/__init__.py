@@ -35,6 +35,12 @@ from .indicadores_views import (
     verificar_disponibilidad_piezas,
 )
 
+# ==================== EPIDEMIOLOGÍA ENDPOINTS ====================
+from .epidemiologia_views import (
+    indices_poblacionales,
+    tendencia_cpo,
+)
+
 # ==================== EXPORTS ====================
 __all__ = [
     # Catálogo ViewSets
@@ -63,6 +69,10 @@ __all__ = [
     # Indicadores endpoints
     'obtener_informacion_piezas_indice',
     'verificar_disponibilidad_piezas',
+
+    # Epidemiología endpoints
+    'indices_poblacionales',
+    'tendencia_cpo',
     
     
 ]
@@ -13,6 +13,7 @@ ViewSets para el catálogo (lectura)
 import logging
 
 from django.core.cache import cache
+from django.utils.decorators import method_decorator
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
@@ -40,13 +41,28 @@ from api.odontogram.repositories.odontogram_repositories import (
     AreaAfectadaRepository,
     TipoAtributoClinicoRepository,
 )
+from api.odontogram.services.catalogo_service import CatalogoDiagnosticosService
 from api.odontogram.services.odontogram_services import OdontogramaService
+from api.utils.conditional_get import etag_de, get_condicional
 
 logger = logging.getLogger(__name__)
 
+
+def _version_catalogo(request, *args, **kwargs):
+    """
+    Las respuestas del catálogo solo cambian cuando las señales del catálogo
+    incrementan VersionCatalogo, así que esa versión es el ETag de todas.
+    """
+    return etag_de('catalogo', CatalogoDiagnosticosService.version()), None
+
+
+get_condicional_catalogo = get_condicional(_version_catalogo)
+
 # ==================== CATÁLOGO VIEWSETS ====================
 
 
+@method_decorator(get_condicional_catalogo, name='list')
+@method_decorator(get_condicional_catalogo, name='retrieve')
 class CategoriaDiagnosticoViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet para categorías de diagnóstico (catálogo)"""
     serializer_class = CategoriaDiagnosticoSerializer
@@ -61,6 +77,7 @@ class CategoriaDiagnosticoViewSet(viewsets.ReadOnlyModelViewSet):
 
     # AGREGAR ESTE MÉTODO
     @action(detail=False, methods=['get'], url_path='con-diagnosticos')
+    @method_decorator(get_condicional_catalogo)
     def con_diagnosticos(self, request):
         """
         GET /api/odontogram/catalogo/categorias/con-diagnosticos/
@@ -98,6 +115,7 @@ class CategoriaDiagnosticoViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["get"])
+    @method_decorator(get_condicional_catalogo)
     def por_prioridad(self, request):
         """GET /api/odontogram/catalogo/categorias/por_prioridad/?prioridad=ALTA"""
         prioridad_key = request.query_params.get("prioridad")
@@ -109,6 +127,7 @@ class CategoriaDiagnosticoViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["get"])
+    @method_decorator(get_condicional_catalogo)
     def filtrar_por_superficie(self, request):
         """
         Filtra diagnósticos aplicables según superficie del frontend
@@ -144,6 +163,7 @@ class CategoriaDiagnosticoViewSet(viewsets.ReadOnlyModelViewSet):
         )
 
 
+@method_decorator(get_condicional_catalogo, name='list')
 class DiagnosticoViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet para diagnósticos del catálogo"""
 
@@ -161,6 +181,7 @@ class DiagnosticoViewSet(viewsets.ReadOnlyModelViewSet):
             return DiagnosticoDetailSerializer
         return DiagnosticoListSerializer
 
+    @method_decorator(get_condicional_catalogo)
     def retrieve(self, request, pk=None):
         """GET /api/odontogram/catalogo/diagnosticos/{id}/ con caché"""
         cache_key = f"odontograma:diagnostico:{pk}"
@@ -177,6 +198,7 @@ class DiagnosticoViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["get"])
+    @method_decorator(get_condicional_catalogo)
     def por_categoria(self, request):
         """GET /api/odontogram/catalogo/diagnosticos/por_categoria/?categoria_id=1"""
         categoria_id = request.query_params.get("categoria_id")
@@ -190,6 +212,7 @@ class DiagnosticoViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["get"])
+    @method_decorator(get_condicional_catalogo)
     def criticos(self, request):
         """GET /api/odontogram/catalogo/diagnosticos/criticos/"""
         diagnosticos = self.repository.get_criticos()
@@ -197,6 +220,7 @@ class DiagnosticoViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
     @action(detail=False, methods=["get"])
+    @method_decorator(get_condicional_catalogo)
     def buscar(self, request):
         """GET /api/odontogram/catalogo/diagnosticos/buscar/?q=caries"""
         query = request.query_params.get("q")
@@ -208,6 +232,8 @@ class DiagnosticoViewSet(viewsets.ReadOnlyModelViewSet):
         return Response(serializer.data, status=status.HTTP_200_OK)
 
 
+@method_decorator(get_condicional_catalogo, name='list')
+@method_decorator(get_condicional_catalogo, name='retrieve')
 class AreaAfectadaViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet para áreas afectadas"""
 
@@ -222,6 +248,8 @@ class AreaAfectadaViewSet(viewsets.ReadOnlyModelViewSet):
         return self.repository.get_all()
 
 
+@method_decorator(get_condicional_catalogo, name='list')
+@method_decorator(get_condicional_catalogo, name='retrieve')
 class TipoAtributoClinicoViewSet(viewsets.ReadOnlyModelViewSet):
     """ViewSet para tipos de atributos clínicos"""
 
@@ -242,6 +270,7 @@ class OdontogramaConfigViewSet(viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
 
     @action(detail=False, methods=["get"])
+    @method_decorator(get_condicional_catalogo)
     def config(self, request):
         """GET /api/odontogram/catalogo/config/ - Configuración completa con caché"""
         cache_key = "odontograma:config:full"
@@ -54,7 +54,7 @@ class DiagnosticoCIEViewSet(viewsets.ReadOnlyModelViewSet):
         codigo_icd10 = self.request.query_params.get('codigo_icd10')
         
         if paciente_id:
-            queryset = queryset.filter(superficie__diente__paciente_id=paciente_id)
+            queryset = queryset.filter(paciente_id=paciente_id)
         
         if fecha_desde:
             try:
@@ -95,7 +95,7 @@ class DiagnosticoCIEViewSet(viewsets.ReadOnlyModelViewSet):
             from api.odontogram.models import HistorialOdontograma
             
             ultimo_snapshot = HistorialOdontograma.objects.filter(
-                diente__paciente_id=paciente_id,
+                paciente_id=paciente_id,
                 tipo_cambio=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO
             ).order_by('-fecha').first()
             
@@ -113,7 +113,7 @@ class DiagnosticoCIEViewSet(viewsets.ReadOnlyModelViewSet):
             # Primero, buscar en el historial cambios de esta versión
             cambios = HistorialOdontograma.objects.filter(
                 version_id=version_id,
-                diente__paciente_id=paciente_id,
+                paciente_id=paciente_id,
                 tipo_cambio__in=[
                     HistorialOdontograma.TipoCambio.DIAGNOSTICO_AGREGADO,
                     HistorialOdontograma.TipoCambio.DIAGNOSTICO_MODIFICADO
@@ -154,7 +154,7 @@ class DiagnosticoCIEViewSet(viewsets.ReadOnlyModelViewSet):
                 fecha_fin = fecha_snapshot + tiempo_ventana
                 
                 diagnosticos = DiagnosticoDental.objects.filter(
-                    superficie__diente__paciente_id=paciente_id,
+                    paciente_id=paciente_id,
                     fecha__range=(fecha_inicio, fecha_fin),
                     activo=True
                 )
@@ -186,7 +186,7 @@ class DiagnosticoCIEViewSet(viewsets.ReadOnlyModelViewSet):
             
             eliminados = HistorialOdontograma.objects.filter(
                 version_id=version_id,
-                diente__paciente_id=paciente_id,
+                paciente_id=paciente_id,
                 tipo_cambio=HistorialOdontograma.TipoCambio.DIAGNOSTICO_ELIMINADO
             ).count()
             
@@ -329,7 +329,7 @@ class DiagnosticoCIEViewSet(viewsets.ReadOnlyModelViewSet):
             from api.odontogram.models import HistorialOdontograma
             
             ultimo_snapshot = HistorialOdontograma.objects.filter(
-                diente__paciente_id=paciente_id,
+                paciente_id=paciente_id,
                 tipo_cambio=HistorialOdontograma.TipoCambio.SNAPSHOT_COMPLETO
             ).order_by('-fecha').first()
             
@@ -344,7 +344,7 @@ class DiagnosticoCIEViewSet(viewsets.ReadOnlyModelViewSet):
             # 2. Obtener SOLO diagnósticos NUEVOS de esa versión
             cambios_nuevos = HistorialOdontograma.objects.filter(
                 version_id=version_id,
-                diente__paciente_id=paciente_id,
+                paciente_id=paciente_id,
                 tipo_cambio=HistorialOdontograma.TipoCambio.DIAGNOSTICO_AGREGADO
             )
             
@@ -400,7 +400,7 @@ class DiagnosticoCIEViewSet(viewsets.ReadOnlyModelViewSet):
             )
         
         diagnosticos = self.get_queryset().filter(
-            superficie__diente__paciente=paciente
+            paciente=paciente
         )
         
         page = self.paginate_queryset(diagnosticos)
@@ -0,0 +1,161 @@
+# api/odontogram/views/epidemiologia_views.py
+
+"""
+Vistas de epidemiología bucal poblacional (reportes de salud pública)
+"""
+
+import logging
+from datetime import datetime
+
+from rest_framework import status
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from api.patients.models.constants import SEXOS
+from api.odontogram.services.epidemiologia_service import AGRUPACIONES, EpidemiologiaService
+
+logger = logging.getLogger(__name__)
+
+
+def _error_400(mensaje, errores):
+    return Response({
+        'success': False,
+        'status_code': status.HTTP_400_BAD_REQUEST,
+        'message': mensaje,
+        'data': None,
+        'errors': errores,
+    }, status=status.HTTP_400_BAD_REQUEST)
+
+
+def _leer_filtros(request):
+    """
+    Valida los filtros de cohorte comunes.
+    Retorna (filtros, errores).
+    """
+    params = request.query_params
+    filtros = {}
+    errores = {}
+
+    sexo = params.get('sexo')
+    if sexo:
+        if sexo not in dict(SEXOS):
+            errores['sexo'] = [f"Valor inválido. Opciones: {', '.join(dict(SEXOS))}"]
+        filtros['sexo'] = sexo
+
+    for campo in ('edad_min', 'edad_max'):
+        valor = params.get(campo)
+        if valor in (None, ''):
+            continue
+        try:
+            filtros[campo] = int(valor)
+            if filtros[campo] < 0:
+                raise ValueError
+        except ValueError:
+            errores[campo] = ['Debe ser un entero positivo']
+
+    for campo in ('fecha_inicio', 'fecha_fin'):
+        valor = params.get(campo)
+        if not valor:
+            continue
+        try:
+            filtros[campo] = datetime.strptime(valor, '%Y-%m-%d').date()
+        except ValueError:
+            errores[campo] = ['Use formato YYYY-MM-DD']
+
+    if (
+        'edad_min' in filtros and 'edad_max' in filtros
+        and filtros['edad_min'] > filtros['edad_max']
+    ):
+        errores['edad_min'] = ['edad_min no puede ser mayor que edad_max']
+
+    if (
+        'fecha_inicio' in filtros and 'fecha_fin' in filtros
+        and filtros['fecha_inicio'] > filtros['fecha_fin']
+    ):
+        errores['fecha_inicio'] = ['fecha_inicio no puede ser mayor que fecha_fin']
+
+    return filtros, errores
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def indices_poblacionales(request):
+    """
+    GET /api/odontogram/epidemiologia/indices/
+
+    Índices CPO/ceo, OHI-S y GI de la cohorte filtrada, con distribución
+    y agregados por grupo etario o sexo.
+
+    Query params:
+      - sexo        (M|F|O)
+      - edad_min    (int)
+      - edad_max    (int)
+      - fecha_inicio, fecha_fin (YYYY-MM-DD): rango de indicadores OHI-S/GI
+      - agrupar_por (edad|sexo, default edad)
+    """
+    filtros, errores = _leer_filtros(request)
+    agrupar_por = request.query_params.get('agrupar_por', 'edad')
+    if agrupar_por not in AGRUPACIONES:
+        errores['agrupar_por'] = [f"Opciones: {', '.join(AGRUPACIONES)}"]
+    if errores:
+        return _error_400('Filtros inválidos', errores)
+
+    try:
+        data = EpidemiologiaService.calcular_indices_cohorte(agrupar_por=agrupar_por, **filtros)
+    except Exception as e:
+        logger.error(f"Error calculando índices poblacionales: {str(e)}", exc_info=True)
+        return Response({
+            'success': False,
+            'status_code': status.HTTP_500_INTERNAL_SERVER_ERROR,
+            'message': 'Error calculando índices poblacionales',
+            'data': None,
+            'errors': {'detail': [str(e)]},
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    return Response({
+        'success': True,
+        'status_code': status.HTTP_200_OK,
+        'message': 'Índices poblacionales calculados correctamente',
+        'data': data,
+        'errors': None,
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+def tendencia_cpo(request):
+    """
+    GET /api/odontogram/epidemiologia/tendencia-cpo/
+
+    Evolución mensual del CPO/ceo promedio de la cohorte según los
+    snapshots de índices de caries.
+
+    Query params: sexo, edad_min, edad_max, fecha_inicio, fecha_fin
+    """
+    filtros, errores = _leer_filtros(request)
+    if errores:
+        return _error_400('Filtros inválidos', errores)
+
+    try:
+        data = EpidemiologiaService.calcular_tendencia_cpo(**filtros)
+    except Exception as e:
+        logger.error(f"Error calculando tendencia CPO: {str(e)}", exc_info=True)
+        return Response({
+            'success': False,
+            'status_code': status.HTTP_500_INTERNAL_SERVER_ERROR,
+            'message': 'Error calculando tendencia CPO',
+            'data': None,
+            'errors': {'detail': [str(e)]},
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+    return Response({
+        'success': True,
+        'status_code': status.HTTP_200_OK,
+        'message': 'Tendencia CPO calculada correctamente',
+        'data': {
+            'serie': data,
+            'filtros': {k: (v.isoformat() if hasattr(v, 'isoformat') else v) for k, v in filtros.items()},
+        },
+        'errors': None,
+    }, status=status.HTTP_200_OK)
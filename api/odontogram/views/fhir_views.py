@@ -94,7 +94,7 @@ class FHIRViewSet(viewsets.ViewSet):
             # Obtener diagnósticos del odontograma
             diagnosticos = (
                 DiagnosticoDental.objects.filter(
-                    superficie__diente__paciente=paciente
+                    paciente=paciente
                 )
                 .select_related("odontologo", "superficie__diente")
             )
@@ -1,13 +1,18 @@
 # api/odontogram/views/odontograma_views.py
 
 import logging
+from datetime import datetime, time
+from functools import lru_cache
 from django.shortcuts import get_object_or_404
-from django.db.models import Q, Prefetch
+from django.db.models import OuterRef, Q, Prefetch, Subquery
+from django.utils.decorators import method_decorator
 from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
 from rest_framework import generics
 from rest_framework.views import APIView
 from rest_framework import viewsets, status, permissions
 from rest_framework.decorators import action, api_view
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from api.odontogram.models import (
@@ -18,6 +23,8 @@ from api.odontogram.models import (
     DiagnosticoDental,
     HistorialOdontograma,
     IndiceCariesSnapshot,
+    ResumenVersionOdontograma,
+    VersionCatalogo,
 )
 from django.core.cache import cache
 from rest_framework.pagination import CursorPagination
@@ -39,8 +46,11 @@ from api.odontogram.services.odontogram_services import OdontogramaService
 from api.odontogram.services.indice_caries_service import IndiceCariesService
 from api.odontogram.serializers.bundle_serializers import FHIRBundleSerializer
 
+from api.odontogram.services.catalogo_service import FILA_VERSION
 from api.users.permissions import UserBasedPermission
+from api.utils.conditional_get import etag_de, get_condicional
 from django.db import models
+from django.db.models.functions import Coalesce
 
 logger = logging.getLogger(__name__)
 
@@ -210,6 +220,7 @@ class PacienteViewSet(viewsets.ModelViewSet):
         """
         GET /api/odontogram/historial/estadisticas/?paciente_id=...
         
+        Agrega las cabeceras de versión (una fila por guardado), no el historial
         """
         paciente_id = request.query_params.get('paciente_id') or request.query_params.get('pacienteid')
         
@@ -219,34 +230,25 @@ class PacienteViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        cache_key = f'historial:stats:{paciente_id}'
-        stats = cache.get(cache_key)
-        
-        if not stats:
-            from django.db.models import Count, Min, Max
-            
-            stats = HistorialOdontograma.objects.filter(
-                diente__paciente_id=paciente_id
-            ).aggregate(
-                total_cambios=Count('id'),
-                total_versiones=Count('version_id', distinct=True),
-                primer_cambio=Min('fecha'),
-                ultimo_cambio=Max('fecha'),
-                cambios_por_tipo=Count('tipo_cambio')
-            )
-            
-            # Caché de 10 minutos
-            cache.set(cache_key, stats, timeout=600)
+        stats = ResumenVersionOdontograma.objects.filter(
+            paciente_id=paciente_id
+        ).aggregate(
+            total_cambios=Coalesce(models.Sum('total_cambios'), 0),
+            total_versiones=models.Count('version_id'),
+            primer_cambio=models.Min('fecha'),
+            ultimo_cambio=models.Max('fecha_ultimo_cambio'),
+        )
+        stats['cambios_por_tipo'] = stats['total_cambios']
         
         return Response(stats)
     
     @action(detail=False, methods=['get'])
     def versiones(self, request):
         """
-        GET /api/odontogram/historial/versiones/?paciente_id=...
+        GET /api/odontogram/historial/versiones/?paciente_id=...[&cursor=...&page_size=...]
         
-        Retorna lista de versiones únicas (guardados completos)
-        con caché de 5 minutos
+        Versiones del paciente (una por guardado), más recientes primero,
+        con paginación por cursor sobre (fecha, version_id)
         """
         paciente_id = request.query_params.get('paciente_id') or request.query_params.get('pacienteid')
         
@@ -256,31 +258,27 @@ class PacienteViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        cache_key = f'historial:versiones:{paciente_id}'
-        versiones = cache.get(cache_key)
-        
-        if not versiones:
-            # Consulta optimizada con anotaciones
-            versiones = HistorialOdontograma.objects.filter(
-                diente__paciente_id=paciente_id
-            ).values(
-                'version_id',
-                'fecha'
-            ).annotate(
-                odontologo_nombre=models.F('odontologo__nombres'),
-                odontologo_apellido=models.F('odontologo__apellidos'),
-                total_cambios=models.Count('id')
-            ).order_by('-fecha').distinct()[:50]
-            
-            versiones = list(versiones)
-            
-            # Guardar en caché por 5 minutos
-            cache.set(cache_key, versiones, timeout=300)
-        
-        return Response({
-            'count': len(versiones),
-            'results': versiones
-        })
+        queryset = ResumenVersionOdontograma.objects.filter(
+            paciente_id=paciente_id
+        ).select_related('odontologo')
+        
+        paginator = VersionesCursorPagination()
+        pagina = paginator.paginate_queryset(queryset, request, view=self)
+        versiones = [
+            {
+                'version_id': resumen.version_id,
+                'fecha': resumen.fecha,
+                'fecha_ultimo_cambio': resumen.fecha_ultimo_cambio,
+                'odontologo_nombre': resumen.odontologo.nombres if resumen.odontologo else None,
+                'odontologo_apellido': resumen.odontologo.apellidos if resumen.odontologo else None,
+                'total_cambios': resumen.total_cambios,
+                'cambios_por_tipo': resumen.cambios_por_tipo,
+                'guardado_completo': resumen.guardado_completo,
+                'snapshot_caries_id': resumen.snapshot_caries_id,
+            }
+            for resumen in pagina
+        ]
+        return paginator.get_paginated_response(versiones)
 
     @action(detail=True, methods=['get'])
     def diagnosticos(self, request, pk=None):
@@ -372,9 +370,9 @@ class DiagnosticoDentalViewSet(viewsets.ModelViewSet):
         estado = self.request.query_params.get('estado')
         
         if sesion_id:
-            queryset = queryset.filter(superficie__diente__paciente_id=sesion_id)
+            queryset = queryset.filter(paciente_id=sesion_id)
         if paciente_id:
-            queryset = queryset.filter(superficie__diente__paciente_id=paciente_id)
+            queryset = queryset.filter(paciente_id=paciente_id)
         if numero_diente:
             queryset = queryset.filter(superficie__diente__codigo_fdi=numero_diente)
         if estado:
@@ -502,6 +500,23 @@ class HistorialCursorPagination(CursorPagination):
     cursor_query_param = 'cursor'
     
 
+class VersionesCursorPagination(CursorPagination):
+    """Paginación por cursor (keyset) del listado de versiones"""
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 200
+    ordering = ('-fecha', '-version_id')
+    cursor_query_param = 'cursor'
+
+    def get_paginated_response(self, data):
+        return Response({
+            'count': len(data),
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
 class HistorialOdontogramaViewSet(viewsets.ReadOnlyModelViewSet):
     """
     ViewSet para consultar historial del odontograma
@@ -533,23 +548,70 @@ class HistorialOdontogramaViewSet(viewsets.ReadOnlyModelViewSet):
         elif diente_id:
             queryset = queryset.filter(diente_id=diente_id)
         elif paciente_id:
-            queryset = queryset.filter(diente__paciente_id=paciente_id)
+            queryset = queryset.filter(paciente_id=paciente_id)
         elif odontologo_id:
             queryset = queryset.filter(odontologo_id=odontologo_id)
         
+        # Auditoría por período: los meses archivados se restauran al consultar
+        desde = self._fecha_param('desde')
+        if desde:
+            queryset = queryset.periodo(desde, self._fecha_param('hasta', fin_del_dia=True))
+        
         return queryset
+
+    def _fecha_param(self, nombre, fin_del_dia=False):
+        """Fecha o datetime ISO del query param; una fecha sola cubre el día completo"""
+        valor = self.request.query_params.get(nombre)
+        if not valor:
+            return None
+        fecha = parse_datetime(valor)
+        if fecha is None:
+            dia = parse_date(valor)
+            if dia is None:
+                raise ValidationError({nombre: 'Fecha inválida (AAAA-MM-DD)'})
+            fecha = datetime.combine(dia, time.max if fin_del_dia else time.min)
+        if timezone.is_naive(fecha):
+            fecha = timezone.make_aware(fecha)
+        return fecha
     
 class HistorialCursorPagination(CursorPagination):
     page_size = 20
     ordering = '-fecha'  # Más reciente primero
     cursor_query_param = 'cursor'
 
+def _version_odontograma(request, paciente_id):
+    """
+    Último cambio del historial del paciente (todo guardado lo registra) más
+    la versión del catálogo, que aporta nombres y colores al payload. Todo
+    sale de la misma consulta.
+    """
+    ultimo_cambio = HistorialOdontograma.objects.filter(paciente_id=OuterRef('id')).order_by('-fecha')
+    fila = (
+        Paciente.objects.filter(id=paciente_id)
+        .annotate(
+            ultima_version=Subquery(ultimo_cambio.values('version_id')[:1]),
+            ultima_fecha=Subquery(ultimo_cambio.values('fecha')[:1]),
+            version_catalogo=Subquery(
+                VersionCatalogo.objects.filter(pk=FILA_VERSION).values('version')[:1]
+            ),
+        )
+        .values_list('fecha_modificacion', 'ultima_version', 'ultima_fecha', 'version_catalogo')
+        .first()
+    )
+    if fila is None:
+        return None
+    fecha_paciente, version_id, fecha_cambio, version_catalogo = fila
+    etag = etag_de('odontograma', paciente_id, version_id, fecha_cambio, fecha_paciente, version_catalogo or 0)
+    return etag, max(f for f in (fecha_paciente, fecha_cambio) if f is not None)
+
+
 class OdontogramaCompletoView(APIView):
     """
     Devuelve el odontograma completo del paciente (ultimo guardado)
     """
     permission_classes = [IsAuthenticated]
 
+    @method_decorator(get_condicional(_version_odontograma))
     def get(self, request, paciente_id):
         try:
             paciente = Paciente.objects.get(id=paciente_id)
@@ -576,7 +638,24 @@ class OdontogramaCompletoView(APIView):
         return Response(odontograma_completo_backend, status=status.HTTP_200_OK)
 
 
+@lru_cache(maxsize=None)
+def _etag_definiciones_superficies():
+    return etag_de(
+        'definiciones-superficies',
+        sorted(SuperficieDental.FRONTEND_ID_TO_BACKEND.items()),
+        SuperficieDental.TipoSuperficie.choices,
+        sorted(SuperficieDental.SUPERFICIE_A_AREA.items()),
+        sorted(SuperficieDental.FHIR_SURFACE_MAPPING.items()),
+    )
+
+
+def _version_definiciones_superficies(request):
+    """Las definiciones salen de constantes del modelo: solo cambian con un despliegue"""
+    return _etag_definiciones_superficies(), None
+
+
 @api_view(['GET'])
+@get_condicional(_version_definiciones_superficies)
 def obtener_definiciones_superficies(request):
     """
     GET /api/odontograma/definiciones-superficies/
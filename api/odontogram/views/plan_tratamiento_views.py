@@ -22,6 +22,7 @@ from api.odontogram.serializers.plan_tratamiento_serializers import (
     SesionTratamientoCreateSerializer
 )
 from api.odontogram.services.plan_tratamiento_service import PlanTratamientoService
+from api.odontogram.services.resumen_plan_service import ResumenPlanService
 
 logger = logging.getLogger(__name__)
 
@@ -118,6 +119,9 @@ class PlanTratamientoViewSet(viewsets.ModelViewSet):
                     filter=Q(sesiones__activo=True, sesiones__estado='completada')
                 )
             )
+        elif self.action == 'estadisticas':
+            # Estadísticas: solo el resumen precalculado, sin sesiones
+            queryset = queryset.select_related('resumen')
         else:
             # Para detalle: prefetch completo
             queryset = queryset.select_related(
@@ -293,46 +297,8 @@ class PlanTratamientoViewSet(viewsets.ModelViewSet):
         Retorna estadísticas del plan de tratamiento
         """
         plan = self.get_object()
-        
-        sesiones = plan.sesiones.filter(activo=True)
-        
-        estadisticas = {
-            'total_sesiones': sesiones.count(),
-            'sesiones_por_estado': {
-                'planificada': sesiones.filter(estado='planificada').count(),
-                'en_progreso': sesiones.filter(estado='en_progreso').count(),
-                'completada': sesiones.filter(estado='completada').count(),
-                'cancelada': sesiones.filter(estado='cancelada').count(),
-            },
-            'progreso_porcentaje': 0,
-            'fecha_ultima_sesion': None,
-            'proxima_sesion': None
-        }
-        
-        # Calcular progreso
-        if estadisticas['total_sesiones'] > 0:
-            completadas = estadisticas['sesiones_por_estado']['completada']
-            estadisticas['progreso_porcentaje'] = round(
-                (completadas / estadisticas['total_sesiones']) * 100, 2
-            )
-        
-        # Última sesión
-        ultima = sesiones.filter(fecha_realizacion__isnull=False).order_by('-fecha_realizacion').first()
-        if ultima:
-            estadisticas['fecha_ultima_sesion'] = ultima.fecha_realizacion.isoformat()
-        
-        # Próxima sesión
-        proxima = sesiones.filter(
-            estado='planificada',
-            fecha_programada__gte=timezone.now()
-        ).order_by('fecha_programada').first()
-        
-        if proxima:
-            estadisticas['proxima_sesion'] = {
-                'id': str(proxima.id),
-                'fecha': proxima.fecha_programada.isoformat() if proxima.fecha_programada else None,
-                'numero_sesion': proxima.numero_sesion
-            }
+        # Conteos y próxima sesión salen del resumen precalculado del plan
+        estadisticas = ResumenPlanService.estadisticas(ResumenPlanService.obtener(plan))
         
         return Response(estadisticas, status=status.HTTP_200_OK)
 
@@ -1,9 +1,12 @@
 # api/patients/admin.py
 from django.contrib import admin
 from django import forms  
+from django.db.models import BooleanField, Case, ExpressionWrapper, IntegerField, Q, Value, When
 from django.utils.html import format_html
 from django.core.exceptions import ValidationError
 
+from api.utils.admin_changelist import ChangelistEficienteMixin
+
 from .models.examenes_complementarios import ExamenesComplementarios
 
 
@@ -19,7 +22,7 @@ from .models.constantes_vitales import ConstantesVitales
 
 # ================== PACIENTE ADMIN ==================
 @admin.register(Paciente)
-class PacienteAdmin(admin.ModelAdmin):
+class PacienteAdmin(ChangelistEficienteMixin, admin.ModelAdmin):
     
     # ================== CONFIGURACIÓN DE LISTADO ==================
     list_display = (
@@ -203,7 +206,7 @@ class PacienteAdmin(admin.ModelAdmin):
 
 
 @admin.register(ExamenEstomatognatico)
-class ExamenEstomatognaticoAdmin(admin.ModelAdmin):
+class ExamenEstomatognaticoAdmin(ChangelistEficienteMixin, admin.ModelAdmin):
     list_display = [
         'paciente', 
         'examen_sin_patologia',
@@ -211,6 +214,7 @@ class ExamenEstomatognaticoAdmin(admin.ModelAdmin):
         'activo',
         'fecha_creacion'
     ]
+    list_select_related = ('paciente',)
     
     list_filter = [
         'examen_sin_patologia',
@@ -341,7 +345,7 @@ class ExamenEstomatognaticoAdmin(admin.ModelAdmin):
 # ✅ NUEVO: CONSULTA ADMIN
 # ============================================================================
 @admin.register(ConstantesVitales)
-class ConstantesVitalesAdmin(admin.ModelAdmin):
+class ConstantesVitalesAdmin(ChangelistEficienteMixin, admin.ModelAdmin):
     list_display = [
         'paciente', 
         'fecha_consulta',
@@ -350,6 +354,7 @@ class ConstantesVitalesAdmin(admin.ModelAdmin):
         'presion_arterial',
         'activo'
     ]
+    list_select_related = ('paciente',)
     
     list_filter = [
         'fecha_consulta',
@@ -409,7 +414,7 @@ class ConstantesVitalesAdmin(admin.ModelAdmin):
 
 
 @admin.register(AntecedentesPersonales)
-class AntecedentesPersonalesAdmin(admin.ModelAdmin):
+class AntecedentesPersonalesAdmin(ChangelistEficienteMixin, admin.ModelAdmin):
     """Admin para Antecedentes Personales"""
     
     list_display = [
@@ -422,6 +427,7 @@ class AntecedentesPersonalesAdmin(admin.ModelAdmin):
         'tiene_condiciones_importantes',
         'fecha_creacion',
     ]
+    list_select_related = ('paciente',)
     
     list_filter = [
         'alergia_antibiotico',
@@ -440,7 +446,6 @@ class AntecedentesPersonalesAdmin(admin.ModelAdmin):
         'paciente__nombres',
         'paciente__apellidos',
         'paciente__cedula_pasaporte',
-        'paciente__numero_historia_clinica',
     ]
     
     readonly_fields = [
@@ -499,6 +504,47 @@ class AntecedentesPersonalesAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        """Nivel de riesgo calculado en la consulta (ordenable desde el listado)"""
+        # Mismo criterio que tiene_antecedentes_criticos y total_antecedentes del modelo
+        criticos = (
+            Q(hemorragias='SI')
+            | Q(vih_sida__in=['POSITIVO', 'OTRO'])
+            | Q(tuberculosis__in=['ACTIVA', 'OTRO'])
+            | Q(asma='SEVERA')
+            | Q(diabetes__in=['TIPO_1', 'TIPO_2'])
+            | Q(hipertension_arterial__in=['NO_CONTROLADA', 'SIN_TRATAMIENTO', 'OTRO'])
+            | ~Q(enfermedad_cardiaca='NO')
+        )
+        antecedentes = [
+            ~Q(alergia_antibiotico='NO'),
+            ~Q(alergia_anestesia='NO'),
+            Q(hemorragias='SI'),
+            ~Q(vih_sida='NEGATIVO'),
+            ~Q(tuberculosis='NUNCA'),
+            ~Q(asma='NO'),
+            ~Q(diabetes='NO'),
+            ~Q(hipertension_arterial='NO'),
+            ~Q(enfermedad_cardiaca='NO'),
+            Q(otros_antecedentes_personales__regex=r'\S'),
+        ]
+        total = sum(
+            (Case(When(condicion, then=Value(1)), default=Value(0), output_field=IntegerField())
+             for condicion in antecedentes),
+            Value(0),
+        )
+        return super().get_queryset(request).annotate(
+            total_antecedentes_calculado=total,
+        ).annotate(
+            riesgo=Case(
+                When(criticos, then=Value(3)),
+                When(total_antecedentes_calculado__gt=2, then=Value(2)),
+                When(total_antecedentes_calculado__gt=0, then=Value(1)),
+                default=Value(0),
+                output_field=IntegerField(),
+            ),
+        )
+    
     def paciente_info(self, obj):
         """Información del paciente con enlace"""
         url = f'/admin/patients/paciente/{obj.paciente.id}/change/'
@@ -509,18 +555,19 @@ class AntecedentesPersonalesAdmin(admin.ModelAdmin):
             obj.paciente.cedula_pasaporte
         )
     paciente_info.short_description = 'Paciente'
+    paciente_info.admin_order_field = 'paciente__apellidos'
     
     def nivel_riesgo(self, obj):
         """Nivel de riesgo con colores"""
-        if obj.tiene_antecedentes_criticos:
+        if obj.riesgo == 3:
             return format_html(
                 '<span style="color: white; background-color: #dc3545; padding: 3px 8px; border-radius: 3px; font-weight: bold;">CRÍTICO</span>'
             )
-        elif obj.total_antecedentes > 2:
+        elif obj.riesgo == 2:
             return format_html(
                 '<span style="color: #856404; background-color: #fff3cd; padding: 3px 8px; border-radius: 3px; font-weight: bold;">ALTO</span>'
             )
-        elif obj.total_antecedentes > 0:
+        elif obj.riesgo == 1:
             return format_html(
                 '<span style="color: #0c5460; background-color: #d1ecf1; padding: 3px 8px; border-radius: 3px; font-weight: bold;">MEDIO</span>'
             )
@@ -528,6 +575,7 @@ class AntecedentesPersonalesAdmin(admin.ModelAdmin):
             '<span style="color: #155724; background-color: #d4edda; padding: 3px 8px; border-radius: 3px; font-weight: bold;">BAJO</span>'
         )
     nivel_riesgo.short_description = 'Riesgo'
+    nivel_riesgo.admin_order_field = 'riesgo'
     
     def alergias_resumidas(self, obj):
         """Resumen de alergias"""
@@ -591,7 +639,7 @@ class AntecedentesPersonalesAdmin(admin.ModelAdmin):
 
 
 @admin.register(AntecedentesFamiliares)
-class AntecedentesFamiliaresAdmin(admin.ModelAdmin):
+class AntecedentesFamiliaresAdmin(ChangelistEficienteMixin, admin.ModelAdmin):
     """Admin para Antecedentes Familiares"""
     
     list_display = [
@@ -603,6 +651,7 @@ class AntecedentesFamiliaresAdmin(admin.ModelAdmin):
         'tiene_antecedentes_importantes',
         'fecha_creacion',
     ]
+    list_select_related = ('paciente',)
     
     list_filter = [
         'cardiopatia_familiar',
@@ -619,7 +668,6 @@ class AntecedentesFamiliaresAdmin(admin.ModelAdmin):
         'paciente__nombres',
         'paciente__apellidos',
         'paciente__cedula_pasaporte',
-        'paciente__numero_historia_clinica',
     ]
     
     readonly_fields = [
@@ -672,6 +720,14 @@ class AntecedentesFamiliaresAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        """Antecedente endócrino-metabólico como columna booleana (ordenable)"""
+        return super().get_queryset(request).annotate(
+            tiene_diabetes_familiar=ExpressionWrapper(
+                ~Q(endocrino_metabolico_familiar='NO'), output_field=BooleanField()
+            ),
+        )
+    
     def paciente_info(self, obj):
         """Información del paciente con enlace"""
         url = f'/admin/patients/paciente/{obj.paciente.id}/change/'
@@ -682,13 +738,15 @@ class AntecedentesFamiliaresAdmin(admin.ModelAdmin):
             obj.paciente.cedula_pasaporte
         )
     paciente_info.short_description = 'Paciente'
+    paciente_info.admin_order_field = 'paciente__apellidos'
     
     def diabetes_familiar(self, obj):
         """Mostrar si tiene diabetes familiar"""
-        if obj.endocrino_metabolico_familiar:
+        if obj.tiene_diabetes_familiar:
             return format_html('<span style="color: #856404;">SÍ</span>')
         return format_html('<span style="color: #6c757d;">NO</span>')
     diabetes_familiar.short_description = 'Diabetes'
+    diabetes_familiar.admin_order_field = 'tiene_diabetes_familiar'
     
     def resumen_antecedentes_display(self, obj):
         """Resumen de antecedentes familiares"""
@@ -708,7 +766,7 @@ class AntecedentesFamiliaresAdmin(admin.ModelAdmin):
 
 
 @admin.register(ExamenesComplementarios)
-class ExamenesComplementariosAdmin(admin.ModelAdmin):
+class ExamenesComplementariosAdmin(ChangelistEficienteMixin, admin.ModelAdmin):
     """Admin para Exámenes Complementarios"""
     
     list_display = [
@@ -718,6 +776,7 @@ class ExamenesComplementariosAdmin(admin.ModelAdmin):
         'estado_examenes_display',
         'fecha_creacion',
     ]
+    list_select_related = ('paciente',)
     
     list_filter = [
         'pedido_examenes',
@@ -730,7 +789,6 @@ class ExamenesComplementariosAdmin(admin.ModelAdmin):
         'paciente__nombres',
         'paciente__apellidos',
         'paciente__cedula_pasaporte',
-        'paciente__numero_historia_clinica',
         'pedido_examenes_detalle',
         'informe_examenes_detalle',
     ]
@@ -772,6 +830,17 @@ class ExamenesComplementariosAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_queryset(self, request):
+        """Estado de los exámenes calculado en la consulta (ordenable)"""
+        # Mismo criterio que la propiedad estado_examenes del modelo
+        return super().get_queryset(request).annotate(
+            estado_calculado=Case(
+                When(~Q(informe_examenes='NINGUNO') & ~Q(informe_examenes_detalle=''), then=Value('completado')),
+                When(pedido_examenes='SI', then=Value('pendiente')),
+                default=Value('no_solicitado'),
+            ),
+        )
+    
     def paciente_info(self, obj):
         """Información del paciente con enlace"""
         url = f'/admin/patients/paciente/{obj.paciente.id}/change/'
@@ -782,10 +851,11 @@ class ExamenesComplementariosAdmin(admin.ModelAdmin):
             obj.paciente.cedula_pasaporte
         )
     paciente_info.short_description = 'Paciente'
+    paciente_info.admin_order_field = 'paciente__apellidos'
     
     def estado_examenes_display(self, obj):
         """Estado de exámenes con colores"""
-        estado = obj.estado_examenes
+        estado = obj.estado_calculado
         
         if estado == 'completado':
             return format_html(
@@ -800,6 +870,7 @@ class ExamenesComplementariosAdmin(admin.ModelAdmin):
                 '<span style="color: #6c757d; background-color: #e9ecef; padding: 3px 8px; border-radius: 3px;">NO SOLICITADO</span>'
             )
     estado_examenes_display.short_description = 'Estado'
+    estado_examenes_display.admin_order_field = 'estado_calculado'
     
     def resumen_examenes_display(self, obj):
         """Resumen de exámenes complementarios"""
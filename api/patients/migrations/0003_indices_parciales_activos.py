@@ -0,0 +1,44 @@
+# Generated by Django 5.1.6 on 2026-10-18 22:57
+
+from django.contrib.postgres.operations import AddIndexConcurrently, RemoveIndexConcurrently
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Índices parciales (WHERE activo) creados CONCURRENTLY antes de borrar los
+    # completos que reemplazan: las consultas calientes no quedan sin índice y
+    # la migración no bloquea escrituras. Si un CREATE INDEX CONCURRENTLY se
+    # interrumpe queda un índice INVALID: borrarlo y volver a migrar. Revertir
+    # recrea los índices anteriores.
+    atomic = False
+
+    dependencies = [
+        ('patients', '0002_initial'),
+    ]
+
+    operations = [
+        AddIndexConcurrently(
+            model_name='constantesvitales',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['paciente', '-fecha_consulta'], name='idx_constantes_pac_act'),
+        ),
+        AddIndexConcurrently(
+            model_name='paciente',
+            index=models.Index(condition=models.Q(('activo', True)), fields=['apellidos', 'nombres'], name='idx_paciente_nombre_act'),
+        ),
+        RemoveIndexConcurrently(
+            model_name='constantesvitales',
+            name='patients_co_pacient_6c6912_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='constantesvitales',
+            name='patients_co_activo_0b0d46_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='paciente',
+            name='patients_pa_apellid_1d0a5d_idx',
+        ),
+        RemoveIndexConcurrently(
+            model_name='paciente',
+            name='patients_pa_activo_9bd8e6_idx',
+        ),
+    ]
@@ -1,5 +1,5 @@
 # patients/models/__init__.py
-from .base import BaseModel
+from .base import ActivosManager, BaseModel, SoftDeleteManager, SoftDeleteQuerySet
 from .constants import *
 from .paciente import Paciente
 from .antecedentes_personales import AntecedentesPersonales
@@ -10,6 +10,9 @@ from .examenes_complementarios import ExamenesComplementarios
 
 __all__ = [
     'BaseModel',
+    'SoftDeleteQuerySet',
+    'SoftDeleteManager',
+    'ActivosManager',
     'Paciente',
     'AntecedentesPersonales',
     'AntecedentesFamiliares',
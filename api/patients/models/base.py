@@ -5,6 +5,38 @@ import uuid
 from django.db import models
 from django_currentuser.db.models import CurrentUserField
 
+
+class SoftDeleteQuerySet(models.QuerySet):
+    """QuerySet con los filtros del eliminado lógico (campo `activo`)"""
+
+    def activos(self):
+        return self.filter(activo=True)
+
+    def inactivos(self):
+        return self.filter(activo=False)
+
+    def desactivar(self, **campos):
+        """Eliminado lógico en bloque; devuelve la cantidad de filas afectadas"""
+        return self.update(activo=False, **campos)
+
+
+class SoftDeleteManager(models.Manager.from_queryset(SoftDeleteQuerySet)):
+    """
+    Manager sin filtro: admin, restauraciones y accesos por FK siguen viendo
+    los registros inactivos. Usar `.activos()` o el manager `activos`.
+    """
+
+
+class ActivosManager(SoftDeleteManager):
+    """
+    Manager que solo devuelve registros activos. Las consultas que pasan por
+    aquí coinciden con la condición de los índices parciales (activo = true).
+    """
+
+    def get_queryset(self):
+        return super().get_queryset().filter(activo=True)
+
+
 class BaseModel(models.Model):
     """Modelo base abstracto con campos comunes a todos los modelos"""
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False, unique=True)
@@ -29,6 +61,9 @@ class BaseModel(models.Model):
     fecha_creacion = models.DateTimeField(auto_now_add=True, verbose_name="Fecha de creación")
     fecha_modificacion = models.DateTimeField(auto_now=True, verbose_name="Fecha de modificación")
     activo = models.BooleanField(default=True, verbose_name="Activo")
+
+    objects = SoftDeleteManager()
+    activos = ActivosManager()
     
     class Meta:
         abstract = True
\ No newline at end of file
@@ -1,5 +1,6 @@
 # api/patients/models/constantes_vitales.py
 from django.db import models
+from django.db.models import Q
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 from .base import BaseModel
@@ -74,8 +75,9 @@ class ConstantesVitales(BaseModel):
         verbose_name_plural = "Constantes Vitales"
         ordering = ['-fecha_consulta', 'paciente__apellidos']
         indexes = [
-            models.Index(fields=['paciente', '-fecha_consulta']),
-            models.Index(fields=['activo']),
+            models.Index(
+                fields=['paciente', '-fecha_consulta'], name='idx_constantes_pac_act', condition=Q(activo=True),
+            ),
         ]
     
     def clean(self):
@@ -1,5 +1,6 @@
 # patients/models/paciente.py
 from django.db import models
+from django.db.models import Q
 from django.core.validators import MinLengthValidator, RegexValidator
 from django.core.exceptions import ValidationError
 from .base import BaseModel
@@ -52,8 +53,9 @@ class Paciente(BaseModel):
         verbose_name_plural = "Pacientes"
         ordering = ['apellidos', 'nombres']  
         indexes = [
-            models.Index(fields=['apellidos', 'nombres']),  
-            models.Index(fields=['activo']),
+            models.Index(
+                fields=['apellidos', 'nombres'], name='idx_paciente_nombre_act', condition=Q(activo=True),
+            ),
         ]
         
     def get_full_name(self):
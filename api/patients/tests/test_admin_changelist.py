@@ -0,0 +1,157 @@
+"""
+Tests de los listados del admin: columnas calculadas en la consulta
+(iguales a las propiedades del modelo), consultas constantes por página y
+conteo estimado para tablas grandes.
+"""
+import random
+from datetime import date
+
+import pytest
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, RequestFactory
+from django.test.utils import CaptureQueriesContext
+
+from api.odontogram.models import Diagnostico, DiagnosticoDental, Diente, SuperficieDental
+from api.patients.admin import AntecedentesPersonalesAdmin, ExamenesComplementariosAdmin
+from api.patients.models.antecedentes_personales import AntecedentesPersonales
+from api.patients.models.examenes_complementarios import ExamenesComplementarios
+from api.patients.models.paciente import Paciente
+from api.utils.admin_changelist import ConteoEstimadoPaginator
+
+Usuario = get_user_model()
+
+CAMPOS_RIESGO = (
+    'alergia_antibiotico', 'alergia_anestesia', 'hemorragias', 'vih_sida', 'tuberculosis',
+    'asma', 'diabetes', 'hipertension_arterial', 'enfermedad_cardiaca',
+)
+
+
+def _pacientes(cantidad, inicio=0):
+    return Paciente.objects.bulk_create([
+        Paciente(
+            nombres=f'Paciente {n}', apellidos='Admin', cedula_pasaporte=f'17{n:08d}', sexo='F', edad=30,
+            condicion_edad='A', fecha_nacimiento=date(1995, 1, 1), fecha_ingreso=date(2025, 1, 1),
+            telefono='0999999999',
+        )
+        for n in range(inicio, inicio + cantidad)
+    ])
+
+
+def _opciones(campo):
+    return [valor for valor, _ in AntecedentesPersonales._meta.get_field(campo).choices]
+
+
+def _request():
+    request = RequestFactory().get('/')
+    request.user = Usuario(is_superuser=True, is_staff=True)
+    return request
+
+
+@pytest.fixture
+def cliente_admin(db):
+    usuario = Usuario.objects.create_superuser(
+        username='admin_listados', nombres='Admin', apellidos='Listados', correo='admin_listados@test.com',
+        telefono='0999999999', password='x',
+    )
+    client = Client()
+    client.force_login(usuario)
+    return client
+
+
+@pytest.mark.django_db
+def test_nivel_riesgo_anotado_igual_a_las_propiedades():
+    azar = random.Random(50)
+    antecedentes = []
+    for paciente in _pacientes(80):
+        valores = {campo: azar.choice(_opciones(campo)) for campo in CAMPOS_RIESGO}
+        valores['otros_antecedentes_personales'] = azar.choice(['', '   ', '\n', 'Bruxismo'])
+        antecedentes.append(AntecedentesPersonales(paciente=paciente, **valores))
+    AntecedentesPersonales.objects.bulk_create(antecedentes)
+
+    modelo_admin = AntecedentesPersonalesAdmin(AntecedentesPersonales, admin.site)
+    for fila in modelo_admin.get_queryset(_request()):
+        esperado = (
+            3 if fila.tiene_antecedentes_criticos
+            else 2 if fila.total_antecedentes > 2
+            else 1 if fila.total_antecedentes > 0
+            else 0
+        )
+        assert fila.riesgo == esperado, {campo: getattr(fila, campo) for campo in CAMPOS_RIESGO}
+
+
+@pytest.mark.django_db
+def test_estado_examenes_anotado_igual_a_la_propiedad():
+    combinaciones = [
+        ('NO', '', 'NINGUNO', ''),
+        ('SI', 'Biometría', 'NINGUNO', ''),
+        ('SI', 'Biometría', 'BIOMETRIA', 'Normal'),
+        ('NO', '', 'BIOMETRIA', ''),
+    ]
+    ExamenesComplementarios.objects.bulk_create([
+        ExamenesComplementarios(
+            paciente=paciente, pedido_examenes=pedido, pedido_examenes_detalle=pedido_detalle,
+            informe_examenes=informe, informe_examenes_detalle=informe_detalle,
+        )
+        for paciente, (pedido, pedido_detalle, informe, informe_detalle) in zip(
+            _pacientes(len(combinaciones)), combinaciones
+        )
+    ])
+
+    modelo_admin = ExamenesComplementariosAdmin(ExamenesComplementarios, admin.site)
+    estados = {fila.estado_calculado == fila.estado_examenes for fila in modelo_admin.get_queryset(_request())}
+    assert estados == {True}
+
+
+def _consultas_listado(client, url):
+    with CaptureQueriesContext(connection) as consultas:
+        assert client.get(url).status_code == 200
+    return len(consultas)
+
+
+@pytest.mark.django_db
+def test_listados_con_consultas_constantes(cliente_admin):
+    call_command('cargar_odontograma_csv', quiet=True)
+    caries = Diagnostico.objects.get(key='caries')
+    odontologo = Usuario.objects.get(username='admin_listados')
+
+    def crear(pacientes):
+        AntecedentesPersonales.objects.bulk_create([AntecedentesPersonales(paciente=p) for p in pacientes])
+        for paciente in pacientes:
+            diente = Diente.objects.create(paciente=paciente, codigo_fdi='16')
+            superficie = SuperficieDental.objects.create(diente=diente, nombre='oclusal')
+            DiagnosticoDental.objects.create(
+                superficie=superficie, diagnostico_catalogo=caries, odontologo=odontologo,
+            )
+
+    urls = ['/admin/patients/antecedentespersonales/', '/admin/odontogram/diente/',
+            '/admin/odontogram/superficiedental/']
+    crear(_pacientes(2))
+    antes = [_consultas_listado(cliente_admin, url) for url in urls]
+    crear(_pacientes(8, inicio=100))
+    assert [_consultas_listado(cliente_admin, url) for url in urls] == antes
+
+
+@pytest.mark.django_db
+def test_conteo_estimado_por_encima_del_umbral(settings):
+    settings.ADMIN_CONTEO_ESTIMADO_MIN_FILAS = 5
+    _pacientes(12)
+    with connection.cursor() as cursor:
+        cursor.execute(f'ANALYZE {Paciente._meta.db_table}')
+
+    # Sin filtros: filas estimadas de pg_class, sin COUNT
+    with CaptureQueriesContext(connection) as consultas:
+        assert ConteoEstimadoPaginator(Paciente.objects.all(), 20).count == 12
+    assert not any('COUNT(' in q['sql'].upper() for q in consultas.captured_queries)
+
+    # Filtrado por debajo del umbral: exacto
+    assert ConteoEstimadoPaginator(Paciente.objects.filter(cedula_pasaporte__endswith='1'), 20).count == 2
+    # Filtrado por encima: al menos umbral + 1, y la página 1 siempre existe
+    paginador = ConteoEstimadoPaginator(Paciente.objects.filter(apellidos='Admin'), 20)
+    assert paginador.count >= 6
+    assert len(paginador.page(1).object_list) == 12
+
+    settings.ADMIN_CONTEO_ESTIMADO_MIN_FILAS = 1000
+    assert ConteoEstimadoPaginator(Paciente.objects.all(), 20).count == 12
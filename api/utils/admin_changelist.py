@@ -0,0 +1,106 @@
+# api/utils/admin_changelist.py
+"""
+Listados del admin sobre tablas grandes (pacientes, antecedentes,
+odontogramas, historial, citas).
+
+El paginador por defecto hace un COUNT(*) exacto en cada página del
+changelist, y con `show_full_result_count` un segundo COUNT de la tabla
+completa. ConteoEstimadoPaginator:
+
+- sin filtros, usa las filas estimadas por PostgreSQL (pg_class.reltuples,
+  sumando las particiones) cuando superan ADMIN_CONTEO_ESTIMADO_MIN_FILAS;
+- con filtros o búsqueda, cuenta como mucho ADMIN_CONTEO_ESTIMADO_MIN_FILAS + 1
+  filas (COUNT sobre un LIMIT); si hay más, usa la estimación del planificador.
+
+Por debajo del umbral el conteo es exacto. Con una estimación las últimas
+páginas pueden quedar vacías, pero nunca dan error.
+"""
+import json
+import logging
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Count, IntegerField, OuterRef, QuerySet, Subquery
+from django.db.models.functions import Coalesce
+from django.utils.functional import cached_property
+
+logger = logging.getLogger(__name__)
+
+_SQL_FILAS_ESTIMADAS = """
+    SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::bigint
+    FROM pg_class c
+    WHERE c.oid = %s::regclass
+       OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = %s::regclass)
+"""
+
+
+def conteo_relacionados(relacionados: QuerySet, campo: str):
+    """
+    COUNT de `relacionados` por fila del changelist como subconsulta
+    correlacionada (`campo` apunta al modelo del admin): evita una consulta
+    por fila sin multiplicar filas con JOINs.
+    """
+    return Coalesce(
+        Subquery(
+            relacionados.filter(**{campo: OuterRef('pk')})
+            .order_by().values(campo).annotate(total=Count('pk')).values('total')[:1],
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+class ConteoEstimadoPaginator(Paginator):
+    """Paginator del admin con conteo estimado para tablas grandes"""
+
+    @cached_property
+    def count(self):
+        if not isinstance(self.object_list, QuerySet):
+            return super().count
+
+        queryset = self.object_list
+        umbral = getattr(settings, 'ADMIN_CONTEO_ESTIMADO_MIN_FILAS', 50000)
+        connection = connections[queryset.db]
+        if connection.vendor != 'postgresql':
+            return super().count
+
+        try:
+            if not queryset.query.where:
+                estimadas = self._filas_tabla(connection, queryset.model._meta.db_table)
+                if estimadas > umbral:
+                    return estimadas
+
+            # Conteo acotado: exacto si no supera el umbral
+            acotado = queryset[:umbral + 1].count()
+            if acotado <= umbral:
+                return acotado
+            return max(self._filas_plan(connection, queryset), acotado)
+        except Exception as e:
+            logger.warning(f"[Admin] No se pudo estimar el conteo de {queryset.model.__name__}: {e}")
+            return super().count
+
+    @staticmethod
+    def _filas_tabla(connection, tabla: str) -> int:
+        with connection.cursor() as cursor:
+            cursor.execute(_SQL_FILAS_ESTIMADAS, [tabla, tabla])
+            return int(cursor.fetchone()[0])
+
+    @staticmethod
+    def _filas_plan(connection, queryset) -> int:
+        sql, params = queryset.order_by().query.sql_with_params()
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
+
+
+class ChangelistEficienteMixin:
+    """
+    ModelAdmin con conteo estimado y sin el COUNT de la tabla completa.
+    Cada admin declara además `list_select_related` para sus columnas.
+    """
+    paginator = ConteoEstimadoPaginator
+    show_full_result_count = False
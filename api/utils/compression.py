@@ -0,0 +1,53 @@
+# api/utils/compression.py
+"""
+Compresión de las respuestas JSON grandes (odontogramas, semanas de citas,
+listas CIE, bundles FHIR).
+
+Negocia por Accept-Encoding: brotli si el cliente lo acepta y el paquete
+`brotli` está instalado, si no gzip (GZipMiddleware de Django). Las
+respuestas pequeñas, las que no son JSON y las de streaming (descargas,
+exportaciones) pasan sin tocar.
+"""
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+try:
+    import brotli
+except ImportError:  # Opcional: sin brotli se negocia solo gzip
+    brotli = None
+
+re_accepts_br = _lazy_re_compile(r'\bbr\b')
+
+
+class CompresionRespuestaMiddleware(GZipMiddleware):
+    """Comprime con brotli o gzip las respuestas JSON de al menos RESPUESTA_COMPRESION_MIN_BYTES"""
+
+    def process_response(self, request, response):
+        if response.streaming or response.has_header('Content-Encoding'):
+            return response
+        if not response.get('Content-Type', '').startswith('application/json'):
+            return response
+        if len(response.content) < getattr(settings, 'RESPUESTA_COMPRESION_MIN_BYTES', 1024):
+            return response
+
+        if brotli is None or not re_accepts_br.search(request.META.get('HTTP_ACCEPT_ENCODING', '')):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        # Calidad media: las máximas (10-11) son para estáticos precomprimidos
+        comprimido = brotli.compress(
+            response.content, quality=getattr(settings, 'RESPUESTA_COMPRESION_BROTLI_CALIDAD', 5)
+        )
+        if len(comprimido) >= len(response.content):
+            return response
+        response.content = comprimido
+        response.headers['Content-Length'] = str(len(comprimido))
+
+        # ETag débil tras comprimir (RFC 9110 8.8.1); If-None-Match compara en modo débil
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = 'br'
+        return response
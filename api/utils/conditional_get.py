@@ -0,0 +1,62 @@
+# api/utils/conditional_get.py
+"""
+GET condicional (ETag / Last-Modified) para vistas de lectura muy consultadas.
+
+La vista declara una función de versión que lee marcadores baratos (versión
+del catálogo, último cambio del historial, fechas de modificación) en vez de
+serializar el payload. Si el cliente manda If-None-Match / If-Modified-Since
+y la versión no cambió, se responde 304 sin ejecutar la vista.
+
+Se aplica al handler (método del ViewSet con method_decorator, o debajo de
+@api_view), así que autenticación y permisos ya corrieron antes.
+"""
+import hashlib
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import condition
+
+
+def etag_de(*partes) -> str:
+    """ETag (sin comillas) a partir de los marcadores de versión"""
+    texto = '|'.join('' if parte is None else str(parte) for parte in partes)
+    return hashlib.md5(texto.encode(), usedforsecurity=False).hexdigest()
+
+
+def get_condicional(version_func):
+    """
+    Decorador de GET condicional.
+
+    version_func(request, *args, **kwargs) recibe los mismos argumentos que
+    la vista y devuelve (etag, ultima_modificacion) —esta última puede ser
+    None— o None si el recurso no existe: en ese caso la vista responde
+    normalmente (p. ej. 404) y sin ETag.
+    """
+    def decorador(vista):
+        @wraps(vista)
+        def envoltura(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return vista(request, *args, **kwargs)
+
+            try:
+                version = version_func(request, *args, **kwargs)
+            except (ValueError, ValidationError):
+                version = None  # id mal formado: la vista devuelve el error
+            etag, ultima_modificacion = version or (None, None)
+
+            response = condition(
+                etag_func=lambda *a, **k: etag,
+                last_modified_func=lambda *a, **k: ultima_modificacion,
+            )(vista)(request, *args, **kwargs)
+            if response.status_code >= 400:
+                # Un error no es una representación cacheable del recurso
+                for cabecera in ('ETag', 'Last-Modified'):
+                    if response.has_header(cabecera):
+                        del response[cabecera]
+            elif etag:
+                # Datos de pacientes: solo caché del navegador y revalidando siempre
+                patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return envoltura
+    return decorador
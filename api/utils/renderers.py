@@ -1,34 +1,90 @@
 # api/utils/renderers.py
+import logging
+
 from rest_framework.renderers import JSONRenderer
+from rest_framework.utils import encoders
+
+try:
+    import orjson
+except ImportError:  # Opcional: sin orjson se usa el encoder de DRF (json de la stdlib)
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+# Fechas, decimales, lazy strings, etc. pasan por el encoder de DRF para que la
+# salida sea la misma con y sin orjson (p. ej. "2025-01-01T10:00:00Z")
+_DEFAULT_DRF = encoders.JSONEncoder().default
+_OPCIONES_ORJSON = (orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS) if orjson else 0
+
+# DRF escapa U+2028 / U+2029 para que el JSON sea un subconjunto estricto de JavaScript
+_SEPARADORES_JS = (('\u2028'.encode(), b'\\u2028'), ('\u2029'.encode(), b'\\u2029'))
+
 
 class StandardizedJSONRenderer(JSONRenderer):
     """
     Renderer que automáticamente envuelve todas las respuestas en formato estándar.
     Maneja tanto respuestas simples como paginadas.
+
+    El payload se codifica una sola vez (con orjson si está instalado) y el
+    sobre {success, status_code, message, data, errors} se escribe como bytes
+    alrededor, sin armar un dict nuevo ni volver a recorrer los datos.
     """
-    
+
     def render(self, data, accepted_media_type=None, renderer_context=None):
         response = renderer_context.get('response') if renderer_context else None
-        
+
+        # Con indentación (p. ej. la API navegable) se usa el render estándar de DRF
+        indentado = self.get_indent(accepted_media_type, renderer_context or {}) is not None
+
         # Si no hay response context, retornar data tal cual (caso de browsable API)
-        if not response:
-            return super().render(data, accepted_media_type, renderer_context)
-        
         # No modificar respuestas que ya están en formato estándar
-        if isinstance(data, dict) and 'success' in data and 'status_code' in data:
-            return super().render(data, accepted_media_type, renderer_context)
-        
-        # Estructura estándar de respuesta
-        standardized_response = {
-            'success': response.status_code < 400,
-            'status_code': response.status_code,
-            'message': self._get_message(data, response),
-            'data': data if response.status_code < 400 else None,
-            'errors': data if response.status_code >= 400 else None
-        }
-        
-        return super().render(standardized_response, accepted_media_type, renderer_context)
-    
+        if not response or (isinstance(data, dict) and 'success' in data and 'status_code' in data):
+            if indentado or data is None:
+                return super().render(data, accepted_media_type, renderer_context)
+            return self.codificar(data)
+
+        exito = response.status_code < 400
+        # Se calcula antes de codificar: puede sacar 'message' de los datos
+        mensaje = self._get_message(data, response)
+
+        if indentado:
+            # Estructura estándar de respuesta
+            standardized_response = {
+                'success': exito,
+                'status_code': response.status_code,
+                'message': mensaje,
+                'data': data if exito else None,
+                'errors': data if not exito else None
+            }
+            return super().render(standardized_response, accepted_media_type, renderer_context)
+
+        payload = self.codificar(data)
+        return b''.join((
+            b'{"success":', b'true' if exito else b'false',
+            b',"status_code":', str(response.status_code).encode(),
+            b',"message":', self.codificar(mensaje),
+            b',"data":', payload if exito else b'null',
+            b',"errors":', b'null' if exito else payload,
+            b'}',
+        ))
+
+    def codificar(self, data) -> bytes:
+        """JSON compacto de `data`, igual al de JSONRenderer sin indentación"""
+        if orjson is not None:
+            try:
+                contenido = orjson.dumps(data, default=_DEFAULT_DRF, option=_OPCIONES_ORJSON)
+            except TypeError as e:
+                # p. ej. enteros de más de 64 bits: el encoder de DRF sí los admite
+                logger.debug(f"orjson no pudo codificar la respuesta ({e}); se usa el encoder de DRF")
+            else:
+                for caracter, escape in _SEPARADORES_JS:
+                    if caracter in contenido:
+                        contenido = contenido.replace(caracter, escape)
+                return contenido
+        if data is None:
+            return b'null'
+        return super().render(data)
+
     def _get_message(self, data, response):
         """Genera mensaje automático basado en el status code"""
         status_messages = {
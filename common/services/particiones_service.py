@@ -0,0 +1,400 @@
+# common/services/particiones_service.py
+"""
+Particionado mensual y archivo en frío de las tablas de historial.
+
+Las tablas de PARTICIONADAS se particionan por rango (un mes por partición,
+límites en UTC) sobre su columna de fecha, más una partición DEFAULT que
+recibe cualquier fila fuera de los meses creados:
+
+    odonto_historial_odontograma_p202610, ..., odonto_historial_odontograma_pdefault
+
+La clave primaria en la base es (id, fecha) porque PostgreSQL exige que la
+columna de partición forme parte de ella; para Django `id` sigue siendo la
+clave primaria (UUID, único de hecho). Ninguna FK apunta a estas tablas.
+
+Las migraciones que particionan estas tablas (SQL congelado en cada una)
+copian las filas existentes por lotes antes de cambiar la tabla original por
+la particionada.
+
+Ciclo de vida (`python manage.py particiones_historial`, programado en cron):
+- crear_futuras: deja creadas las particiones de los próximos meses; si la
+  DEFAULT tiene filas de ese mes las mueve a la partición nueva.
+- archivar: las particiones con más de HISTORIAL_ARCHIVO_MESES se exportan a
+  NDJSON comprimido con gzip en el storage (StorageService), se verifica el
+  SHA-256 del objeto subido y se desprende y borra la partición. Las filas
+  de CONSERVAR no se exportan: pasan a la DEFAULT.
+- restaurar / asegurar_periodo: las lecturas de auditoría sobre meses
+  archivados (QuerySet.periodo) vuelven a cargar esos meses en su partición;
+  quedan en la base hasta la siguiente corrida de archivar.
+"""
+import gzip
+import hashlib
+import io
+import logging
+import re
+from datetime import date, datetime, timezone as dt_timezone
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, models, transaction
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Tabla particionada -> columna de partición
+PARTICIONADAS = {
+    'odonto_historial_odontograma': 'fecha',
+    'historial_citas': 'fecha_cambio',
+    'appointment_recordatoriocita': 'fecha_envio',
+}
+
+# Filas que siguen en la base aunque su mes se archive, porque se leen sin
+# .periodo(): la versión del último SNAPSHOT_COMPLETO y la del último cambio
+# de cada paciente. Quedan en la partición DEFAULT y se archivan con su mes
+# cuando una versión posterior las reemplaza.
+CONSERVAR = {
+    'odonto_historial_odontograma': (
+        "version_id IN (SELECT DISTINCT ON (paciente_id) version_id FROM odonto_historial_odontograma "
+        "WHERE tipo_cambio = 'snapshot_completo' ORDER BY paciente_id, fecha DESC) "
+        "OR version_id IN (SELECT DISTINCT ON (paciente_id) version_id FROM odonto_historial_odontograma "
+        "ORDER BY paciente_id, fecha DESC)"
+    ),
+}
+
+LOTE_RESTAURACION = 1000
+CACHE_ARCHIVADOS_TIMEOUT = 300
+
+_SUFIJO_MES = re.compile(r'_p(\d{4})(\d{2})$')
+
+
+def _mes(valor) -> date:
+    """Primer día del mes (UTC) de una fecha o datetime"""
+    if isinstance(valor, datetime):
+        if timezone.is_aware(valor):
+            valor = valor.astimezone(dt_timezone.utc)
+        valor = valor.date()
+    return valor.replace(day=1)
+
+
+def _sumar_meses(mes: date, cantidad: int) -> date:
+    indice = mes.year * 12 + mes.month - 1 + cantidad
+    return date(indice // 12, indice % 12 + 1, 1)
+
+
+def _limite(mes: date) -> str:
+    return f'{mes:%Y-%m-%d} 00:00:00+00'
+
+
+def _nombre_particion(tabla: str, mes: date) -> str:
+    return f'{tabla}_p{mes:%Y%m}'
+
+
+def _particion_defecto(tabla: str) -> str:
+    return f'{tabla}_pdefault'
+
+
+def _clave_cache_archivados(tabla: str) -> str:
+    return f'particiones:archivados:{tabla}'
+
+
+class ParticionesService:
+    """Particiones mensuales de las tablas de historial y su archivo en el storage"""
+
+    # ------------------------------------------------------------------
+    # Particiones futuras
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def crear_futuras(cls, meses: Optional[int] = None) -> List[str]:
+        """Crea las particiones del mes actual y los `meses` siguientes; devuelve las creadas"""
+        actual = _mes(timezone.now())
+        creadas = []
+        for tabla in PARTICIONADAS:
+            for n in range(cls._meses_futuros(meses) + 1):
+                with transaction.atomic(), connection.cursor() as cursor:
+                    if cls._crear_particion(cursor, tabla, _sumar_meses(actual, n)):
+                        creadas.append(_nombre_particion(tabla, _sumar_meses(actual, n)))
+        return creadas
+
+    @classmethod
+    def _crear_particion(cls, cursor, tabla: str, mes: date) -> bool:
+        nombre = _nombre_particion(tabla, mes)
+        if cls._existe(cursor, nombre):
+            return False
+        columna = PARTICIONADAS[tabla]
+        rango = [_limite(mes), _limite(_sumar_meses(mes, 1))]
+        defecto = _particion_defecto(tabla)
+
+        en_defecto = False
+        if cls._existe(cursor, defecto):
+            cursor.execute(
+                f'SELECT EXISTS (SELECT 1 FROM {defecto} WHERE {columna} >= %s AND {columna} < %s)', rango
+            )
+            en_defecto = cursor.fetchone()[0]
+
+        if not en_defecto:
+            cursor.execute(
+                f'CREATE TABLE {nombre} PARTITION OF {tabla} FOR VALUES FROM (%s) TO (%s)', rango
+            )
+            return True
+
+        # PostgreSQL no deja crear la partición si la DEFAULT tiene filas de su
+        # rango: se mueven a una tabla suelta que después se anexa.
+        cursor.execute(f'CREATE TABLE {nombre} (LIKE {tabla} INCLUDING DEFAULTS INCLUDING STORAGE)')
+        cursor.execute(
+            f'WITH movidas AS (DELETE FROM {defecto} WHERE {columna} >= %s AND {columna} < %s RETURNING *) '
+            f'INSERT INTO {nombre} SELECT * FROM movidas',
+            rango,
+        )
+        logger.info(f"[Particiones] {cursor.rowcount} fila(s) movidas de {defecto} a {nombre}")
+        cursor.execute(f'ALTER TABLE {tabla} ATTACH PARTITION {nombre} FOR VALUES FROM (%s) TO (%s)', rango)
+        return True
+
+    # ------------------------------------------------------------------
+    # Archivo en frío
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def archivar(cls, meses_retencion: Optional[int] = None) -> List[Dict]:
+        """
+        Exporta al storage y borra las particiones con más de `meses_retencion`
+        meses. Returns: [{'tabla', 'mes', 'filas', 'conservadas', 'bytes', 'object_key'}]
+        """
+        limite = cls.limite_archivo(meses_retencion)
+        archivadas = []
+        for tabla in PARTICIONADAS:
+            cls._separar_defecto(tabla, limite)
+            for mes in cls.meses_en_base(tabla):
+                if mes < limite:
+                    archivadas.append(cls._archivar_particion(tabla, mes))
+            cache.delete(_clave_cache_archivados(tabla))
+        return archivadas
+
+    @classmethod
+    def _separar_defecto(cls, tabla: str, limite: date) -> None:
+        """
+        Pasa a su partición mensual las filas antiguas que quedaron en la
+        DEFAULT (salvo las de CONSERVAR). Si el mes ya está archivado lo
+        restaura, para que el siguiente archivo lo incluya completo.
+        """
+        columna = PARTICIONADAS[tabla]
+        conservar = CONSERVAR.get(tabla)
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT DISTINCT date_trunc('month', {columna} AT TIME ZONE 'UTC')::date "
+                f"FROM {_particion_defecto(tabla)} WHERE {columna} < %s"
+                + (f' AND NOT ({conservar})' if conservar else ''),
+                [_limite(limite)],
+            )
+            meses = [fila[0] for fila in cursor.fetchall()]
+        archivados = set(cls.meses_archivados(tabla)) if meses else set()
+        for mes in meses:
+            if mes in archivados:
+                cls.restaurar(tabla, mes)
+                continue
+            with transaction.atomic(), connection.cursor() as cursor:
+                cls._crear_particion(cursor, tabla, mes)
+
+    @classmethod
+    def _archivar_particion(cls, tabla: str, mes: date) -> Dict:
+        from common.services.storage_service import StorageService
+
+        nombre = _nombre_particion(tabla, mes)
+        object_key = cls.clave_archivo(tabla, mes)
+        conservar = CONSERVAR.get(tabla)
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                # Sin escrituras en el mes mientras se exporta y se desprende
+                cursor.execute(f'LOCK TABLE {nombre} IN SHARE MODE')
+                # Antes de desprender: CONSERVAR se evalúa sobre la tabla completa
+                conservadas = []
+                if conservar:
+                    cursor.execute(f'SELECT id FROM {nombre} WHERE {conservar}')
+                    conservadas = [fila[0] for fila in cursor.fetchall()]
+            buffer = io.BytesIO()
+            filas = 0
+            with gzip.GzipFile(fileobj=buffer, mode='wb') as salida:
+                with connection.chunked_cursor() as cursor:
+                    cursor.execute(
+                        f'SELECT row_to_json(p)::text FROM {nombre} p WHERE NOT (id = ANY(%s::uuid[])) '
+                        f'ORDER BY {PARTICIONADAS[tabla]}',
+                        [conservadas],
+                    )
+                    for (linea,) in cursor:
+                        salida.write(linea.encode('utf-8') + b'\n')
+                        filas += 1
+            contenido = buffer.getvalue()
+
+            storage = StorageService()
+            if not storage.upload_file(object_key, contenido, 'application/gzip'):
+                raise RuntimeError(f"No se pudo subir {object_key}")
+            # El ETag no es un MD5 con SSE-KMS: se compara el SHA-256 del objeto
+            metadata = storage.get_file_metadata(object_key, checksum=True)
+            if not metadata or metadata['size'] != len(contenido) or \
+                    metadata['sha256'] != hashlib.sha256(contenido).hexdigest():
+                raise RuntimeError(f"El objeto {object_key} no coincide con la partición exportada")
+
+            with connection.cursor() as cursor:
+                cursor.execute(f'ALTER TABLE {tabla} DETACH PARTITION {nombre}')
+                if conservadas:
+                    # Sin partición para el mes: van a la DEFAULT
+                    cursor.execute(f'INSERT INTO {tabla} SELECT * FROM {nombre} WHERE id = ANY(%s::uuid[])', [conservadas])
+                cursor.execute(f'DROP TABLE {nombre}')
+        logger.info(
+            f"[Particiones] {nombre} archivada en {object_key} ({filas} filas, {len(contenido)} bytes, "
+            f"{len(conservadas)} conservadas en la base)"
+        )
+        return {
+            'tabla': tabla, 'mes': mes, 'filas': filas, 'conservadas': len(conservadas),
+            'bytes': len(contenido), 'object_key': object_key,
+        }
+
+    @classmethod
+    def restaurar(cls, tabla: str, mes: date) -> int:
+        """Vuelve a cargar un mes archivado en su partición; devuelve las filas restauradas"""
+        from common.services.storage_service import StorageService
+
+        mes = _mes(mes)
+        nombre = _nombre_particion(tabla, mes)
+        with transaction.atomic(), connection.cursor() as cursor:
+            # Dos lecturas del mismo mes no lo restauran dos veces
+            cursor.execute('SELECT pg_advisory_xact_lock(hashtext(%s))', [nombre])
+            if cls._existe(cursor, nombre):
+                return 0
+            buffer = io.BytesIO()
+            if not StorageService().download_file(cls.clave_archivo(tabla, mes), buffer):
+                raise FileNotFoundError(f"No hay archivo de {tabla} para {mes:%Y-%m}")
+            cls._crear_particion(cursor, tabla, mes)
+
+            filas = 0
+            lineas = gzip.decompress(buffer.getvalue()).decode('utf-8').splitlines()
+            for inicio in range(0, len(lineas), LOTE_RESTAURACION):
+                lote = lineas[inicio:inicio + LOTE_RESTAURACION]
+                cursor.execute(
+                    f'INSERT INTO {nombre} SELECT * FROM json_populate_recordset(NULL::{tabla}, %s::json)',
+                    ['[' + ','.join(lote) + ']'],
+                )
+                filas += len(lote)
+        logger.info(f"[Particiones] {nombre} restaurada desde el archivo ({filas} filas)")
+        return filas
+
+    @classmethod
+    def asegurar_periodo(cls, tabla: str, desde, hasta=None) -> List[date]:
+        """
+        Restaura los meses archivados entre `desde` y `hasta` (lecturas de
+        auditoría). Solo consulta el storage si el período llega a meses que
+        pueden estar archivados y cuya partición no está en la base.
+        """
+        limite = cls.limite_archivo()
+        inicio = _mes(desde)
+        if inicio >= limite:
+            return []
+        fin = min(_mes(hasta or timezone.now()), _sumar_meses(limite, -1))
+
+        en_base = set(cls.meses_en_base(tabla))
+        faltantes = []
+        mes = inicio
+        while mes <= fin:
+            if mes not in en_base:
+                faltantes.append(mes)
+            mes = _sumar_meses(mes, 1)
+        if not faltantes:
+            return []
+
+        archivados = set(cls.meses_archivados(tabla))
+        restaurados = [mes for mes in faltantes if mes in archivados]
+        for mes in restaurados:
+            cls.restaurar(tabla, mes)
+        return restaurados
+
+    # ------------------------------------------------------------------
+    # Consultas
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def meses_en_base(cls, tabla: str) -> List[date]:
+        """Meses con partición en la base (sin la DEFAULT)"""
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+                "WHERE i.inhparent = %s::regclass",
+                [tabla],
+            )
+            nombres = [fila[0] for fila in cursor.fetchall()]
+        return sorted(cls._mes_de_nombre(nombre) for nombre in nombres if _SUFIJO_MES.search(nombre))
+
+    @classmethod
+    def meses_archivados(cls, tabla: str) -> List[date]:
+        """Meses de `tabla` con archivo en el storage (cacheado unos minutos)"""
+        from common.services.storage_service import StorageService
+
+        clave = _clave_cache_archivados(tabla)
+        meses = cache.get(clave)
+        if meses is None:
+            prefijo = f'{cls._prefijo()}/{tabla}/'
+            meses = sorted(
+                date(int(objeto['key'][len(prefijo):][:4]), int(objeto['key'][len(prefijo):][5:7]), 1)
+                for objeto in StorageService().list_objects(prefijo)
+                if objeto['key'].endswith('.ndjson.gz')
+            )
+            cache.set(clave, meses, timeout=CACHE_ARCHIVADOS_TIMEOUT)
+        return meses
+
+    @classmethod
+    def limite_archivo(cls, meses_retencion: Optional[int] = None) -> date:
+        """Primer mes que se conserva en la base"""
+        if meses_retencion is None:
+            meses_retencion = getattr(settings, 'HISTORIAL_ARCHIVO_MESES', 24)
+        return _sumar_meses(_mes(timezone.now()), -max(1, meses_retencion))
+
+    @classmethod
+    def clave_archivo(cls, tabla: str, mes: date) -> str:
+        return f'{cls._prefijo()}/{tabla}/{mes:%Y-%m}.ndjson.gz'
+
+    # ------------------------------------------------------------------
+    # Internos
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _prefijo() -> str:
+        return getattr(settings, 'HISTORIAL_ARCHIVO_PREFIJO', 'archivo/historial').rstrip('/')
+
+    @staticmethod
+    def _meses_futuros(meses: Optional[int]) -> int:
+        if meses is None:
+            meses = getattr(settings, 'HISTORIAL_PARTICIONES_MESES_FUTUROS', 3)
+        return max(0, meses)
+
+    @staticmethod
+    def _mes_de_nombre(nombre: str) -> date:
+        anio, mes = _SUFIJO_MES.search(nombre).groups()
+        return date(int(anio), int(mes), 1)
+
+    @staticmethod
+    def _existe(cursor, nombre: str) -> bool:
+        cursor.execute('SELECT to_regclass(%s) IS NOT NULL', [nombre])
+        return cursor.fetchone()[0]
+
+    @staticmethod
+    def _es_particionada(cursor, tabla: str) -> bool:
+        cursor.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = %s::regclass", [tabla])
+        return cursor.fetchone()[0]
+
+
+class HistorialParticionadoQuerySet(models.QuerySet):
+    """QuerySet de las tablas de historial particionadas"""
+
+    def periodo(self, desde, hasta=None):
+        """
+        Filas entre `desde` y `hasta` (inclusive), restaurando antes desde el
+        archivo los meses del período que ya no están en la base.
+        """
+        tabla = self.model._meta.db_table
+        columna = PARTICIONADAS[tabla]
+        ParticionesService.asegurar_periodo(tabla, desde, hasta)
+        filtros = {f'{columna}__gte': desde}
+        if hasta is not None:
+            filtros[f'{columna}__lte'] = hasta
+        return self.filter(**filtros)
+
@@ -1,21 +1,97 @@
 # api/common/services/storage_backend.py
 """
 Implementación del patrón Strategy para backends de almacenamiento.
-Permite cambiar entre MinIO (desarrollo) y AWS S3 (producción) sin modificar código.
+Permite cambiar entre MinIO (desarrollo), AWS S3 (producción) y un backend
+local en disco con semántica S3 (tests) sin modificar código.
 """
 from abc import ABC, abstractmethod
-from typing import Optional
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterable, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qsl, quote, unquote, urlencode, urlsplit
+import base64
+import binascii
+import hashlib
+import hmac
+import json
 import logging
+import os
+import shutil
+import uuid
 
 logger = logging.getLogger(__name__)
 
+# (object_key, download_name) → identifica una URL de visualización/descarga
+SolicitudURL = Tuple[str, Optional[str]]
+
+# Límite de claves por llamada a DeleteObjects (S3 y MinIO)
+MAX_CLAVES_DELETE_OBJECTS = 1000
+
+
+def _config_cliente(config: dict):
+    """
+    botocore.Config compartido por S3 y MinIO: pool de conexiones acorde a los
+    hilos que usan el cliente (requests, derivados, cola de eliminación),
+    reintentos 'standard' con backoff y timeouts cortos de conexión.
+    """
+    from botocore.config import Config
+
+    cliente = config.get('cliente', {})
+    return Config(
+        signature_version='s3v4',
+        max_pool_connections=cliente.get('max_pool_connections', 50),
+        connect_timeout=cliente.get('connect_timeout', 3),
+        read_timeout=cliente.get('read_timeout', 30),
+        retries={'max_attempts': cliente.get('max_attempts', 3), 'mode': 'standard'},
+        tcp_keepalive=True,
+    )
+
+
+def _disposicion(download_name: Optional[str]) -> Optional[str]:
+    return f'attachment; filename="{download_name}"' if download_name else None
+
+
+def _parametros_subida(bucket: str, object_key: str, content_type: str, sha256: Optional[str]) -> dict:
+    params = {'Bucket': bucket, 'Key': object_key, 'ContentType': content_type}
+    if sha256:
+        params['ChecksumSHA256'] = base64.b64encode(bytes.fromhex(sha256)).decode('ascii')
+    return params
+
+
+def _parametros_head(bucket: str, object_key: str, checksum: bool) -> dict:
+    params = {'Bucket': bucket, 'Key': object_key}
+    if checksum:
+        params['ChecksumMode'] = 'ENABLED'
+    return params
+
+
+def _metadata(respuesta: dict, checksum: bool) -> dict:
+    metadata = {'size': respuesta['ContentLength'], 'etag': respuesta['ETag'].strip('"')}
+    if checksum:
+        # Solo el checksum de objeto completo ('base64'); el de multipart termina en '-N'
+        valor = respuesta.get('ChecksumSHA256') or ''
+        try:
+            metadata['sha256'] = base64.b64decode(valor, validate=True).hex() if valor else None
+        except (binascii.Error, ValueError):
+            metadata['sha256'] = None
+    return metadata
+
 
 class StorageBackend(ABC):
     """Interfaz abstracta para backends de almacenamiento compatible S3"""
     
     @abstractmethod
-    def generate_upload_url(self, object_key: str, content_type: str, expiration: int = 300) -> Optional[str]:
-        """Genera URL prefirmada para subir archivo (PUT)"""
+    def verificar(self) -> None:
+        """Health check: comprueba el acceso al bucket (lanza excepción si falla)"""
+        pass
+    
+    @abstractmethod
+    def generate_upload_url(self, object_key: str, content_type: str, expiration: int = 300, sha256: Optional[str] = None) -> Optional[str]:
+        """
+        Genera URL prefirmada para subir archivo (PUT).
+        Con `sha256` (hex) la firma incluye x-amz-checksum-sha256: el storage
+        rechaza un contenido distinto y guarda el checksum con el objeto.
+        """
         pass
     
     @abstractmethod
@@ -23,6 +99,15 @@ class StorageBackend(ABC):
         """Genera URL prefirmada para ver/descargar archivo (GET)"""
         pass
     
+    def generate_view_urls(self, solicitudes: Iterable[SolicitudURL], expiration: int = 3600) -> Dict[SolicitudURL, str]:
+        """Genera URLs GET prefirmadas en lote: {(object_key, download_name): url}"""
+        urls = {}
+        for object_key, download_name in solicitudes:
+            url = self.generate_view_url(object_key, expiration, download_name)
+            if url:
+                urls[(object_key, download_name)] = url
+        return urls
+    
     @abstractmethod
     def check_file_exists(self, object_key: str) -> bool:
         """Verifica que el archivo existe en el storage"""
@@ -32,49 +117,103 @@ class StorageBackend(ABC):
     def delete_file(self, object_key: str) -> bool:
         """Elimina un archivo del storage"""
         pass
+    
+    @abstractmethod
+    def delete_files(self, object_keys: List[str]) -> Dict[str, str]:
+        """
+        Elimina en lote (DeleteObjects, hasta 1000 claves por llamada).
+        Retorna {object_key: error} de las claves que no se eliminaron.
+        """
+        pass
+    
+    @abstractmethod
+    def list_objects(self, prefix: str) -> Iterator[dict]:
+        """
+        Recorre los objetos bajo `prefix` en orden de clave:
+        {'key', 'size', 'last_modified'}. Propaga el error si el listado falla.
+        """
+        pass
+    
+    @abstractmethod
+    def get_file_metadata(self, object_key: str, checksum: bool = False) -> Optional[dict]:
+        """
+        Tamaño y ETag del objeto: {'size': int, 'etag': str} o None si no existe.
+        Con `checksum` agrega 'sha256' (hex, o None si el objeto no lo tiene).
+        """
+        pass
+    
+    @abstractmethod
+    def download_file(self, object_key: str, destino: BinaryIO) -> bool:
+        """Copia el contenido del objeto en `destino` (en streaming)"""
+        pass
+    
+    @abstractmethod
+    def upload_file(self, object_key: str, contenido: bytes, content_type: str) -> bool:
+        """Sube un objeto pequeño generado por el servidor (p. ej. derivados), con su SHA-256"""
+        pass
+    
+    # ── Subida multipart (archivos grandes: DICOM, STL/OBJ) ──────────────────
+    @abstractmethod
+    def create_multipart_upload(self, object_key: str, content_type: str) -> Optional[str]:
+        """Inicia una subida multipart y retorna su upload_id"""
+        pass
+    
+    @abstractmethod
+    def generate_part_upload_urls(self, object_key: str, upload_id: str, part_numbers: Iterable[int], expiration: int = 3600) -> Dict[int, str]:
+        """URLs prefirmadas (PUT) para subir cada parte: {part_number: url}"""
+        pass
+    
+    @abstractmethod
+    def list_uploaded_parts(self, object_key: str, upload_id: str) -> Optional[List[dict]]:
+        """Partes ya recibidas: [{'part_number', 'etag', 'size'}]; None si la subida no existe"""
+        pass
+    
+    @abstractmethod
+    def complete_multipart_upload(self, object_key: str, upload_id: str, parts: List[dict]) -> Optional[str]:
+        """Ensambla el objeto con las partes [{'part_number', 'etag'}] y retorna su ETag"""
+        pass
+    
+    @abstractmethod
+    def abort_multipart_upload(self, object_key: str, upload_id: str) -> bool:
+        """Cancela la subida y libera las partes almacenadas"""
+        pass
 
 
-class S3Backend(StorageBackend):
-    """Backend para AWS S3 (Producción)"""
+class Boto3Backend(StorageBackend):
+    """
+    Operaciones S3 comunes a AWS S3 y MinIO sobre un cliente boto3.
+    Las subclases crean `s3_client` y `bucket`, y definen `nombre` (para
+    los logs) y `errores` (excepciones que se registran en lugar de propagarse).
+    """
     
-    def __init__(self, config: dict):
-        import boto3
-        from botocore.config import Config
-        
-        self.s3_client = boto3.client(
-            's3',
-            aws_access_key_id=config['access_key'],
-            aws_secret_access_key=config['secret_key'],
-            region_name=config['region'],
-            config=Config(signature_version='s3v4')
-        )
-        self.bucket = config['bucket_name']
-        logger.info(f"AWS S3 Backend inicializado: {self.bucket}")
+    nombre = 'S3'
     
-    def generate_upload_url(self, object_key: str, content_type: str, expiration: int = 300) -> Optional[str]:
+    @property
+    def errores(self) -> tuple:
         from botocore.exceptions import ClientError
+        return (ClientError,)
+    
+    def verificar(self) -> None:
+        self.s3_client.head_bucket(Bucket=self.bucket)
+    
+    def generate_upload_url(self, object_key: str, content_type: str, expiration: int = 300, sha256: Optional[str] = None) -> Optional[str]:
         try:
             url = self.s3_client.generate_presigned_url(
                 'put_object',
-                Params={
-                    'Bucket': self.bucket,
-                    'Key': object_key,
-                    'ContentType': content_type
-                },
+                Params=_parametros_subida(self.bucket, object_key, content_type, sha256),
                 ExpiresIn=expiration
             )
-            logger.debug(f"URL de subida generada para: {object_key}")
+            logger.debug(f"URL de subida {self.nombre} generada para: {object_key}")
             return url
-        except ClientError as e:
-            logger.error(f"Error generando URL de subida S3: {e}")
+        except self.errores as e:
+            logger.error(f"Error generando URL de subida {self.nombre}: {e}")
             return None
     
     def generate_view_url(self, object_key: str, expiration: int = 3600, download_name: Optional[str] = None) -> Optional[str]:
-        from botocore.exceptions import ClientError
         params = {'Bucket': self.bucket, 'Key': object_key}
         
         if download_name:
-            params['ResponseContentDisposition'] = f'attachment; filename="{download_name}"'
+            params['ResponseContentDisposition'] = _disposicion(download_name)
         
         try:
             url = self.s3_client.generate_presigned_url(
@@ -83,35 +222,179 @@ class S3Backend(StorageBackend):
                 ExpiresIn=expiration
             )
             return url
-        except ClientError as e:
-            logger.error(f"Error generando URL de visualización S3: {e}")
+        except self.errores as e:
+            logger.error(f"Error generando URL de visualización {self.nombre}: {e}")
             return None
     
     def check_file_exists(self, object_key: str) -> bool:
-        from botocore.exceptions import ClientError
         try:
             self.s3_client.head_object(Bucket=self.bucket, Key=object_key)
             return True
-        except ClientError:
+        except self.errores:
             return False
     
     def delete_file(self, object_key: str) -> bool:
-        from botocore.exceptions import ClientError
         try:
             self.s3_client.delete_object(Bucket=self.bucket, Key=object_key)
-            logger.info(f"Archivo eliminado de S3: {object_key}")
+            logger.info(f"Archivo eliminado de {self.nombre}: {object_key}")
             return True
-        except ClientError as e:
-            logger.error(f"Error eliminando archivo S3: {e}")
+        except self.errores as e:
+            logger.error(f"Error eliminando archivo {self.nombre}: {e}")
             return False
+    
+    def delete_files(self, object_keys: List[str]) -> Dict[str, str]:
+        errores = {}
+        for inicio in range(0, len(object_keys), MAX_CLAVES_DELETE_OBJECTS):
+            lote = object_keys[inicio:inicio + MAX_CLAVES_DELETE_OBJECTS]
+            try:
+                respuesta = self.s3_client.delete_objects(
+                    Bucket=self.bucket,
+                    Delete={'Objects': [{'Key': clave} for clave in lote], 'Quiet': True},
+                )
+            except self.errores as e:
+                logger.error(f"Error eliminando lote de {len(lote)} objetos en {self.nombre}: {e}")
+                errores.update((clave, str(e)) for clave in lote)
+                continue
+            for error in respuesta.get('Errors', []):
+                errores[error['Key']] = f"{error.get('Code')}: {error.get('Message')}"
+        logger.info(f"{len(object_keys) - len(errores)} objeto(s) eliminado(s) de {self.nombre}")
+        return errores
+    
+    def list_objects(self, prefix: str) -> Iterator[dict]:
+        paginador = self.s3_client.get_paginator('list_objects_v2')
+        try:
+            for pagina in paginador.paginate(Bucket=self.bucket, Prefix=prefix):
+                for objeto in pagina.get('Contents', []):
+                    yield {
+                        'key': objeto['Key'],
+                        'size': objeto['Size'],
+                        'last_modified': objeto['LastModified'],
+                    }
+        except self.errores as e:
+            logger.error(f"Error listando {prefix} en {self.nombre}: {e}")
+            raise
+    
+    def get_file_metadata(self, object_key: str, checksum: bool = False) -> Optional[dict]:
+        try:
+            respuesta = self.s3_client.head_object(**_parametros_head(self.bucket, object_key, checksum))
+        except self.errores:
+            return None
+        return _metadata(respuesta, checksum)
+    
+    def download_file(self, object_key: str, destino: BinaryIO) -> bool:
+        try:
+            respuesta = self.s3_client.get_object(Bucket=self.bucket, Key=object_key)
+            shutil.copyfileobj(respuesta['Body'], destino, 1024 * 1024)
+            return True
+        except self.errores as e:
+            logger.error(f"Error descargando {object_key} de {self.nombre}: {e}")
+            return False
+    
+    def upload_file(self, object_key: str, contenido: bytes, content_type: str) -> bool:
+        try:
+            self.s3_client.put_object(
+                Body=contenido,
+                **_parametros_subida(self.bucket, object_key, content_type, hashlib.sha256(contenido).hexdigest()),
+            )
+            return True
+        except self.errores as e:
+            logger.error(f"Error subiendo {object_key} a {self.nombre}: {e}")
+            return False
+    
+    def create_multipart_upload(self, object_key: str, content_type: str) -> Optional[str]:
+        try:
+            respuesta = self.s3_client.create_multipart_upload(
+                Bucket=self.bucket, Key=object_key, ContentType=content_type
+            )
+            logger.info(f"Subida multipart {self.nombre} iniciada: {object_key}")
+            return respuesta['UploadId']
+        except self.errores as e:
+            logger.error(f"Error iniciando subida multipart {self.nombre}: {e}")
+            return None
+    
+    def generate_part_upload_urls(self, object_key: str, upload_id: str, part_numbers: Iterable[int], expiration: int = 3600) -> Dict[int, str]:
+        return {
+            numero: self.s3_client.generate_presigned_url(
+                'upload_part',
+                Params={
+                    'Bucket': self.bucket,
+                    'Key': object_key,
+                    'UploadId': upload_id,
+                    'PartNumber': numero,
+                },
+                ExpiresIn=expiration
+            )
+            for numero in part_numbers
+        }
+    
+    def list_uploaded_parts(self, object_key: str, upload_id: str) -> Optional[List[dict]]:
+        partes = []
+        try:
+            paginador = self.s3_client.get_paginator('list_parts')
+            for pagina in paginador.paginate(Bucket=self.bucket, Key=object_key, UploadId=upload_id):
+                partes.extend(
+                    {'part_number': p['PartNumber'], 'etag': p['ETag'].strip('"'), 'size': p['Size']}
+                    for p in pagina.get('Parts', [])
+                )
+        except self.errores as e:
+            logger.warning(f"No se pudieron listar las partes de {object_key}: {e}")
+            return None
+        return partes
+    
+    def complete_multipart_upload(self, object_key: str, upload_id: str, parts: List[dict]) -> Optional[str]:
+        try:
+            respuesta = self.s3_client.complete_multipart_upload(
+                Bucket=self.bucket,
+                Key=object_key,
+                UploadId=upload_id,
+                MultipartUpload={'Parts': [
+                    {'PartNumber': p['part_number'], 'ETag': '"' + p['etag'].strip('"') + '"'}
+                    for p in sorted(parts, key=lambda p: p['part_number'])
+                ]},
+            )
+            logger.info(f"Subida multipart {self.nombre} completada: {object_key} ({len(parts)} partes)")
+            return respuesta['ETag'].strip('"')
+        except self.errores as e:
+            logger.error(f"Error completando subida multipart {self.nombre}: {e}")
+            return None
+    
+    def abort_multipart_upload(self, object_key: str, upload_id: str) -> bool:
+        try:
+            self.s3_client.abort_multipart_upload(Bucket=self.bucket, Key=object_key, UploadId=upload_id)
+            logger.info(f"Subida multipart {self.nombre} cancelada: {object_key}")
+            return True
+        except self.errores as e:
+            logger.error(f"Error cancelando subida multipart {self.nombre}: {e}")
+            return False
+
+
+class S3Backend(Boto3Backend):
+    """Backend para AWS S3 (Producción)"""
+    
+    def __init__(self, config: dict):
+        import boto3
+        
+        self.s3_client = boto3.client(
+            's3',
+            aws_access_key_id=config['access_key'],
+            aws_secret_access_key=config['secret_key'],
+            aws_session_token=config.get('session_token'),
+            region_name=config['region'],
+            config=_config_cliente(config)
+        )
+        self.bucket = config['bucket_name']
+        logger.info(f"AWS S3 Backend inicializado: {self.bucket}")
 
 
-class MinIOBackend(StorageBackend):
+class MinIOBackend(Boto3Backend):
     """Backend para MinIO (Desarrollo Local)"""
     
+    nombre = 'MinIO'
+    # En desarrollo MinIO puede no estar levantado: cualquier error se registra
+    errores = (Exception,)
+    
     def __init__(self, config: dict):
         import boto3
-        from botocore.config import Config
         
         self.s3_client = boto3.client(
             's3',
@@ -119,15 +402,16 @@ class MinIOBackend(StorageBackend):
             aws_access_key_id=config['access_key'],
             aws_secret_access_key=config['secret_key'],
             region_name='us-east-1',  # MinIO no requiere región real
-            config=Config(signature_version='s3v4')
+            config=_config_cliente(config)
         )
         self.bucket = config['bucket_name']
         self.endpoint_url = config['endpoint_url']
-        
-        # Auto-crear bucket si no existe
-        self._ensure_bucket_exists()
+        # Sin llamadas de red aquí: el bucket se crea en verificar() (health check)
         logger.info(f"MinIO Backend inicializado: {self.endpoint_url}/{self.bucket}")
     
+    def verificar(self) -> None:
+        self._ensure_bucket_exists()
+    
     def _ensure_bucket_exists(self):
         """Crea el bucket automáticamente en desarrollo"""
         from botocore.exceptions import ClientError
@@ -136,58 +420,271 @@ class MinIOBackend(StorageBackend):
             logger.debug(f"Bucket '{self.bucket}' ya existe")
         except ClientError:
             logger.warning(f"Creando bucket '{self.bucket}' en MinIO...")
-            try:
-                self.s3_client.create_bucket(Bucket=self.bucket)
-                logger.info(f" Bucket '{self.bucket}' creado exitosamente")
-            except ClientError as e:
-                logger.error(f" Error creando bucket: {e}")
-    
-    def generate_upload_url(self, object_key: str, content_type: str, expiration: int = 300) -> Optional[str]:
+            self.s3_client.create_bucket(Bucket=self.bucket)
+            logger.info(f" Bucket '{self.bucket}' creado exitosamente")
+
+
+class LocalBackend(StorageBackend):
+    """
+    Backend en disco con semántica S3 (tests y desarrollo sin MinIO).
+
+    Cada objeto se guarda como '{root}/{bucket}/objetos/{sha256(clave)}' junto
+    a un JSON con la clave, tipo de contenido, ETag (MD5; en multipart,
+    MD5 de los MD5 + '-N') y el SHA-256 si la subida lo firmó. Las URLs
+    prefirmadas llevan una firma HMAC y caducidad; `atender()` las resuelve
+    como lo haría el storage (firma, caducidad, Content-Type y checksum).
+    """
+
+    ALGORITMO = 'LOCAL-HMAC-SHA256'
+
+    def __init__(self, config: dict):
+        self.bucket = config['bucket_name']
+        self.raiz = Path(config['root']) / self.bucket
+        self.base_url = config.get('base_url', 'http://storage.local').rstrip('/')
+        self._secreto = config['secret_key'].encode('utf-8')
+        logger.info(f"Local Backend inicializado: {self.raiz}")
+
+    def verificar(self) -> None:
+        for carpeta in ('objetos', 'multipart'):
+            (self.raiz / carpeta).mkdir(parents=True, exist_ok=True)
+
+    # ── Almacenamiento ───────────────────────────────────────────────────────
+    def _rutas(self, object_key: str) -> Tuple[Path, Path]:
+        nombre = hashlib.sha256(object_key.encode('utf-8')).hexdigest()
+        carpeta = self.raiz / 'objetos'
+        return carpeta / nombre, carpeta / f"{nombre}.json"
+
+    @staticmethod
+    def _escribir(ruta: Path, contenido: bytes) -> None:
+        # Escritura atómica: un lector nunca ve un objeto a medias
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        temporal = ruta.with_name(f"{ruta.name}.{uuid.uuid4().hex}.tmp")
+        temporal.write_bytes(contenido)
+        os.replace(temporal, ruta)
+
+    def _meta(self, object_key: str) -> Optional[dict]:
+        _, ruta_meta = self._rutas(object_key)
         try:
-            url = self.s3_client.generate_presigned_url(
-                'put_object',
-                Params={
-                    'Bucket': self.bucket,
-                    'Key': object_key,
-                    'ContentType': content_type
-                },
-                ExpiresIn=expiration
-            )
-            logger.debug(f"URL de subida MinIO generada para: {object_key}")
-            return url
-        except Exception as e:
-            logger.error(f"Error generando URL de subida MinIO: {e}")
+            return json.loads(ruta_meta.read_text())
+        except FileNotFoundError:
             return None
-    
-    def generate_view_url(self, object_key: str, expiration: int = 3600, download_name: Optional[str] = None) -> Optional[str]:
-        params = {'Bucket': self.bucket, 'Key': object_key}
-        
-        if download_name:
-            params['ResponseContentDisposition'] = f'attachment; filename="{download_name}"'
-        
+
+    def _guardar(self, object_key: str, contenido: bytes, content_type: str,
+                 etag: Optional[str] = None, sha256: Optional[str] = None) -> str:
+        ruta, ruta_meta = self._rutas(object_key)
+        etag = etag or hashlib.md5(contenido).hexdigest()
+        self._escribir(ruta, contenido)
+        self._escribir(ruta_meta, json.dumps({
+            'key': object_key,
+            'size': len(contenido),
+            'etag': etag,
+            'content_type': content_type,
+            'sha256': sha256,
+            'last_modified': datetime.now(timezone.utc).isoformat(),
+        }).encode('utf-8'))
+        return etag
+
+    def _leer(self, object_key: str) -> Optional[bytes]:
+        ruta, _ = self._rutas(object_key)
         try:
-            url = self.s3_client.generate_presigned_url(
-                'get_object',
-                Params=params,
-                ExpiresIn=expiration
-            )
-            return url
-        except Exception as e:
-            logger.error(f"Error generando URL de visualización MinIO: {e}")
+            return ruta.read_bytes()
+        except FileNotFoundError:
             return None
-    
+
+    def _ruta_multipart(self, upload_id: str) -> Path:
+        if not upload_id.isalnum():
+            raise ValueError(f"upload_id inválido: {upload_id}")
+        return self.raiz / 'multipart' / upload_id
+
+    # ── URLs prefirmadas ─────────────────────────────────────────────────────
+    def _firma(self, metodo: str, ruta: str, parametros: List[Tuple[str, str]]) -> str:
+        canonica = '&'.join(f"{k}={quote(v, safe='-_.~')}" for k, v in sorted(parametros))
+        return hmac.new(self._secreto, f"{metodo}\n{ruta}\n{canonica}".encode('utf-8'), hashlib.sha256).hexdigest()
+
+    def _url(self, metodo: str, object_key: str, expiration: int, extra: Optional[Dict[str, str]] = None) -> str:
+        ruta = f"/{self.bucket}/" + quote(object_key.encode('utf-8'), safe='/~')
+        parametros = [(k, v) for k, v in (extra or {}).items() if v is not None]
+        parametros += [
+            ('X-Amz-Algorithm', self.ALGORITMO),
+            ('X-Amz-Date', datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')),
+            ('X-Amz-Expires', str(expiration)),
+        ]
+        parametros.append(('X-Amz-Signature', self._firma(metodo, ruta, parametros)))
+        return f"{self.base_url}{ruta}?{urlencode(parametros, quote_via=quote)}"
+
+    def atender(self, metodo: str, url: str, cuerpo: bytes = b'', headers: Optional[dict] = None) -> Tuple[int, bytes, dict]:
+        """
+        Resuelve una petición a una URL prefirmada como lo haría S3.
+        Retorna (status, cuerpo, headers).
+        """
+        headers = {k.lower(): v for k, v in (headers or {}).items()}
+        partes = urlsplit(url)
+        prefijo = f"/{self.bucket}/"
+        if not partes.path.startswith(prefijo):
+            return 404, b'NoSuchBucket', {}
+        object_key = unquote(partes.path[len(prefijo):])
+        parametros = parse_qsl(partes.query, keep_blank_values=True)
+        firma = dict(parametros).get('X-Amz-Signature', '')
+        parametros = [(k, v) for k, v in parametros if k != 'X-Amz-Signature']
+        if not hmac.compare_digest(firma, self._firma(metodo, partes.path, parametros)):
+            return 403, b'SignatureDoesNotMatch', {}
+
+        valores = dict(parametros)
+        emitida = datetime.strptime(valores['X-Amz-Date'], '%Y%m%dT%H%M%SZ').replace(tzinfo=timezone.utc)
+        if (datetime.now(timezone.utc) - emitida).total_seconds() > int(valores['X-Amz-Expires']):
+            return 403, b'AccessDenied: Request has expired', {}
+
+        if metodo == 'GET':
+            contenido = self._leer(object_key)
+            meta = self._meta(object_key)
+            if contenido is None or meta is None:
+                return 404, b'NoSuchKey', {}
+            respuesta = {'Content-Type': meta['content_type'], 'ETag': f'"{meta["etag"]}"'}
+            if valores.get('response-content-disposition'):
+                respuesta['Content-Disposition'] = valores['response-content-disposition']
+            return 200, contenido, respuesta
+
+        if 'uploadId' in valores:
+            carpeta = self._ruta_multipart(valores['uploadId'])
+            if not carpeta.is_dir():
+                return 404, b'NoSuchUpload', {}
+            self._escribir(carpeta / f"{int(valores['partNumber']):05d}.part", cuerpo)
+            return 200, b'', {'ETag': f'"{hashlib.md5(cuerpo).hexdigest()}"'}
+
+        if headers.get('content-type') != valores.get('content-type'):
+            return 403, b'SignatureDoesNotMatch: Content-Type', {}
+        sha256 = None
+        if valores.get('x-amz-checksum-sha256'):
+            esperado = valores['x-amz-checksum-sha256']
+            if headers.get('x-amz-checksum-sha256') != esperado:
+                return 403, b'SignatureDoesNotMatch: x-amz-checksum-sha256', {}
+            if base64.b64encode(hashlib.sha256(cuerpo).digest()).decode('ascii') != esperado:
+                return 400, b'BadDigest', {}
+            sha256 = base64.b64decode(esperado).hex()
+        etag = self._guardar(object_key, cuerpo, valores['content-type'], sha256=sha256)
+        return 200, b'', {'ETag': f'"{etag}"'}
+
+    # ── StorageBackend ───────────────────────────────────────────────────────
+    def generate_upload_url(self, object_key: str, content_type: str, expiration: int = 300, sha256: Optional[str] = None) -> Optional[str]:
+        checksum = _parametros_subida(self.bucket, object_key, content_type, sha256).get('ChecksumSHA256')
+        return self._url('PUT', object_key, expiration, {
+            'content-type': content_type, 'x-amz-checksum-sha256': checksum,
+        })
+
+    def generate_view_url(self, object_key: str, expiration: int = 3600, download_name: Optional[str] = None) -> Optional[str]:
+        return self._url('GET', object_key, expiration, {
+            'response-content-disposition': _disposicion(download_name),
+        })
+
+    def generate_view_urls(self, solicitudes: Iterable[SolicitudURL], expiration: int = 3600) -> Dict[SolicitudURL, str]:
+        return {
+            (object_key, download_name): self.generate_view_url(object_key, expiration, download_name)
+            for object_key, download_name in solicitudes
+        }
+
     def check_file_exists(self, object_key: str) -> bool:
-        try:
-            self.s3_client.head_object(Bucket=self.bucket, Key=object_key)
-            return True
-        except Exception:
-            return False
-    
+        return self._meta(object_key) is not None
+
     def delete_file(self, object_key: str) -> bool:
-        try:
-            self.s3_client.delete_object(Bucket=self.bucket, Key=object_key)
-            logger.info(f"Archivo eliminado de MinIO: {object_key}")
-            return True
-        except Exception as e:
-            logger.error(f"Error eliminando archivo MinIO: {e}")
+        # Como en S3, eliminar una clave inexistente no es un error
+        for ruta in self._rutas(object_key):
+            ruta.unlink(missing_ok=True)
+        return True
+
+    def delete_files(self, object_keys: List[str]) -> Dict[str, str]:
+        for object_key in object_keys:
+            self.delete_file(object_key)
+        return {}
+
+    def list_objects(self, prefix: str) -> Iterator[dict]:
+        metas = []
+        for ruta_meta in (self.raiz / 'objetos').glob('*.json'):
+            meta = json.loads(ruta_meta.read_text())
+            if meta['key'].startswith(prefix):
+                metas.append(meta)
+        for meta in sorted(metas, key=lambda m: m['key']):
+            yield {
+                'key': meta['key'],
+                'size': meta['size'],
+                'last_modified': datetime.fromisoformat(meta['last_modified']),
+            }
+
+    def get_file_metadata(self, object_key: str, checksum: bool = False) -> Optional[dict]:
+        meta = self._meta(object_key)
+        if meta is None:
+            return None
+        metadata = {'size': meta['size'], 'etag': meta['etag']}
+        if checksum:
+            metadata['sha256'] = meta['sha256']
+        return metadata
+
+    def download_file(self, object_key: str, destino: BinaryIO) -> bool:
+        contenido = self._leer(object_key)
+        if contenido is None:
+            logger.error(f"Error descargando {object_key}: no existe")
+            return False
+        destino.write(contenido)
+        return True
+
+    def upload_file(self, object_key: str, contenido: bytes, content_type: str) -> bool:
+        self._guardar(object_key, contenido, content_type, sha256=hashlib.sha256(contenido).hexdigest())
+        return True
+
+    def create_multipart_upload(self, object_key: str, content_type: str) -> Optional[str]:
+        upload_id = uuid.uuid4().hex
+        self._escribir(
+            self._ruta_multipart(upload_id) / 'subida.json',
+            json.dumps({'key': object_key, 'content_type': content_type}).encode('utf-8'),
+        )
+        return upload_id
+
+    def generate_part_upload_urls(self, object_key: str, upload_id: str, part_numbers: Iterable[int], expiration: int = 3600) -> Dict[int, str]:
+        return {
+            numero: self._url('PUT', object_key, expiration, {'uploadId': upload_id, 'partNumber': str(numero)})
+            for numero in part_numbers
+        }
+
+    def list_uploaded_parts(self, object_key: str, upload_id: str) -> Optional[List[dict]]:
+        carpeta = self._ruta_multipart(upload_id)
+        if not carpeta.is_dir():
+            return None
+        partes = []
+        for ruta in sorted(carpeta.glob('*.part')):
+            contenido = ruta.read_bytes()
+            partes.append({
+                'part_number': int(ruta.stem),
+                'etag': hashlib.md5(contenido).hexdigest(),
+                'size': len(contenido),
+            })
+        return partes
+
+    def complete_multipart_upload(self, object_key: str, upload_id: str, parts: List[dict]) -> Optional[str]:
+        carpeta = self._ruta_multipart(upload_id)
+        if not carpeta.is_dir():
+            logger.error(f"Error completando subida multipart local: {upload_id} no existe")
+            return None
+        subida = json.loads((carpeta / 'subida.json').read_text())
+        contenido, digests = [], []
+        for parte in sorted(parts, key=lambda p: p['part_number']):
+            try:
+                datos = (carpeta / f"{parte['part_number']:05d}.part").read_bytes()
+            except FileNotFoundError:
+                logger.error(f"Error completando subida multipart local: falta la parte {parte['part_number']}")
+                return None
+            digest = hashlib.md5(datos)
+            if digest.hexdigest() != parte['etag'].strip('"'):
+                logger.error(f"Error completando subida multipart local: ETag de la parte {parte['part_number']}")
+                return None
+            contenido.append(datos)
+            digests.append(digest.digest())
+        etag = f"{hashlib.md5(b''.join(digests)).hexdigest()}-{len(digests)}"
+        self._guardar(object_key, b''.join(contenido), subida['content_type'], etag=etag)
+        shutil.rmtree(carpeta, ignore_errors=True)
+        return etag
+
+    def abort_multipart_upload(self, object_key: str, upload_id: str) -> bool:
+        carpeta = self._ruta_multipart(upload_id)
+        if not carpeta.is_dir():
             return False
+        shutil.rmtree(carpeta, ignore_errors=True)
+        return True
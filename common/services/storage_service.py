@@ -2,13 +2,87 @@
 """
 Factory Service que selecciona automáticamente el backend de storage correcto.
 Implementa patrón Singleton para reutilizar la instancia.
+
+El backend (cliente boto3 con su pool de conexiones) se crea de forma
+diferida en el primer uso, nunca al importar. La verificación del bucket
+(health check) corre en segundo plano: al iniciar si
+STORAGE_VERIFICAR_AL_INICIAR está activo, o desde el endpoint de estado.
 """
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+import math
+import threading
+import time
+
 from django.conf import settings
-from .storage_backend import StorageBackend, S3Backend, MinIOBackend
+from django.utils import timezone
+from .storage_backend import StorageBackend, S3Backend, MinIOBackend, LocalBackend, SolicitudURL
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Límites de S3 para subidas multipart
+MULTIPART_TAMANO_MINIMO = 5 * 1024 * 1024       # 5 MiB (salvo la última parte)
+MULTIPART_TAMANO_DEFECTO = 16 * 1024 * 1024     # 16 MiB
+MULTIPART_MAX_PARTES = 10000
+
+
+class PresignedURLCache:
+    """
+    Cache en proceso de URLs GET prefirmadas.
+
+    Agrupada por object_key (LRU acotado en objetos); dentro de cada objeto,
+    una URL por (download_name, expiration). Una URL se reutiliza mientras le
+    quede al menos `margen` de vigencia, así el cliente siempre recibe una URL
+    con margen suficiente para usarla. Invalidar un objeto es O(1).
+
+    Es por proceso a propósito: una URL de otro worker que apunte a un objeto
+    ya eliminado solo obtiene 404 del storage, no expone datos.
+    """
+
+    def __init__(self, max_entries: int = 10000, margen_fraccion: float = 0.25, margen_minimo: int = 60):
+        self.max_entries = max_entries
+        self.margen_fraccion = margen_fraccion
+        self.margen_minimo = margen_minimo
+        self._entradas = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _margen(self, expiration: int) -> float:
+        return max(self.margen_minimo, expiration * self.margen_fraccion)
+
+    def obtener(self, object_key: str, download_name: Optional[str], expiration: int) -> Optional[str]:
+        variante = (download_name, expiration)
+        with self._lock:
+            urls = self._entradas.get(object_key)
+            entrada = urls.get(variante) if urls else None
+            if entrada is None:
+                return None
+            url, vence = entrada
+            if vence - time.time() < self._margen(expiration):
+                del urls[variante]
+                return None
+            self._entradas.move_to_end(object_key)
+            return url
+
+    def guardar(self, object_key: str, download_name: Optional[str], expiration: int, url: str,
+                generado: Optional[float] = None) -> None:
+        vence = (generado or time.time()) + expiration
+        with self._lock:
+            self._entradas.setdefault(object_key, {})[(download_name, expiration)] = (url, vence)
+            self._entradas.move_to_end(object_key)
+            while len(self._entradas) > self.max_entries:
+                self._entradas.popitem(last=False)
+
+    def invalidar(self, object_key: str) -> None:
+        with self._lock:
+            self._entradas.pop(object_key, None)
+
+    def limpiar(self) -> None:
+        with self._lock:
+            self._entradas.clear()
+
 
 class StorageService:
     """
@@ -17,13 +91,44 @@ class StorageService:
     """
     
     _instance = None
+    _lock = threading.Lock()
+    url_cache = PresignedURLCache()
+    # Resultado del último health check: {'ok', 'backend', 'error', 'verificado_en'}
+    estado_salud = {'ok': None, 'backend': None, 'error': None, 'verificado_en': None}
+    _verificando = threading.Lock()
     
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._backend = cls._create_backend()
+            with cls._lock:
+                if cls._instance is None:
+                    instancia = super().__new__(cls)
+                    instancia._backend_obj = None
+                    cls._instance = instancia
         return cls._instance
     
+    @property
+    def _backend(self) -> StorageBackend:
+        """Backend creado en el primer uso (el cliente boto3 es thread-safe; su creación no)"""
+        if self._backend_obj is None:
+            with self._lock:
+                if self._backend_obj is None:
+                    self._backend_obj = self._create_backend()
+        return self._backend_obj
+    
+    @classmethod
+    @contextmanager
+    def usar_backend(cls, backend: StorageBackend):
+        """Reemplaza temporalmente el backend (tests: LocalBackend en un directorio temporal)"""
+        servicio = cls()
+        anterior = servicio._backend_obj
+        servicio._backend_obj = backend
+        cls.url_cache.limpiar()
+        try:
+            yield servicio
+        finally:
+            servicio._backend_obj = anterior
+            cls.url_cache.limpiar()
+    
     @staticmethod
     def _create_backend() -> StorageBackend:
         """Crea el backend según STORAGE_BACKEND en settings"""
@@ -33,17 +138,69 @@ class StorageService:
             'bucket_name': settings.AWS_STORAGE_BUCKET_NAME,
             'access_key': settings.AWS_ACCESS_KEY_ID,
             'secret_key': settings.AWS_SECRET_ACCESS_KEY,
+            'session_token': getattr(settings, 'AWS_SESSION_TOKEN', None),
+            'cliente': {
+                'max_pool_connections': getattr(settings, 'STORAGE_MAX_POOL_CONNECTIONS', 50),
+                'connect_timeout': getattr(settings, 'STORAGE_CONNECT_TIMEOUT', 3),
+                'read_timeout': getattr(settings, 'STORAGE_READ_TIMEOUT', 30),
+                'max_attempts': getattr(settings, 'STORAGE_MAX_INTENTOS', 3),
+            },
         }
         
         if backend_type == 'minio':
             config['endpoint_url'] = settings.MINIO_ENDPOINT_URL
             logger.info(f" Usando MinIO local: {config['endpoint_url']}")
             return MinIOBackend(config)
+        elif backend_type == 'local':
+            config['root'] = settings.STORAGE_LOCAL_ROOT
+            config['base_url'] = settings.STORAGE_LOCAL_URL
+            logger.info(f" Usando storage local en disco: {config['root']}")
+            return LocalBackend(config)
         else:
             config['region'] = getattr(settings, 'AWS_S3_REGION_NAME', 'us-east-1')
             logger.info(f"  Usando AWS S3: {config['bucket_name']}")
             return S3Backend(config)
         
+    # ── Health check ─────────────────────────────────────────────────────────
+    def verificar(self) -> dict:
+        """Verifica el acceso al bucket (creándolo en MinIO) y actualiza `estado_salud`"""
+        backend, error = getattr(settings, 'STORAGE_BACKEND', 'minio'), None
+        try:
+            backend = self.backend_type
+            self._backend.verificar()
+        except Exception as e:
+            error = str(e)
+            logger.error(f"[Storage] Health check fallido ({backend}): {e}")
+        StorageService.estado_salud = {
+            'ok': error is None,
+            'backend': backend,
+            'error': error,
+            'verificado_en': timezone.now(),
+        }
+        return StorageService.estado_salud
+    
+    @classmethod
+    def verificar_en_segundo_plano(cls) -> None:
+        """Crea el cliente y verifica el bucket fuera del request (un hilo a la vez)"""
+        if not cls._verificando.acquire(blocking=False):
+            return
+        
+        def _ejecutar():
+            try:
+                cls().verificar()
+            finally:
+                cls._verificando.release()
+        
+        threading.Thread(target=_ejecutar, name='storage-verificar', daemon=True).start()
+    
+    @classmethod
+    def estado(cls, max_edad: int = 60) -> dict:
+        """Último health check; si tiene más de `max_edad` segundos, agenda otro"""
+        verificado_en = cls.estado_salud['verificado_en']
+        if verificado_en is None or timezone.now() - verificado_en > timedelta(seconds=max_edad):
+            cls.verificar_en_segundo_plano()
+        return cls.estado_salud
+    
     @property
     def bucket_name(self) -> str:
         """Retorna el nombre del bucket desde el backend"""
@@ -54,13 +211,41 @@ class StorageService:
         """Retorna el tipo de backend (útil para debugging)"""
         return self._backend.__class__.__name__
     
-    def generate_upload_url(self, object_key: str, content_type: str, expiration: int = 300):
-        """Genera URL prefirmada para subir archivo"""
-        return self._backend.generate_upload_url(object_key, content_type, expiration)
+    def generate_upload_url(self, object_key: str, content_type: str, expiration: int = 300, sha256: Optional[str] = None):
+        """Genera URL prefirmada para subir archivo (con `sha256`, el storage verifica el contenido)"""
+        return self._backend.generate_upload_url(object_key, content_type, expiration, sha256)
     
     def generate_view_url(self, object_key: str, expiration: int = 3600, download_name=None):
-        """Genera URL prefirmada para visualizar/descargar archivo"""
-        return self._backend.generate_view_url(object_key, expiration, download_name)
+        """Genera URL prefirmada para visualizar/descargar archivo (reutiliza la cacheada)"""
+        url = self.url_cache.obtener(object_key, download_name, expiration)
+        if url is None:
+            generado = time.time()
+            url = self._backend.generate_view_url(object_key, expiration, download_name)
+            if url:
+                self.url_cache.guardar(object_key, download_name, expiration, url, generado)
+        return url
+    
+    def generate_view_urls(self, solicitudes: Iterable[SolicitudURL], expiration: int = 3600) -> Dict[SolicitudURL, str]:
+        """
+        Genera URLs de visualización/descarga en lote.
+        Solo firma (con el cliente boto3 compartido) las que no están en cache.
+        """
+        urls = {}
+        faltantes = []
+        for object_key, download_name in solicitudes:
+            url = self.url_cache.obtener(object_key, download_name, expiration)
+            if url is None:
+                faltantes.append((object_key, download_name))
+            else:
+                urls[(object_key, download_name)] = url
+        
+        if faltantes:
+            generado = time.time()
+            firmadas = self._backend.generate_view_urls(faltantes, expiration)
+            for (object_key, download_name), url in firmadas.items():
+                self.url_cache.guardar(object_key, download_name, expiration, url, generado)
+            urls.update(firmadas)
+        return urls
     
     def check_file_exists(self, object_key: str) -> bool:
         """Verifica existencia del archivo"""
@@ -68,4 +253,58 @@ class StorageService:
     
     def delete_file(self, object_key: str) -> bool:
         """Elimina archivo del storage"""
+        self.url_cache.invalidar(object_key)
         return self._backend.delete_file(object_key)
+    
+    def delete_files(self, object_keys: List[str]) -> Dict[str, str]:
+        """Elimina en lote; retorna {object_key: error} de los que fallaron"""
+        for object_key in object_keys:
+            self.url_cache.invalidar(object_key)
+        return self._backend.delete_files(list(object_keys))
+    
+    def list_objects(self, prefix: str):
+        """Objetos bajo el prefijo: {'key', 'size', 'last_modified'}"""
+        return self._backend.list_objects(prefix)
+
+    
+    def get_file_metadata(self, object_key: str, checksum: bool = False) -> Optional[dict]:
+        """Tamaño y ETag del objeto (None si no existe); con `checksum`, también su SHA-256"""
+        return self._backend.get_file_metadata(object_key, checksum)
+    
+    def download_file(self, object_key: str, destino) -> bool:
+        """Descarga el objeto en un archivo abierto en modo binario"""
+        return self._backend.download_file(object_key, destino)
+    
+    def upload_file(self, object_key: str, contenido: bytes, content_type: str) -> bool:
+        """Sube contenido generado por el servidor"""
+        return self._backend.upload_file(object_key, contenido, content_type)
+    
+    # ── Subida multipart ─────────────────────────────────────────────────────
+    @staticmethod
+    def calcular_partes(size: int) -> Tuple[int, int]:
+        """Tamaño de parte y número de partes para un archivo de `size` bytes"""
+        tamano_parte = max(
+            MULTIPART_TAMANO_DEFECTO,
+            math.ceil(size / MULTIPART_MAX_PARTES / MULTIPART_TAMANO_MINIMO) * MULTIPART_TAMANO_MINIMO,
+        )
+        return tamano_parte, max(1, math.ceil(size / tamano_parte))
+    
+    def create_multipart_upload(self, object_key: str, content_type: str) -> Optional[str]:
+        """Inicia una subida multipart; retorna el upload_id"""
+        return self._backend.create_multipart_upload(object_key, content_type)
+    
+    def generate_part_upload_urls(self, object_key: str, upload_id: str, part_numbers: Iterable[int], expiration: int = 3600) -> Dict[int, str]:
+        """URLs prefirmadas para subir partes (en paralelo desde el cliente)"""
+        return self._backend.generate_part_upload_urls(object_key, upload_id, part_numbers, expiration)
+    
+    def list_uploaded_parts(self, object_key: str, upload_id: str) -> Optional[List[dict]]:
+        """Partes ya recibidas (para reanudar tras una caída de red)"""
+        return self._backend.list_uploaded_parts(object_key, upload_id)
+    
+    def complete_multipart_upload(self, object_key: str, upload_id: str, parts: List[dict]) -> Optional[str]:
+        """Ensambla el objeto; retorna su ETag"""
+        return self._backend.complete_multipart_upload(object_key, upload_id, parts)
+    
+    def abort_multipart_upload(self, object_key: str, upload_id: str) -> bool:
+        """Cancela la subida multipart"""
+        return self._backend.abort_multipart_upload(object_key, upload_id)
@@ -0,0 +1,38 @@
+# common/views.py
+"""
+Punto de acceso HTTP del backend de storage 'local' (solo desarrollo).
+
+Las URLs prefirmadas de LocalBackend apuntan a STORAGE_LOCAL_URL; esta vista
+las resuelve con LocalBackend.atender() (firma, caducidad, Content-Type y
+checksum), igual que lo haría S3 con las de boto3. config/urls.py la monta
+solo con DEBUG y STORAGE_BACKEND=local.
+"""
+from urllib.parse import quote
+
+from django.http import Http404, HttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_http_methods
+
+from common.services.storage_backend import LocalBackend
+from common.services.storage_service import StorageService
+
+
+@csrf_exempt
+@require_http_methods(['GET', 'PUT'])
+def storage_local(request, ruta):
+    backend = StorageService()._backend
+    if not isinstance(backend, LocalBackend):
+        raise Http404('El backend de storage no es local')
+
+    # La firma se calcula sobre la ruta codificada como en LocalBackend._url
+    url = quote(f"/{ruta}".encode('utf-8'), safe='/~') + '?' + request.META.get('QUERY_STRING', '')
+    headers = {'content-type': request.content_type or ''}
+    checksum = request.headers.get('x-amz-checksum-sha256')
+    if checksum:
+        headers['x-amz-checksum-sha256'] = checksum
+
+    estado, cuerpo, cabeceras = backend.atender(request.method, url, request.body, headers)
+    respuesta = HttpResponse(cuerpo, status=estado, content_type=cabeceras.pop('Content-Type', None))
+    for nombre, valor in cabeceras.items():
+        respuesta[nombre] = valor
+    return respuesta
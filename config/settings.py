@@ -33,6 +33,15 @@ STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'minio')
 AWS_STORAGE_BUCKET_NAME = os.getenv('AWS_STORAGE_BUCKET_NAME', 'plexident-clinical-files')
 AWS_ACCESS_KEY_ID = os.getenv('AWS_ACCESS_KEY_ID', 'minioadmin')
 AWS_SECRET_ACCESS_KEY = os.getenv('AWS_SECRET_ACCESS_KEY', 'minioadmin')
+# Credenciales temporales (STS / rol de instancia): sin el token las URLs firmadas no son válidas
+AWS_SESSION_TOKEN = os.getenv('AWS_SESSION_TOKEN') or None
+# Cliente boto3 (compartido por requests e hilos de fondo)
+STORAGE_MAX_POOL_CONNECTIONS = int(os.getenv('STORAGE_MAX_POOL_CONNECTIONS', '50'))
+STORAGE_CONNECT_TIMEOUT = float(os.getenv('STORAGE_CONNECT_TIMEOUT', '3'))
+STORAGE_READ_TIMEOUT = float(os.getenv('STORAGE_READ_TIMEOUT', '30'))
+STORAGE_MAX_INTENTOS = int(os.getenv('STORAGE_MAX_INTENTOS', '3'))
+# Health check del bucket en segundo plano al iniciar (fuera del primer request)
+STORAGE_VERIFICAR_AL_INICIAR = os.getenv('STORAGE_VERIFICAR_AL_INICIAR', 'False') == 'True'
 
 if STORAGE_BACKEND == 's3':
     # AWS S3 Configuration (Producción)
@@ -60,6 +69,15 @@ else:
     # Fallback a sistema de archivos local
     MEDIA_URL = '/media/'
     MEDIA_ROOT = BASE_DIR / 'media'
+    # Backend 'local' de StorageService: objetos en disco con semántica S3
+    STORAGE_LOCAL_ROOT = os.getenv('STORAGE_LOCAL_ROOT', str(BASE_DIR / 'storage_local'))
+    # Con DEBUG, config/urls.py monta esta ruta (common.views.storage_local)
+    STORAGE_LOCAL_URL = os.getenv('STORAGE_LOCAL_URL', 'http://localhost:8000/storage-local')
+
+# Exportación masiva de PDF: ZIP de trabajo y archivo de progreso (siempre en disco local)
+EXPORTACION_PDF_DIR = os.getenv('EXPORTACION_PDF_DIR', str(BASE_DIR / 'exports'))
+# Tope de procesos de render por exportación (el comando corre fuera de gunicorn)
+EXPORTACION_PDF_MAX_WORKERS = int(os.getenv('EXPORTACION_PDF_MAX_WORKERS', str(min(4, os.cpu_count() or 1))))
 
 # ============================================================================
 # APPLICATION DEFINITION
@@ -102,6 +120,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'api.utils.compression.CompresionRespuestaMiddleware',
     'corsheaders.middleware.CorsMiddleware',  
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -218,10 +237,10 @@ REST_FRAMEWORK = {
 
      # Renderer personalizado - Formatea TODAS las respuestas automáticamente
 
+    # La API navegable solo en desarrollo (en producción renderiza HTML y formularios)
     'DEFAULT_RENDERER_CLASSES': [
         'api.utils.renderers.StandardizedJSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
-    ],
+    ] + (['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
 
     #  Exception handler personalizado - Maneja TODOS los errores
     'EXCEPTION_HANDLER': 'api.utils.exception_handlers.custom_exception_handler',
@@ -397,6 +416,30 @@ CACHES = {
     }
 }
 
+# Catálogo del odontograma en memoria: precarga al iniciar y cada cuántos
+# segundos se compara su versión con la de la BD (VersionCatalogo)
+ODONTOGRAMA_CATALOGO_PRECARGAR = os.getenv('ODONTOGRAMA_CATALOGO_PRECARGAR', 'False') == 'True'
+ODONTOGRAMA_CATALOGO_VERIFICAR_SEGUNDOS = float(os.getenv('ODONTOGRAMA_CATALOGO_VERIFICAR_SEGUNDOS', '5'))
+
+# Versiones del odontograma: estado completo cada N versiones (deltas entre
+# medio) y compresión zlib del contenido
+ODONTOGRAMA_VERSIONES_KEYFRAME = int(os.getenv('ODONTOGRAMA_VERSIONES_KEYFRAME', '20'))
+ODONTOGRAMA_VERSIONES_COMPRIMIR = os.getenv('ODONTOGRAMA_VERSIONES_COMPRIMIR', 'True') == 'True'
+
+# Historial particionado por mes (odontograma, citas, recordatorios): meses
+# futuros con partición creada, meses que se conservan en la base antes de
+# archivarse en el storage y prefijo de los archivos (NDJSON + gzip)
+HISTORIAL_PARTICIONES_MESES_FUTUROS = int(os.getenv('HISTORIAL_PARTICIONES_MESES_FUTUROS', '3'))
+HISTORIAL_ARCHIVO_MESES = int(os.getenv('HISTORIAL_ARCHIVO_MESES', '24'))
+HISTORIAL_ARCHIVO_PREFIJO = os.getenv('HISTORIAL_ARCHIVO_PREFIJO', 'archivo/historial')
+
+# Compresión (brotli o gzip según Accept-Encoding) de respuestas JSON de al menos este tamaño
+RESPUESTA_COMPRESION_MIN_BYTES = int(os.getenv('RESPUESTA_COMPRESION_MIN_BYTES', '1024'))
+RESPUESTA_COMPRESION_BROTLI_CALIDAD = int(os.getenv('RESPUESTA_COMPRESION_BROTLI_CALIDAD', '5'))
+
+# Listados del admin: por encima de estas filas se muestra un conteo estimado (pg_class / EXPLAIN)
+ADMIN_CONTEO_ESTIMADO_MIN_FILAS = int(os.getenv('ADMIN_CONTEO_ESTIMADO_MIN_FILAS', '50000'))
+
 # ============================================================================
 # LOGGING CONFIGURATION
 # ============================================================================
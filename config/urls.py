@@ -1,4 +1,7 @@
 # config/urls.py
+from urllib.parse import urlsplit
+
+from django.conf import settings
 from django.contrib import admin
 from django.urls import path, include
 
@@ -19,3 +22,11 @@ urlpatterns = [
     # Autenticación DRF (opcional, útil para pruebas)
     path("api-auth/", include("rest_framework.urls", namespace="rest_framework")),
 ]
+
+# Storage 'local' (desarrollo sin MinIO): sirve las URLs prefirmadas de LocalBackend
+if settings.DEBUG and settings.STORAGE_BACKEND == 'local':
+    from common.views import storage_local
+
+    urlpatterns.append(
+        path(f"{urlsplit(settings.STORAGE_LOCAL_URL).path.strip('/')}/<path:ruta>", storage_local)
+    )
@@ -19,6 +19,7 @@ python manage.py cargar_odontograma_csv --quiet
 echo "Recolectando archivos estáticos..."
 python manage.py collectstatic --noinput 
 
-# Iniciar el servidor con Gunicorn
+# Iniciar el servidor con Gunicorn (cada worker precarga el catálogo del odontograma)
 echo "Iniciando Gunicorn..."
+export ODONTOGRAMA_CATALOGO_PRECARGAR=${ODONTOGRAMA_CATALOGO_PRECARGAR:-True}
 exec gunicorn config.wsgi:application --bind 0.0.0.0:8000 --workers 3 
\ No newline at end of file